@@ -33,7 +33,7 @@ def create_app():
 
     # from app.routes.recommendations.download_nltk_resources import download_nltk_resources
     # from app.routes.recommendations.download_punkt_tab import download_punkt_tab
-    from app.routes import user_application_form, employer, student_jobseeker, main_bp, academe, recommendation, admin
+    from app.routes import user_application_form, employer, student_jobseeker, main_bp, academe, recommendation, admin, warm_up_matchers, start_recommendation_refresher, configure_posting_snapshots, start_matching_service
     
     # download_punkt_tab()
     # download_nltk_resources()
@@ -46,6 +46,22 @@ def create_app():
     app.register_blueprint(recommendation, url_prefix='/api')
     app.register_blueprint(admin, url_prefix='/api')
 
+    # Load NLTK data and build the shared recommendation matchers before serving requests
+    warm_up_matchers(
+        app.config.get("RECOMMENDATION_SCORING_BACKEND", "auto"),
+        featurization=app.config.get("RECOMMENDATION_FEATURIZATION", "tfidf"),
+        hash_features=app.config.get("RECOMMENDATION_HASH_FEATURES", 2 ** 18)
+    )
+
+    # Map the job posting index from shared on-disk snapshots (RECOMMENDATION_SNAPSHOT_DIR)
+    configure_posting_snapshots(app)
+
+    # Run the matchers on a process pool (RECOMMENDATION_MATCHING_PROCESSES), off the request threads
+    start_matching_service(app)
+
+    # Keep the stored per-user recommendations up to date in the background
+    start_recommendation_refresher(app)
+
     # Logging configuration
     if not app.debug:
         logging.basicConfig(level=logging.INFO)
@@ -8,6 +8,56 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL")
     SECRET_KEY = os.getenv("SECRET_KEY")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Stored recommendations older than this (seconds) are recomputed on demand
+    RECOMMENDATION_MAX_STALENESS = int(os.getenv("RECOMMENDATION_MAX_STALENESS", 6 * 60 * 60))
+    # How often (seconds) the background refresher looks for outdated stored recommendations
+    RECOMMENDATION_REFRESH_INTERVAL = int(os.getenv("RECOMMENDATION_REFRESH_INTERVAL", 60))
+    RECOMMENDATION_REFRESHER_ENABLED = os.getenv("RECOMMENDATION_REFRESHER_ENABLED", "true").lower() == "true"
+    # Size and lifetime (seconds) of the in-process cache of computed recommendations
+    RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", 1024))
+    RECOMMENDATION_CACHE_TTL = int(os.getenv("RECOMMENDATION_CACHE_TTL", 600))
+    # Threads running the matchers of /recommend/all concurrently (shared by all requests)
+    RECOMMENDATION_WORKERS = int(os.getenv("RECOMMENDATION_WORKERS", 6))
+    # Job preference prefilter: constraint tiers tried strictest first (fields country, municipality,
+    # industry, salary and scope = local/overseas), until at least MIN_CANDIDATES postings remain
+    RECOMMENDATION_PREFILTER_ENABLED = os.getenv("RECOMMENDATION_PREFILTER_ENABLED", "true").lower() == "true"
+    RECOMMENDATION_PREFILTER_MIN_CANDIDATES = int(os.getenv("RECOMMENDATION_PREFILTER_MIN_CANDIDATES", 20))
+    RECOMMENDATION_PREFILTER_TIERS = os.getenv(
+        "RECOMMENDATION_PREFILTER_TIERS",
+        "country,municipality,salary,industry;country,salary,industry;country,salary;country;scope"
+    )
+    # Country of local postings (a preference for any other country means overseas work)
+    RECOMMENDATION_HOME_COUNTRY = os.getenv("RECOMMENDATION_HOME_COUNTRY", "Philippines")
+    # Kernel of the matchers' per-posting score math: numba (compiled), numpy, or auto (numba when installed)
+    RECOMMENDATION_SCORING_BACKEND = os.getenv("RECOMMENDATION_SCORING_BACKEND", "auto")
+    # Job posting features: tfidf (vocabulary fitted per catalog version) or hashing (HASH_FEATURES
+    # hashed columns and a document-frequency array updated per posting, fixed memory, no refit)
+    RECOMMENDATION_FEATURIZATION = os.getenv("RECOMMENDATION_FEATURIZATION", "tfidf")
+    RECOMMENDATION_HASH_FEATURES = int(os.getenv("RECOMMENDATION_HASH_FEATURES", 2 ** 18))
+    # Directory of the memory-mapped job posting index snapshots shared by all worker processes
+    # (empty = every worker keeps its own in-memory index); the newest KEEP versions are kept
+    RECOMMENDATION_SNAPSHOT_DIR = os.getenv("RECOMMENDATION_SNAPSHOT_DIR", "")
+    RECOMMENDATION_SNAPSHOT_KEEP = int(os.getenv("RECOMMENDATION_SNAPSHOT_KEEP", 3))
+    # Near-duplicate reposts: postings of one employer whose MinHash similarity (estimated Jaccard
+    # similarity of their word 3-grams) reaches the threshold are scored as one posting, the newest
+    RECOMMENDATION_DEDUP_ENABLED = os.getenv("RECOMMENDATION_DEDUP_ENABLED", "true").lower() == "true"
+    RECOMMENDATION_DEDUP_THRESHOLD = float(os.getenv("RECOMMENDATION_DEDUP_THRESHOLD", 0.8))
+    # Latency budget (ms) of a /recommend/* request (0 = unbounded; ?budget_ms= can only lower it):
+    # when the time left can't cover the boosts, postings are ranked by cosine similarity alone
+    RECOMMENDATION_LATENCY_BUDGET_MS = int(os.getenv("RECOMMENDATION_LATENCY_BUDGET_MS", 2000))
+    # Asynchronous recommendation jobs (POST /recommend/jobs): worker threads of each kind's pool
+    # ("kind=threads,..."; the admin bulk matching runs on the job pool) and how long (seconds)
+    # finished results are kept for polling, in the database so every worker process can serve the poll
+    RECOMMENDATION_JOB_WORKERS = os.getenv("RECOMMENDATION_JOB_WORKERS", "job=2,training=1,scholarship=1")
+    RECOMMENDATION_JOB_TTL = int(os.getenv("RECOMMENDATION_JOB_TTL", 600))
+    # Worker processes running the matchers off the request threads (0 = match in the request
+    # threads), and how many matchings may be queued or running at once before requests get a 503
+    RECOMMENDATION_MATCHING_PROCESSES = int(os.getenv("RECOMMENDATION_MATCHING_PROCESSES", 0))
+    RECOMMENDATION_MATCHING_QUEUE_DEPTH = int(os.getenv("RECOMMENDATION_MATCHING_QUEUE_DEPTH", 16))
+    # Seconds after which the jobseeker profile matrix used to rank candidates for employers is
+    # reloaded in full (profile changes made through other worker processes show up then)
+    RECOMMENDATION_CANDIDATE_INDEX_MAX_AGE = int(os.getenv("RECOMMENDATION_CANDIDATE_INDEX_MAX_AGE", 3600))
     # cloudinary.config( 
     #     cloud_name = os.getenv("CLOUDINARY_CLOUD_NAME"),
     #     api_key = os.getenv("CLOUDINARY_API_KEY"), 
@@ -4,4 +4,5 @@ from .user import User
 from .employer import EmployerJobPosting, EmployerTrainingPosting, EmployerScholarshipPosting, EmployerCompanyInformation
 from .student_jobseeker import StudentJobseekerSavedJobs, StudentJobseekerSavedTrainings, StudentJobseekerSavedScholarships, StudentJobseekerApplyJobs, StudentJobseekerApplyScholarships, StudentJobseekerApplyTrainings
 from .academe import AcademeGraduateReport, AcademeEnrollmentReport
-from .admin import Announcement
\ No newline at end of file
+from .admin import Announcement
+from .recommendation import PostingCatalogVersion, UserRecommendation, PostingSignature, PostingSignatureBand, RecommendationJobRecord
\ No newline at end of file
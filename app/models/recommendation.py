@@ -0,0 +1,64 @@
+from datetime import datetime
+from app import db
+from app.models import BaseModel
+
+# Version counter of the active postings per posting type (job, training, scholarship).
+# Bumped in the same transaction as every posting write so cached recommendation indexes know when to rebuild.
+class PostingCatalogVersion(BaseModel):
+    __tablename__ = 'posting_catalog_versions'
+
+    posting_type = db.Column(db.String(20), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+# Materialized recommendations of one user for one posting type (job, training, scholarship).
+# Holds the ranked posting ids and scores computed against a catalog version, so the
+# recommendation endpoints can serve them without rerunning the matchers.
+class UserRecommendation(BaseModel):
+    __tablename__ = 'user_recommendations'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), primary_key=True)
+    kind = db.Column(db.String(20), primary_key=True)
+    catalog_version = db.Column(db.Integer, nullable=False, default=0)
+    ranked_postings = db.Column(db.Text, nullable=False)  # JSON list of {posting_id, match_score, details}
+    total_postings = db.Column(db.Integer, nullable=False, default=0)
+    stale = db.Column(db.Boolean, nullable=False, default=False)  # Set when the user's profile changed
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    refresh_failures = db.Column(db.Integer, nullable=False, default=0)  # Failed background recomputes in a row
+    retry_after = db.Column(db.DateTime, nullable=True)  # Skipped by the refresher sweep until then, after a failure
+
+# MinHash signature of one posting's text, written whenever the posting is created or edited.
+# The matchers collapse near-duplicate reposts of the same employer with it (see near_duplicates).
+class PostingSignature(BaseModel):
+    __tablename__ = 'posting_signatures'
+
+    posting_type = db.Column(db.String(20), primary_key=True)
+    posting_id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False, index=True)
+    signature = db.Column(db.Text, nullable=False)  # JSON list of MinHash values
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+# LSH band buckets of the posting signatures: postings sharing a (band, bucket) are near-duplicate candidates.
+class PostingSignatureBand(BaseModel):
+    __tablename__ = 'posting_signature_bands'
+    __table_args__ = (db.Index('ix_posting_signature_bands_bucket', 'posting_type', 'band', 'bucket'),)
+
+    posting_type = db.Column(db.String(20), primary_key=True)
+    posting_id = db.Column(db.Integer, primary_key=True)
+    band = db.Column(db.Integer, primary_key=True)
+    bucket = db.Column(db.String(16), nullable=False)
+
+# State of one asynchronous recommendation job (POST /recommend/jobs). Written by the worker
+# process running the job and read by whichever worker process serves its poll; finished
+# jobs expire RECOMMENDATION_JOB_TTL seconds after they finished.
+class RecommendationJobRecord(BaseModel):
+    __tablename__ = 'recommendation_jobs'
+
+    job_id = db.Column(db.String(32), primary_key=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey('users.user_id'), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False)
+    results = db.Column(db.Text, nullable=True)  # JSON {part name: result} once finished
+    errors = db.Column(db.Text, nullable=True)  # JSON {part name: error} of the failed parts
+    submitted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=True, index=True)  # Unset until the job finished
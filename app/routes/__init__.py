@@ -3,6 +3,8 @@ from .employer import employer
 from .student_jobseeker import student_jobseeker
 from .login_register import main_bp
 from .academe import academe
-from .recommendations.recommendation_routes import recommendation
+from .recommendations.recommendation_routes import recommendation, warm_up_matchers, start_recommendation_refresher
 from .recommendations.job_reco_model.job_matcher import NoveltyEnhancedJobMatcher
+from .recommendations.snapshot_commands import configure_posting_snapshots
+from .recommendations.matching_service import start_matching_service
 from .admin import admin
\ No newline at end of file
@@ -22,7 +22,9 @@ from app.models import (
         EmployerTrainingPosting,
         Announcement
     )
-from app.utils import get_user_data, exclude_fields, update_expired_job_postings, update_expired_training_postings, update_expired_scholarship_postings, convert_dates, convert
+from app.utils import get_user_data, exclude_fields, update_expired_job_postings, update_expired_training_postings, update_expired_scholarship_postings, convert_dates, convert, bump_posting_catalog_version
+from app.utils.employer_helper import POSTING_TYPES
+from app.routes.recommendations.near_duplicates import near_duplicate_report
 from datetime import datetime, timedelta
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError,  NoResultFound
 from werkzeug.exceptions import BadRequest
@@ -101,6 +103,7 @@ def update_posting_status():
             }), 400
             
         # Commit the changes
+        bump_posting_catalog_version(data['posting_type'])
         db.session.commit()
         
         return jsonify({
@@ -1453,6 +1456,43 @@ def get_all_company_information():
         # Handle unexpected errors
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
+@admin.route('/near-duplicate-postings', methods=['GET'])
+@auth.login_required
+def get_near_duplicate_postings():
+    """
+    Route to report postings that are near-duplicates of another posting of the same employer
+    (reposts with small edits), grouped in clusters. Only the newest posting of each cluster
+    is used for recommendations.
+    Optional query parameter: posting_type=job|training|scholarship (all types by default).
+    Only users with 'ADMIN' privileges can access this route.
+    """
+    try:
+        # Check if the authenticated user has ADMIN privileges
+        if g.user.user_type != 'ADMIN':
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        posting_type = request.args.get('posting_type')
+        if posting_type and posting_type not in POSTING_TYPES:
+            return jsonify({"error": f"Invalid posting type. Must be one of: {', '.join(POSTING_TYPES)}"}), 400
+
+        report = {}
+        for kind in [posting_type] if posting_type else POSTING_TYPES:
+            model, id_column, _ = POSTING_TYPES[kind]
+            clusters = near_duplicate_report(kind, model, id_column)
+            report[kind] = {
+                "clusters": clusters,
+                "duplicate_postings": sum(len(cluster["postings"]) - 1 for cluster in clusters)
+            }
+
+        return jsonify({
+            "success": True,
+            "near_duplicates": report
+        }), 200
+
+    except Exception as e:
+        # Handle unexpected errors
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
 # ===========================================================================================================================================#
 #                                                       ADMIN ADD ANNOUNCEMENTS
 # ===========================================================================================================================================#
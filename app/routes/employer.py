@@ -4,7 +4,8 @@ from app import db
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError, NoResultFound
 from flask_httpauth import HTTPBasicAuth
 from app.models import User, EmployerJobPosting, EmployerTrainingPosting, EmployerScholarshipPosting, EmployerPersonalInformation, StudentJobseekerApplyJobs, StudentJobseekerApplyTrainings, StudentJobseekerApplyScholarships, PersonalInformation, EmployerCompanyInformation
-from app.utils import get_user_data, exclude_fields, update_expired_job_postings, update_expired_training_postings, update_expired_scholarship_postings
+from app.utils import get_user_data, exclude_fields, update_expired_job_postings, update_expired_training_postings, update_expired_scholarship_postings, bump_posting_catalog_version
+from app.routes.recommendations.near_duplicates import record_posting_signature, delete_posting_signature, posting_text
 from datetime import datetime, timedelta
 from werkzeug.exceptions import BadRequest
 import logging
@@ -94,12 +95,18 @@ def create_job_posting():
 
         # Add and commit to the database
         db.session.add(new_job_posting)
+        db.session.flush()
+        
+        # MinHash signature for near-duplicate detection; earlier postings it repeats are reported back
+        duplicate_ids = record_posting_signature('job', new_job_posting.employer_jobpost_id, uid, posting_text('job', new_job_posting))
+        bump_posting_catalog_version('job')
         db.session.commit()
 
         # Return success response
         return jsonify({
             "message": "Job posting created successfully",
-            "job_posting_id": new_job_posting.employer_jobpost_id
+            "job_posting_id": new_job_posting.employer_jobpost_id,
+            "near_duplicate_postings": duplicate_ids
         }), 201
 
     except Exception as e:
@@ -217,12 +224,17 @@ def update_job_posting(job_id):
         if job.expiration_date and job.expiration_date < datetime.utcnow() and job.status != 'expired':
             job.status = 'expired'
         
+        # Refresh the MinHash signature of the edited text
+        duplicate_ids = record_posting_signature('job', job.employer_jobpost_id, job.user_id, posting_text('job', job))
+        
         # Commit the changes to the database
+        bump_posting_catalog_version('job')
         db.session.commit()
         
         return jsonify({
             "success": True,
-            "message": "Job posting updated successfully"
+            "message": "Job posting updated successfully",
+            "near_duplicate_postings": duplicate_ids
         }), 200
     except Exception as e:
         db.session.rollback()
@@ -249,6 +261,8 @@ def delete_job_posting(job_id):
         
         # Delete the job posting
         db.session.delete(job)
+        delete_posting_signature('job', job_id)
+        bump_posting_catalog_version('job')
         db.session.commit()
         
         return jsonify({
@@ -462,13 +476,19 @@ def create_training_posting():
 
         # Add and commit to the database
         db.session.add(new_training_posting)
+        db.session.flush()
+        
+        # MinHash signature for near-duplicate detection; earlier postings it repeats are reported back
+        duplicate_ids = record_posting_signature('training', new_training_posting.employer_trainingpost_id, uid, posting_text('training', new_training_posting))
+        bump_posting_catalog_version('training')
         db.session.commit()
 
         # Return success response with the created posting's ID
         return jsonify({
             "success": True,
             "message": "Training posting created successfully",
-            "training_id": new_training_posting.employer_trainingpost_id
+            "training_id": new_training_posting.employer_trainingpost_id,
+            "near_duplicate_postings": duplicate_ids
         }), 201
     except Exception as e:
         # Handle unexpected errors
@@ -561,12 +581,17 @@ def update_training_posting(training_id):
         if training.expiration_date and training.expiration_date < datetime.utcnow() and training.status != 'expired':
             training.status = 'expired'
         
+        # Refresh the MinHash signature of the edited text
+        duplicate_ids = record_posting_signature('training', training.employer_trainingpost_id, training.user_id, posting_text('training', training))
+        
         # Commit the changes to the database
+        bump_posting_catalog_version('training')
         db.session.commit()
         
         return jsonify({
             "success": True,
-            "message": "Training posting updated successfully"
+            "message": "Training posting updated successfully",
+            "near_duplicate_postings": duplicate_ids
         }), 200
     except Exception as e:
         db.session.rollback()
@@ -593,6 +618,8 @@ def delete_training_posting(training_id):
         
         # Delete the training posting
         db.session.delete(training)
+        delete_posting_signature('training', training_id)
+        bump_posting_catalog_version('training')
         db.session.commit()
         
         return jsonify({
@@ -721,13 +748,19 @@ def create_scholarship_posting():
 
         # Add and commit to the database
         db.session.add(new_scholarship_posting)
+        db.session.flush()
+        
+        # MinHash signature for near-duplicate detection; earlier postings it repeats are reported back
+        duplicate_ids = record_posting_signature('scholarship', new_scholarship_posting.employer_scholarshippost_id, uid, posting_text('scholarship', new_scholarship_posting))
+        bump_posting_catalog_version('scholarship')
         db.session.commit()
 
         # Return success response with the created posting's ID
         return jsonify({
             "success": True,
             "message": "Scholarship posting created successfully",
-            "scholarship_id": new_scholarship_posting.employer_scholarshippost_id
+            "scholarship_id": new_scholarship_posting.employer_scholarshippost_id,
+            "near_duplicate_postings": duplicate_ids
         }), 201
     except Exception as e:
         # Handle unexpected errors
@@ -820,12 +853,17 @@ def update_scholarship_posting(scholarship_id):
         if scholarship.expiration_date and scholarship.expiration_date < datetime.utcnow() and scholarship.status != 'expired':
             scholarship.status = 'expired'
         
+        # Refresh the MinHash signature of the edited text
+        duplicate_ids = record_posting_signature('scholarship', scholarship.employer_scholarshippost_id, scholarship.user_id, posting_text('scholarship', scholarship))
+        
         # Commit the changes to the database
+        bump_posting_catalog_version('scholarship')
         db.session.commit()
         
         return jsonify({
             "success": True,
-            "message": "Scholarship posting updated successfully"
+            "message": "Scholarship posting updated successfully",
+            "near_duplicate_postings": duplicate_ids
         }), 200
     except Exception as e:
         db.session.rollback()
@@ -852,6 +890,8 @@ def delete_scholarship_posting(scholarship_id):
         
         # Delete the scholarship posting
         db.session.delete(scholarship)
+        delete_posting_signature('scholarship', scholarship_id)
+        bump_posting_catalog_version('scholarship')
         db.session.commit()
         
         return jsonify({
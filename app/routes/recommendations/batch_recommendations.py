@@ -0,0 +1,70 @@
+# batch_recommendations.py - Bulk job matching for many jobseekers, streamed as NDJSON
+import json
+from sqlalchemy import or_
+from app.models import User, PersonalInformation
+from app.utils import update_expired_job_postings, get_posting_catalog_version
+from .job_reco_model.job_matching import run_batch_job_matching
+from .near_duplicates import load_job_postings
+from .recommendation_store import build_user_profiles
+
+# Profiles loaded and scored together
+BATCH_SIZE = 256
+
+
+def parse_user_ids(value):
+    """
+    The user_ids field of a batch request: None when missing, otherwise a list of
+    integer ids (ValueError for anything else, reported to the client as a 400)
+    """
+    if value is None:
+        return None
+    if not isinstance(value, list) or not all(isinstance(user_id, int) and not isinstance(user_id, bool) for user_id in value):
+        raise ValueError("user_ids must be a list of integers")
+    return value
+
+
+def select_jobseeker_ids(user_ids=None, municipality=None, limit=None):
+    """
+    Ids of the jobseekers/students to match, optionally restricted to given ids
+    and/or to a (permanent or temporary) municipality
+    """
+    query = User.query.filter(User.user_type.in_(["STUDENT", "JOBSEEKER"]))
+
+    if user_ids:
+        query = query.filter(User.user_id.in_(user_ids))
+
+    if municipality:
+        query = (query
+                 .join(PersonalInformation, PersonalInformation.user_id == User.user_id)
+                 .filter(or_(PersonalInformation.permanent_municipality.ilike(municipality),
+                             PersonalInformation.temporary_municipality.ilike(municipality))))
+
+    query = query.with_entities(User.user_id).distinct().order_by(User.user_id)
+    if limit:
+        query = query.limit(limit)
+    return [row.user_id for row in query.all()]
+
+
+def generate_batch_job_recommendations(user_ids, top_n=5, batch_size=BATCH_SIZE):
+    """NDJSON lines with the top_n jobs of every user, produced batch by batch"""
+    # Expire outdated postings first so the catalog version reflects them
+    update_expired_job_postings()
+    catalog_version = get_posting_catalog_version('job')
+
+    def profiles():
+        # Profiles are loaded a batch at a time, with one query per profile section
+        for start in range(0, len(user_ids), batch_size):
+            batch_ids = user_ids[start:start + batch_size]
+            batch_profiles = build_user_profiles(batch_ids)
+            for user_id in batch_ids:
+                yield user_id, batch_profiles[user_id]
+
+    results = run_batch_job_matching(
+        profiles(),
+        lambda: load_job_postings(catalog_version),
+        top_n=top_n,
+        catalog_version=catalog_version,
+        batch_size=batch_size
+    )
+    for result in results:
+        yield json.dumps(result) + "\n"
@@ -0,0 +1,247 @@
+# candidate_index.py - Jobseeker profile matrix in the job posting feature space, for ranking candidates per posting
+import threading
+import time
+import numpy as np
+from scipy import sparse
+from .job_reco_model.job_matcher import NoveltyEnhancedJobMatcher
+from .matcher_registry import get_shared_matcher
+from .section_vectors import weighted_section_matrix, feature_count
+from .scoring import cosine_similarities, row_norms, top_k_rows
+from app.config import Config
+
+
+class CandidateIndex:
+    """
+    Sparse (jobseekers x features) float32 matrix of L2-normalized profile vectors, in
+    the feature space of one job posting index, so the vector of a posting ranks every
+    jobseeker with one sparse product.
+
+    The profile vectors are the ones the job matcher scores postings with: the
+    section-weighted sum of the profile's section vectors (see extract_profile_sections).
+    """
+    def __init__(self, vectorizer, user_ids, matrix):
+        # Vectorizer of the job posting index the rows were transformed with
+        self.vectorizer = vectorizer
+
+        # User id of every row, and the row of every user id
+        self.user_ids = list(user_ids)
+        self.row_by_user = {user_id: row for row, user_id in enumerate(self.user_ids)}
+
+        self.matrix = matrix
+        self.row_norms = row_norms(matrix)
+
+    def with_profiles(self, user_ids, matrix, removed=()):
+        """
+        Copy of this index where the rows of the given users are replaced by (or, for
+        users not indexed yet, extended with) the rows of matrix, and removed users dropped
+        """
+        replaced = set(user_ids) | set(removed)
+        kept = [row for row, user_id in enumerate(self.user_ids) if user_id not in replaced]
+        return CandidateIndex(
+            self.vectorizer,
+            [self.user_ids[row] for row in kept] + list(user_ids),
+            sparse.vstack([self.matrix[kept], matrix], format='csr')
+        )
+
+    def rank(self, posting_vector, top_n, offset=0, user_ids=None, excluded_ids=()):
+        """
+        Best candidates for a posting vector (dense, in this index's feature space):
+        (user ids, match scores 0-100) of the top_n after skipping the offset best, and the
+        number of candidates ranked. With user_ids, only those users are ranked (every one
+        of them, whatever their score); otherwise every indexed jobseeker sharing at least
+        one term with the posting, except excluded_ids.
+        """
+        if user_ids is not None:
+            rows = np.array([self.row_by_user[user_id] for user_id in user_ids if user_id in self.row_by_user], dtype=np.intp)
+            scores = cosine_similarities(posting_vector, self.matrix[rows], self.row_norms[rows]) * 100
+        else:
+            rows = np.arange(len(self.user_ids))
+            scores = cosine_similarities(posting_vector, self.matrix, self.row_norms) * 100
+            scores[scores <= 0] = -np.inf
+            excluded_rows = [self.row_by_user[user_id] for user_id in excluded_ids if user_id in self.row_by_user]
+            scores[excluded_rows] = -np.inf
+
+        total = int(np.isfinite(scores).sum())
+        top = top_k_rows(scores, top_n, offset)
+        top = top[np.isfinite(scores[top])]
+        return [self.user_ids[row] for row in rows[top]], np.minimum(scores[top], 100), total
+
+    def shared_terms(self, user_id, posting_vector, feature_names, limit=5):
+        """Terms a candidate shares with the posting, those adding most to the score first"""
+        row = self.row_by_user.get(user_id)
+        if row is None or feature_names is None:
+            return []
+        start, end = self.matrix.indptr[row], self.matrix.indptr[row + 1]
+        term_indices = self.matrix.indices[start:end]
+        contributions = self.matrix.data[start:end] * posting_vector[term_indices]
+        order = np.argsort(-contributions, kind='stable')
+        return [str(feature_names[term_indices[i]]) for i in order[:limit] if contributions[i] > 0]
+
+
+class CandidateIndexCache:
+    """
+    Holds the CandidateIndex over the current job posting index.
+
+    The preprocessed profile sections of every jobseeker are kept, so a refitted job
+    vocabulary only transforms them again, and a changed profile (see mark_stale) is
+    loaded and re-vectorized alone on the next use. Every max_age seconds all profiles
+    are loaded again, which also picks up changes made through other worker processes.
+    """
+    def __init__(self, max_age=3600):
+        self.max_age = max_age
+        self._sections = {}
+        self._stale = set()
+        self._loaded_at = None
+        self._index = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+        self.full_loads = 0
+        self.builds = 0
+        self.updates = 0
+        self.updated_profiles = 0
+        self.last_build_ms = 0.0
+
+    def mark_stale(self, user_id):
+        """Re-vectorize a user's profile the next time the index is used"""
+        with self._lock:
+            self._stale.add(user_id)
+
+    def get(self, posting_index, load_user_ids, load_profiles, user_ids=()):
+        """
+        Index in the feature space of posting_index, up to date with the profiles.
+        load_user_ids() returns the ids of every jobseeker/student and load_profiles(ids)
+        the profiles of those of the given ids that are still jobseekers/students.
+        user_ids not indexed yet (e.g. applicants) are loaded along with the stale ones.
+
+        Loading and vectorizing run outside the lock guarding the current index: while
+        one thread refreshes it, requests the current index can serve get it right away,
+        and only those it can't serve (other vocabulary, missing users) wait for the refresh.
+        """
+        with self._lock:
+            index = self._index
+            pending = (
+                self._stale
+                or self._loaded_at is None
+                or time.time() - self._loaded_at > self.max_age
+            )
+        usable = (
+            index is not None
+            and index.vectorizer is posting_index.vectorizer
+            and all(user_id in index.row_by_user for user_id in user_ids)
+        )
+        if usable and not pending:
+            return index
+
+        # Only one thread loads and vectorizes at a time
+        if not self._build_lock.acquire(blocking=not usable):
+            return index
+        try:
+            return self._refresh(posting_index, load_user_ids, load_profiles, user_ids)
+        finally:
+            self._build_lock.release()
+
+    def _refresh(self, posting_index, load_user_ids, load_profiles, user_ids):
+        """Reload, update or rebuild the index as needed (the caller holds the build lock)"""
+        with self._lock:
+            full_load = self._loaded_at is None or time.time() - self._loaded_at > self.max_age
+            stale = self._stale
+            self._stale = set()
+            sections = self._sections
+            index = self._index
+
+        try:
+            matcher = get_shared_matcher(NoveltyEnhancedJobMatcher)
+            loaded_at = None
+            if full_load:
+                # Profiles flagged stale meanwhile are loaded fresh anyway
+                loaded_at = time.time()
+                ids = load_user_ids()
+                sections = self._extract_sections(matcher, load_profiles(ids) if ids else {})
+                index = None
+                stale = set()
+
+            changed = stale | {user_id for user_id in user_ids if user_id not in sections}
+            if changed:
+                sections = dict(sections)
+                changed_sections = self._extract_sections(matcher, load_profiles(sorted(changed)))
+                for user_id in changed:
+                    if user_id in changed_sections:
+                        sections[user_id] = changed_sections[user_id]
+                    else:
+                        sections.pop(user_id, None)
+
+            vectorizer = posting_index.vectorizer
+            build_ms = None
+            if index is None or index.vectorizer is not vectorizer:
+                # New vocabulary (or first use): every profile is transformed against it
+                start = time.perf_counter()
+                indexed_ids = list(sections)
+                index = CandidateIndex(vectorizer, indexed_ids, self._vectorize(matcher, vectorizer, sections, indexed_ids))
+                build_ms = (time.perf_counter() - start) * 1000
+            elif changed:
+                present = [user_id for user_id in sorted(changed) if user_id in sections]
+                removed = [user_id for user_id in changed if user_id not in sections]
+                index = index.with_profiles(present, self._vectorize(matcher, vectorizer, sections, present), removed)
+        except Exception:
+            # Flagged profiles are retried on the next use
+            with self._lock:
+                self._stale |= stale
+            raise
+
+        with self._lock:
+            self._sections = sections
+            self._index = index
+            if loaded_at is not None:
+                self._loaded_at = loaded_at
+                self.full_loads += 1
+            if build_ms is not None:
+                self.builds += 1
+                self.last_build_ms = build_ms
+            elif changed:
+                self.updates += 1
+                self.updated_profiles += len(changed)
+        return index
+
+    def _extract_sections(self, matcher, profiles):
+        sections = {}
+        for user_id, profile in profiles.items():
+            try:
+                sections[user_id] = matcher.extract_profile_sections(profile)
+            except Exception as e:
+                print(f"Skipping the profile of user {user_id} in the candidate index: {str(e)}")
+        return sections
+
+    def _vectorize(self, matcher, vectorizer, sections, user_ids):
+        if not user_ids:
+            return sparse.csr_matrix((0, feature_count(vectorizer)), dtype=np.float32)
+        return weighted_section_matrix(
+            vectorizer, [sections[user_id] for user_id in user_ids], matcher.profile_section_weights
+        )
+
+    def clear(self):
+        """Drop the index and the profiles, so the next use loads them all again"""
+        with self._lock:
+            self._sections = {}
+            self._stale = set()
+            self._loaded_at = None
+            self._index = None
+
+    def stats(self):
+        with self._lock:
+            index = self._index
+            return {
+                'profiles': len(index.user_ids) if index is not None else 0,
+                'stored_terms': int(index.matrix.nnz) if index is not None else 0,
+                'pending_updates': len(self._stale),
+                'full_loads': self.full_loads,
+                'builds': self.builds,
+                'updates': self.updates,
+                'updated_profiles': self.updated_profiles,
+                'last_build_ms': round(self.last_build_ms, 1),
+                'max_age': self.max_age
+            }
+
+
+# Process-wide jobseeker profile index, kept in the feature space of the job posting index
+jobseeker_profile_index = CandidateIndexCache(Config.RECOMMENDATION_CANDIDATE_INDEX_MAX_AGE)
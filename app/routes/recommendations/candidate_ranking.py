@@ -0,0 +1,156 @@
+# candidate_ranking.py - Employer-side ranking of jobseekers (a posting's applicants, or the whole pool) for a job posting
+from app.models import StudentJobseekerApplyJobs, PersonalInformation
+from app.utils import update_expired_job_postings, get_posting_catalog_version, build_job_posting_data
+from .job_reco_model.job_matcher import NoveltyEnhancedJobMatcher
+from .job_reco_model.job_matching import job_posting_index
+from .job_reco_model.transform_jobs import transform_job_postings
+from .matcher_registry import get_shared_matcher
+from .near_duplicates import load_job_postings
+from .section_vectors import weighted_section_matrix
+from .candidate_index import jobseeker_profile_index
+from .batch_recommendations import select_jobseeker_ids
+from .text_normalizer import surface_forms, surface_term
+from .recommendation_store import build_user_profiles
+
+# Candidate scopes: the applicants of the posting, or every jobseeker/student
+SCOPE_APPLICANTS = 'applicants'
+SCOPE_POOL = 'pool'
+
+# Profiles loaded per query batch when the candidate index is (re)loaded
+PROFILE_BATCH_SIZE = 1000
+
+# Shared terms listed per candidate
+MATCHED_TERMS = 5
+
+# Personal information shown with a ranked candidate (contact and id numbers are left out)
+CANDIDATE_SUMMARY_FIELDS = (
+    'first_name', 'last_name', 'sex', 'permanent_municipality', 'temporary_municipality',
+    'employment_status', 'is_looking_for_work', 'is_willing_to_work_immediately'
+)
+
+
+def load_jobseeker_profiles(user_ids):
+    """Profiles of those of the given users that are jobseekers/students, PROFILE_BATCH_SIZE at a time"""
+    profiles = {}
+    for start in range(0, len(user_ids), PROFILE_BATCH_SIZE):
+        jobseeker_ids = select_jobseeker_ids(user_ids[start:start + PROFILE_BATCH_SIZE])
+        if jobseeker_ids:
+            profiles.update(build_user_profiles(jobseeker_ids))
+    return profiles
+
+
+def job_posting_vector(job, posting_index, matcher):
+    """
+    Dense, L2-normalized vector of a job posting in the feature space of the job posting
+    index: its row when indexed, otherwise (closed, pending or collapsed as a near-duplicate)
+    the posting vectorized the same way as the indexed ones
+    """
+    row = posting_index.row_by_id.get(job.employer_jobpost_id)
+    if row is not None:
+        return posting_index.matrix[row].toarray().ravel()
+
+    payload = build_job_posting_data(job) or {
+        "job_id": job.employer_jobpost_id,
+        "job_title": job.job_title,
+        "job_description": job.job_description,
+        "other_skills": job.other_skills,
+        "course_name": job.course_name,
+        "created_at": job.created_at.strftime('%Y-%m-%d') if job.created_at else ''
+    }
+    (title, description), = transform_job_postings({"job_postings": [payload]}).items()
+    sections = matcher.process_job_posting(title, description)
+    return weighted_section_matrix(posting_index.vectorizer, [sections], matcher.position_weights).toarray().ravel()
+
+
+def posting_surface_forms(job, matcher):
+    """
+    Surface form of every stem in a job posting's text: the matched terms are stemmed
+    features of the vectorizer, shown to employers as the words the posting uses
+    """
+    text = ' '.join(filter(None, [job.job_title, job.job_description, job.other_skills, job.course_name]))
+    return surface_forms(text, matcher.domain_stopword_set)
+
+
+def candidate_summaries(user_ids):
+    """CANDIDATE_SUMMARY_FIELDS of the personal information of each user (None when missing)"""
+    if not user_ids:
+        return {}
+    records = PersonalInformation.query.filter(PersonalInformation.user_id.in_(user_ids)).all()
+    return {
+        record.user_id: {field: getattr(record, field) for field in CANDIDATE_SUMMARY_FIELDS}
+        for record in records
+    }
+
+
+def rank_candidates(job, scope=SCOPE_POOL, top_n=10, offset=0, include_applicants=False):
+    """
+    Jobseekers ranked for an EmployerJobPosting by the cosine similarity of their profile
+    vector to the posting's, scored against the indexed profile matrix (see candidate_index).
+
+    scope 'applicants' ranks the posting's applicants; 'pool' every jobseeker/student
+    sharing a term with the posting, except its applicants unless include_applicants.
+    """
+    try:
+        # Expire outdated postings first so the catalog version reflects them
+        update_expired_job_postings()
+        catalog_version = get_posting_catalog_version('job')
+        posting_index = job_posting_index.get(catalog_version, lambda: load_job_postings(catalog_version))
+        matcher = get_shared_matcher(NoveltyEnhancedJobMatcher)
+
+        applications = {
+            application.user_id: application
+            for application in (StudentJobseekerApplyJobs.query
+                                .filter_by(employer_jobpost_id=job.employer_jobpost_id)
+                                .order_by(StudentJobseekerApplyJobs.created_at)
+                                .all())
+        }
+        index = jobseeker_profile_index.get(
+            posting_index,
+            select_jobseeker_ids,
+            load_jobseeker_profiles,
+            user_ids=list(applications) if scope == SCOPE_APPLICANTS else ()
+        )
+
+        posting_vector = job_posting_vector(job, posting_index, matcher)
+        if scope == SCOPE_APPLICANTS:
+            user_ids, scores, total = index.rank(posting_vector, top_n, offset, user_ids=list(applications))
+        else:
+            excluded_ids = () if include_applicants else list(applications)
+            user_ids, scores, total = index.rank(posting_vector, top_n, offset, excluded_ids=excluded_ids)
+
+        summaries = candidate_summaries(user_ids)
+        forms = posting_surface_forms(job, matcher)
+        candidates = []
+        for user_id, score in zip(user_ids, scores):
+            candidate = {
+                "user_id": user_id,
+                "match_score": round(float(score), 2),
+                "matched_terms": [
+                    surface_term(term, forms)
+                    for term in index.shared_terms(user_id, posting_vector, posting_index.feature_names, MATCHED_TERMS)
+                ],
+                "personal_information": summaries.get(user_id)
+            }
+            application = applications.get(user_id)
+            if application is not None:
+                candidate["application"] = {
+                    "application_id": application.apply_job_id,
+                    "status": application.status,
+                    "created_at": application.created_at.strftime('%Y-%m-%d %H:%M:%S') if application.created_at else None
+                }
+            candidates.append(candidate)
+
+        return {
+            "success": True,
+            "job_id": job.employer_jobpost_id,
+            "scope": scope,
+            "candidates": candidates,
+            "pagination": {"offset": offset, "top_n": top_n, "total": total}
+        }
+    except Exception as e:
+        print(f"Error ranking candidates for job posting {job.employer_jobpost_id}: {str(e)}")
+        return {
+            "success": False,
+            "error": str(e),
+            "candidates": []
+        }
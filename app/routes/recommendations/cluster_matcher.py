@@ -0,0 +1,96 @@
+# cluster_matcher.py - Skill/field cluster lookups compiled into one multi-pattern automaton
+from collections import deque
+import numpy as np
+
+
+class ClusterMatcher:
+    """
+    Aho-Corasick automaton over all the terms of a cluster dictionary
+    ({cluster name: [cluster terms]}).
+
+    A text belongs to a cluster when one of the cluster's terms occurs in it
+    as a substring, exactly like `any(cluster_term in text for cluster_term in terms)`,
+    but a lookup costs one pass over the text instead of one scan per cluster term.
+    """
+    def __init__(self, clusters, weight):
+        # Cluster names in dictionary order; the first matching cluster wins
+        self.cluster_names = list(clusters.keys())
+
+        # Boost applied to terms that belong to any cluster
+        self.weight = weight
+
+        # Trie transitions, failure links and matched-cluster bitmask per state
+        self.transitions = [{}]
+        self.fail = [0]
+        self.outputs = [0]
+
+        for cluster_idx, terms in enumerate(clusters.values()):
+            for cluster_term in terms:
+                state = 0
+                for char in cluster_term:
+                    next_state = self.transitions[state].get(char)
+                    if next_state is None:
+                        next_state = len(self.transitions)
+                        self.transitions[state][char] = next_state
+                        self.transitions.append({})
+                        self.fail.append(0)
+                        self.outputs.append(0)
+                    state = next_state
+                self.outputs[state] |= 1 << cluster_idx
+
+        # Breadth-first pass to set the failure links and inherit their outputs
+        # (states one character below the root keep failing back to the root)
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.transitions[state].items():
+                fallback = self.fail[state]
+                while fallback and char not in self.transitions[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.transitions[fallback].get(char, 0)
+                self.outputs[next_state] |= self.outputs[self.fail[next_state]]
+                queue.append(next_state)
+
+    def match_mask(self, text):
+        """Bitmask of every cluster with a term occurring in text"""
+        transitions = self.transitions
+        fail = self.fail
+        outputs = self.outputs
+
+        mask = 0
+        state = 0
+        for char in text:
+            while state and char not in transitions[state]:
+                state = fail[state]
+            state = transitions[state].get(char, 0)
+            mask |= outputs[state]
+        return mask
+
+    def clusters(self, text):
+        """Names of all clusters matching text, in dictionary order"""
+        mask = self.match_mask(text)
+        return [name for idx, name in enumerate(self.cluster_names) if mask >> idx & 1]
+
+    def cluster(self, text):
+        """Name of the first cluster matching text, or None"""
+        mask = self.match_mask(text)
+        if not mask:
+            return None
+        return self.cluster_names[(mask & -mask).bit_length() - 1]
+
+    def term_weight(self, text):
+        """Cluster boost of a term (1.0 when it belongs to no cluster)"""
+        return self.weight if self.match_mask(text) else 1.0
+
+    def vocabulary_clusters(self, feature_names):
+        """
+        Cluster index of every vocabulary term (-1 for none) and the matching
+        boost array, computed once per fitted vocabulary.
+        """
+        cluster_ids = np.full(len(feature_names), -1, dtype=np.int32)
+        for term_idx, term in enumerate(feature_names):
+            mask = self.match_mask(term)
+            if mask:
+                cluster_ids[term_idx] = (mask & -mask).bit_length() - 1
+        weights = np.where(cluster_ids >= 0, self.weight, 1.0)
+        return cluster_ids, weights
@@ -0,0 +1,125 @@
+# hashed_features.py - Vocabulary-free TF-IDF: feature hashing plus an incrementally maintained document-frequency array
+import copy
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.feature_extraction.text import HashingVectorizer
+
+
+class HashedTfidfVectorizer:
+    """
+    TF-IDF features without a vocabulary or a global fit.
+
+    Unigrams and 2-3-grams are hashed into two fixed blocks of columns (unigrams
+    first, so single-word features stay identifiable), and the IDF comes from a
+    document-frequency array that is updated as documents are added or removed.
+    Memory is fixed by n_features, whatever the number of postings or n-grams.
+
+    Works like the fitted vectorizers of section_vectors: transform() returns raw
+    (unnormalized) TF-IDF rows, with sublinear TF and the smoothed IDF of
+    TfidfVectorizer. Instances are never modified; with_documents() returns an
+    updated copy, so an index keeps the IDF it was built with.
+    """
+    def __init__(self, n_features=2 ** 18, ngram_range=(1, 3), stop_words='english', unigram_share=0.25):
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self.unigram_features = int(n_features * unigram_share) if ngram_range[1] > 1 else n_features
+
+        # Word analyzers of the two blocks (same tokenization and stop words as TfidfVectorizer)
+        self._unigram_analyzer = HashingVectorizer(ngram_range=(1, 1), stop_words=stop_words).build_analyzer()
+        self._unigram_hasher = FeatureHasher(self.unigram_features, input_type='string', alternate_sign=False)
+        self._ngram_analyzer = None
+        self._ngram_hasher = None
+        if ngram_range[1] > 1:
+            self._ngram_analyzer = HashingVectorizer(
+                ngram_range=(max(2, ngram_range[0]), ngram_range[1]), stop_words=stop_words
+            ).build_analyzer()
+            self._ngram_hasher = FeatureHasher(n_features - self.unigram_features, input_type='string', alternate_sign=False)
+
+        # Number of documents containing each feature, and number of documents
+        self.document_frequencies = np.zeros(n_features, dtype=np.int64)
+        self.n_documents = 0
+        self.idf_ = np.ones(n_features)
+
+    def _blocks(self):
+        """(analyzer, hasher, first column) of each block"""
+        blocks = [(self._unigram_analyzer, self._unigram_hasher, 0)]
+        if self._ngram_analyzer is not None:
+            blocks.append((self._ngram_analyzer, self._ngram_hasher, self.unigram_features))
+        return blocks
+
+    def term_frequencies(self, texts):
+        """Sublinear TF rows (1 + log count) of texts, before IDF weighting"""
+        texts = list(texts)
+        if not texts:
+            return sparse.csr_matrix((0, self.n_features), dtype=np.float32)
+        counts = sparse.hstack([
+            hasher.transform(analyzer(text) for text in texts)
+            for analyzer, hasher, _ in self._blocks()
+        ], format='csr')
+        counts.sum_duplicates()
+        counts.data = 1 + np.log(counts.data)
+        return counts.astype(np.float32)
+
+    def transform(self, texts):
+        """Raw TF-IDF rows of texts with the current IDF"""
+        return self.weight(self.term_frequencies(texts))
+
+    def weight(self, term_frequencies):
+        """TF rows (see term_frequencies) weighted by the current IDF, kept in their own float dtype"""
+        matrix = sparse.csr_matrix(term_frequencies, copy=True)
+        matrix.data *= self.idf_[matrix.indices]
+        return matrix
+
+    def with_documents(self, added=None, removed=None):
+        """
+        Copy whose document frequencies count the rows of the TF matrix added as new
+        documents and no longer count the rows of removed (one pass over their nonzeros)
+        """
+        vectorizer = copy.copy(self)
+        document_frequencies = self.document_frequencies.copy()
+        n_documents = self.n_documents
+        for matrix, sign in ((added, 1), (removed, -1)):
+            if matrix is None or matrix.shape[0] == 0:
+                continue
+            matrix = sparse.csr_matrix(matrix)
+            document_frequencies += sign * np.bincount(matrix.indices[matrix.data > 0], minlength=self.n_features)
+            n_documents += sign * matrix.shape[0]
+        vectorizer.document_frequencies = document_frequencies
+        vectorizer.n_documents = n_documents
+        vectorizer.idf_ = np.log((1 + n_documents) / (1 + document_frequencies)) + 1
+        return vectorizer
+
+    def rarity_weights(self):
+        """
+        Gap weight of every feature: log(documents / (df + 1)) + 1 for the single-word
+        block and 0 for n-grams (counterpart of gap_term_weights over a vocabulary)
+        """
+        weights = np.zeros(self.n_features)
+        if self.n_documents:
+            unigram_frequencies = self.document_frequencies[:self.unigram_features]
+            weights[:self.unigram_features] = np.log(self.n_documents / (unigram_frequencies + 1)) + 1
+        return weights
+
+    def term_boosts(self, texts, profile_vector, term_boost):
+        """
+        Per-feature boost vector of the terms of texts present in profile_vector,
+        term_boost(term) each (the first term wins when several hash to the same feature).
+        Counterpart of scoring.profile_term_boosts without feature names.
+        """
+        profile_vector = np.asarray(profile_vector).ravel()
+        boosts = np.zeros(self.n_features)
+        assigned = np.zeros(self.n_features, dtype=bool)
+        for text in texts:
+            if not text:
+                continue
+            for analyzer, hasher, first_column in self._blocks():
+                terms = list(dict.fromkeys(analyzer(text)))
+                if not terms:
+                    continue
+                columns = hasher.transform([term] for term in terms).indices + first_column
+                for term, column in zip(terms, columns):
+                    if profile_vector[column] > 0 and not assigned[column]:
+                        boosts[column] = term_boost(term)
+                        assigned[column] = True
+        return boosts
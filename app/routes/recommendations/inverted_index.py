@@ -0,0 +1,110 @@
+# inverted_index.py - Term -> posting lists over a posting matrix, with MaxScore-style top-k pruning
+import numpy as np
+from scipy import sparse
+from .scoring import top_k_rows
+
+# Numbers of processed terms after which the top-k threshold is re-estimated from exact scores
+THRESHOLD_REFRESH_TERMS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class InvertedIndex:
+    """
+    Posting lists (term id -> posting rows and weights) of a TF-IDF posting matrix,
+    with the largest weight of every term as its max-impact bound.
+
+    Rows can be deactivated (a posting closed or expired) or reactivated without
+    rebuilding the lists; inactive rows are never returned.
+    """
+    def __init__(self, matrix, active=None, term_postings=None, term_max_weights=None):
+        self.matrix = sparse.csr_matrix(matrix)
+
+        # Column j of the CSC matrix is the posting list of term j
+        self.term_postings = term_postings if term_postings is not None else self.matrix.tocsc()
+        if term_max_weights is None:
+            term_max_weights = self.term_postings.max(axis=0).toarray().ravel()
+        self.term_max_weights = term_max_weights
+
+        if active is None:
+            active = np.ones(self.matrix.shape[0], dtype=bool)
+        self.active = active
+
+    def with_active_rows(self, rows):
+        """Copy sharing the posting lists, with only the given rows active"""
+        active = np.zeros(self.matrix.shape[0], dtype=bool)
+        active[np.asarray(rows, dtype=np.intp)] = True
+        return InvertedIndex(self.matrix, active, self.term_postings, self.term_max_weights)
+
+    def active_count(self):
+        """Number of active rows"""
+        return int(np.count_nonzero(self.active))
+
+    def top_k(self, profile_vector, k, exact_scores, score_bound, allowed=None):
+        """
+        Rows and exact scores of the k best active postings, best first, scoring
+        only the postings that could still reach the top k. When given, the
+        boolean mask allowed further restricts the rows that can be returned.
+
+        exact_scores(rows) returns the exact scores of the given rows and must never
+        exceed score_bound * (profile . posting row). Returns None when pruning can't
+        guarantee the same result as scoring every posting (e.g. fewer than k
+        postings with a positive score); the caller then scores them all.
+        """
+        active = self.active if allowed is None else self.active & allowed
+        profile_vector = np.asarray(profile_vector, dtype=np.float64).ravel()
+        terms = np.flatnonzero(profile_vector > 0)
+        if k <= 0 or terms.size == 0:
+            return None
+
+        # Leave room for rounding differences between the partial sums and the exact
+        # scores (float32 posting weights, whose products may be summed in float32)
+        score_bound = score_bound * (1 + 1e-4)
+
+        # Process terms by decreasing max impact; remaining[i] bounds the dot product
+        # a posting can still gain from the terms not processed before term i
+        impacts = profile_vector[terms] * self.term_max_weights[terms]
+        order = np.argsort(-impacts, kind='stable')
+        terms = terms[order]
+        remaining = np.concatenate([np.cumsum(impacts[order][::-1])[::-1], [0.0]])
+
+        indptr = self.term_postings.indptr
+        posting_rows = self.term_postings.indices
+        posting_weights = self.term_postings.data
+
+        partial = np.zeros(self.matrix.shape[0])
+        threshold = -np.inf
+        processed = 0
+        for term in terms:
+            # Postings not seen yet can't beat the current k-th best score anymore
+            if score_bound * remaining[processed] < threshold:
+                break
+
+            start, end = indptr[term], indptr[term + 1]
+            partial[posting_rows[start:end]] += profile_vector[term] * posting_weights[start:end]
+            processed += 1
+
+            if processed in THRESHOLD_REFRESH_TERMS:
+                threshold = max(threshold, self._threshold(partial, k, exact_scores, active))
+
+        if processed not in THRESHOLD_REFRESH_TERMS:
+            threshold = max(threshold, self._threshold(partial, k, exact_scores, active))
+        if threshold <= 0:
+            return None
+
+        # Upper bound of every candidate: what it has so far plus all it could still gain
+        candidates = np.flatnonzero((partial > 0) & active)
+        bounds = score_bound * (partial[candidates] + remaining[processed])
+        candidates = candidates[bounds >= threshold]
+
+        scores = exact_scores(candidates)
+        best = top_k_rows(scores, k)
+        if best.size < k or scores[best[-1]] <= 0:
+            return None
+        return candidates[best], scores[best]
+
+    def _threshold(self, partial, k, exact_scores, active):
+        """Exact k-th best score among the active postings with the highest partial scores"""
+        candidates = np.flatnonzero((partial > 0) & active)
+        if candidates.size < k:
+            return -np.inf
+        leaders = candidates[top_k_rows(partial[candidates], k)]
+        return np.min(exact_scores(np.sort(leaders)))
@@ -1,38 +1,34 @@
 # job_matcher.py - Enhanced with Novelty Features
 import json
-import nltk
-from nltk.stem import SnowballStemmer
+import time
 from nltk.corpus import stopwords
-import re
+from sklearn.base import clone
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
 from collections import Counter
 from datetime import datetime
 import string
 from nltk.tokenize import word_tokenize
 from nltk.util import ngrams
-
-nltk.data.path.insert(0, './nltk_data')
+from ..posting_index import PostingIndex
+from ..scoring import score_components, profile_term_boosts, gap_scores, gap_term_weights, top_k_rows, presence_matrix, batch_cosine_similarities, batch_gap_scores, batch_shared_term_boosts, cosine_similarities
+from ..cluster_matcher import ClusterMatcher
+from ..text_normalizer import normalize_text
+from ..section_vectors import join_sections, fit_section_vectorizer, weighted_section_matrix, weighted_section_sum
+from ..hashed_features import HashedTfidfVectorizer
+from ..posting_text_cache import PostingTextCache, keys_for_titles
+from ..recency import RecencyTable, work_experience_entries
+from ..latency_budget import TIER_FULL, scoring_tier, observe_stage
+from .. import nltk_resources  # Points NLTK at the vendored nltk_data directory
 
 class NoveltyEnhancedJobMatcher:
     def __init__(self, debug=True):
         """Initialize the enhanced job matcher with advanced text processing tools"""
-        # Download all required resources explicitly
-        nltk.download('punkt', quiet=True)
-        nltk.download('stopwords', quiet=True)
-        nltk.download('wordnet', quiet=True)
-        
-        # Make sure nltk has the tokenize package
-        try:
-            from nltk.tokenize import word_tokenize
-            word_tokenize("Test tokenization")
-        except LookupError:
-            # If word_tokenize still fails, download punkt again
-            nltk.download('punkt', quiet=False)
-            
+        # NLTK data comes from the vendored nltk_data directory (see nltk_resources)
         self.debug = debug
-        self.stemmer = SnowballStemmer("english")
         
         # Define domain-specific stopwords (novel feature)
         self.domain_stopwords = [
@@ -42,6 +38,15 @@ class NoveltyEnhancedJobMatcher:
             'please', 'submit', 'resume', 'application'
         ]
         
+        # Set version of the domain stopwords for the per-word filter in preprocess_text
+        self.domain_stopword_set = set(self.domain_stopwords)
+        
+        # Stopwords for key-term extraction, built once instead of on every call
+        self.key_term_stopwords = set(stopwords.words('english')).union(self.domain_stopwords)
+        
+        # Preprocessing results per posting version (see posting_text_cache)
+        self.posting_text_cache = PostingTextCache(self.process_job_posting, self.extract_key_terms)
+        
         # Custom TF-IDF vectorizer with enhanced parameters
         self.vectorizer = TfidfVectorizer(
             ngram_range=(1, 3),  # Increased to capture more contextual phrases
@@ -52,6 +57,9 @@ class NoveltyEnhancedJobMatcher:
             sublinear_tf=True    # Apply sublinear scaling to reduce impact of high frequencies
         )
         
+        # Fixed-memory alternative to the vectorizer, set by use_hashed_features (None = fitted vocabulary)
+        self.hashed_vectorizer = None
+        
         # Define skill categories for semantic clustering (novel feature)
         self.skill_clusters = {
             'programming': ['python', 'java', 'javascript', 'c++', 'ruby', 'php', 'go', 'swift', 
@@ -68,10 +76,16 @@ class NoveltyEnhancedJobMatcher:
                           'critical thinking', 'time management', 'organization']
         }
         
+        # Cluster terms compiled once into a single automaton
+        self.skill_cluster_matcher = ClusterMatcher(self.skill_clusters, weight=1.2)
+        
         # Initialize recency weighting parameters (novel feature)
         self.time_decay_lambda = 0.05  # Controls the decay rate
         self.max_recency_boost = 1.5   # Maximum boost for very recent experience
         
+        # Cap of the combined cluster/recency boost of a job's shared terms
+        self.max_semantic_boost = 1.5
+        
         # Position importance weights (novel feature)
         self.position_weights = {
             'job_title': 3.0,
@@ -81,8 +95,13 @@ class NoveltyEnhancedJobMatcher:
             'company': 0.8
         }
         
-        # Skill rarity index (will be populated during processing)
-        self.skill_rarity_index = {}
+        # Profile section weights (novel feature)
+        self.profile_section_weights = {
+            'education': 2.5,
+            'skills': 4.0,
+            'work_experience': 3.5,
+            'training': 2.5
+        }
         
     def extract_key_terms(self, text):
         """Extract potential skill terms from text (novel feature)"""
@@ -90,7 +109,7 @@ class NoveltyEnhancedJobMatcher:
         tokens = word_tokenize(text.lower())
         
         # Remove punctuation and stopwords
-        stop_words = set(stopwords.words('english')).union(self.domain_stopwords)
+        stop_words = self.key_term_stopwords
         filtered_tokens = [w for w in tokens if w not in stop_words and w not in string.punctuation]
         
         # Extract unigrams, bigrams and trigrams as potential skills
@@ -103,8 +122,12 @@ class NoveltyEnhancedJobMatcher:
         
         return all_terms
         
-    def build_skill_rarity_index(self, job_descriptions):
+    def build_skill_rarity_index(self, job_descriptions, posting_keys=None):
         """Build an index of skill term rarity across job postings (novel feature)"""
+        # Cached per posting version, with counts updated only for postings that changed
+        if posting_keys is not None:
+            return self.posting_text_cache.rarity_index(posting_keys, job_descriptions)
+        
         # Extract all potential skill terms from all job descriptions
         all_job_terms = []
         for desc in job_descriptions:
@@ -116,66 +139,38 @@ class NoveltyEnhancedJobMatcher:
         
         # Calculate inverse frequency (rarity) for each term
         total_jobs = len(job_descriptions)
+        skill_rarity_index = {}
         for term, count in term_counts.items():
             # More rare terms get higher weights
-            self.skill_rarity_index[term] = np.log(total_jobs / (count + 1)) + 1
+            skill_rarity_index[term] = np.log(total_jobs / (count + 1)) + 1
+        
+        return skill_rarity_index
     
     def get_semantic_cluster_weight(self, term):
         """Get the semantic cluster weight for a term (novel feature)"""
-        for cluster, terms in self.skill_clusters.items():
-            if any(skill_term in term for skill_term in terms):
-                return 1.2  # Boost terms that are part of a skill cluster
-        return 1.0
+        # Boost terms that are part of a skill cluster
+        return self.skill_cluster_matcher.term_weight(term)
     
-    def calculate_recency_weight(self, term, profile_data):
-        """Calculate recency weight based on work experience (novel feature)"""
-        # Default weight
-        recency_weight = 1.0
-        
-        # Check work experience for this term
+    def get_semantic_cluster(self, term):
+        """Name of the skill cluster a term belongs to, or None"""
+        return self.skill_cluster_matcher.cluster(term)
+    
+    def build_recency_table(self, profile_data):
+        """Recency weights of the profile's terms, from its work experience (novel feature)"""
+        now = datetime.now()
         try:
-            work_exp = profile_data.get('work_experience', [])
-            
-            # Initialize variables to track the most recent mention
-            most_recent_date = None
-            
-            for exp in work_exp:
-                # Check if the term appears in the position or description
-                position = exp.get('position', '').lower()
-                company = exp.get('company_name', '').lower()
-                
-                if term in position or term in company:
-                    # Parse the end date
-                    end_date = exp.get('end_date', None)
-                    
-                    # If still current, use today's date
-                    if end_date is None or end_date.lower() == 'present':
-                        end_date = datetime.now().strftime('%Y-%m-%d')
-                    
-                    # Try to parse the date
-                    try:
-                        date_obj = datetime.strptime(end_date, '%Y-%m-%d')
-                        
-                        # Update most recent date if this is more recent
-                        if most_recent_date is None or date_obj > most_recent_date:
-                            most_recent_date = date_obj
-                    except:
-                        # If date parsing fails, continue to the next experience
-                        continue
-            
-            # Calculate recency weight if we found a date
-            if most_recent_date:
-                days_since = (datetime.now() - most_recent_date).days
-                recency_weight = self.max_recency_boost * np.exp(-self.time_decay_lambda * days_since/365.0)
-                # Ensure the weight is at least 1.0
-                recency_weight = max(1.0, recency_weight)
-        
+            # Parse every dated history entry once per profile
+            entries = work_experience_entries(profile_data, now)
         except Exception as e:
             if self.debug:
                 print(f"Error calculating recency weight: {str(e)}")
-            recency_weight = 1.0
+            entries = []
             
-        return recency_weight
+        return RecencyTable(entries, self.max_recency_boost, self.time_decay_lambda, now=now)
+
+    def calculate_recency_weight(self, term, profile_data):
+        """Calculate recency weight of a single term (prefer build_recency_table when scoring many terms)"""
+        return self.build_recency_table(profile_data).weight(term)
 
     def calculate_position_weight(self, term, section):
         """Calculate weight based on term position in document (novel feature)"""
@@ -186,27 +181,12 @@ class NoveltyEnhancedJobMatcher:
 
     def preprocess_text(self, text):
         """Enhanced text preprocessing (improved from original)"""
-        # Convert to lowercase string
-        text = str(text).lower()
-        
-        # Remove special characters but keep spaces
-        text = re.sub(r'[^a-zA-Z\s]', ' ', text)
-        
-        # Remove domain-specific stopwords (novel feature)
-        words = text.split()
-        filtered_words = [word for word in words if word not in self.domain_stopwords]
-        text = ' '.join(filtered_words)
-        
-        # Remove extra whitespace
-        text = ' '.join(text.split())
-        
-        # Apply stemming
-        stemmed_words = [self.stemmer.stem(word) for word in text.split()]
-        
-        return ' '.join(stemmed_words)
+        # Lowercase, keep letters only, remove domain-specific stopwords, collapse
+        # whitespace and stem (memoized, shared by all matchers) in a single pass
+        return normalize_text(text, self.domain_stopword_set)
     
-    def extract_profile_features(self, profile_data):
-        """Extract weighted features from profile with enhanced weighting (novel feature)"""
+    def extract_profile_sections(self, profile_data):
+        """Extract preprocessed, separately weighted feature sections from profile (novel feature)"""
         try:
             # Create structured feature sections for position-based weighting
             feature_sections = {}
@@ -249,179 +229,319 @@ class NoveltyEnhancedJobMatcher:
             }
             
 
-            # Apply section weights
-            weighted_sections = {
-                'education': processed_sections['education'] * int(2.5),
-                'skills': processed_sections['skills'] * int(4.0),
-                'work_experience': processed_sections['work_experience'] * int(3.5),
-                'training': processed_sections['training'] * int(2.5)
-            }
-            
-            # Combine all weighted sections
-            combined_text = " ".join(weighted_sections.values())
-            
-            return combined_text
+            return processed_sections
             
         except Exception as e:
             print(f"Error extracting profile features: {str(e)}")
             raise
     
-    def process_job_postings(self, job_posts):
-        """Process job posts with section-based weighting (novel feature)"""
+    def extract_profile_features(self, profile_data):
+        """Unweighted profile document (the section weights are applied in vector space)"""
+        return join_sections(self.extract_profile_sections(profile_data))
+    
+    def process_job_posting(self, title, description):
+        """Split one job post into preprocessed sections for section-based weighting (novel feature)"""
+        # Split description into sections (if possible)
+        sections = {}
+        
+        # Extract job title section
+        sections['job_title'] = title
+        
+        # Basic section extraction (very simplified)
+        if "Requirements:" in description:
+            parts = description.split("Requirements:")
+            sections['description'] = parts[0]
+            sections['requirements'] = "Requirements:" + parts[1]
+        else:
+            sections['description'] = description
+        
+        # Process each section
+        processed_sections = {
+            section: self.preprocess_text(text)
+            for section, text in sections.items()
+        }
+        
+        # Section weights are applied to the section vectors (see section_vectors)
+        return processed_sections
+    
+    def process_job_postings(self, job_posts, posting_keys=None):
+        """Preprocessed sections of every job post, for section-based weighting (novel feature)"""
         processed_jobs = {}
         
         for title, description in job_posts.items():
-            # Split description into sections (if possible)
-            sections = {}
-            
-            # Extract job title section
-            sections['job_title'] = title
-            
-            # Basic section extraction (very simplified)
-            if "Requirements:" in description:
-                parts = description.split("Requirements:")
-                sections['description'] = parts[0]
-                sections['requirements'] = "Requirements:" + parts[1]
+            # Reuse the cached result of unchanged postings
+            key = posting_keys.get(title) if posting_keys else None
+            if key is not None:
+                processed_jobs[title] = self.posting_text_cache.processed_sections(key, title, description)
             else:
-                sections['description'] = description
-            
-            # Process each section
-            processed_sections = {
-                section: self.preprocess_text(text)
-                for section, text in sections.items()
-            }
-            
-            # Apply section weights
-            weighted_text = ""
-            for section, text in processed_sections.items():
-                weight = self.position_weights.get(section, 1.0)
-                # Convert float to int before multiplying with text
-                weighted_text += f" {text * int(weight)}"
-            
-            processed_jobs[title] = weighted_text.strip()
+                processed_jobs[title] = self.process_job_posting(title, description)
         
         return processed_jobs
     
-    def generate_skill_gap_vector(self, profile_features, job_features, feature_names):
-        """Generate a skill gap vector to penalize missing critical skills (novel feature)"""
-        # Extract profile and job terms
-        profile_terms = set(profile_features.split())
+    def generate_skill_gap_vector(self, profile_vector, job_matrix, gap_weights):
+        """Generate a per-job skill gap score to penalize missing critical skills (novel feature)"""
+        # Sum the rarity of every skill term a job asks for and the profile lacks
+        # (higher penalty for rarer skills), for all jobs in one sparse product
+        return gap_scores(profile_vector, job_matrix, gap_weights * 0.1)
+    
+    def use_hashed_features(self, n_features=2 ** 18):
+        """
+        Build posting indexes from hashed features with a maintained document-frequency
+        array instead of a fitted vocabulary (n_features=None goes back to the vocabulary)
+        """
+        if n_features is None:
+            self.hashed_vectorizer = None
+        else:
+            self.hashed_vectorizer = HashedTfidfVectorizer(
+                n_features=n_features,
+                ngram_range=self.vectorizer.ngram_range,
+                stop_words=self.vectorizer.stop_words
+            )
+    
+    def build_posting_index(self, job_posts, postings=None, posting_keys=None, posting_ids=None, postings_by_id=None, base_index=None):
+        """
+        Fit the vocabulary, IDF and job matrix once for a set of job posts (novel feature).
+        With hashed features, only the posts missing from base_index (or changed since) are featurized.
+        """
+        if self.hashed_vectorizer is not None:
+            return self.build_hashed_posting_index(job_posts, postings, posting_keys, posting_ids, postings_by_id, base_index)
         
-        # Initialize skill gap vector
-        skill_gap_vector = np.zeros(len(feature_names))
+        # Process job posts with section-based weighting (cached per posting version when keys are given)
+        processed_jobs = self.process_job_postings(job_posts, posting_keys)
+        job_sections = list(processed_jobs.values())
+        job_features = [join_sections(sections) for sections in job_sections]
         
-        # Count missing skills for each job
-        for job_idx, job_text in enumerate(job_features):
-            job_terms = set(job_text.split())
-            
-            # Find potential skill terms in job that are not in profile
-            missing_skills = job_terms - profile_terms
-            
-            # Calculate penalty for missing skills
-            for term_idx, term in enumerate(feature_names):
-                if term in missing_skills:
-                    # Higher penalty for rarer skills
-                    rarity_factor = self.skill_rarity_index.get(term, 1.0)
-                    skill_gap_vector[term_idx] += rarity_factor * 0.1
-        
-        return skill_gap_vector
-    
-    def get_recommendations(self, profile_data, job_posts, top_n=5):
-        """Get job recommendations with novelty enhancements"""
+        # Build skill rarity index (novel feature)
+        skill_rarity_index = self.build_skill_rarity_index(job_features, keys_for_titles(posting_keys, processed_jobs))
+        
+        # Fit a private copy of the vectorizer on the (unweighted) postings only (the profile
+        # is not part of the fit, it is just transformed against this vocabulary)
         try:
-            # Process profile with enhanced feature extraction
-            profile_features = self.extract_profile_features(profile_data)
-            
-            # Process job posts with section-based weighting
-            processed_jobs = self.process_job_postings(job_posts)
-            
-            # Build skill rarity index (novel feature)
-            self.build_skill_rarity_index(list(processed_jobs.values()))
-            
-            # Combine all texts for vectorization
-            all_texts = list(processed_jobs.values()) + [profile_features]
-            
-            # Create TF-IDF matrix with enhanced vectorizer
-            tfidf_matrix = self.vectorizer.fit_transform(all_texts)
-            
-            # Get feature names for semantic analysis
-            feature_names = self.vectorizer.get_feature_names_out()
-            
-            # Generate skill gap vector (novel feature)
-            skill_gap_vector = self.generate_skill_gap_vector(
-                profile_features, 
-                list(processed_jobs.values()),
-                feature_names
+            vectorizer = fit_section_vectorizer(self.vectorizer, job_features)
+        except ValueError:
+            # Catalog too small for min_df=2 (e.g. a single posting) - keep every term
+            vectorizer = fit_section_vectorizer(clone(self.vectorizer).set_params(min_df=1), job_features)
+        
+        # Job vectors are the position-weighted sum of their section vectors
+        job_matrix = weighted_section_matrix(vectorizer, job_sections, self.position_weights)
+        
+        # Resolve the skill cluster and rarity of every vocabulary term once per fitted vocabulary
+        feature_names = vectorizer.get_feature_names_out()
+        term_clusters, cluster_weights = self.skill_cluster_matcher.vocabulary_clusters(feature_names)
+        gap_weights = gap_term_weights(feature_names, skill_rarity_index)
+        
+        return PostingIndex(
+            titles=list(processed_jobs.keys()),
+            descriptions=job_posts,
+            processed_texts=job_features,
+            vectorizer=vectorizer,
+            matrix=job_matrix,
+            rarity_index=skill_rarity_index,
+            postings=postings,
+            term_clusters=term_clusters,
+            cluster_weights=cluster_weights,
+            gap_weights=gap_weights,
+            posting_ids=posting_ids,
+            postings_by_id=postings_by_id
+        )
+    
+    def build_hashed_posting_index(self, job_posts, postings=None, posting_keys=None, posting_ids=None, postings_by_id=None, base_index=None):
+        """
+        Posting index over hashed features (see hashed_features). Rows of base_index whose
+        post is unchanged are reused; new and edited posts are featurized and added to the
+        document frequencies, removed ones subtracted, and the IDF weighting is reapplied.
+        """
+        titles = list(job_posts.keys())
+        if posting_ids is None:
+            posting_ids = [None] * len(titles)
+        
+        # Only reuse the rows of a hashed index built with the same feature layout
+        if base_index is not None and (
+            base_index.term_frequencies is None
+            or base_index.vectorizer.n_features != self.hashed_vectorizer.n_features
+        ):
+            base_index = None
+        base_rows = {}
+        if base_index is not None:
+            base_rows = {title: row for row, title in enumerate(base_index.titles)}
+        
+        reused_rows, new_titles = [], []
+        order = []
+        for title, posting_id in zip(titles, posting_ids):
+            row = base_rows.get(title)
+            if (row is not None and base_index.posting_ids[row] == posting_id
+                    and base_index.descriptions[title] == job_posts[title]):
+                order.append(len(reused_rows))
+                reused_rows.append(row)
+            else:
+                order.append(None)
+                new_titles.append(title)
+        
+        # Position-weighted sum of the TF vectors of every new post's sections (novel feature)
+        processed_jobs = self.process_job_postings({title: job_posts[title] for title in new_titles}, posting_keys)
+        new_frequencies = weighted_section_sum(
+            self.hashed_vectorizer.term_frequencies,
+            self.hashed_vectorizer.n_features,
+            list(processed_jobs.values()),
+            self.position_weights,
+            dtype=np.float32
+        )
+        
+        if base_index is not None:
+            removed_rows = np.setdiff1d(np.arange(len(base_index.titles)), reused_rows)
+            vectorizer = base_index.vectorizer.with_documents(
+                added=new_frequencies, removed=base_index.term_frequencies[removed_rows]
             )
+            reused_frequencies = base_index.term_frequencies[reused_rows]
+        else:
+            vectorizer = self.hashed_vectorizer.with_documents(added=new_frequencies)
+            reused_frequencies = sparse.csr_matrix((0, self.hashed_vectorizer.n_features), dtype=np.float32)
+        
+        # Rows back in the order of job_posts: reused rows first in the stack, then the new ones
+        new_position = iter(range(len(reused_rows), len(titles)))
+        permutation = [position if position is not None else next(new_position) for position in order]
+        term_frequencies = sparse.csr_matrix(sparse.vstack([reused_frequencies, new_frequencies]))[permutation]
+        job_matrix = normalize(vectorizer.weight(term_frequencies).astype(np.float64)).astype(np.float32)
+        
+        return PostingIndex(
+            titles=titles,
+            descriptions=job_posts,
+            processed_texts=None,
+            vectorizer=vectorizer,
+            matrix=job_matrix,
+            rarity_index=None,
+            postings=postings,
+            gap_weights=vectorizer.rarity_weights(),
+            posting_ids=posting_ids,
+            postings_by_id=postings_by_id,
+            term_frequencies=term_frequencies
+        )
+    
+    def profile_term_boost_vector(self, posting_index, profile_vector, profile_sections, recency_table):
+        """Per-term cluster and recency boosts, only needed for the profile's own terms (novel feature)"""
+        if posting_index.feature_names is None:
+            # Hashed features have no vocabulary - both boosts come from the profile's own terms
+            return posting_index.vectorizer.term_boosts(
+                profile_sections.values(),
+                profile_vector,
+                lambda term: (self.get_semantic_cluster_weight(term) - 1.0) + (recency_table.weight(term) - 1.0)
+            )
+        
+        # Cluster weights are precomputed for the whole vocabulary of the index
+        term_boosts = profile_term_boosts(
+            profile_vector,
+            posting_index.feature_names,
+            lambda term: recency_table.weight(term) - 1.0
+        )
+        term_boosts += np.where(profile_vector > 0, posting_index.cluster_weights - 1.0, 0.0)
+        return term_boosts
+    
+    def score_jobs(self, profile_vector, job_matrix, term_boosts, gap_weights, job_norms=None):
+        """
+        Match scores of a profile against the given job rows (cosine, semantic boost and gap penalty),
+        job_norms optionally holding the cached L2 norms of those rows
+        """
+        # Basic cosine similarity, the boosts averaged over the terms each job shares with the
+        # profile (capped at max_semantic_boost) and the per-job skill gap scores (novel feature),
+        # all from one pass over the job rows (see scoring.score_components)
+        base_similarity, semantic_boost, skill_gap_vector = score_components(
+            profile_vector, job_matrix, term_boosts, gap_weights * 0.1, self.max_semantic_boost, job_norms
+        )
+        
+        # Apply skill gap penalty (novel feature) - REDUCED IMPACT
+        # Changed from 0.1 to 0.02 to reduce the penalty; each job is penalized for its own gap
+        skill_gap_penalty = skill_gap_vector * 0.02
+        
+        # Calculate final match score
+        # Adjust the formula to ensure positive scores
+        # Base similarity is typically between 0 and 1
+        # Apply a positive scaling factor to make scores more meaningful
+        base_score = base_similarity * 100  # Scale to percentage-like values
+        boosted_score = base_score * semantic_boost  # Apply semantic boost
+        return boosted_score - (skill_gap_penalty * base_score / 10)  # Apply reduced penalty
+    
+    def get_recommendations(self, profile_data, job_posts=None, top_n=5, posting_index=None, offset=0, candidate_rows=None, budget=None):
+        """
+        Get job recommendations with novelty enhancements (top_n of them, after skipping the offset best),
+        only among the rows of the boolean mask candidate_rows when given (see preference_filter).
+        Under a latency budget (see latency_budget) without time left for the boosts, jobs
+        are ranked by cosine similarity alone.
+        """
+        try:
+            # Fit an index on the fly when no prefitted one is given
+            if posting_index is None:
+                posting_index = self.build_posting_index(job_posts)
+            job_posts = posting_index.descriptions
             
-            # Apply semantic clustering and recency weighting (novel feature)
-            profile_vector = tfidf_matrix[-1:].toarray()[0]
-            job_vectors = tfidf_matrix[:-1].toarray()
-            
-            # Initialize match scores array
-            match_scores = np.zeros(len(job_vectors))
-            
-            # Calculate enhanced similarity with multiple factors
-            for i, job_vector in enumerate(job_vectors):
-                # Basic cosine similarity
-                dot_product = np.dot(profile_vector, job_vector)
-                profile_norm = np.linalg.norm(profile_vector)
-                job_norm = np.linalg.norm(job_vector)
-                
-                if profile_norm > 0 and job_norm > 0:
-                    base_similarity = dot_product / (profile_norm * job_norm)
-                else:
-                    base_similarity = 0
-                
-                # Apply skill gap penalty (novel feature) - REDUCED IMPACT
-                # Changed from 0.1 to 0.02 to reduce the penalty
-                skill_gap_penalty = np.sum(skill_gap_vector) * 0.02
-                
-                # Apply semantic clustering boost (novel feature)
-                semantic_boost = 1.0
-                boost_count = 0
+            # Process profile with enhanced feature extraction
+            profile_sections = self.extract_profile_sections(profile_data)
+            
+            # Only the profile is vectorized per request: the weighted sum of its
+            # section vectors, each cached by the index for unchanged sections
+            profile_vector = posting_index.section_vectors.combine(profile_sections, self.profile_section_weights)
+            job_matrix = posting_index.matrix
+            
+            full_tier = scoring_tier(budget, 'job') == TIER_FULL
+            stage_start = time.perf_counter()
+            if full_tier:
+                # Recency weights come from one pass over the profile history, then per-term lookups
+                recency_table = self.build_recency_table(profile_data)
                 
-                for term_idx, term in enumerate(feature_names):
-                    if job_vector[term_idx] > 0 and profile_vector[term_idx] > 0:
-                        # Apply cluster weight
-                        cluster_boost = self.get_semantic_cluster_weight(term) - 1.0
-                        
-                        # Apply recency weight
-                        recency_boost = self.calculate_recency_weight(term, profile_data) - 1.0
-                        
-                        # Add boosts to the total
-                        semantic_boost += cluster_boost + recency_boost
-                        boost_count += 1
+                # Per-term cluster and recency boosts, only needed for the profile's own terms (novel feature)
+                term_boosts = self.profile_term_boost_vector(posting_index, profile_vector, profile_sections, recency_table)
                 
-                # Normalize semantic boost by the number of matching terms
-                if boost_count > 0:
-                    semantic_boost = 1.0 + (semantic_boost - 1.0) / boost_count
-                    semantic_boost = min(1.5, semantic_boost)  # Cap the boost
+                def score_rows(rows=None):
+                    # All rows: the index's own matrix, without a per-request copy
+                    if rows is None:
+                        return self.score_jobs(profile_vector, job_matrix, term_boosts, posting_index.gap_weights, posting_index.row_norms)
+                    return self.score_jobs(
+                        profile_vector, job_matrix[rows], term_boosts, posting_index.gap_weights, posting_index.row_norms[rows]
+                    )
                 
-                # Calculate final match score
-                # Adjust the formula to ensure positive scores
-                # Base similarity is typically between 0 and 1
-                # Apply a positive scaling factor to make scores more meaningful
-                base_score = base_similarity * 100  # Scale to percentage-like values
-                boosted_score = base_score * semantic_boost  # Apply semantic boost
-                final_score = boosted_score - (skill_gap_penalty * base_score / 10)  # Apply reduced penalty
+                # The boosts can at most multiply the cosine by max_semantic_boost
+                score_bound = 100 * self.max_semantic_boost
+            else:
+                # Cosine tier: the scaled cosine similarity, which is its own bound
+                def score_rows(rows=None):
+                    if rows is None:
+                        return cosine_similarities(profile_vector, job_matrix, posting_index.row_norms) * 100
+                    return cosine_similarities(profile_vector, job_matrix[rows], posting_index.row_norms[rows]) * 100
                 
-                match_scores[i] = final_score
-            
-            # Create job-score pairs
-            job_titles = list(processed_jobs.keys())
-            job_scores = list(zip(job_titles, match_scores))
-            
-            # Sort by score and get top recommendations
-            recommendations = sorted(job_scores, key=lambda x: x[1], reverse=True)[:top_n]
+                score_bound = 100
+            
+            # Only the postings that can still reach the requested page are scored in full
+            best = posting_index.inverted_index.top_k(
+                profile_vector,
+                offset + top_n,
+                score_rows,
+                score_bound=score_bound,
+                allowed=candidate_rows
+            )
+            if best is not None:
+                top_rows, top_scores = best[0][offset:], best[1][offset:]
+            else:
+                # Too few postings share a term with the profile - score every active job
+                match_scores = score_rows()
+                match_scores[~posting_index.active_rows()] = -np.inf
+                if candidate_rows is not None:
+                    match_scores[~candidate_rows] = -np.inf
+                top_rows = top_k_rows(match_scores, top_n, offset)
+                top_rows = top_rows[np.isfinite(match_scores[top_rows])]
+                top_scores = match_scores[top_rows]
+            if full_tier:
+                observe_stage(budget, 'job', stage_start)
+            
+            job_titles = posting_index.titles
             
             # Format recommendations with detailed scores
             detailed_recommendations = []
-            for job_title, score in recommendations:
+            for row, match_score in zip(top_rows, top_scores):
+                job_title = job_titles[row]
                 # Ensure scores are positive and capped at 100
-                match_percentage = min(100, max(0, score))
+                match_percentage = min(100, max(0, match_score))
                 recommendation = {
                     'job_title': job_title,
+                    'job_id': posting_index.posting_ids[row],
                     'match_score': match_percentage,
                     'job_description': job_posts[job_title]
                 }
@@ -435,4 +555,75 @@ class NoveltyEnhancedJobMatcher:
             
         except Exception as e:
             print(f"Error getting recommendations: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+    
+    def build_profile_matrix(self, profiles_data, posting_index):
+        """
+        Sparse (profiles x vocabulary) matrix of the profile vectors, and the matching
+        matrix of per-term boosts (recency and skill cluster) of every profile term
+        """
+        profiles_sections = [self.extract_profile_sections(profile_data) for profile_data in profiles_data]
+        
+        # All profile sections are vectorized in one transform call
+        profile_matrix = weighted_section_matrix(
+            posting_index.vectorizer, profiles_sections, self.profile_section_weights
+        )
+        
+        # Same boosts as get_recommendations, stored at the profile's own terms
+        boost_matrix = profile_matrix.copy()
+        for row, (profile_data, profile_sections) in enumerate(zip(profiles_data, profiles_sections)):
+            start, end = boost_matrix.indptr[row], boost_matrix.indptr[row + 1]
+            term_indices = boost_matrix.indices[start:end]
+            profile_vector = np.zeros(profile_matrix.shape[1])
+            profile_vector[term_indices] = profile_matrix.data[start:end]
+            term_boosts = self.profile_term_boost_vector(
+                posting_index, profile_vector, profile_sections, self.build_recency_table(profile_data)
+            )
+            boost_matrix.data[start:end] = term_boosts[term_indices]
+        
+        return profile_matrix, boost_matrix
+    
+    def get_batch_recommendations(self, profiles_data, posting_index, top_n=5, posting_presence=None, candidate_rows=None):
+        """
+        Top job rows and match scores for many profiles at once (batch feature)
+        
+        Same scores as get_recommendations, but every factor is computed for all
+        profiles with one sparse product against the posting matrix.
+        
+        candidate_rows optionally holds one boolean row mask (or None) per profile.
+        
+        Returns:
+            list: (rows, match scores) of the top_n jobs of each profile, best first
+        """
+        job_matrix = posting_index.matrix
+        if posting_presence is None:
+            posting_presence = presence_matrix(job_matrix)
+        
+        profile_matrix, boost_matrix = self.build_profile_matrix(profiles_data, posting_index)
+        profile_presence = presence_matrix(profile_matrix)
+        
+        # Basic cosine similarity of every profile against every job
+        base_similarity = batch_cosine_similarities(profile_matrix, job_matrix, posting_index.row_norms)
+        
+        # Per-job skill gap of every profile, with the same reduced penalty
+        skill_gap_penalty = batch_gap_scores(profile_presence, posting_presence, posting_index.gap_weights * 0.1) * 0.02
+        
+        # Average boost of the terms each job shares with each profile, capped at max_semantic_boost
+        semantic_boost = batch_shared_term_boosts(boost_matrix, profile_presence, posting_presence, max_boost=self.max_semantic_boost)
+        
+        base_score = base_similarity * 100
+        match_scores = base_score * semantic_boost - (skill_gap_penalty * base_score / 10)
+        
+        # Closed postings kept in the index (see PostingIndex.with_active_postings) are never returned
+        match_scores[:, ~posting_index.active_rows()] = -np.inf
+        # Neither are postings outside a profile's preference prefilter
+        for profile_row, rows in enumerate(candidate_rows or []):
+            if rows is not None:
+                match_scores[profile_row, ~rows] = -np.inf
+        
+        results = []
+        for scores in match_scores:
+            top_rows = top_k_rows(scores, top_n)
+            top_rows = top_rows[np.isfinite(scores[top_rows])]
+            results.append((top_rows, np.clip(scores[top_rows], 0, 100)))
+        return results
@@ -4,6 +4,12 @@ import json
 import os
 from .job_matcher import NoveltyEnhancedJobMatcher
 from .transform_jobs import transform_job_postings
+from ..posting_index import PostingIndexCache
+from ..matcher_registry import get_shared_matcher
+from ..posting_text_cache import posting_version_keys
+from ..scoring import presence_matrix
+from ..preference_filter import select_candidate_rows
+from ..posting_snapshot import PostingSnapshotStore
 
 # Fetch data from API, local JSON file, or directly from a JSON object
 def fetch_data(source):
@@ -53,30 +59,49 @@ def fetch_data(source):
         raise
 
 # Format recommendations for frontend display
-def format_recommendations_for_frontend(recommendations, original_job_postings_json):
-    # Create a lookup dictionary for the original job postings
-    job_lookup = {}
-    for job in original_job_postings_json.get('job_postings', []):
-        job_title = job.get('job_title')
-        if job_title:
-            # If multiple jobs have the same title, we'll just use the latest one
-            job_lookup[job_title] = job
+def format_recommendations_for_frontend(recommendations, original_job_postings_json, postings_by_id=None, pagination=None):
+    """
+    Join the recommendations back to their original job postings
+    
+    Args:
+        recommendations (list): Recommendations from the matcher
+        original_job_postings_json (dict): Original job postings payload
+        postings_by_id (dict): Precomputed job_id -> original posting (from the posting index)
+        pagination (dict): offset/top_n/total of the requested page, echoed in the response
+    """
+    if postings_by_id is None:
+        postings_by_id = {}
+    
+    # Title lookup, only built for recommendations without a known job_id
+    job_lookup = None
     
     # Format the response
     formatted_response = {
         "success": True,
         "recommendations": []
     }
+    if pagination is not None:
+        formatted_response["pagination"] = pagination
     
     for rec in recommendations:
         job_title = rec['job_title']
         match_score = rec['match_score']
         
-        # Extract the base job title if it contains a unique identifier
-        base_title = job_title.split(' (')[0] if ' (' in job_title else job_title
+        # Find the original job posting by job_id (titles are not unique)
+        original_job = postings_by_id.get(rec.get('job_id'))
         
-        # Find the original job posting
-        original_job = job_lookup.get(base_title)
+        if original_job is None:
+            if job_lookup is None:
+                # Create a lookup dictionary for the original job postings
+                job_lookup = {}
+                for job in original_job_postings_json.get('job_postings', []):
+                    if job.get('job_title'):
+                        # If multiple jobs have the same title, we'll just use the latest one
+                        job_lookup[job.get('job_title')] = job
+            
+            # Extract the base job title if it contains a unique identifier
+            base_title = job_title.split(' (')[0] if ' (' in job_title else job_title
+            original_job = job_lookup.get(base_title)
         
         if original_job:
             # Create a recommendation object with the match score and original posting
@@ -127,8 +152,101 @@ def generate_novelty_explanation(recommendation):
             "recency_boost": False
         }
 
+# Build a prefitted posting index from job postings data
+def build_job_posting_index(job_postings_source, matcher=None, base_index=None):
+    """
+    Transform the job postings and fit the TF-IDF posting index once
+    
+    Args:
+        job_postings_source: Job postings data (see fetch_data for accepted formats)
+        matcher: NoveltyEnhancedJobMatcher used to fit the index (the shared one if omitted)
+        base_index: Previous index whose unchanged rows are reused (hashed features only)
+        
+    Returns:
+        PostingIndex: Fitted index holding the original postings payload
+    """
+    job_postings_json = fetch_data(job_postings_source)
+    
+    # Transform job postings to the required format, passing job_id
+    transformed_jobs, job_id_map = transform_job_postings(job_postings_json, return_id_map=True)
+    
+    # Preprocessing of unchanged postings is reused across rebuilds, keyed by (job_id, updated_at)
+    job_postings = job_postings_json.get('job_postings', [])
+    posting_keys = posting_version_keys(job_id_map, job_postings, 'job_id')
+    
+    # Row -> job_id and job_id -> posting, so results are joined back by id
+    posting_ids = [job_id_map.get(title) for title in transformed_jobs]
+    postings_by_id = {job.get('job_id'): job for job in job_postings if job.get('job_id') is not None}
+    
+    if matcher is None:
+        matcher = get_shared_matcher(NoveltyEnhancedJobMatcher)
+    
+    return matcher.build_posting_index(
+        transformed_jobs,
+        postings=job_postings_json,
+        posting_keys=posting_keys,
+        posting_ids=posting_ids,
+        postings_by_id=postings_by_id,
+        base_index=base_index
+    )
+
+# Reuse a posting index when only the set of active postings changed
+def update_job_posting_index(posting_index, job_postings_source):
+    """
+    Copy of the posting index with only the given postings active, when every one
+    of them is already indexed with the same text (e.g. postings closed, expired or
+    reopened without edits). Returns None when the index needs a full rebuild.
+    
+    An index over hashed features is always updated: only new or edited postings are
+    featurized, and the document frequencies follow the postings that came and went.
+    """
+    job_postings_json = fetch_data(job_postings_source)
+    if posting_index.term_frequencies is not None:
+        return build_job_posting_index(job_postings_json, base_index=posting_index)
+    
+    transformed_jobs, job_id_map = transform_job_postings(job_postings_json, return_id_map=True)
+    
+    active_ids = []
+    for job_title, description in transformed_jobs.items():
+        row = posting_index.row_by_id.get(job_id_map.get(job_title))
+        # New or edited posting - the vocabulary and matrix have to be refitted
+        if row is None or posting_index.descriptions[posting_index.titles[row]] != description:
+            return None
+        active_ids.append(job_id_map[job_title])
+    
+    job_postings = job_postings_json.get('job_postings', [])
+    postings_by_id = {job.get('job_id'): job for job in job_postings if job.get('job_id') is not None}
+    return posting_index.with_active_postings(active_ids, postings=job_postings_json, postings_by_id=postings_by_id)
+
+# Process-wide job posting index, rebuilt whenever the job catalog version changes
+# (or only updated when postings merely changed status)
+job_posting_index = PostingIndexCache(build_job_posting_index, update_job_posting_index)
+
+# Featurize the job postings by hashing instead of with a fitted vocabulary
+def use_hashed_job_features(n_features=2 ** 18):
+    """
+    Build the job posting index from hashed features (fixed memory, updated per posting
+    without refitting); None goes back to the fitted TF-IDF vocabulary
+    """
+    matcher = get_shared_matcher(NoveltyEnhancedJobMatcher)
+    matcher.use_hashed_features(n_features)
+    job_posting_index.clear()
+
+# Share the job posting index between worker processes through snapshots
+def use_job_posting_snapshots(directory, keep=3):
+    """
+    Map the job posting index from the versioned snapshots in directory (see posting_snapshot)
+    instead of keeping a private copy per process; None stops using snapshots
+    """
+    matcher = get_shared_matcher(NoveltyEnhancedJobMatcher)
+    # Hashed indexes are updated in place by each worker and have no snapshot format
+    if not directory or matcher.hashed_vectorizer is not None:
+        job_posting_index.set_snapshots(None)
+        return
+    job_posting_index.set_snapshots(PostingSnapshotStore(directory, matcher.vectorizer, keep=keep))
+
 # Main function to run the job matching process
-def run_job_matching(profile_source, job_postings_source, top_n=5, return_json=False):
+def run_job_matching(profile_source, job_postings_source=None, top_n=5, return_json=False, catalog_version=None, offset=0, budget=None):
     """
     Run the job matching process using profile and job posting data
     
@@ -141,8 +259,14 @@ def run_job_matching(profile_source, job_postings_source, top_n=5, return_json=F
             - API endpoint URL string
             - Path to JSON file string
             - Dictionary/JSON object already in memory
+            - Callable returning one of the above (only called when the index is rebuilt)
         top_n (int): Number of top recommendations to return
         return_json (bool): Whether to return formatted JSON for frontend
+        catalog_version: Version of the job catalog. When given, the process-wide posting
+            index is reused until the version changes instead of refitting per call
+        offset (int): Number of best recommendations to skip (for paging through them)
+        budget: LatencyBudget of the request; without time left for the boosts, jobs are
+            ranked by cosine similarity alone (see latency_budget)
         
     Returns:
         list or dict: List of recommendations or formatted JSON for frontend
@@ -150,20 +274,47 @@ def run_job_matching(profile_source, job_postings_source, top_n=5, return_json=F
     try:
         # Fetch data from API, JSON file, or use directly if already an object
         profile_data = fetch_data(profile_source)
-        job_postings_json = fetch_data(job_postings_source)
         
-        # Transform job postings to the required format
-        transformed_jobs = transform_job_postings(job_postings_json)
+        def load_postings():
+            if callable(job_postings_source):
+                return job_postings_source()
+            return job_postings_source
+        
+        # Reuse the prefitted index for this catalog version, or fit one for this call only
+        if catalog_version is not None:
+            posting_index = job_posting_index.get(catalog_version, load_postings)
+        else:
+            posting_index = build_job_posting_index(load_postings())
+        
+        # Use the shared, already initialized novelty-enhanced job matcher
+        matcher = get_shared_matcher(NoveltyEnhancedJobMatcher)
         
-        # Initialize the novelty-enhanced job matcher
-        matcher = NoveltyEnhancedJobMatcher(debug=True)
+        # Only postings matching the job preferences are scored (relaxed tier by tier if too few do)
+        candidate_rows, _ = select_candidate_rows(posting_index, profile_data)
         
         # Get recommendations
-        recommendations = matcher.get_recommendations(profile_data, transformed_jobs, top_n)
+        recommendations = matcher.get_recommendations(
+            profile_data,
+            top_n=top_n,
+            posting_index=posting_index,
+            offset=offset,
+            candidate_rows=candidate_rows,
+            budget=budget
+        )
         
         # Return the appropriate format
         if return_json:
-            return format_recommendations_for_frontend(recommendations, job_postings_json)
+            if candidate_rows is not None:
+                total = int(candidate_rows.sum())
+            else:
+                total = posting_index.inverted_index.active_count()
+            pagination = {"offset": offset, "top_n": top_n, "total": total}
+            return format_recommendations_for_frontend(
+                recommendations,
+                posting_index.postings,
+                postings_by_id=posting_index.postings_by_id,
+                pagination=pagination
+            )
         else:
             return recommendations
     except Exception as e:
@@ -178,6 +329,71 @@ def run_job_matching(profile_source, job_postings_source, top_n=5, return_json=F
         else:
             raise
 
+# Score many profiles against the job postings in batches
+def run_batch_job_matching(profiles, job_postings_source=None, top_n=5, catalog_version=None, batch_size=256):
+    """
+    Top jobs for many profiles, scored batch_size profiles at a time with one
+    sparse product each (same scores as run_job_matching)
+    
+    Args:
+        profiles: Iterable of (user_id, profile data) pairs
+        job_postings_source: Job postings data or callable returning it (see run_job_matching)
+        top_n (int): Number of top recommendations per profile
+        catalog_version: Version of the job catalog, to reuse the process-wide posting index
+        batch_size (int): Number of profiles scored together
+        
+    Yields:
+        dict: {"user_id", "recommendations": [{"job_id", "job_title", "match_score"}]} per profile
+    """
+    def load_postings():
+        if callable(job_postings_source):
+            return job_postings_source()
+        return job_postings_source
+    
+    if catalog_version is not None:
+        posting_index = job_posting_index.get(catalog_version, load_postings)
+    else:
+        posting_index = build_job_posting_index(load_postings())
+    
+    matcher = get_shared_matcher(NoveltyEnhancedJobMatcher)
+    
+    # Term presence of the postings is shared by all batches
+    posting_presence = presence_matrix(posting_index.matrix)
+    
+    batch = []
+    for user_id, profile_data in profiles:
+        batch.append((user_id, profile_data))
+        if len(batch) >= batch_size:
+            yield from score_profile_batch(matcher, posting_index, batch, top_n, posting_presence)
+            batch = []
+    if batch:
+        yield from score_profile_batch(matcher, posting_index, batch, top_n, posting_presence)
+
+def score_profile_batch(matcher, posting_index, batch, top_n, posting_presence):
+    """Per-profile results of one batch of (user_id, profile data) pairs"""
+    profiles_data = [profile_data for _, profile_data in batch]
+    results = matcher.get_batch_recommendations(
+        profiles_data,
+        posting_index,
+        top_n=top_n,
+        posting_presence=posting_presence,
+        candidate_rows=[select_candidate_rows(posting_index, profile_data)[0] for profile_data in profiles_data]
+    )
+    # The index titles are the matcher's uniquified keys; the response shows the posting's own title
+    postings_by_id = posting_index.postings_by_id or {}
+    for (user_id, _), (rows, scores) in zip(batch, results):
+        yield {
+            "user_id": user_id,
+            "recommendations": [
+                {
+                    "job_id": posting_index.posting_ids[row],
+                    "job_title": (postings_by_id.get(posting_index.posting_ids[row]) or {}).get("job_title"),
+                    "match_score": round(float(score), 2)
+                }
+                for row, score in zip(rows, scores)
+            ]
+        }
+
 # Function to send recommendations to API endpoint
 def send_recommendations(recommendations, output_destination):
     """
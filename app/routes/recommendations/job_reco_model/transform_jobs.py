@@ -3,13 +3,16 @@ import json
 import re
 from datetime import datetime
 
-def transform_job_postings(input_json):
+def transform_job_postings(input_json, return_id_map=False):
     # Initialize the output dictionary
     transformed_jobs = {}
+    # Initialize job_id mapping dictionary
+    job_id_map = {}
     
     # Process each job posting
     for job in input_json.get('job_postings', []):
         job_title = job.get('job_title', 'Unknown Position')
+        job_id = job.get('job_id')
         
         # Create a structured job description with clear sections
         description_parts = {}
@@ -112,8 +115,15 @@ def transform_job_postings(input_json):
             job_title = f"{job_title} ({unique_id})"
         
         transformed_jobs[job_title] = full_description.strip()
+        
+        # Store the mapping between the (possibly modified) job title and the job_id
+        if job_id is not None:
+            job_id_map[job_title] = job_id
     
-    return transformed_jobs
+    if return_id_map:
+        return transformed_jobs, job_id_map
+    else:
+        return transformed_jobs
 
 # Helper function to extract sections from transformed job descriptions
 def extract_job_sections(job_description):
@@ -0,0 +1,146 @@
+# latency_budget.py - Per-request latency budgets, the scoring tier they allow and overrun metrics
+import math
+import threading
+import time
+
+# Scoring tiers: cosine similarity plus the cluster, recency and gap boosts, or cosine similarity alone
+TIER_FULL = 'full'
+TIER_COSINE = 'cosine'
+
+# Weight of the newest observation in the moving estimate of a stage's full-tier time
+ESTIMATE_SMOOTHING = 0.2
+
+# Factor the estimate of a stage shrinks by every time it is scored at the cosine tier, so
+# one slow request doesn't keep later ones at that tier when nothing runs the full tier
+ESTIMATE_DECAY = 0.9
+
+
+class LatencyMetrics:
+    """
+    Per-kind counters of served requests (by scoring tier), budget overruns and
+    elapsed times, and the moving estimate of the full-tier time of every scoring stage.
+    Counters are per worker process.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._kinds = {}
+        self._estimates = {}
+
+    def estimate_ms(self, stage):
+        """Expected full-tier time of a stage (0 until it was observed)"""
+        with self._lock:
+            return self._estimates.get(stage, 0.0)
+
+    def observe_stage(self, stage, elapsed_ms):
+        """Fold the time one full-tier run of a stage took into its estimate"""
+        with self._lock:
+            estimate = self._estimates.get(stage)
+            if estimate is None:
+                self._estimates[stage] = elapsed_ms
+            else:
+                self._estimates[stage] = estimate + ESTIMATE_SMOOTHING * (elapsed_ms - estimate)
+
+    def decay_stage(self, stage):
+        """Shrink the estimate of a stage that was skipped for lack of time"""
+        with self._lock:
+            if stage in self._estimates:
+                self._estimates[stage] *= ESTIMATE_DECAY
+
+    def record(self, kind, tier, elapsed_ms, overrun):
+        """Count one served request of a kind"""
+        with self._lock:
+            counters = self._kinds.setdefault(kind, {
+                'requests': 0, 'tiers': {}, 'overruns': 0, 'total_ms': 0.0, 'max_ms': 0.0
+            })
+            counters['requests'] += 1
+            counters['tiers'][tier] = counters['tiers'].get(tier, 0) + 1
+            counters['overruns'] += int(overrun)
+            counters['total_ms'] += elapsed_ms
+            counters['max_ms'] = max(counters['max_ms'], elapsed_ms)
+
+    def clear(self):
+        with self._lock:
+            self._kinds = {}
+            self._estimates = {}
+
+    def stats(self):
+        """Counters per kind (with overrun ratio and average time) and the stage estimates"""
+        with self._lock:
+            kinds = {}
+            for kind, counters in self._kinds.items():
+                requests = counters['requests']
+                kinds[kind] = {
+                    'requests': requests,
+                    'tiers': dict(counters['tiers']),
+                    'overruns': counters['overruns'],
+                    'overrun_ratio': counters['overruns'] / requests if requests else 0.0,
+                    'avg_ms': round(counters['total_ms'] / requests, 1) if requests else 0.0,
+                    'max_ms': round(counters['max_ms'], 1)
+                }
+            return {
+                'kinds': kinds,
+                'stage_estimates_ms': {stage: round(estimate, 1) for stage, estimate in self._estimates.items()}
+            }
+
+
+# Process-wide metrics, reported by /recommend/cache-stats
+latency_metrics = LatencyMetrics()
+
+
+class LatencyBudget:
+    """
+    Time a recommendation request may take, counted from its creation.
+
+    The matchers ask it for the tier of their scoring stage (see scoring_tier): the
+    boosts are only applied when the time left covers their estimated cost. The tier
+    chosen for every stage is kept, so the caller can annotate its response.
+    budget_ms None (or 0) means unbounded: every stage gets the full tier.
+    """
+    def __init__(self, budget_ms=None, metrics=None):
+        self.budget_ms = budget_ms or None
+        self.metrics = metrics if metrics is not None else latency_metrics
+        self.start = time.perf_counter()
+        self.tiers = {}
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def remaining_ms(self):
+        if self.budget_ms is None:
+            return math.inf
+        return self.budget_ms - self.elapsed_ms()
+
+    def overrun(self):
+        """Whether the request took longer than its budget"""
+        return self.budget_ms is not None and self.elapsed_ms() > self.budget_ms
+
+    def choose_tier(self, stage):
+        """Full tier when the time left covers the estimated full-tier time of the stage"""
+        if self.remaining_ms() > self.metrics.estimate_ms(stage):
+            tier = TIER_FULL
+        else:
+            tier = TIER_COSINE
+            self.metrics.decay_stage(stage)
+        self.tiers[stage] = tier
+        return tier
+
+    def tier(self, stage):
+        """Tier a stage was scored with (full when it didn't ask)"""
+        return self.tiers.get(stage, TIER_FULL)
+
+    def record(self, kind, tier):
+        """Count the response of a kind served under this budget in the metrics"""
+        self.metrics.record(kind, tier, self.elapsed_ms(), self.overrun())
+
+
+def scoring_tier(budget, stage):
+    """Tier a matcher scores a stage with under a budget (full without one)"""
+    if budget is None:
+        return TIER_FULL
+    return budget.choose_tier(stage)
+
+
+def observe_stage(budget, stage, start):
+    """Record the time since start (a perf_counter value) as one full-tier run of a stage"""
+    metrics = budget.metrics if budget is not None else latency_metrics
+    metrics.observe_stage(stage, (time.perf_counter() - start) * 1000)
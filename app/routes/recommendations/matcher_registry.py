@@ -0,0 +1,20 @@
+# matcher_registry.py - One shared, warm matcher instance per matcher type and process
+import threading
+
+_matchers = {}
+_matchers_lock = threading.Lock()
+
+
+def get_shared_matcher(matcher_class):
+    """
+    Return the process-wide instance of a matcher class, creating it on first use.
+    Matchers keep no per-request state, so one instance is safely shared by all threads.
+    """
+    matcher = _matchers.get(matcher_class)
+    if matcher is None:
+        with _matchers_lock:
+            matcher = _matchers.get(matcher_class)
+            if matcher is None:
+                matcher = matcher_class(debug=True)
+                _matchers[matcher_class] = matcher
+    return matcher
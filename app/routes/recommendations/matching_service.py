@@ -0,0 +1,250 @@
+# matching_service.py - Process pool running the matchers off the request threads, with bounded queueing
+import multiprocessing
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from .job_reco_model.job_matcher import NoveltyEnhancedJobMatcher
+from .job_reco_model.job_matching import run_job_matching, job_posting_index, use_hashed_job_features, use_job_posting_snapshots
+from .training_reco_model.training_matcher import TrainingMatcher
+from .scholarship_reco_model.scholarship_matcher import ScholarshipMatcher
+from .matcher_registry import get_shared_matcher
+from .nltk_resources import load_nltk_resources
+from .scoring import select_scoring_backend
+from .latency_budget import LatencyBudget, TIER_FULL
+
+
+class MatchingServiceBusy(Exception):
+    """Raised when the matching queue is full, so the request can be answered with a 503"""
+
+
+class SnapshotUnavailable(Exception):
+    """A worker process has no snapshot of the job posting index for the requested version"""
+
+
+def in_matching_worker():
+    """
+    Whether this is a matching worker process. Spawned workers re-import the main module,
+    and with it possibly create_app, which must then not start background threads or pools.
+    """
+    return multiprocessing.parent_process() is not None
+
+
+def run_matcher(kind, user_profile, postings, catalog_version, top_n, offset=0, budget=None):
+    """
+    Formatted response of the matcher of a kind for one profile (return_json=True).
+    postings is the payload of the posting type, or for jobs a callable returning it
+    (only called when the posting index of catalog_version has to be built).
+    """
+    if kind == 'job':
+        return run_job_matching(
+            user_profile,
+            postings,
+            top_n=top_n,
+            return_json=True,
+            catalog_version=catalog_version,
+            offset=offset,
+            budget=budget
+        )
+    if kind == 'training':
+        return TrainingMatcher.run_training_matching(
+            user_profile, postings, top_n=top_n, return_json=True, offset=offset, budget=budget
+        )
+    return ScholarshipMatcher.run_scholarship_matching(
+        user_profile, postings, top_n=top_n, return_json=True, offset=offset, budget=budget
+    )
+
+
+def _snapshot_postings():
+    # Worker processes only map published snapshots; building is left to the serving process
+    raise SnapshotUnavailable("No job posting index snapshot for this catalog version")
+
+
+def _init_worker(settings):
+    """Process initializer: the same warm-up as the serving process, and the snapshot directory"""
+    load_nltk_resources()
+    select_scoring_backend(settings['scoring_backend'])
+    for matcher_class in (NoveltyEnhancedJobMatcher, TrainingMatcher, ScholarshipMatcher):
+        get_shared_matcher(matcher_class)
+    use_hashed_job_features(settings['hash_features'] if settings['featurization'] == 'hashing' else None)
+    use_job_posting_snapshots(settings['snapshot_dir'], keep=settings['snapshot_keep'])
+
+
+def _match_in_worker(kind, user_profile, postings, catalog_version, top_n, offset, budget_ms, submitted_at):
+    """
+    Runs in a worker process: (response, scoring tier), or None when the job posting
+    index snapshot of the version isn't there (the caller then matches in-process).
+    The budget left when the call was submitted is reduced by the time spent queued.
+    """
+    budget = None
+    if budget_ms is not None:
+        # A budget used up while queued still has to choose the cosine tier, not become unbounded
+        budget = LatencyBudget(max(budget_ms - (time.time() - submitted_at) * 1000, 1e-3))
+
+    if kind == 'job':
+        try:
+            job_posting_index.get(catalog_version, _snapshot_postings)
+        except SnapshotUnavailable:
+            return None
+        postings = _snapshot_postings
+
+    response = run_matcher(kind, user_profile, postings, catalog_version, top_n, offset, budget)
+    return response, budget.tier(kind) if budget is not None else TIER_FULL
+
+
+class MatchingService:
+    """
+    Pool of worker processes running the CPU-bound matchers (TF-IDF fitting, n-gram
+    extraction, scoring), so they don't hold the GIL of the serving process.
+
+    Workers are warmed up like the serving process and map the job posting index
+    from its snapshots; per request only the profile (and, for trainings and
+    scholarships, their postings, which are fitted per request anyway) is sent.
+    At most queue_depth matchings are queued or running at once: beyond that,
+    callers that can't wait get MatchingServiceBusy.
+    """
+    def __init__(self, processes=0, queue_depth=16, settings=None):
+        self._executor = None
+        self._lock = threading.Lock()
+        self.configure(processes, queue_depth, settings)
+
+        self.dispatched = 0
+        self.rejected = 0
+        self.fallbacks = 0
+        self.failures = 0
+        self.restarts = 0
+
+    def configure(self, processes, queue_depth=16, settings=None):
+        """
+        Set the pool size, queue depth (never below the pool size) and the worker settings:
+        scoring_backend, featurization, hash_features, snapshot_dir and snapshot_keep
+        (as in the app config). Only effective before start().
+        """
+        self.processes = processes
+        self.queue_depth = max(queue_depth, processes)
+        self.settings = settings or {}
+        self._slots = threading.BoundedSemaphore(self.queue_depth)
+
+    def start(self):
+        """Start the worker processes (once)"""
+        with self._lock:
+            if self._executor is not None or self.processes <= 0:
+                return
+            self._executor = self._create_executor()
+
+    def _create_executor(self):
+        # Spawned workers don't inherit the serving process's threads, locks or database connections
+        return ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.settings,)
+        )
+
+    def _restart(self, broken):
+        """Replace a pool whose worker died (once, however many requests saw it broken)"""
+        with self._lock:
+            if self._executor is not broken:
+                return
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._create_executor()
+            self.restarts += 1
+
+    def handles(self, kind):
+        """Whether matchings of a kind go to the pool (jobs need snapshots of the posting index)"""
+        if self._executor is None:
+            return False
+        return kind != 'job' or bool(self.settings.get('snapshot_dir'))
+
+    def match(self, kind, user_profile, postings, catalog_version, top_n, offset=0, budget=None, block=True):
+        """
+        Formatted response of the matcher of a kind, computed by a worker process, or
+        None when the caller should match in-process (also when the worker failed; a pool
+        broken by a dead worker is replaced). The tier the worker scored with is
+        recorded on the budget. Without a free queue slot, waits for one when block is
+        true and raises MatchingServiceBusy otherwise.
+        """
+        if not self._slots.acquire(blocking=block):
+            with self._lock:
+                self.rejected += 1
+            raise MatchingServiceBusy(f"Recommendation matching queue is full ({self.queue_depth} pending)")
+        try:
+            if kind == 'job':
+                # Make sure the index of the version is built and published before a worker maps it
+                job_posting_index.get(catalog_version, postings)
+                postings = None
+            with self._lock:
+                self.dispatched += 1
+                executor = self._executor
+            try:
+                future = executor.submit(
+                    _match_in_worker, kind, user_profile, postings, catalog_version, top_n, offset,
+                    budget.remaining_ms() if budget is not None and budget.budget_ms is not None else None,
+                    time.time()
+                )
+                result = future.result()
+            except Exception as e:
+                print(f"Error matching {kind} recommendations in a worker process: {str(e)}")
+                result = None
+                with self._lock:
+                    self.failures += 1
+                # A worker died: every later submit to this pool would fail too
+                if isinstance(e, BrokenProcessPool):
+                    self._restart(executor)
+        finally:
+            self._slots.release()
+
+        if result is None:
+            with self._lock:
+                self.fallbacks += 1
+            return None
+        response, tier = result
+        if budget is not None:
+            budget.tiers[kind] = tier
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {
+                'processes': self.processes if self._executor is not None else 0,
+                'queue_depth': self.queue_depth,
+                'dispatched': self.dispatched,
+                'rejected': self.rejected,
+                'fallbacks': self.fallbacks,
+                'failures': self.failures,
+                'restarts': self.restarts
+            }
+
+
+# Process-wide service, started by create_app when RECOMMENDATION_MATCHING_PROCESSES is set
+matching_service = MatchingService()
+
+
+def start_matching_service(app):
+    """
+    Start the matching pool configured by RECOMMENDATION_MATCHING_PROCESSES (0 = match
+    in the request threads). With the fitted vocabulary and no RECOMMENDATION_SNAPSHOT_DIR,
+    job posting index snapshots go to a private temporary directory shared with the workers.
+    """
+    processes = app.config.get("RECOMMENDATION_MATCHING_PROCESSES", 0)
+    if processes <= 0 or in_matching_worker():
+        return
+    featurization = app.config.get("RECOMMENDATION_FEATURIZATION", "tfidf")
+    snapshot_dir = app.config.get("RECOMMENDATION_SNAPSHOT_DIR")
+    snapshot_keep = app.config.get("RECOMMENDATION_SNAPSHOT_KEEP", 3)
+    # Hashed indexes have no snapshot format: job matchings then stay in-process
+    if featurization == 'hashing':
+        snapshot_dir = ""
+    elif not snapshot_dir:
+        snapshot_dir = tempfile.mkdtemp(prefix="posting-snapshots-")
+        use_job_posting_snapshots(snapshot_dir, keep=snapshot_keep)
+
+    matching_service.configure(processes, app.config.get("RECOMMENDATION_MATCHING_QUEUE_DEPTH", 16), {
+        'scoring_backend': app.config.get("RECOMMENDATION_SCORING_BACKEND", "auto"),
+        'featurization': featurization,
+        'hash_features': app.config.get("RECOMMENDATION_HASH_FEATURES", 2 ** 18),
+        'snapshot_dir': snapshot_dir,
+        'snapshot_keep': snapshot_keep
+    })
+    matching_service.start()
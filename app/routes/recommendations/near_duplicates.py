@@ -0,0 +1,330 @@
+# near_duplicates.py - MinHash signatures of postings and banded LSH lookup of near-duplicate reposts
+import hashlib
+import json
+import re
+import threading
+import zlib
+from collections import defaultdict
+import numpy as np
+from sqlalchemy import or_, and_
+from app import db
+from app.models import PostingSignature, PostingSignatureBand
+from app.utils import get_employer_all_jobpostings, get_employer_all_trainingpostings, get_employer_all_scholarshippostings
+from app.config import Config
+
+# Signature length and banding: 16 bands of 8 rows make postings with a Jaccard
+# similarity above ~0.7 share a bucket, below the default duplicate threshold of 0.8
+NUM_PERMUTATIONS = 128
+BANDS = 16
+
+# Postings are compared as sets of word 3-grams
+SHINGLE_SIZE = 3
+
+# Text fields of every posting type that make up its signature
+SIGNATURE_FIELDS = {
+    'job': ('job_title', 'job_description', 'other_skills'),
+    'training': ('training_title', 'training_description'),
+    'scholarship': ('scholarship_title', 'scholarship_description')
+}
+
+# Key of the posting list and id field of the matcher payload of every posting type
+PAYLOAD_FIELDS = {
+    'job': ('job_postings', 'job_id'),
+    'training': ('training_postings', 'training_id'),
+    'scholarship': ('scholarship_postings', 'scholarship_id')
+}
+
+# Loader of the active postings payload the matchers score, per posting type
+PAYLOAD_LOADERS = {
+    'job': get_employer_all_jobpostings,
+    'training': get_employer_all_trainingpostings,
+    'scholarship': get_employer_all_scholarshippostings
+}
+
+# Universal hash functions (a * h + b) mod p, fixed so signatures stay comparable across processes
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_permutations = np.random.RandomState(1)
+_PERMUTATION_A = _permutations.randint(1, 1 << 32, NUM_PERMUTATIONS, dtype=np.uint64)
+_PERMUTATION_B = _permutations.randint(0, 1 << 32, NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def posting_text(posting_type, posting):
+    """Text a posting's signature is computed from (a model instance or a payload dict)"""
+    fields = SIGNATURE_FIELDS[posting_type]
+    if isinstance(posting, dict):
+        values = [posting.get(field) for field in fields]
+    else:
+        values = [getattr(posting, field, None) for field in fields]
+    return ' '.join(str(value) for value in values if value)
+
+
+def shingles(text):
+    """Set of the word SHINGLE_SIZE-grams of a text (the whole text when shorter)"""
+    words = re.findall(r'\w+', (text or '').lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text):
+    """
+    MinHash signature (NUM_PERMUTATIONS uint32 values) of the shingles of a text.
+    The share of equal values of two signatures estimates the Jaccard similarity of the texts.
+    """
+    hashes = np.array([zlib.crc32(shingle.encode('utf-8')) for shingle in shingles(text)], dtype=np.uint64)
+    if hashes.size == 0:
+        return np.full(NUM_PERMUTATIONS, _MAX_HASH, dtype=np.uint32)
+    # a, h < 2**32, so a * h + b never overflows uint64
+    permuted = (np.outer(hashes, _PERMUTATION_A) + _PERMUTATION_B) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def signature_similarity(signature, other):
+    """Estimated Jaccard similarity of the texts of two signatures"""
+    return float(np.mean(np.asarray(signature) == np.asarray(other)))
+
+
+def band_buckets(signature):
+    """LSH bucket key of every band of a signature"""
+    signature = np.asarray(signature, dtype='<u4')
+    rows = len(signature) // BANDS
+    return [
+        hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).hexdigest()
+        for band in range(BANDS)
+    ]
+
+
+class DuplicateIndex:
+    """
+    In-memory banded LSH index over the signatures of one posting type.
+
+    Only postings of the same group (the employer) can be near-duplicates, and
+    candidates sharing a band bucket are confirmed by their estimated similarity.
+    """
+    def __init__(self, threshold=0.8):
+        self.threshold = threshold
+        self.signatures = {}
+        self.groups = {}
+        self.buckets = defaultdict(set)
+
+    def add(self, posting_id, signature, group=None):
+        signature = np.asarray(signature, dtype=np.uint32)
+        self.signatures[posting_id] = signature
+        self.groups[posting_id] = group
+        for band, bucket in enumerate(band_buckets(signature)):
+            self.buckets[band, bucket].add(posting_id)
+
+    def near_duplicates(self, posting_id):
+        """Ids of the other postings of the same group at or above the similarity threshold"""
+        signature = self.signatures[posting_id]
+        group = self.groups[posting_id]
+        candidates = set()
+        for band, bucket in enumerate(band_buckets(signature)):
+            candidates |= self.buckets[band, bucket]
+        candidates.discard(posting_id)
+        return sorted(
+            candidate for candidate in candidates
+            if self.groups[candidate] == group
+            and signature_similarity(signature, self.signatures[candidate]) >= self.threshold
+        )
+
+    def clusters(self):
+        """Lists of near-duplicate posting ids (two or more each, ascending), by first id"""
+        parents = {posting_id: posting_id for posting_id in self.signatures}
+
+        def root(posting_id):
+            while parents[posting_id] != posting_id:
+                parents[posting_id] = parents[parents[posting_id]]
+                posting_id = parents[posting_id]
+            return posting_id
+
+        for posting_id in self.signatures:
+            for duplicate in self.near_duplicates(posting_id):
+                parents[root(duplicate)] = root(posting_id)
+
+        members = defaultdict(list)
+        for posting_id in sorted(self.signatures):
+            members[root(posting_id)].append(posting_id)
+        return sorted((ids for ids in members.values() if len(ids) > 1), key=lambda ids: ids[0])
+
+
+def record_posting_signature(posting_type, posting_id, user_id, text):
+    """
+    Store the signature and band buckets of a created or edited posting, in the
+    caller's transaction (call it before the commit, like bump_posting_catalog_version).
+    Returns the ids of the employer's other postings it is a near-duplicate of.
+    """
+    signature = minhash_signature(text)
+    buckets = band_buckets(signature)
+
+    entry = db.session.get(PostingSignature, (posting_type, posting_id))
+    if entry is None:
+        entry = PostingSignature(posting_type=posting_type, posting_id=posting_id)
+        db.session.add(entry)
+    entry.user_id = user_id
+    entry.signature = json.dumps(signature.tolist())
+
+    PostingSignatureBand.query.filter_by(posting_type=posting_type, posting_id=posting_id).delete(synchronize_session=False)
+    db.session.add_all([
+        PostingSignatureBand(posting_type=posting_type, posting_id=posting_id, band=band, bucket=bucket)
+        for band, bucket in enumerate(buckets)
+    ])
+
+    # Candidates share at least one band bucket; only the employer's own postings count
+    candidate_ids = {
+        row.posting_id for row in PostingSignatureBand.query
+        .filter(PostingSignatureBand.posting_type == posting_type, PostingSignatureBand.posting_id != posting_id)
+        .filter(or_(*[
+            and_(PostingSignatureBand.band == band, PostingSignatureBand.bucket == bucket)
+            for band, bucket in enumerate(buckets)
+        ]))
+        .with_entities(PostingSignatureBand.posting_id)
+    }
+    if not candidate_ids:
+        return []
+    candidates = (PostingSignature.query
+                  .filter(PostingSignature.posting_type == posting_type,
+                          PostingSignature.posting_id.in_(candidate_ids),
+                          PostingSignature.user_id == user_id)
+                  .all())
+    return sorted(
+        candidate.posting_id for candidate in candidates
+        if signature_similarity(signature, json.loads(candidate.signature)) >= Config.RECOMMENDATION_DEDUP_THRESHOLD
+    )
+
+
+def delete_posting_signature(posting_type, posting_id):
+    """Drop the signature of a deleted posting (in the caller's transaction)"""
+    PostingSignatureBand.query.filter_by(posting_type=posting_type, posting_id=posting_id).delete(synchronize_session=False)
+    PostingSignature.query.filter_by(posting_type=posting_type, posting_id=posting_id).delete(synchronize_session=False)
+
+
+def load_duplicate_index(posting_type, posting_ids=None, threshold=None):
+    """DuplicateIndex of the stored signatures of a posting type (only the given ids when given)"""
+    index = DuplicateIndex(Config.RECOMMENDATION_DEDUP_THRESHOLD if threshold is None else threshold)
+    query = PostingSignature.query.filter_by(posting_type=posting_type)
+    if posting_ids is not None:
+        if not posting_ids:
+            return index
+        query = query.filter(PostingSignature.posting_id.in_(list(posting_ids)))
+    for entry in query.all():
+        index.add(entry.posting_id, json.loads(entry.signature), group=entry.user_id)
+    return index
+
+
+# Ids left out of the matchers' corpus per posting type, with the catalog version they were computed for
+_collapsed_ids = {}
+_collapsed_lock = threading.Lock()
+
+
+def collapsed_posting_ids(posting_type, posting_ids, catalog_version=None):
+    """
+    Ids among posting_ids that are older reposts of another one of them: every
+    near-duplicate cluster is represented by its newest (highest id) posting.
+    Reused for the same catalog version, since every signature write bumps it.
+    """
+    if catalog_version is not None:
+        with _collapsed_lock:
+            cached = _collapsed_ids.get(posting_type)
+        if cached is not None and cached[0] == catalog_version:
+            return cached[1]
+
+    collapsed = frozenset(
+        posting_id
+        for cluster in load_duplicate_index(posting_type, posting_ids).clusters()
+        for posting_id in cluster[:-1]
+    )
+    if catalog_version is not None:
+        with _collapsed_lock:
+            _collapsed_ids[posting_type] = (catalog_version, collapsed)
+    return collapsed
+
+
+def collapse_near_duplicates(posting_type, payload, catalog_version=None):
+    """
+    Matcher payload ({'<type>_postings': [...]}, or its JSON text) with the older reposts
+    of every near-duplicate cluster removed, so one employer's reposts are scored once.
+    Anything else (e.g. an error response) is returned unchanged.
+    """
+    if not Config.RECOMMENDATION_DEDUP_ENABLED:
+        return payload
+    if isinstance(payload, str):
+        try:
+            payload = json.loads(payload)
+        except ValueError:
+            return payload
+    postings_key, id_field = PAYLOAD_FIELDS[posting_type]
+    if not isinstance(payload, dict) or not isinstance(payload.get(postings_key), list):
+        return payload
+
+    postings = payload[postings_key]
+    posting_ids = [posting.get(id_field) for posting in postings if posting.get(id_field) is not None]
+    collapsed = collapsed_posting_ids(posting_type, posting_ids, catalog_version)
+    if not collapsed:
+        return payload
+    return {**payload, postings_key: [posting for posting in postings if posting.get(id_field) not in collapsed]}
+
+
+def load_job_postings(catalog_version=None):
+    """
+    Active job postings payload for the job posting index, near-duplicates collapsed
+    (shared by every path that builds the index, so they all index the same postings)
+    """
+    return collapse_near_duplicates('job', get_employer_all_jobpostings(), catalog_version)
+
+
+def active_posting_ids(posting_type):
+    """
+    Ids of the postings the matchers score: those of the same active postings payload
+    collapse_near_duplicates is given (empty when none could be loaded)
+    """
+    payload = PAYLOAD_LOADERS[posting_type]()
+    if isinstance(payload, tuple):
+        payload = payload[0]
+    if isinstance(payload, str):
+        try:
+            payload = json.loads(payload)
+        except ValueError:
+            return []
+    postings_key, id_field = PAYLOAD_FIELDS[posting_type]
+    if not isinstance(payload, dict) or not isinstance(payload.get(postings_key), list):
+        return []
+    return [posting.get(id_field) for posting in payload[postings_key] if posting.get(id_field) is not None]
+
+
+def near_duplicate_report(posting_type, posting_model, id_column):
+    """
+    Near-duplicate clusters of a posting type for the admin report: the postings of
+    each cluster (newest last, the one the matchers keep) and their similarity to it.
+    Clustered over the active postings only, like collapse_near_duplicates, so the
+    report shows exactly what the matchers collapse.
+    """
+    title_field = SIGNATURE_FIELDS[posting_type][0]
+    index = load_duplicate_index(posting_type, active_posting_ids(posting_type))
+    clusters = index.clusters()
+    posting_ids = [posting_id for cluster in clusters for posting_id in cluster]
+    postings = {
+        getattr(posting, id_column): posting
+        for posting in posting_model.query.filter(getattr(posting_model, id_column).in_(posting_ids)).all()
+    } if posting_ids else {}
+
+    report = []
+    for cluster in clusters:
+        kept = cluster[-1]
+        report.append({
+            "employer_id": index.groups[kept],
+            "kept_posting_id": kept,
+            "postings": [
+                {
+                    "posting_id": posting_id,
+                    "title": getattr(postings[posting_id], title_field) if posting_id in postings else None,
+                    "status": postings[posting_id].status if posting_id in postings else None,
+                    "created_at": postings[posting_id].created_at.strftime('%Y-%m-%d')
+                    if posting_id in postings and postings[posting_id].created_at else None,
+                    "similarity": round(signature_similarity(index.signatures[posting_id], index.signatures[kept]), 3)
+                }
+                for posting_id in cluster
+            ]
+        })
+    return report
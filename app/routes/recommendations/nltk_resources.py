@@ -0,0 +1,31 @@
+# nltk_resources.py - Use the NLTK data vendored with the app, never download at runtime
+import os
+import nltk
+from nltk.corpus import stopwords
+from nltk.tokenize import word_tokenize
+
+# Vendored NLTK data (stopwords, punkt, punkt_tab, ...) next to this module
+NLTK_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nltk_data')
+
+# Resources the matchers need at runtime
+REQUIRED_RESOURCES = [
+    'corpora/stopwords',
+    'tokenizers/punkt_tab/english',
+]
+
+if NLTK_DATA_DIR not in nltk.data.path:
+    nltk.data.path.insert(0, NLTK_DATA_DIR)
+
+
+def load_nltk_resources():
+    """
+    Check the vendored NLTK resources and load them into memory.
+    Production hosts have no outbound network, so a missing resource is an error
+    instead of a download attempt.
+    """
+    for resource in REQUIRED_RESOURCES:
+        nltk.data.find(resource)
+
+    # Touch the lazy loaders once so the first request doesn't pay for unpickling them
+    stopwords.words('english')
+    word_tokenize("Warm up tokenizer")
@@ -0,0 +1,68 @@
+# numba_kernels.py - Optional numba-compiled CSR scoring kernels (see scoring.score_components)
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # numba is optional; scoring falls back to the NumPy kernels
+    numba = None
+
+AVAILABLE = numba is not None
+
+if AVAILABLE:
+    # nogil: requests scoring in different threads of a worker run in parallel;
+    # cache: the compiled code is kept in __pycache__ for the next worker start
+    @numba.njit(nogil=True, cache=True)
+    def _csr_score_components(data, indices, indptr, profile_vector, term_boosts, gap_weights, max_boost):
+        n_rows = indptr.shape[0] - 1
+        n_gaps = gap_weights.shape[1]
+        similarities = np.zeros(n_rows)
+        boosts = np.ones(n_rows)
+        gaps = np.zeros((n_rows, n_gaps))
+
+        profile_norm = 0.0
+        for value in profile_vector:
+            profile_norm += value * value
+        profile_norm = np.sqrt(profile_norm)
+
+        # One pass over the nonzeros of every posting row
+        for row in range(n_rows):
+            dot_product = 0.0
+            squared_norm = 0.0
+            shared_count = 0
+            shared_boost = 0.0
+            for position in range(indptr[row], indptr[row + 1]):
+                term = indices[position]
+                # float32 or float64 entries, accumulated in float64
+                value = np.float64(data[position])
+                squared_norm += value * value
+                profile_value = profile_vector[term]
+                dot_product += value * profile_value
+                if value > 0:
+                    if profile_value > 0:
+                        shared_count += 1
+                        shared_boost += term_boosts[term]
+                    else:
+                        for gap in range(n_gaps):
+                            gaps[row, gap] += gap_weights[term, gap]
+
+            if profile_norm > 0 and squared_norm > 0:
+                similarities[row] = dot_product / (profile_norm * np.sqrt(squared_norm))
+            if shared_count > 0:
+                boosts[row] = min(max_boost, 1.0 + shared_boost / shared_count)
+        return similarities, boosts, gaps
+
+
+def score_components(profile_vector, posting_matrix, term_boosts, gap_weights, max_boost):
+    """
+    Compiled version of scoring.numpy_score_components (same arguments, gap_weights
+    always 2-D); the matrix data is read in its own dtype, without a float64 copy
+    """
+    return _csr_score_components(
+        posting_matrix.data,
+        posting_matrix.indices,
+        posting_matrix.indptr,
+        np.ascontiguousarray(profile_vector, dtype=np.float64),
+        np.ascontiguousarray(term_boosts, dtype=np.float64),
+        np.ascontiguousarray(gap_weights, dtype=np.float64),
+        float(max_boost)
+    )
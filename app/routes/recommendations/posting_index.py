@@ -0,0 +1,148 @@
+# posting_index.py - Long-lived TF-IDF indexes over the active postings
+import copy
+import threading
+from .section_vectors import SectionVectorCache
+from .inverted_index import InvertedIndex
+from .scoring import row_norms
+
+
+class PostingIndex:
+    """Vocabulary, IDF and sparse posting matrix fitted once for a snapshot of the postings"""
+    def __init__(self, titles, descriptions, processed_texts, vectorizer, matrix, rarity_index, postings=None,
+                 term_clusters=None, cluster_weights=None, gap_weights=None, posting_ids=None, postings_by_id=None,
+                 feature_names=None, inverted_index=None, term_frequencies=None):
+        # Row order of the posting matrix
+        self.titles = titles
+
+        # Posting id of every row (None when unknown) and the row of every id
+        self.posting_ids = posting_ids if posting_ids is not None else [None] * len(titles)
+        self.row_by_id = {
+            posting_id: row for row, posting_id in enumerate(self.posting_ids) if posting_id is not None
+        }
+
+        # Structured description per title (as produced by the transform step)
+        self.descriptions = descriptions
+
+        # Preprocessed, unweighted document text per row
+        self.processed_texts = processed_texts
+
+        # Vectorizer fitted on the postings only; profiles are just transformed against it
+        # (a HashedTfidfVectorizer has no vocabulary, so no feature names either)
+        self.vectorizer = vectorizer
+        if feature_names is None and hasattr(vectorizer, 'get_feature_names_out'):
+            feature_names = vectorizer.get_feature_names_out()
+        self.feature_names = feature_names
+
+        # Raw TF-IDF vectors of profile sections already seen with this vocabulary
+        self.section_vectors = SectionVectorCache(vectorizer)
+
+        # Sparse (postings x vocabulary) float32 TF-IDF matrix, and the L2 norm of every row
+        self.matrix = matrix
+        self.row_norms = row_norms(matrix)
+
+        # Section-weighted TF rows before IDF (hashed features only), so postings can be
+        # added or removed and the IDF updated without featurizing the others again
+        self.term_frequencies = term_frequencies
+
+        # Posting lists per term for pruned top-k retrieval; also tracks which rows are active
+        self.inverted_index = inverted_index if inverted_index is not None else InvertedIndex(matrix)
+
+        # Term rarity across the postings, used by the gap penalty
+        self.rarity_index = rarity_index
+
+        # Rarity weight of every vocabulary term for the per-posting gap scores
+        self.gap_weights = gap_weights
+
+        # Skill cluster index (-1 for none) and cluster weight of every vocabulary term
+        self.term_clusters = term_clusters
+        self.cluster_weights = cluster_weights
+
+        # Original posting payload, used to format responses for the frontend
+        self.postings = postings if postings is not None else {}
+
+        # Original posting per id, so responses are joined by id instead of title
+        self.postings_by_id = postings_by_id if postings_by_id is not None else {}
+
+        # Per-row posting attributes for the job preference prefilter (built on first use)
+        self.attributes = None
+
+        # Catalog version this index was built from (set by PostingIndexCache)
+        self.version = None
+
+    def active_rows(self):
+        """Boolean mask of the rows whose posting is still active"""
+        return self.inverted_index.active
+
+    def with_active_postings(self, posting_ids, postings=None, postings_by_id=None):
+        """
+        Copy of this index where only the given posting ids are active, sharing the
+        fitted vectorizer and matrices (for postings closed or reopened without edits)
+        """
+        index = copy.copy(self)
+        index.inverted_index = self.inverted_index.with_active_rows(
+            [self.row_by_id[posting_id] for posting_id in posting_ids]
+        )
+        if postings is not None:
+            index.postings = postings
+        if postings_by_id is not None:
+            index.postings_by_id = postings_by_id
+            index.attributes = None
+        index.version = None
+        return index
+
+
+class PostingIndexCache:
+    """Holds the current PostingIndex of one posting type and rebuilds it when the catalog version changes"""
+    def __init__(self, build_index, update_index=None, snapshots=None):
+        self.build_index = build_index
+
+        # update_index(index, postings) returns an updated copy of the index, or
+        # None when the change needs a full rebuild
+        self.update_index = update_index
+
+        # Optional PostingSnapshotStore: a published snapshot of the version is mapped
+        # instead of building the index, and indexes built here are published for the other workers
+        self.snapshots = snapshots
+        self._index = None
+        self._lock = threading.Lock()
+
+    def get(self, version, load_postings):
+        """Return the index for a catalog version, building it from load_postings() if needed"""
+        index = self._index
+        if index is not None and index.version == version:
+            return index
+
+        # Only one thread rebuilds; the others wait and reuse its result
+        with self._lock:
+            index = self._index
+            if index is None or index.version != version:
+                snapshot = self.snapshots.load(version) if self.snapshots is not None else None
+                if snapshot is not None:
+                    index = snapshot
+                else:
+                    index = self._build(index, version, load_postings)
+                index.version = version
+                self._index = index
+
+        return index
+
+    def _build(self, index, version, load_postings):
+        """Index of a version built (or updated) in this process, swapped for its snapshot once published"""
+        postings = load_postings()
+        updated = None
+        if index is not None and self.update_index is not None:
+            updated = self.update_index(index, postings)
+        index = updated if updated is not None else self.build_index(postings)
+
+        if self.snapshots is not None and self.snapshots.save(index, version):
+            # Drop the private copy and map the shared one like every other worker
+            index = self.snapshots.load(version) or index
+        return index
+
+    def set_snapshots(self, snapshots):
+        """Use a PostingSnapshotStore from now on (None to stop using snapshots)"""
+        self.snapshots = snapshots
+
+    def clear(self):
+        """Drop the cached index so the next request rebuilds it"""
+        self._index = None
@@ -0,0 +1,227 @@
+# posting_snapshot.py - Versioned on-disk posting index snapshots, memory-mapped read-only by every worker
+import json
+import os
+import shutil
+import threading
+import numpy as np
+from scipy import sparse
+from sklearn.base import clone
+from .posting_index import PostingIndex
+from .inverted_index import InvertedIndex
+
+# File pointing at the newest complete snapshot of a directory
+CURRENT_FILE = 'CURRENT'
+
+# Arrays of a snapshot, one .npy file each (mapped with mmap_mode='r' on load)
+SNAPSHOT_ARRAYS = (
+    'feature_names',      # vocabulary terms in column order (fixed-width unicode)
+    'idf',                # IDF of every term
+    'data', 'indices', 'indptr',                     # CSR posting matrix
+    'term_data', 'term_indices', 'term_indptr',      # CSC copy (posting lists of the inverted index)
+    'term_max_weights',   # max-impact bound of every term
+    'posting_ids',        # posting id of every row (-1 when unknown)
+    'term_clusters', 'cluster_weights', 'gap_weights'
+)
+
+
+def snapshot_name(version):
+    """Directory name of the snapshot of a catalog version"""
+    return f"v{int(version):012d}"
+
+
+def write_posting_snapshot(posting_index, directory, version, keep=3):
+    """
+    Write a posting index as the snapshot of a catalog version.
+
+    Files go to a temporary directory first, which is renamed into place and then
+    published through the CURRENT file, so readers never see a partial snapshot.
+    Only the keep newest snapshots are kept (mapped files stay readable by the
+    workers still using them). Returns the snapshot path.
+    """
+    if posting_index.feature_names is None:
+        raise ValueError("Posting indexes over hashed features have no snapshot format")
+    os.makedirs(directory, exist_ok=True)
+    target = os.path.join(directory, snapshot_name(version))
+    if os.path.isdir(target):
+        return target
+
+    # Posting weights are stored (and mapped) as float32 like the in-memory matrices
+    matrix = sparse.csr_matrix(posting_index.matrix, dtype=np.float32)
+    matrix.sort_indices()
+    term_postings = sparse.csc_matrix(posting_index.inverted_index.term_postings, dtype=np.float32)
+    term_postings.sort_indices()
+    arrays = {
+        'feature_names': np.asarray(posting_index.feature_names, dtype=str),
+        'idf': np.asarray(posting_index.vectorizer.idf_, dtype=np.float64),
+        'data': matrix.data,
+        'indices': matrix.indices,
+        'indptr': matrix.indptr,
+        'term_data': term_postings.data,
+        'term_indices': term_postings.indices,
+        'term_indptr': term_postings.indptr,
+        'term_max_weights': np.asarray(posting_index.inverted_index.term_max_weights, dtype=np.float32),
+        'posting_ids': np.array(
+            [-1 if posting_id is None else posting_id for posting_id in posting_index.posting_ids],
+            dtype=np.int64
+        ),
+        'term_clusters': np.asarray(posting_index.term_clusters, dtype=np.int32),
+        'cluster_weights': np.asarray(posting_index.cluster_weights, dtype=np.float64),
+        'gap_weights': np.asarray(posting_index.gap_weights, dtype=np.float64)
+    }
+
+    # Row order, texts and payload are only needed to format responses, kept as JSON
+    metadata = {
+        'version': int(version),
+        'shape': list(matrix.shape),
+        'titles': posting_index.titles,
+        'descriptions': posting_index.descriptions,
+        'active_ids': [
+            posting_id for posting_id, active in zip(posting_index.posting_ids, posting_index.active_rows())
+            if active and posting_id is not None
+        ],
+        'postings': posting_index.postings
+    }
+
+    staging = f"{target}.tmp-{os.getpid()}-{threading.get_ident()}"
+    os.makedirs(staging)
+    try:
+        for name, array in arrays.items():
+            np.save(os.path.join(staging, f"{name}.npy"), array)
+        with open(os.path.join(staging, 'metadata.json'), 'w') as file:
+            json.dump(metadata, file, default=str)
+        try:
+            os.rename(staging, target)
+        except OSError:
+            # Another process published the same version meanwhile
+            if not os.path.isdir(target):
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    publish_snapshot(directory, version)
+    prune_snapshots(directory, keep)
+    return target
+
+
+def publish_snapshot(directory, version):
+    """Point CURRENT at the snapshot of a version, unless a newer one is already current"""
+    current = current_snapshot_version(directory)
+    if current is not None and current > int(version):
+        return
+    pointer = os.path.join(directory, f"{CURRENT_FILE}.tmp-{os.getpid()}-{threading.get_ident()}")
+    with open(pointer, 'w') as file:
+        file.write(snapshot_name(version))
+    os.replace(pointer, os.path.join(directory, CURRENT_FILE))
+
+
+def current_snapshot_version(directory):
+    """Catalog version of the published snapshot of a directory, or None"""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as file:
+            return int(file.read().strip().lstrip('v'))
+    except (OSError, ValueError):
+        return None
+
+
+def prune_snapshots(directory, keep):
+    """Delete all but the keep newest complete snapshots"""
+    names = sorted(
+        name for name in os.listdir(directory)
+        if name.startswith('v') and '.tmp-' not in name and os.path.isdir(os.path.join(directory, name))
+    )
+    for name in names[:-keep] if keep > 0 else []:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+def load_posting_snapshot(directory, version, vectorizer, postings_key='job_postings', id_field='job_id'):
+    """
+    PostingIndex of the snapshot of a catalog version, or None when there is none.
+
+    Every array is mapped read-only, so all worker processes share one copy of the
+    pages. vectorizer is the (unfitted) template of the matcher; only the vocabulary
+    dict it needs for transform() is rebuilt in each process. The preprocessed
+    posting texts and the rarity counts are not part of a snapshot (scoring only
+    needs the matrix and the per-term gap weights).
+    """
+    path = os.path.join(directory, snapshot_name(version))
+    if not os.path.isfile(os.path.join(path, 'metadata.json')):
+        return None
+
+    with open(os.path.join(path, 'metadata.json')) as file:
+        metadata = json.load(file)
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in SNAPSHOT_ARRAYS}
+
+    shape = tuple(metadata['shape'])
+    matrix = sparse.csr_matrix((arrays['data'], arrays['indices'], arrays['indptr']), shape=shape, copy=False)
+    term_postings = sparse.csc_matrix(
+        (arrays['term_data'], arrays['term_indices'], arrays['term_indptr']), shape=shape, copy=False
+    )
+    # Written sorted and without duplicates; flag it so scipy never tries to fix them in place
+    for mapped in (matrix, term_postings):
+        mapped.has_sorted_indices = True
+        mapped.has_canonical_format = True
+
+    feature_names = arrays['feature_names']
+    fitted = clone(vectorizer).set_params(norm=None)
+    fitted.vocabulary_ = {term: column for column, term in enumerate(feature_names.tolist())}
+    fitted.idf_ = np.asarray(arrays['idf'])
+
+    posting_ids = [None if posting_id < 0 else posting_id for posting_id in arrays['posting_ids'].tolist()]
+    postings = metadata['postings'] or {}
+    postings_by_id = {
+        posting.get(id_field): posting
+        for posting in postings.get(postings_key, [])
+        if posting.get(id_field) is not None
+    }
+
+    index = PostingIndex(
+        titles=metadata['titles'],
+        descriptions=metadata['descriptions'],
+        processed_texts=None,
+        vectorizer=fitted,
+        matrix=matrix,
+        rarity_index=None,
+        postings=postings,
+        term_clusters=arrays['term_clusters'],
+        cluster_weights=arrays['cluster_weights'],
+        gap_weights=arrays['gap_weights'],
+        posting_ids=posting_ids,
+        postings_by_id=postings_by_id,
+        feature_names=feature_names,
+        inverted_index=InvertedIndex(matrix, term_postings=term_postings, term_max_weights=arrays['term_max_weights'])
+    )
+    if len(metadata['active_ids']) != index.inverted_index.active_count():
+        index = index.with_active_postings(metadata['active_ids'])
+    index.version = metadata['version']
+    return index
+
+
+class PostingSnapshotStore:
+    """
+    Snapshot directory of one posting type, as seen by a worker process.
+
+    load(version) maps the snapshot of a catalog version when one was published;
+    save() writes one after a worker had to build the index itself, so the other
+    workers can map it instead of building their own copy.
+    """
+    def __init__(self, directory, vectorizer, keep=3, postings_key='job_postings', id_field='job_id'):
+        self.directory = directory
+        self.vectorizer = vectorizer
+        self.keep = keep
+        self.postings_key = postings_key
+        self.id_field = id_field
+
+    def load(self, version):
+        try:
+            return load_posting_snapshot(self.directory, version, self.vectorizer, self.postings_key, self.id_field)
+        except Exception as e:
+            print(f"Error loading posting snapshot {version} from {self.directory}: {str(e)}")
+            return None
+
+    def save(self, posting_index, version):
+        try:
+            write_posting_snapshot(posting_index, self.directory, version, keep=self.keep)
+            return True
+        except Exception as e:
+            print(f"Error writing posting snapshot {version} to {self.directory}: {str(e)}")
+            return False
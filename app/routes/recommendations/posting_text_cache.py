@@ -0,0 +1,148 @@
+# posting_text_cache.py - Per-posting preprocessing results and incrementally maintained rarity counts
+import threading
+from collections import Counter
+import numpy as np
+
+
+class RarityIndex:
+    """
+    Read-only term rarity view over term counts of the active postings.
+
+    Same values as the dicts the matchers used to build
+    (log(total / (count + 1)) + 1), computed on lookup.
+    """
+    def __init__(self, term_counts, total_postings):
+        self.term_counts = term_counts
+        self.total_postings = total_postings
+
+    def get(self, term, default=None):
+        count = self.term_counts.get(term)
+        if count is None:
+            return default
+        return np.log(self.total_postings / (count + 1)) + 1
+
+    def __getitem__(self, term):
+        if term not in self.term_counts:
+            raise KeyError(term)
+        return self.get(term)
+
+    def __contains__(self, term):
+        return term in self.term_counts
+
+    def __len__(self):
+        return len(self.term_counts)
+
+
+class PostingTextCache:
+    """
+    Preprocessed sections and key-term counts of each posting, keyed by
+    (posting id, updated_at), plus the summed key-term counts of the active postings.
+
+    updated_at only has a day resolution, so an entry is also recomputed when
+    the text it was built from changed.
+    """
+    def __init__(self, process_posting, extract_key_terms):
+        # (title, description) -> {section: preprocessed text}
+        self.process_posting = process_posting
+
+        # preprocessed text -> list of key terms (1-3-grams)
+        self.extract_key_terms = extract_key_terms
+
+        # posting key -> {'source', 'sections', 'document', 'key_terms'}
+        self._entries = {}
+
+        # Key-term counts of the currently active postings; replaced (never
+        # mutated) when the active set changes, so readers always see a consistent snapshot
+        self._active = {}
+        self._term_counts = Counter()
+        self._lock = threading.Lock()
+
+    def processed_sections(self, key, title, description):
+        """Preprocessed sections of one posting"""
+        source = (title, description)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['source'] == source:
+                return entry['sections']
+
+        # Preprocessed outside the lock; a concurrent request may store the same result
+        sections = self.process_posting(title, description)
+        with self._lock:
+            self._entries[key] = {
+                'source': source,
+                'sections': sections,
+                'document': None,
+                'key_terms': None
+            }
+        return sections
+
+    def _key_term_counts(self, key, document):
+        """Key-term counts of one posting document, cached with its entry (the caller holds the lock)"""
+        entry = self._entries.get(key)
+        if entry is None or (entry['document'] is not None and entry['document'] != document):
+            entry = {'source': None, 'sections': None, 'document': document, 'key_terms': None}
+            self._entries[key] = entry
+        if entry['key_terms'] is None:
+            entry['document'] = document
+            entry['key_terms'] = Counter(self.extract_key_terms(document))
+        return entry['key_terms']
+
+    def rarity_index(self, posting_keys, documents):
+        """
+        Rarity index over the given posting documents. Only postings that entered
+        or left the active set since the previous call change the term counts.
+        """
+        documents = list(documents)
+        with self._lock:
+            active = {
+                key: self._key_term_counts(key, document)
+                for key, document in zip(posting_keys, documents)
+            }
+
+            # Apply the difference to the previous active set
+            left = [counts for key, counts in self._active.items() if active.get(key) is not counts]
+            entered = [counts for key, counts in active.items() if self._active.get(key) is not counts]
+            if left or entered:
+                term_counts = self._term_counts.copy()
+                for counts in left:
+                    term_counts.subtract(counts)
+                for counts in entered:
+                    term_counts.update(counts)
+                # Drop terms no active posting mentions anymore
+                self._term_counts = Counter({term: count for term, count in term_counts.items() if count > 0})
+                self._active = active
+
+                # Entries of postings that left the catalog are not needed anymore
+                self._entries = {key: entry for key, entry in self._entries.items() if key in active}
+
+            return RarityIndex(self._term_counts, len(documents))
+
+    def clear(self):
+        """Drop all cached entries and counts"""
+        with self._lock:
+            self._entries = {}
+            self._active = {}
+            self._term_counts = Counter()
+
+
+def posting_version_keys(id_map, postings, id_field):
+    """
+    Cache key (posting id, updated_at) per transformed title, from the id map
+    returned by the transform step and the raw postings payload.
+    """
+    versions = {posting.get(id_field): posting.get('updated_at') for posting in postings}
+    return {
+        title: (posting_id, versions.get(posting_id))
+        for title, posting_id in id_map.items()
+        if posting_id is not None
+    }
+
+
+def keys_for_titles(posting_keys, titles):
+    """Cache keys aligned with titles, or None unless every title has one"""
+    if not posting_keys:
+        return None
+    keys = [posting_keys.get(title) for title in titles]
+    if any(key is None for key in keys):
+        return None
+    return keys
@@ -0,0 +1,165 @@
+# preference_filter.py - Hard-constraint prefilter of job postings from the user's JobPreference
+import threading
+import numpy as np
+from app.config import Config
+
+# Preference fields compared by exact (case-insensitive) value, and the posting field they match
+CATEGORICAL_FIELDS = {
+    'country': lambda job: job.get('country'),
+    'municipality': lambda job: job.get('city_municipality'),
+    'industry': lambda job: (job.get('employer') or {}).get('company_industry'),
+    'scope': lambda job: posting_scope(job.get('local_or_overseas'))
+}
+
+
+def normalize_value(value):
+    """Lowercased, trimmed text, or None when empty"""
+    if value is None:
+        return None
+    value = str(value).strip().lower()
+    return value or None
+
+
+def posting_scope(local_or_overseas):
+    """'local', 'overseas' or None (unknown) from EmployerJobPosting.local_or_overseas"""
+    value = normalize_value(local_or_overseas)
+    if value is None:
+        return None
+    if 'overseas' in value or 'abroad' in value:
+        return 'overseas'
+    if 'local' in value:
+        return 'local'
+    return None
+
+
+def salary_value(value):
+    """Salary as a float, NaN when missing or not a number"""
+    try:
+        return float(value) if value is not None else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def parse_tiers(tiers):
+    """Tiers from a 'field,field;field' string, strictest first"""
+    return [
+        tuple(field.strip() for field in tier.split(',') if field.strip())
+        for tier in tiers.split(';') if tier.strip()
+    ]
+
+
+class PostingAttributes:
+    """
+    Bitmaps over the rows of a posting index: one boolean mask per value of each
+    categorical field, plus the salary range of every row. A posting without a
+    value for a field never fails that field's constraint.
+    """
+    def __init__(self, posting_index):
+        postings_by_id = posting_index.postings_by_id or {}
+        jobs = [postings_by_id.get(posting_id) or {} for posting_id in posting_index.posting_ids]
+        row_count = len(jobs)
+
+        self.bitmaps = {}
+        self.unknown = {}
+        for field, get_value in CATEGORICAL_FIELDS.items():
+            values = [normalize_value(get_value(job)) for job in jobs]
+            rows_by_value = {}
+            for row, value in enumerate(values):
+                rows_by_value.setdefault(value, []).append(row)
+
+            bitmaps = {}
+            for value, rows in rows_by_value.items():
+                bitmap = np.zeros(row_count, dtype=bool)
+                bitmap[rows] = True
+                bitmaps[value] = bitmap
+            self.unknown[field] = bitmaps.pop(None, np.zeros(row_count, dtype=bool))
+            self.bitmaps[field] = bitmaps
+
+        self.salary_from = np.array([salary_value(job.get('estimated_salary_from')) for job in jobs], dtype=np.float64)
+        self.salary_to = np.array([salary_value(job.get('estimated_salary_to')) for job in jobs], dtype=np.float64)
+
+    def matches(self, field, value):
+        """Rows whose field equals the (normalized) value or is unknown"""
+        bitmap = self.bitmaps[field].get(value)
+        if bitmap is None:
+            return self.unknown[field]
+        return bitmap | self.unknown[field]
+
+    def salary_overlaps(self, salary_from, salary_to):
+        """Rows whose salary range overlaps [salary_from, salary_to] (open ends when missing)"""
+        mask = np.ones(self.salary_from.shape[0], dtype=bool)
+        if salary_from:
+            mask &= np.isnan(self.salary_to) | (self.salary_to >= salary_from)
+        if salary_to:
+            mask &= np.isnan(self.salary_from) | (self.salary_from <= salary_to)
+        return mask
+
+
+# Posting attributes per posting index, built on first use
+_attributes_lock = threading.Lock()
+
+
+def posting_attributes(posting_index):
+    """Attributes of a posting index, built once and kept on the index"""
+    with _attributes_lock:
+        if posting_index.attributes is None:
+            posting_index.attributes = PostingAttributes(posting_index)
+        return posting_index.attributes
+
+
+def preference_constraints(preference):
+    """Normalized constraint values of one JobPreference record"""
+    country = normalize_value(preference.get('country'))
+    scope = None
+    if country is not None:
+        scope = 'local' if country == normalize_value(Config.RECOMMENDATION_HOME_COUNTRY) else 'overseas'
+    return {
+        'country': country,
+        'municipality': normalize_value(preference.get('municipality')),
+        'industry': normalize_value(preference.get('industry')),
+        'scope': scope,
+        'salary': (preference.get('salary_from'), preference.get('salary_to'))
+    }
+
+
+def tier_mask(attributes, constraints, fields):
+    """Rows satisfying the given fields of one preference's constraints"""
+    mask = np.ones(attributes.salary_from.shape[0], dtype=bool)
+    for field in fields:
+        if field == 'salary':
+            mask &= attributes.salary_overlaps(*constraints['salary'])
+        elif constraints.get(field) is not None:
+            mask &= attributes.matches(field, constraints[field])
+    return mask
+
+
+def select_candidate_rows(posting_index, profile_data, min_candidates=None, tiers=None):
+    """
+    Boolean mask of the active postings that satisfy the user's job preferences.
+
+    Tiers of constraints are tried strictest first; a tier is used as soon as at
+    least min_candidates postings survive it (a posting may match any of the
+    user's preferences). Returns (mask, tier fields), or (None, None) when the
+    prefilter is off, the user has no preferences or every tier is too strict.
+    """
+    preferences = profile_data.get('job_preference') or []
+    if not Config.RECOMMENDATION_PREFILTER_ENABLED or not preferences:
+        return None, None
+
+    if min_candidates is None:
+        min_candidates = Config.RECOMMENDATION_PREFILTER_MIN_CANDIDATES
+    if tiers is None:
+        tiers = parse_tiers(Config.RECOMMENDATION_PREFILTER_TIERS)
+
+    attributes = posting_attributes(posting_index)
+    constraints_per_preference = [preference_constraints(preference) for preference in preferences]
+    active = posting_index.active_rows()
+
+    for fields in tiers:
+        mask = np.zeros(active.shape[0], dtype=bool)
+        for constraints in constraints_per_preference:
+            mask |= tier_mask(attributes, constraints, fields)
+        mask &= active
+        if np.count_nonzero(mask) >= min_candidates:
+            return mask, fields
+    return None, None
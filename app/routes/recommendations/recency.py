@@ -0,0 +1,76 @@
+# recency.py - Per-profile recency weights, computed once per request instead of once per term
+from datetime import datetime
+import numpy as np
+
+
+class RecencyTable:
+    """
+    Recency weight of every profile term, built from the dated profile history
+    (work experience, trainings, ...) of one request.
+
+    Each history entry is parsed and weighted once; a term then gets the weight
+    of the most recent entry whose text contains it, or 1.0 if none does.
+    """
+    def __init__(self, entries, max_recency_boost, time_decay_lambda, now=None):
+        now = now or datetime.now()
+
+        # (lowercased texts, weight) per entry, most recent (= highest weight) first
+        weighted_entries = []
+        for texts, date_obj in entries:
+            days_since = (now - date_obj).days
+            weight = max(1.0, max_recency_boost * np.exp(-time_decay_lambda * days_since / 365.0))
+            weighted_entries.append((date_obj, texts, weight))
+        weighted_entries.sort(key=lambda entry: entry[0], reverse=True)
+        self.entries = [(texts, weight) for _, texts, weight in weighted_entries]
+
+        # Lookups already answered for this profile
+        self.weights = {}
+
+    def weight(self, term):
+        """Recency weight of one term (1.0 if no dated history entry mentions it)"""
+        weight = self.weights.get(term)
+        if weight is None:
+            weight = 1.0
+            for texts, entry_weight in self.entries:
+                if any(term in text for text in texts):
+                    weight = entry_weight
+                    break
+            self.weights[term] = weight
+        return weight
+
+
+def parse_history_date(value, today=None):
+    """Parse a YYYY-MM-DD history date; None or 'present' means today, unparseable dates give None"""
+    if value is None or value.lower() == 'present':
+        if today is None:
+            return None
+        value = today.strftime('%Y-%m-%d')
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return None
+
+
+def work_experience_entries(profile_data, now):
+    """Dated (position, company name) entries of the profile's work experience"""
+    entries = []
+    for exp in profile_data.get('work_experience', []):
+        texts = (exp.get('position', '').lower(), exp.get('company_name', '').lower())
+        # Ongoing positions count as ending today
+        date_obj = parse_history_date(exp.get('end_date', None), today=now)
+        if date_obj is not None:
+            entries.append((texts, date_obj))
+    return entries
+
+
+def training_entries(profile_data):
+    """Dated (course name, skills acquired) entries of the profile's other trainings"""
+    entries = []
+    for training in profile_data.get('other_training', []):
+        texts = (training.get('course_name', '').lower(), training.get('skills_acquired', '').lower())
+        completion_date = training.get('completion_date', None)
+        # Trainings without a completion date don't count
+        date_obj = parse_history_date(completion_date) if completion_date else None
+        if date_obj is not None:
+            entries.append((texts, date_obj))
+    return entries
@@ -0,0 +1,79 @@
+# recommendation_cache.py - In-process LRU/TTL cache of computed recommendation responses
+import hashlib
+import json
+import threading
+from cachetools import TTLCache
+
+
+def profile_fingerprint(user_profile):
+    """Stable hash of an assembled user profile (dates and decimals included via str)"""
+    payload = json.dumps(user_profile, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RecommendationCache:
+    """
+    Formatted recommendation responses keyed by (kind, profile hash, catalog version, page).
+
+    Entries of a user can be dropped as soon as the profile changes, and expire
+    after ttl seconds; the least recently used ones go first when full.
+    Cached responses are shared, callers must not modify them.
+    """
+    def __init__(self, maxsize=1024, ttl=600):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+        # user_id -> cache keys of that user, for per-user invalidation
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id, key):
+        """Cached response for a user and key, or None"""
+        with self._lock:
+            response = self._cache.get((user_id, key))
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return response
+
+    def set(self, user_id, key, response):
+        """Cache a response for a user and key"""
+        with self._lock:
+            self._cache[(user_id, key)] = response
+
+            # Forget keys of this user that were evicted or expired meanwhile
+            user_keys = self._keys_by_user.get(user_id, set())
+            user_keys = {user_key for user_key in user_keys if user_key in self._cache}
+            user_keys.add((user_id, key))
+            self._keys_by_user[user_id] = user_keys
+
+    def invalidate_user(self, user_id):
+        """Drop every cached response of a user"""
+        with self._lock:
+            for user_key in self._keys_by_user.pop(user_id, ()):
+                if self._cache.pop(user_key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        """Drop all cached responses"""
+        with self._lock:
+            self._cache.clear()
+            self._keys_by_user = {}
+
+    def stats(self):
+        """Hit/miss counters, hit ratio and fill level"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'invalidations': self.invalidations,
+                'size': len(self._cache),
+                'max_size': self._cache.maxsize,
+                'ttl': self._cache.ttl
+            }
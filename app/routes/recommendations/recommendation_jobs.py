@@ -0,0 +1,249 @@
+# recommendation_jobs.py - Asynchronous recommendation jobs: per-kind worker pools, submit and (long-)poll
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from app import db
+from app.models import RecommendationJobRecord
+from app.config import Config
+
+# Job states as reported by the poll endpoint
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+# Seconds between reads of a long-polled job that runs in another worker process
+WAIT_POLL_INTERVAL = 0.5
+
+# Pool of the admin bulk matching jobs (they run the job matcher)
+BATCH_POOL = 'job'
+
+# Worker threads per pool when RECOMMENDATION_JOB_WORKERS can't be parsed
+DEFAULT_POOL_SIZES = "job=2,training=1,scholarship=1"
+
+
+def parse_pool_sizes(spec):
+    """
+    Worker threads per pool from "job=2,training=1,scholarship=1"
+    (pools not listed get one thread); a malformed spec falls back to DEFAULT_POOL_SIZES
+    """
+    sizes = {}
+    try:
+        for entry in (spec or '').split(','):
+            if not entry.strip():
+                continue
+            name, _, size = entry.partition('=')
+            if not name.strip() or not size.strip():
+                raise ValueError(f"expected name=threads, got {entry.strip()!r}")
+            sizes[name.strip()] = max(int(size), 1)
+    except ValueError as e:
+        print(f"Invalid RECOMMENDATION_JOB_WORKERS {spec!r} ({str(e)}), using {DEFAULT_POOL_SIZES!r}")
+        return parse_pool_sizes(DEFAULT_POOL_SIZES)
+    return sizes
+
+
+class RecommendationJob:
+    """One submitted computation running in this worker process: its parts (one per kind) and their results so far"""
+    def __init__(self, owner_id, parts):
+        self.job_id = uuid.uuid4().hex
+        self.owner_id = owner_id
+        self.status = JOB_QUEUED
+        self.results = {}
+        self.errors = {}
+        self.remaining_parts = len(parts)
+        self.finished = threading.Event()
+
+
+def job_finished(record):
+    """Whether a stored job finished (done or failed)"""
+    return record.status in (JOB_DONE, JOB_FAILED)
+
+
+def job_timestamp(value):
+    """Seconds since the epoch of a stored (naive UTC) time, None when unset"""
+    return value.replace(tzinfo=timezone.utc).timestamp() if value is not None else None
+
+
+def describe_job(record):
+    """Status of a stored job, with the results (or errors) once it finished"""
+    description = {
+        "job_id": record.job_id,
+        "status": record.status,
+        "submitted_at": job_timestamp(record.submitted_at),
+        "finished_at": job_timestamp(record.finished_at)
+    }
+    if job_finished(record):
+        description["results"] = json.loads(record.results or '{}')
+        if record.errors:
+            description["errors"] = json.loads(record.errors)
+    return description
+
+
+class RecommendationJobQueue:
+    """
+    Recommendation computations run off the request threads.
+
+    Every part of a job (a kind, or the admin bulk matching) runs on the worker pool
+    of its kind, sized per kind, so a burst of one kind doesn't hold up the others.
+    The state and results of every job are kept in the recommendation_jobs table, so
+    any worker process can serve the poll of a job another one runs. Finished jobs
+    are kept ttl seconds for polling, then dropped.
+    """
+    def __init__(self, pool_sizes=None, ttl=600):
+        self.pool_sizes = pool_sizes or {}
+        self.ttl = ttl
+        self._pools = {}
+        self._jobs = {}  # Jobs of this process still running, by id
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.expired = 0
+
+    def _pool(self, name):
+        with self._lock:
+            pool = self._pools.get(name)
+            if pool is None:
+                pool = ThreadPoolExecutor(
+                    max_workers=self.pool_sizes.get(name, 1), thread_name_prefix=f"recommendation-job-{name}"
+                )
+                self._pools[name] = pool
+            return pool
+
+    def submit(self, app, owner_id, parts):
+        """
+        Queue a job of {part name: (pool name, function)}; every function runs in its
+        own app context and its return value becomes results[part name].
+        Called within an app context (the job is stored before its parts run).
+        Returns the RecommendationJob.
+        """
+        self.purge()
+        job = RecommendationJob(owner_id, parts)
+        db.session.add(RecommendationJobRecord(job_id=job.job_id, owner_id=owner_id, status=JOB_QUEUED))
+        db.session.commit()
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self.submitted += 1
+
+        for name, (pool_name, function) in parts.items():
+            self._pool(pool_name).submit(self._run, app, job, name, function)
+        return job
+
+    def _run(self, app, job, name, function):
+        with self._lock:
+            started = job.status == JOB_QUEUED
+            if started:
+                job.status = JOB_RUNNING
+        if started:
+            with app.app_context():
+                self._store(job.job_id, status=JOB_RUNNING)
+        try:
+            with app.app_context():
+                result = function()
+            error = None
+        except Exception as e:
+            print(f"Error in recommendation job {job.job_id} ({name}): {str(e)}")
+            result, error = None, str(e)
+
+        with self._lock:
+            if error is None:
+                job.results[name] = result
+            else:
+                job.errors[name] = error
+            job.remaining_parts -= 1
+            if job.remaining_parts > 0:
+                return
+            job.status = JOB_FAILED if job.errors else JOB_DONE
+            if job.errors:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+        finished_at = datetime.utcnow()
+        with app.app_context():
+            self._store(
+                job.job_id, status=job.status,
+                results=json.dumps(job.results, default=str),
+                errors=json.dumps(job.errors) if job.errors else None,
+                finished_at=finished_at,
+                expires_at=finished_at + timedelta(seconds=self.ttl)
+            )
+        job.finished.set()
+        with self._lock:
+            self._jobs.pop(job.job_id, None)
+
+    def _store(self, job_id, **fields):
+        """Update the stored state of a job; a finished state is never overwritten by a running one"""
+        try:
+            query = RecommendationJobRecord.query.filter_by(job_id=job_id)
+            if fields.get('status') == JOB_RUNNING:
+                query = query.filter_by(status=JOB_QUEUED)
+            query.update(fields, synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error storing recommendation job {job_id}: {str(e)}")
+
+    def get(self, job_id):
+        """The stored job with this id (read afresh), or None when unknown or expired"""
+        record = db.session.get(RecommendationJobRecord, job_id, populate_existing=True)
+        if record is None or (record.expires_at is not None and record.expires_at < datetime.utcnow()):
+            return None
+        return record
+
+    def wait(self, job_id, timeout):
+        """
+        The stored job once it finished, or as it stands after timeout seconds (None when
+        it expired meanwhile). Jobs of another worker process are re-read every WAIT_POLL_INTERVAL.
+        """
+        deadline = time.monotonic() + timeout
+        record = self.get(job_id)
+        while record is not None and not job_finished(record):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            with self._lock:
+                job = self._jobs.get(job_id)
+            if job is not None:
+                job.finished.wait(remaining)
+            else:
+                time.sleep(min(WAIT_POLL_INTERVAL, remaining))
+            record = self.get(job_id)
+        return record
+
+    def purge(self):
+        """Delete the stored jobs that finished longer than the TTL ago"""
+        try:
+            expired = RecommendationJobRecord.query.filter(
+                RecommendationJobRecord.expires_at < datetime.utcnow()
+            ).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error purging expired recommendation jobs: {str(e)}")
+            return
+        with self._lock:
+            self.expired += expired
+
+    def stats(self):
+        """Job counters of this process, its running jobs, the stored jobs and pool sizes"""
+        held = RecommendationJobRecord.query.count()
+        with self._lock:
+            return {
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'expired': self.expired,
+                'pending': len(self._jobs),
+                'held': held,
+                'pool_sizes': dict(self.pool_sizes),
+                'ttl': self.ttl
+            }
+
+
+# Process-wide job queue used by the submit and poll endpoints (job state is shared through the database)
+recommendation_jobs = RecommendationJobQueue(parse_pool_sizes(Config.RECOMMENDATION_JOB_WORKERS), Config.RECOMMENDATION_JOB_TTL)
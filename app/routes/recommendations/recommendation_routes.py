@@ -1,19 +1,73 @@
-from flask import g, Blueprint, request, jsonify
+from flask import g, Blueprint, request, jsonify, Response, stream_with_context, current_app, url_for
 import json
+import time
 from app import db
 from flask_httpauth import HTTPBasicAuth
-from .job_reco_model.job_matching import run_job_matching
 from .training_reco_model.training_matcher import TrainingMatcher
 from .scholarship_reco_model.scholarship_matcher import ScholarshipMatcher
-from app.models import User, PersonalInformation, JobPreference, LanguageProficiency, EducationalBackground, WorkExperience, OtherSkills, ProfessionalLicense, OtherTraining
-from app.utils import get_user_data, exclude_fields, convert_dates, get_employer_all_jobpostings, get_employer_all_trainingpostings, get_employer_all_scholarshippostings
-import nltk
+from .job_reco_model.job_matcher import NoveltyEnhancedJobMatcher
+from .matcher_registry import get_shared_matcher
+from .job_reco_model.job_matching import use_hashed_job_features
+from .recommendation_store import get_user_recommendations, get_recommendations_for_kinds, start_recommendation_refresher, recommendation_cache, RECOMMENDATION_KINDS
+from .text_normalizer import stem_cache_stats
+from .scoring import select_scoring_backend, scoring_backend
+from .batch_recommendations import parse_user_ids, select_jobseeker_ids, generate_batch_job_recommendations
+from .nltk_resources import load_nltk_resources
+from .latency_budget import LatencyBudget, latency_metrics
+from .recommendation_jobs import recommendation_jobs, describe_job, job_finished, BATCH_POOL
+from .matching_service import matching_service, MatchingServiceBusy
+from .candidate_ranking import rank_candidates, SCOPE_APPLICANTS, SCOPE_POOL
+from .candidate_index import jobseeker_profile_index
+from app.models import User, EmployerJobPosting
 
 
 auth = HTTPBasicAuth()
 
 recommendation = Blueprint("recommendation", __name__)
 
+# Largest page of recommendations a single request may ask for
+MAX_RECOMMENDATIONS_PER_PAGE = 50
+
+# Longest a poll of a recommendation job may wait for it to finish (seconds)
+MAX_JOB_POLL_WAIT = 30
+
+def get_paging_params(default_top_n=5):
+    """
+    top_n and offset query parameters of a recommendation request,
+    so the UI can page through the ranked postings (?top_n=5&offset=5)
+    """
+    top_n = request.args.get('top_n', default_top_n, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    return min(max(top_n, 1), MAX_RECOMMENDATIONS_PER_PAGE), max(offset, 0)
+
+def get_latency_budget():
+    """
+    LatencyBudget of a recommendation request, started now: RECOMMENDATION_LATENCY_BUDGET_MS,
+    or the smaller budget_ms query parameter (a client may ask for a tighter deadline)
+    """
+    budget_ms = current_app.config.get('RECOMMENDATION_LATENCY_BUDGET_MS', 0)
+    requested = request.args.get('budget_ms', type=int)
+    if requested is not None and requested > 0:
+        budget_ms = min(budget_ms, requested) if budget_ms else requested
+    return LatencyBudget(budget_ms)
+
+def warm_up_matchers(scoring_backend='auto', featurization='tfidf', hash_features=2 ** 18):
+    """
+    Load the NLTK resources, select (and compile) the scoring kernel and create
+    the shared matchers once per process, so the first recommendation request doesn't pay for it.
+    featurization 'hashing' builds the job posting index from hash_features hashed features.
+    """
+    load_nltk_resources()
+    select_scoring_backend(scoring_backend)
+    for matcher_class in (NoveltyEnhancedJobMatcher, TrainingMatcher, ScholarshipMatcher):
+        get_shared_matcher(matcher_class)
+    use_hashed_job_features(hash_features if featurization == 'hashing' else None)
+
+@recommendation.errorhandler(MatchingServiceBusy)
+def matching_service_busy(error):
+    # Back-pressure from the matching pool: the client should retry shortly
+    return jsonify({"success": False, "error": str(error)}), 503, {"Retry-After": "1"}
+
 @auth.verify_password
 def verify_password(username_or_token, password):
     # Try to authenticate by token
@@ -29,7 +83,7 @@ def verify_password(username_or_token, password):
 @recommendation.route('/recommend/job-posting', methods=['GET'])
 @auth.login_required
 def recommend_job_posting():
-
+    budget = get_latency_budget()
     uid = g.user.user_id
 
     if uid is None:
@@ -41,45 +95,15 @@ def recommend_job_posting():
     if user is None:
         return jsonify({"error": "User not found"}), 404
 
-    def fetch_data(model):
-        return exclude_fields(get_user_data(model, uid) or [])
-    
     if user.user_type in ["STUDENT", "JOBSEEKER"]:
-        personal_information = fetch_data(PersonalInformation)
-        job_preference = fetch_data(JobPreference)
-        language_proficiency = fetch_data(LanguageProficiency)
-        educational_background = fetch_data(EducationalBackground)
-        other_training = fetch_data(OtherTraining)
-        professional_license = fetch_data(ProfessionalLicense)
-        work_experience = fetch_data(WorkExperience)
-        other_skills = fetch_data(OtherSkills)
-            # Transform disability format
-        for item in personal_information:
-            disability_str = item.get("disability", "")
-            if disability_str:
-                disabilities = [d.strip() for d in disability_str.split(",")]
-                item["disability"] = {
-                    "visual": "visual" in disabilities,
-                    "hearing": "hearing" in disabilities,
-                    "speech": "speech" in disabilities,
-                    "physical": "physical" in disabilities,
-                }
-        user_profile = json.dumps({
-            "personal_information": convert_dates(personal_information),
-            "job_preference": convert_dates(job_preference),
-            "language_proficiency": convert_dates(language_proficiency),
-            "educational_background": convert_dates(educational_background),
-            "other_training": convert_dates(other_training),
-            "professional_license": convert_dates(professional_license),
-            "work_experience": convert_dates(work_experience),
-            "other_skills": convert_dates(other_skills)
-        })
-
-        return run_job_matching(user_profile, get_employer_all_jobpostings(), top_n=5, return_json=True)
-    
+        # Served from the stored recommendations; computed on demand only when missing or too old
+        top_n, offset = get_paging_params()
+        return get_user_recommendations(uid, 'job', top_n=top_n, offset=offset, budget=budget)
+
 @recommendation.route('/recommend/training-posting', methods=['GET'])
 @auth.login_required
 def recommend_training_posting():
+    budget = get_latency_budget()
     uid = g.user.user_id
 
     if uid is None:
@@ -91,56 +115,15 @@ def recommend_training_posting():
     if user is None:
         return jsonify({"error": "User not found"}), 404
 
-    def fetch_data(model):
-        return exclude_fields(get_user_data(model, uid) or [])
-    
     if user.user_type in ["STUDENT", "JOBSEEKER"]:
-        personal_information = fetch_data(PersonalInformation)
-        job_preference = fetch_data(JobPreference)
-        language_proficiency = fetch_data(LanguageProficiency)
-        educational_background = fetch_data(EducationalBackground)
-        other_training = fetch_data(OtherTraining)
-        professional_license = fetch_data(ProfessionalLicense)
-        work_experience = fetch_data(WorkExperience)
-        other_skills = fetch_data(OtherSkills)
-        
-        # Transform disability format
-        for item in personal_information:
-            disability_str = item.get("disability", "")
-            if disability_str:
-                disabilities = [d.strip() for d in disability_str.split(",")]
-                item["disability"] = {
-                    "visual": "visual" in disabilities,
-                    "hearing": "hearing" in disabilities,
-                    "speech": "speech" in disabilities,
-                    "physical": "physical" in disabilities,
-                }
-
-        # Create user profile as a dictionary (not a JSON string)
-        user_profile = {
-            "personal_information": convert_dates(personal_information),
-            "job_preference": convert_dates(job_preference),
-            "language_proficiency": convert_dates(language_proficiency),
-            "educational_background": convert_dates(educational_background),
-            "other_training": convert_dates(other_training),
-            "professional_license": convert_dates(professional_license),
-            "work_experience": convert_dates(work_experience),
-            "other_skills": convert_dates(other_skills)
-        }
-
-        # Fetch training postings
-        training_postings = get_employer_all_trainingpostings()
-
-        # Ensure training_postings is a dictionary
-        if isinstance(training_postings, tuple):
-            training_postings = training_postings[0]  # Extract the first element (assumed to be the dictionary)
-
-        # Run training matching
-        return TrainingMatcher.run_training_matching(user_profile, training_postings, top_n=5, return_json=True)
+        # Served from the stored recommendations; computed on demand only when missing or too old
+        top_n, offset = get_paging_params()
+        return get_user_recommendations(uid, 'training', top_n=top_n, offset=offset, budget=budget)
 
 @recommendation.route('/recommend/scholarship-posting', methods=['GET'])
 @auth.login_required
 def recommend_scholarship_posting():
+    budget = get_latency_budget()
     uid = g.user.user_id
 
     if uid is None:
@@ -152,49 +135,256 @@ def recommend_scholarship_posting():
     if user is None:
         return jsonify({"error": "User not found"}), 404
 
-    def fetch_data(model):
-        return exclude_fields(get_user_data(model, uid) or [])
-    
     if user.user_type in ["STUDENT", "JOBSEEKER"]:
-        personal_information = fetch_data(PersonalInformation)
-        job_preference = fetch_data(JobPreference)
-        language_proficiency = fetch_data(LanguageProficiency)
-        educational_background = fetch_data(EducationalBackground)
-        other_training = fetch_data(OtherTraining)
-        professional_license = fetch_data(ProfessionalLicense)
-        work_experience = fetch_data(WorkExperience)
-        other_skills = fetch_data(OtherSkills)
-        
-        # Transform disability format
-        for item in personal_information:
-            disability_str = item.get("disability", "")
-            if disability_str:
-                disabilities = [d.strip() for d in disability_str.split(",")]
-                item["disability"] = {
-                    "visual": "visual" in disabilities,
-                    "hearing": "hearing" in disabilities,
-                    "speech": "speech" in disabilities,
-                    "physical": "physical" in disabilities,
-                }
-
-        # Create user profile as a dictionary (not a JSON string)
-        user_profile = {
-            "personal_information": convert_dates(personal_information),
-            "job_preference": convert_dates(job_preference),
-            "language_proficiency": convert_dates(language_proficiency),
-            "educational_background": convert_dates(educational_background),
-            "other_training": convert_dates(other_training),
-            "professional_license": convert_dates(professional_license),
-            "work_experience": convert_dates(work_experience),
-            "other_skills": convert_dates(other_skills)
-        }
-
-        # Fetch scholarship postings
-        scholarship_postings = get_employer_all_scholarshippostings()
-
-        # Ensure scholarship_postings is a dictionary
-        if isinstance(scholarship_postings, tuple):
-            scholarship_postings = scholarship_postings[0]  # Extract the first element (assumed to be the dictionary)
-
-        # Run scholarship matching
-        return ScholarshipMatcher.run_scholarship_matching(user_profile, scholarship_postings, top_n=5, return_json=True)
\ No newline at end of file
+        # Served from the stored recommendations; computed on demand only when missing or too old
+        top_n, offset = get_paging_params()
+        return get_user_recommendations(uid, 'scholarship', top_n=top_n, offset=offset, budget=budget)
+
+@recommendation.route('/recommend/all', methods=['GET'])
+@auth.login_required
+def recommend_all():
+    """
+    Job, training and scholarship recommendations in one call, with the time
+    spent on each kind. Only some kinds can be requested, e.g.
+    /recommend/all?kinds=job,scholarship&top_n=5&offset=0
+    The kinds share one latency budget (see get_latency_budget).
+    """
+    budget = get_latency_budget()
+    uid = g.user.user_id
+
+    if uid is None:
+        return jsonify({"error": "Missing user_id"}), 400
+    
+    # Query the database for the user
+    user = User.query.filter_by(user_id=uid).first()
+
+    if user is None:
+        return jsonify({"error": "User not found"}), 404
+
+    if user.user_type not in ["STUDENT", "JOBSEEKER"]:
+        return jsonify({"error": "Recommendations are only available to jobseekers and students"}), 403
+
+    # Requested kinds in the order given (all of them by default)
+    kinds = [kind.strip() for kind in request.args.get('kinds', '').split(',') if kind.strip()]
+    kinds = list(dict.fromkeys(kinds)) or list(RECOMMENDATION_KINDS)
+    unknown = [kind for kind in kinds if kind not in RECOMMENDATION_KINDS]
+    if unknown:
+        return jsonify({"error": f"Unknown recommendation kinds: {', '.join(unknown)}",
+                        "available_kinds": list(RECOMMENDATION_KINDS)}), 400
+
+    top_n, offset = get_paging_params()
+    start = time.perf_counter()
+    responses, timings = get_recommendations_for_kinds(uid, kinds, top_n=top_n, offset=offset, budget=budget)
+
+    return jsonify({
+        "success": all(response.get("success") for response in responses.values()),
+        "recommendations": responses,
+        "timings": timings,
+        "total_ms": round((time.perf_counter() - start) * 1000, 1),
+        "budget_ms": budget.budget_ms
+    }), 200
+
+@recommendation.route('/recommend/jobs', methods=['POST'])
+@auth.login_required
+def submit_recommendation_job():
+    """
+    Compute recommendations in the background instead of within the request, e.g. for
+    large profiles. Returns a job id to poll with GET /recommend/jobs/<job_id>.
+    Expected JSON format (all fields optional, every kind by default):
+    {
+        "kinds": ["job", "training", "scholarship"],
+        "top_n": 5,
+        "offset": 0
+    }
+    Each kind runs on the worker pool of that kind (see RECOMMENDATION_JOB_WORKERS).
+    """
+    uid = g.user.user_id
+    if g.user.user_type not in ["STUDENT", "JOBSEEKER"]:
+        return jsonify({"error": "Recommendations are only available to jobseekers and students"}), 403
+
+    data = request.get_json(silent=True) or {}
+    kinds = data.get('kinds') or list(RECOMMENDATION_KINDS)
+    if isinstance(kinds, str):
+        kinds = [kind.strip() for kind in kinds.split(',') if kind.strip()]
+    kinds = list(dict.fromkeys(kinds))
+    unknown = [kind for kind in kinds if kind not in RECOMMENDATION_KINDS]
+    if unknown:
+        return jsonify({"error": f"Unknown recommendation kinds: {', '.join(map(str, unknown))}",
+                        "available_kinds": list(RECOMMENDATION_KINDS)}), 400
+    try:
+        top_n = min(max(int(data.get('top_n', 5)), 1), MAX_RECOMMENDATIONS_PER_PAGE)
+        offset = max(int(data.get('offset', 0)), 0)
+    except (TypeError, ValueError):
+        return jsonify({"error": "top_n and offset must be integers"}), 400
+
+    # Served like the synchronous endpoints (stored rankings first), without a latency budget
+    parts = {
+        kind: (kind, lambda kind=kind: get_user_recommendations(uid, kind, top_n=top_n, offset=offset))
+        for kind in kinds
+    }
+    job = recommendation_jobs.submit(current_app._get_current_object(), uid, parts)
+    return jsonify({
+        "success": True,
+        "job_id": job.job_id,
+        "status": job.status,
+        "poll_url": url_for('recommendation.poll_recommendation_job', job_id=job.job_id)
+    }), 202
+
+@recommendation.route('/recommend/jobs/batch', methods=['POST'])
+@auth.login_required
+def submit_batch_recommendation_job():
+    """
+    Background counterpart of /recommend/batch/job-posting (admin only): same JSON body,
+    the per-user results are returned as a list by GET /recommend/jobs/<job_id>
+    """
+    # Check if the authenticated user has ADMIN privileges
+    if g.user.user_type != 'ADMIN':
+        return jsonify({"error": "Unauthorized access"}), 403
+
+    data = request.get_json(silent=True) or {}
+    try:
+        top_n = min(max(int(data.get('top_n', 5)), 1), MAX_RECOMMENDATIONS_PER_PAGE)
+        limit = int(data['limit']) if data.get('limit') else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "top_n and limit must be integers"}), 400
+    try:
+        requested_ids = parse_user_ids(data.get('user_ids'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    user_ids = select_jobseeker_ids(requested_ids, data.get('municipality'), limit)
+
+    def run_batch():
+        return [json.loads(line) for line in generate_batch_job_recommendations(user_ids, top_n=top_n)]
+
+    job = recommendation_jobs.submit(current_app._get_current_object(), g.user.user_id, {"batch": (BATCH_POOL, run_batch)})
+    return jsonify({
+        "success": True,
+        "job_id": job.job_id,
+        "status": job.status,
+        "users": len(user_ids),
+        "poll_url": url_for('recommendation.poll_recommendation_job', job_id=job.job_id)
+    }), 202
+
+@recommendation.route('/recommend/jobs/<job_id>', methods=['GET'])
+@auth.login_required
+def poll_recommendation_job(job_id):
+    """
+    Status of a submitted recommendation job, with its results once finished (200;
+    202 while queued or running). ?wait=<seconds> long-polls: the response is held
+    until the job finishes or the wait (at most MAX_JOB_POLL_WAIT) runs out.
+    Finished jobs are kept RECOMMENDATION_JOB_TTL seconds; any worker process serves the poll.
+    """
+    job = recommendation_jobs.get(job_id)
+    # Only the submitter (or an admin) sees a job
+    if job is None or (job.owner_id != g.user.user_id and g.user.user_type != 'ADMIN'):
+        return jsonify({"error": "Recommendation job not found or expired"}), 404
+
+    wait = request.args.get('wait', 0, type=float)
+    if wait > 0:
+        job = recommendation_jobs.wait(job_id, min(wait, MAX_JOB_POLL_WAIT))
+        if job is None:
+            return jsonify({"error": "Recommendation job not found or expired"}), 404
+
+    finished = job_finished(job)
+    response = describe_job(job)
+    response["success"] = finished and not response.get("errors")
+    return jsonify(response), 200 if finished else 202
+
+def candidate_ranking_response(job_id, scope):
+    """
+    Ranked candidates of a job posting of the requesting employer (or any posting, for
+    an admin), paged like the recommendations (?top_n=10&offset=0)
+    """
+    if g.user.user_type not in ['EMPLOYER', 'ADMIN']:
+        return jsonify({"error": "Unauthorized access"}), 403
+
+    job = EmployerJobPosting.query.get(job_id)
+    if not job:
+        return jsonify({"error": "Job posting not found"}), 404
+    if g.user.user_type == 'EMPLOYER' and job.user_id != g.user.user_id:
+        return jsonify({"error": "Unauthorized access"}), 403
+
+    top_n, offset = get_paging_params(default_top_n=10)
+    include_applicants = request.args.get('include_applicants', 'false').lower() == 'true'
+    return rank_candidates(job, scope, top_n=top_n, offset=offset, include_applicants=include_applicants)
+
+@recommendation.route('/recommend/candidates/<int:job_id>/applicants', methods=['GET'])
+@auth.login_required
+def rank_job_applicants(job_id):
+    """
+    Applicants of a job posting ranked by how well their profile matches it, best first,
+    each with the terms they share with the posting and their application
+    """
+    return candidate_ranking_response(job_id, SCOPE_APPLICANTS)
+
+@recommendation.route('/recommend/candidates/<int:job_id>/pool', methods=['GET'])
+@auth.login_required
+def find_job_candidates(job_id):
+    """
+    Jobseekers and students from the whole pool ranked for a job posting, best first.
+    The posting's applicants are left out unless ?include_applicants=true.
+    """
+    return candidate_ranking_response(job_id, SCOPE_POOL)
+
+@recommendation.route('/recommend/cache-stats', methods=['GET'])
+@auth.login_required
+def recommendation_cache_stats():
+    """
+    Hit-ratio metrics of the in-process recommendation caches, the scoring tiers and
+    latency budget overruns of the served recommendations, the asynchronous job
+    counters, the matching pool's queue counters and the candidate index (admin only).
+    Counters are per worker process.
+    """
+    # Check if the authenticated user has ADMIN privileges
+    if g.user.user_type != 'ADMIN':
+        return jsonify({"error": "Unauthorized access"}), 403
+
+    return jsonify({
+        "success": True,
+        "recommendation_cache": recommendation_cache.stats(),
+        "stem_cache": stem_cache_stats(),
+        "scoring_backend": scoring_backend(),
+        "latency": latency_metrics.stats(),
+        "jobs": recommendation_jobs.stats(),
+        "matching_service": matching_service.stats(),
+        "candidate_index": jobseeker_profile_index.stats()
+    }), 200
+
+
+
+@recommendation.route('/recommend/batch/job-posting', methods=['POST'])
+@auth.login_required
+def recommend_job_posting_batch():
+    """
+    Top jobs for many jobseekers/students in one request (admin only), e.g. for
+    nightly bulk matching. Streams one NDJSON line per user.
+    Expected JSON format (all fields optional):
+    {
+        "user_ids": [1, 2, 3],
+        "municipality": "Iloilo City",
+        "top_n": 5,
+        "limit": 1000
+    }
+    """
+    # Check if the authenticated user has ADMIN privileges
+    if g.user.user_type != 'ADMIN':
+        return jsonify({"error": "Unauthorized access"}), 403
+
+    data = request.get_json(silent=True) or {}
+    try:
+        top_n = min(max(int(data.get('top_n', 5)), 1), MAX_RECOMMENDATIONS_PER_PAGE)
+        limit = int(data['limit']) if data.get('limit') else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "top_n and limit must be integers"}), 400
+    try:
+        requested_ids = parse_user_ids(data.get('user_ids'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    user_ids = select_jobseeker_ids(requested_ids, data.get('municipality'), limit)
+
+    return Response(
+        stream_with_context(generate_batch_job_recommendations(user_ids, top_n=top_n)),
+        mimetype='application/x-ndjson'
+    )
@@ -0,0 +1,512 @@
+# recommendation_store.py - Materialized per-user recommendations and their background refresher
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import or_, event
+from sqlalchemy.orm import Session
+from app import db
+from app.models import PersonalInformation, JobPreference, LanguageProficiency, EducationalBackground, WorkExperience, OtherSkills, ProfessionalLicense, OtherTraining, UserRecommendation
+from app.utils import exclude_fields, convert_dates, get_employer_all_trainingpostings, get_employer_all_scholarshippostings, update_expired_job_postings, update_expired_training_postings, update_expired_scholarship_postings, get_posting_catalog_version, get_active_postings_by_id
+from .matching_service import matching_service, run_matcher, in_matching_worker
+from .recommendation_cache import RecommendationCache, profile_fingerprint
+from .near_duplicates import load_job_postings, collapse_near_duplicates
+from .latency_budget import TIER_FULL
+from .candidate_index import jobseeker_profile_index
+from app.config import Config
+
+# Posting types with stored recommendations
+RECOMMENDATION_KINDS = ('job', 'training', 'scholarship')
+
+# Number of ranked postings stored per user and kind (enough for the first pages)
+STORED_RECOMMENDATIONS = 50
+
+# Default staleness bound (seconds) when the app config doesn't set one
+DEFAULT_MAX_STALENESS = 6 * 60 * 60
+
+# Delay (seconds) before the refresher sweep retries an entry that failed to recompute,
+# doubled after every further failure up to the maximum
+REFRESH_RETRY_DELAY = 5 * 60
+MAX_REFRESH_RETRY_DELAY = 24 * 60 * 60
+
+# Session info key of the users whose profile changed in the current transaction
+STALE_PROFILES_KEY = "stale_profile_user_ids"
+
+# Process-wide cache of computed responses, in front of the matchers
+recommendation_cache = RecommendationCache(Config.RECOMMENDATION_CACHE_SIZE, Config.RECOMMENDATION_CACHE_TTL)
+
+# Worker threads running the matchers of different kinds concurrently (see get_recommendations_for_kinds)
+recommendation_executor = ThreadPoolExecutor(max_workers=Config.RECOMMENDATION_WORKERS, thread_name_prefix="recommendation")
+
+
+# Profile section name and model of every part of a jobseeker/student profile
+PROFILE_SECTIONS = [
+    ("personal_information", PersonalInformation),
+    ("job_preference", JobPreference),
+    ("language_proficiency", LanguageProficiency),
+    ("educational_background", EducationalBackground),
+    ("other_training", OtherTraining),
+    ("professional_license", ProfessionalLicense),
+    ("work_experience", WorkExperience),
+    ("other_skills", OtherSkills)
+]
+
+
+def build_user_profiles(user_ids):
+    """
+    Profiles of many jobseekers/students in the format the matchers expect,
+    keyed by user_id (one query per profile section for all the users)
+    """
+    profiles = {user_id: {section: [] for section, _ in PROFILE_SECTIONS} for user_id in user_ids}
+
+    for section, model in PROFILE_SECTIONS:
+        records = model.query.filter(model.user_id.in_(list(profiles))).all()
+        for record in records:
+            profiles[record.user_id][section].extend(exclude_fields([record]))
+
+    for profile in profiles.values():
+        # Transform disability format
+        for item in profile["personal_information"]:
+            disability_str = item.get("disability", "")
+            if disability_str:
+                disabilities = [d.strip() for d in disability_str.split(",")]
+                item["disability"] = {
+                    "visual": "visual" in disabilities,
+                    "hearing": "hearing" in disabilities,
+                    "speech": "speech" in disabilities,
+                    "physical": "physical" in disabilities,
+                }
+
+        for section, _ in PROFILE_SECTIONS:
+            profile[section] = convert_dates(profile[section])
+
+    return profiles
+
+
+def build_user_profile(user_id):
+    """Profile of a jobseeker/student in the format the matchers expect"""
+    return build_user_profiles([user_id])[user_id]
+
+
+def compute_recommendations(user_id, kind, top_n, offset=0, user_profile=None, budget=None):
+    """
+    Run the matcher of a kind for one user, unless the same page was already computed
+    for the same profile and catalog version (see recommendation_cache).
+    The profile is loaded unless an already assembled one is given.
+
+    Under a LatencyBudget the matcher may fall back to the cosine tier; the response's
+    "scoring_tier" tells which one produced it, and cosine-tier responses aren't cached.
+
+    Returns (catalog version the ranking was computed against, formatted response).
+    """
+    if user_profile is None:
+        user_profile = build_user_profile(user_id)
+
+    # Expire outdated postings first so the catalog version reflects them
+    if kind == 'job':
+        update_expired_job_postings()
+    elif kind == 'training':
+        update_expired_training_postings()
+    elif kind == 'scholarship':
+        update_expired_scholarship_postings()
+    else:
+        raise ValueError(f"Unknown recommendation kind: {kind}")
+    catalog_version = get_posting_catalog_version(kind)
+
+    cache_key = (kind, profile_fingerprint(user_profile), catalog_version, top_n, offset)
+    response = recommendation_cache.get(user_id, cache_key)
+    if response is not None:
+        return catalog_version, response
+
+    if kind == 'job':
+        # Postings are only loaded when the prefitted index is stale
+        postings = lambda: load_job_postings(catalog_version)
+    elif kind == 'training':
+        postings = get_employer_all_trainingpostings()
+        if isinstance(postings, tuple):
+            postings = postings[0]
+        # Near-duplicate reposts are scored once
+        postings = collapse_near_duplicates('training', postings, catalog_version)
+    else:
+        postings = get_employer_all_scholarshippostings()
+        if isinstance(postings, tuple):
+            postings = postings[0]
+        postings = collapse_near_duplicates('scholarship', postings, catalog_version)
+
+    # On the matching pool when one is running: requests under a bounded budget don't wait
+    # for a queue slot (MatchingServiceBusy), unbounded ones and background computations do
+    response = None
+    if matching_service.handles(kind):
+        response = matching_service.match(
+            kind, user_profile, postings, catalog_version, top_n, offset, budget=budget,
+            block=budget is None or budget.budget_ms is None
+        )
+    if response is None:
+        response = run_matcher(kind, user_profile, postings, catalog_version, top_n, offset, budget=budget)
+
+    response["scoring_tier"] = budget.tier(kind) if budget is not None else TIER_FULL
+    if response.get("success") and response["scoring_tier"] == TIER_FULL:
+        recommendation_cache.set(user_id, cache_key, response)
+    return catalog_version, response
+
+
+def ranked_postings_from_response(kind, response):
+    """
+    Ranking of a formatted response as stored: ids, scores and the explanation of
+    each recommendation (the postings themselves are loaded fresh when a page is served)
+    """
+    posting_key = f"{kind}_posting"
+    id_key = f"{kind}_id"
+    return [
+        {
+            "posting_id": rec[posting_key][id_key],
+            "match_score": rec["match_score"],
+            "details": {key: value for key, value in rec.items() if key not in ("match_score", posting_key)}
+        }
+        for rec in response.get("recommendations", [])
+    ]
+
+
+def store_recommendations(user_id, kind, catalog_version, ranked_postings, total_postings):
+    """Save a ranking as the user's stored recommendations of a kind"""
+    try:
+        entry = db.session.get(UserRecommendation, (user_id, kind))
+        if entry is None:
+            entry = UserRecommendation(user_id=user_id, kind=kind)
+            db.session.add(entry)
+        entry.catalog_version = catalog_version
+        entry.ranked_postings = json.dumps(ranked_postings)
+        entry.total_postings = total_postings
+        entry.stale = False
+        entry.computed_at = datetime.utcnow()
+        entry.refresh_failures = 0
+        entry.retry_after = None
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error storing {kind} recommendations for user {user_id}: {str(e)}")
+
+
+def record_refresh_failure(user_id, kind):
+    """
+    Count a failed background recompute of a stored entry and hold it back from the
+    refresher sweep for REFRESH_RETRY_DELAY, doubled per failure in a row
+    """
+    try:
+        entry = db.session.get(UserRecommendation, (user_id, kind))
+        if entry is None:
+            return
+        entry.refresh_failures = (entry.refresh_failures or 0) + 1
+        delay = min(REFRESH_RETRY_DELAY * 2 ** (entry.refresh_failures - 1), MAX_REFRESH_RETRY_DELAY)
+        entry.retry_after = datetime.utcnow() + timedelta(seconds=delay)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error recording the failed {kind} refresh of user {user_id}: {str(e)}")
+
+
+def recompute_recommendations(user_id, kind, user_profile=None, budget=None):
+    """
+    Compute and store the ranking of a kind for a user (cosine-tier rankings, computed
+    when the budget ran short, are returned but not stored).
+
+    Returns (ranking, total postings, formatted response), or (None, 0, response) on failure.
+    """
+    catalog_version, response = compute_recommendations(
+        user_id, kind, STORED_RECOMMENDATIONS, user_profile=user_profile, budget=budget
+    )
+    if not response.get("success"):
+        return None, 0, response
+
+    ranked_postings = ranked_postings_from_response(kind, response)
+    total_postings = response.get("pagination", {}).get("total", len(ranked_postings))
+    if response["scoring_tier"] == TIER_FULL:
+        store_recommendations(user_id, kind, catalog_version, ranked_postings, total_postings)
+    return ranked_postings, total_postings, response
+
+
+def recommendations_page(kind, ranked_postings, postings_by_id, top_n, offset, total, scoring_tier=TIER_FULL):
+    """Formatted response for one page of a stored ranking"""
+    posting_key = f"{kind}_posting"
+    recommendations = []
+    for ranked in ranked_postings[offset:offset + top_n]:
+        # Postings removed or closed since the ranking was computed are skipped
+        posting = postings_by_id.get(ranked["posting_id"])
+        if posting is None:
+            continue
+        recommendation = {"match_score": ranked["match_score"], posting_key: posting}
+        recommendation.update(ranked["details"])
+        recommendations.append(recommendation)
+
+    return {
+        "success": True,
+        "recommendations": recommendations,
+        "pagination": {"offset": offset, "top_n": top_n, "total": total},
+        "scoring_tier": scoring_tier
+    }
+
+
+def get_user_recommendations(user_id, kind, top_n=5, offset=0, budget=None):
+    """
+    Recommendations of a kind for a user, served from the store.
+
+    Falls back to computing them on demand only when the stored entry is missing,
+    older than RECOMMENDATION_MAX_STALENESS or doesn't reach the requested page.
+    Entries that are outdated but within the bound are served and refreshed in the background,
+    or, when no refresher thread runs, recomputed on demand too.
+    The request is counted in the latency metrics of its budget, when given.
+    """
+    response = stored_recommendations(user_id, kind, top_n, offset)
+    if response is None:
+        response = computed_recommendations(user_id, kind, top_n, offset, budget=budget)
+    if budget is not None:
+        budget.record(kind, response.get("scoring_tier", TIER_FULL))
+    return response
+
+
+def stored_recommendations(user_id, kind, top_n=5, offset=0):
+    """
+    Page of the stored ranking of a kind, or None when it has to be computed. Outdated
+    entries within RECOMMENDATION_MAX_STALENESS are only served while the refresher runs.
+    """
+    max_staleness = current_app.config.get("RECOMMENDATION_MAX_STALENESS", DEFAULT_MAX_STALENESS)
+    entry = db.session.get(UserRecommendation, (user_id, kind))
+
+    if entry is not None and datetime.utcnow() - entry.computed_at <= timedelta(seconds=max_staleness):
+        ranked_postings = json.loads(entry.ranked_postings)
+
+        # A full stored ranking may not reach deep pages
+        if offset + top_n <= len(ranked_postings) or len(ranked_postings) < STORED_RECOMMENDATIONS:
+            if entry.stale or entry.catalog_version != get_posting_catalog_version(kind):
+                # Without a refresher thread nothing would ever recompute it: compute it now
+                if not recommendation_refresher.running:
+                    return None
+                recommendation_refresher.enqueue(user_id)
+
+            page_ids = [ranked["posting_id"] for ranked in ranked_postings[offset:offset + top_n]]
+            postings_by_id = get_active_postings_by_id(kind, page_ids)
+            return recommendations_page(kind, ranked_postings, postings_by_id, top_n, offset, entry.total_postings)
+    return None
+
+
+def computed_recommendations(user_id, kind, top_n=5, offset=0, user_profile=None, budget=None):
+    """Page of recommendations of a kind computed now (and stored when within the stored depth)"""
+    # Pages past the stored ranking are computed directly and not stored
+    if offset + top_n > STORED_RECOMMENDATIONS:
+        return compute_recommendations(user_id, kind, top_n, offset, user_profile=user_profile, budget=budget)[1]
+
+    # Compute the stored depth once and serve the requested page from it
+    ranked_postings, total_postings, response = recompute_recommendations(
+        user_id, kind, user_profile=user_profile, budget=budget
+    )
+    if ranked_postings is None:
+        return response
+
+    posting_key = f"{kind}_posting"
+    id_key = f"{kind}_id"
+    postings_by_id = {rec[posting_key][id_key]: rec[posting_key] for rec in response["recommendations"]}
+    return recommendations_page(
+        kind, ranked_postings, postings_by_id, top_n, offset, total_postings, response["scoring_tier"]
+    )
+
+
+def get_recommendations_for_kinds(user_id, kinds=RECOMMENDATION_KINDS, top_n=5, offset=0, budget=None):
+    """
+    Recommendations of several kinds for a user in one call.
+
+    Kinds with a usable stored ranking are served from the store; the profile is
+    assembled once for all the others, whose matchers then run concurrently on
+    recommendation_executor, all under the same budget when given.
+
+    Returns ({kind: response}, {kind: {"source": "store" or "computed", "ms": elapsed}}).
+    """
+    responses = {}
+    timings = {}
+    missing = []
+    for kind in kinds:
+        start = time.perf_counter()
+        response = stored_recommendations(user_id, kind, top_n, offset)
+        if response is None:
+            missing.append(kind)
+            continue
+        responses[kind] = response
+        timings[kind] = {"source": "store", "ms": round((time.perf_counter() - start) * 1000, 1)}
+
+    if missing:
+        user_profile = build_user_profile(user_id)
+        app = current_app._get_current_object()
+
+        def compute(kind):
+            # Each worker gets its own app context (and database session)
+            start = time.perf_counter()
+            with app.app_context():
+                try:
+                    response = computed_recommendations(user_id, kind, top_n, offset, user_profile=user_profile, budget=budget)
+                except Exception as e:
+                    print(f"Error computing {kind} recommendations for user {user_id}: {str(e)}")
+                    response = {"success": False, "error": str(e), "recommendations": []}
+            return response, round((time.perf_counter() - start) * 1000, 1)
+
+        futures = {kind: recommendation_executor.submit(compute, kind) for kind in missing}
+        for kind, future in futures.items():
+            responses[kind], elapsed = future.result()
+            timings[kind] = {"source": "computed", "ms": elapsed}
+
+    if budget is not None:
+        for kind in kinds:
+            budget.record(kind, responses[kind].get("scoring_tier", TIER_FULL))
+    return {kind: responses[kind] for kind in kinds}, {kind: timings[kind] for kind in kinds}
+
+
+def mark_recommendations_stale(user_id):
+    """
+    Flag the stored recommendations of a user as outdated after a profile change,
+    drop the user's cached responses and have the candidate index re-vectorize the profile
+    once the change is committed (see mark_committed_profiles_stale).
+    Call it before committing the profile write so both land in the same transaction.
+    """
+    recommendation_cache.invalidate_user(user_id)
+    db.session.info.setdefault(STALE_PROFILES_KEY, set()).add(user_id)
+    (UserRecommendation.query
+     .filter_by(user_id=user_id)
+     .update({UserRecommendation.stale: True}, synchronize_session=False))
+
+
+@event.listens_for(Session, "after_commit")
+def mark_committed_profiles_stale(session):
+    """
+    Flag the profiles changed in a committed transaction in the candidate index. Flagged
+    earlier, a concurrent ranking could reload the uncommitted (old) profile and clear the flag.
+    """
+    for user_id in session.info.pop(STALE_PROFILES_KEY, ()):
+        jobseeker_profile_index.mark_stale(user_id)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def discard_uncommitted_stale_profiles(session, transaction):
+    # Profile changes of a rolled back transaction (savepoints aside) never happened
+    if transaction.parent is None:
+        session.info.pop(STALE_PROFILES_KEY, None)
+
+
+def refresh_user_recommendations(user_id):
+    """Recompute every stored recommendation kind of a user"""
+    kinds = [entry.kind for entry in UserRecommendation.query.filter_by(user_id=user_id).all()]
+    for kind in kinds:
+        recompute_recommendations(user_id, kind)
+
+
+def refresh_outdated_recommendations(limit=100):
+    """
+    Recompute stored recommendations whose profile changed or whose catalog version
+    is behind the current one (at most limit entries per kind per call, least recently
+    computed first). Entries that fail to recompute are skipped until their retry_after
+    (see record_refresh_failure), so they can't crowd out the other outdated ones.
+    """
+    # Expiring postings bumps the catalog versions, so expired postings count as changes
+    update_expired_job_postings()
+    update_expired_training_postings()
+    update_expired_scholarship_postings()
+
+    refreshed = 0
+    for kind in RECOMMENDATION_KINDS:
+        catalog_version = get_posting_catalog_version(kind)
+        outdated = (UserRecommendation.query
+                    .filter(UserRecommendation.kind == kind,
+                            or_(UserRecommendation.stale.is_(True),
+                                UserRecommendation.catalog_version != catalog_version),
+                            or_(UserRecommendation.retry_after.is_(None),
+                                UserRecommendation.retry_after <= datetime.utcnow()))
+                    .order_by(UserRecommendation.computed_at)
+                    .limit(limit)
+                    .all())
+        user_ids = [entry.user_id for entry in outdated]
+
+        for user_id in user_ids:
+            try:
+                ranked_postings = recompute_recommendations(user_id, kind)[0]
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error refreshing the {kind} recommendations of user {user_id}: {str(e)}")
+                ranked_postings = None
+            if ranked_postings is not None:
+                refreshed += 1
+            else:
+                record_refresh_failure(user_id, kind)
+    return refreshed
+
+
+class RecommendationRefresher:
+    """
+    Background thread keeping the stored recommendations up to date.
+
+    Users queued after a profile change are refreshed right away; every interval
+    seconds it also sweeps the entries left outdated by catalog or profile changes
+    (including changes made by other processes).
+    """
+    def __init__(self):
+        self.app = None
+        self.interval = 60
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, app, interval=60):
+        """Start the refresher thread for an app (once per process)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.app = app
+            self.interval = interval
+            self._thread = threading.Thread(target=self.run, name="recommendation-refresher", daemon=True)
+            self._thread.start()
+
+    @property
+    def running(self):
+        """Whether the refresher thread was started in this process"""
+        return self._thread is not None
+
+    def enqueue(self, user_id):
+        """Ask for the stored recommendations of a user to be recomputed"""
+        if self._thread is None:
+            return
+        with self._lock:
+            if user_id in self._pending:
+                return
+            self._pending.add(user_id)
+        self._queue.put(user_id)
+
+    def run(self):
+        while True:
+            try:
+                user_id = self._queue.get(timeout=self.interval)
+            except queue.Empty:
+                user_id = None
+
+            if user_id is not None:
+                with self._lock:
+                    self._pending.discard(user_id)
+
+            with self.app.app_context():
+                try:
+                    if user_id is not None:
+                        refresh_user_recommendations(user_id)
+                    else:
+                        refresh_outdated_recommendations()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Error refreshing stored recommendations: {str(e)}")
+
+
+# Process-wide refresher, started by create_app
+recommendation_refresher = RecommendationRefresher()
+
+
+def start_recommendation_refresher(app):
+    """Start the background refresher unless RECOMMENDATION_REFRESHER_ENABLED is off (never in matching workers)"""
+    if app.config.get("RECOMMENDATION_REFRESHER_ENABLED", True) and not in_matching_worker():
+        recommendation_refresher.start(app, app.config.get("RECOMMENDATION_REFRESH_INTERVAL", 60))
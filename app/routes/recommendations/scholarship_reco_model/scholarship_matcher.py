@@ -1,7 +1,6 @@
 # scholarship_matcher.py - Specialized for scholarship recommendation
 import json
-import nltk
-from nltk.stem import SnowballStemmer
+import time
 from nltk.corpus import stopwords
 import re
 from sklearn.feature_extraction.text import TfidfVectorizer
@@ -12,18 +11,20 @@ from datetime import datetime
 import string
 from nltk.tokenize import word_tokenize
 from nltk.util import ngrams
-
-nltk.data.path.insert(0, './nltk_data')
+from ..scoring import score_components, profile_term_boosts, gap_scores, gap_term_weights, top_k_rows, cosine_similarities
+from ..cluster_matcher import ClusterMatcher
+from ..text_normalizer import normalize_text
+from ..section_vectors import join_sections, fit_section_vectorizer, weighted_section_matrix
+from ..posting_text_cache import PostingTextCache, keys_for_titles, posting_version_keys
+from ..matcher_registry import get_shared_matcher
+from ..latency_budget import TIER_FULL, scoring_tier, observe_stage
+from .. import nltk_resources  # Points NLTK at the vendored nltk_data directory
 
 class ScholarshipMatcher:
     def __init__(self, debug=True):
         """Initialize the scholarship matcher with specialized text processing tools"""
-        nltk.download('stopwords', quiet=True)
-        nltk.download('punkt', quiet=True)
-        nltk.download('wordnet', quiet=True)
-        
+        # NLTK data comes from the vendored nltk_data directory (see nltk_resources)
         self.debug = debug
-        self.stemmer = SnowballStemmer("english")
         
         # Define domain-specific stopwords for scholarships
         self.domain_stopwords = [
@@ -33,6 +34,15 @@ class ScholarshipMatcher:
             'college', 'academic', 'degree', 'funding', 'award', 'grant', 'financial'
         ]
         
+        # Set version of the domain stopwords for the per-word filter in preprocess_text
+        self.domain_stopword_set = set(self.domain_stopwords)
+        
+        # Stopwords for key-term extraction, built once instead of on every call
+        self.key_term_stopwords = set(stopwords.words('english')).union(self.domain_stopwords)
+        
+        # Preprocessing results per posting version (see posting_text_cache)
+        self.posting_text_cache = PostingTextCache(self.process_scholarship_posting, self.extract_key_terms)
+        
         # Custom TF-IDF vectorizer with enhanced parameters
         self.vectorizer = TfidfVectorizer(
             ngram_range=(1, 3),  # Capture contextual phrases
@@ -63,6 +73,9 @@ class ScholarshipMatcher:
                                'economics', 'geography', 'urban planning']
         }
         
+        # Field terms compiled once into a single automaton
+        self.field_cluster_matcher = ClusterMatcher(self.field_clusters, weight=1.3)
+        
         # Initialize scholarship-specific weighting parameters
         self.time_to_expiry_importance = 0.08  # Higher weight for expiring soon scholarships
         self.max_deadline_boost = 1.6          # Maximum boost for urgent deadlines
@@ -76,8 +89,14 @@ class ScholarshipMatcher:
             'sponsor': 1.0
         }
         
-        # Qualification rarity index (will be populated during processing)
-        self.qualification_rarity_index = {}
+        # Profile section weights specific to scholarship matching
+        self.profile_section_weights = {
+            'education': 3.5,
+            'skills': 3.0,
+            'work_experience': 2.5,
+            'training': 3.0,
+            'certifications': 2.5
+        }
         
     def extract_key_terms(self, text):
         """Extract potential skill and qualification terms from text"""
@@ -85,7 +104,7 @@ class ScholarshipMatcher:
         tokens = word_tokenize(text.lower())
         
         # Remove punctuation and stopwords
-        stop_words = set(stopwords.words('english')).union(self.domain_stopwords)
+        stop_words = self.key_term_stopwords
         filtered_tokens = [w for w in tokens if w not in stop_words and w not in string.punctuation]
         
         # Extract n-grams as potential skills/qualifications
@@ -98,8 +117,12 @@ class ScholarshipMatcher:
         
         return all_terms
         
-    def build_qualification_rarity_index(self, scholarship_descriptions):
+    def build_qualification_rarity_index(self, scholarship_descriptions, posting_keys=None):
         """Build an index of qualification term rarity across scholarship postings"""
+        # Cached per posting version, with counts updated only for postings that changed
+        if posting_keys is not None:
+            return self.posting_text_cache.rarity_index(posting_keys, scholarship_descriptions)
+        
         # Extract all potential terms from all scholarship descriptions
         all_terms = []
         for desc in scholarship_descriptions:
@@ -111,16 +134,21 @@ class ScholarshipMatcher:
         
         # Calculate inverse frequency (rarity) for each term
         total_scholarships = len(scholarship_descriptions)
+        qualification_rarity_index = {}
         for term, count in term_counts.items():
             # More rare terms get higher weights
-            self.qualification_rarity_index[term] = np.log(total_scholarships / (count + 1)) + 1
+            qualification_rarity_index[term] = np.log(total_scholarships / (count + 1)) + 1
+        
+        return qualification_rarity_index
     
     def get_field_cluster_weight(self, term):
         """Get the field cluster weight for a term"""
-        for cluster, terms in self.field_clusters.items():
-            if any(field_term in term for field_term in terms):
-                return 1.3  # Boost terms that are part of a field cluster
-        return 1.0
+        # Boost terms that are part of a field cluster
+        return self.field_cluster_matcher.term_weight(term)
+    
+    def get_field_cluster(self, term):
+        """Name of the field cluster a term belongs to, or None"""
+        return self.field_cluster_matcher.cluster(term)
     
     # In the calculate_deadline_weight method, add string cleaning to remove whitespace
     def calculate_deadline_weight(self, scholarship_data):
@@ -171,6 +199,7 @@ class ScholarshipMatcher:
         
         try:
             education = profile_data.get('educational_background', [])
+            term_clusters = self.field_cluster_matcher.match_mask(term)
             
             for edu in education:
                 field = edu.get('field_of_study', '').lower()
@@ -181,10 +210,8 @@ class ScholarshipMatcher:
                     break
                 
                 # Check if term is related to the field via our clusters
-                for cluster, field_terms in self.field_clusters.items():
-                    if any(field_term in field for field_term in field_terms) and any(field_term in term for field_term in field_terms):
-                        field_weight = 1.3  # Smaller boost for related fields
-                        break
+                if term_clusters & self.field_cluster_matcher.match_mask(field):
+                    field_weight = 1.3  # Smaller boost for related fields
         
         except Exception as e:
             if self.debug:
@@ -201,27 +228,12 @@ class ScholarshipMatcher:
 
     def preprocess_text(self, text):
         """Enhanced text preprocessing for scholarship matching"""
-        # Convert to lowercase string
-        text = str(text).lower()
-        
-        # Remove special characters but keep spaces
-        text = re.sub(r'[^a-zA-Z\s]', ' ', text)
-        
-        # Remove domain-specific stopwords
-        words = text.split()
-        filtered_words = [word for word in words if word not in self.domain_stopwords]
-        text = ' '.join(filtered_words)
-        
-        # Remove extra whitespace
-        text = ' '.join(text.split())
-        
-        # Apply stemming
-        stemmed_words = [self.stemmer.stem(word) for word in text.split()]
-        
-        return ' '.join(stemmed_words)
+        # Lowercase, keep letters only, remove domain-specific stopwords, collapse
+        # whitespace and stem (memoized, shared by all matchers) in a single pass
+        return normalize_text(text, self.domain_stopword_set)
     
-    def extract_profile_features(self, profile_data):
-        """Extract weighted features from profile with scholarship-specific weighting"""
+    def extract_profile_sections(self, profile_data):
+        """Extract preprocessed feature sections from profile for scholarship-specific weighting"""
         try:
             # Create structured feature sections for scholarship-focused weighting
             feature_sections = {}
@@ -279,194 +291,163 @@ class ScholarshipMatcher:
                 for section, text in feature_sections.items()
             }
             
-            # Apply section weights specific to scholarship matching
-            weighted_sections = {
-                'education': processed_sections['education'] * int(3.5),
-                'skills': processed_sections['skills'] * int(3.0),
-                'work_experience': processed_sections['work_experience'] * int(2.5),
-                'training': processed_sections['training'] * int(3.0),
-                'certifications': processed_sections.get('certifications', '') * int(2.5)
-            }
-            
-            # Combine all weighted sections
-            combined_text = " ".join(weighted_sections.values())
-            
-            return combined_text
+            return processed_sections
             
         except Exception as e:
             print(f"Error extracting profile features: {str(e)}")
             raise
     
-    def process_scholarship_postings(self, scholarship_posts):
-        """Process scholarship posts with section-based weighting"""
+    def extract_profile_features(self, profile_data):
+        """Unweighted profile document (the section weights are applied in vector space)"""
+        return join_sections(self.extract_profile_sections(profile_data))
+    
+    def process_scholarship_posting(self, title, description):
+        """Split one scholarship post into preprocessed sections for section-based weighting"""
+        # Split description into sections
+        sections = {}
+        
+        # Extract scholarship title section
+        sections['scholarship_title'] = title
+        
+        # Try to extract other sections
+        section_pattern = r'\[SECTION:([A-Z_]+)\](.*?)(?=\[SECTION:|$)'
+        matches = re.findall(section_pattern, description, re.DOTALL)
+        
+        for section_name, content in matches:
+            sections[section_name.lower()] = content.strip()
+        
+        # If no sections found, use the whole description
+        if not matches:
+            sections['description'] = description
+        
+        # Process each section
+        processed_sections = {
+            section: self.preprocess_text(text)
+            for section, text in sections.items()
+        }
+        
+        # Section weights are applied to the section vectors (see section_vectors)
+        return processed_sections
+    
+    def process_scholarship_postings(self, scholarship_posts, posting_keys=None):
+        """Preprocessed sections of every scholarship post, for section-based weighting"""
         processed_scholarships = {}
         
         for title, description in scholarship_posts.items():
-            # Split description into sections
-            sections = {}
-            
-            # Extract scholarship title section
-            sections['scholarship_title'] = title
-            
-            # Try to extract other sections
-            section_pattern = r'\[SECTION:([A-Z_]+)\](.*?)(?=\[SECTION:|$)'
-            matches = re.findall(section_pattern, description, re.DOTALL)
-            
-            for section_name, content in matches:
-                sections[section_name.lower()] = content.strip()
-            
-            # If no sections found, use the whole description
-            if not matches:
-                sections['description'] = description
-            
-            # Process each section
-            processed_sections = {
-                section: self.preprocess_text(text)
-                for section, text in sections.items()
-            }
-            
-            # Apply section weights
-            weighted_text = ""
-            for section, text in processed_sections.items():
-                weight = self.section_weights.get(section, 1.0)
-                # Convert float to int before multiplying with text
-                weighted_text += f" {text * int(weight)}"
-            
-            processed_scholarships[title] = weighted_text.strip()
+            # Reuse the cached result of unchanged postings
+            key = posting_keys.get(title) if posting_keys else None
+            if key is not None:
+                processed_scholarships[title] = self.posting_text_cache.processed_sections(key, title, description)
+            else:
+                processed_scholarships[title] = self.process_scholarship_posting(title, description)
         
         return processed_scholarships
     
-    def generate_eligibility_gap_vector(self, profile_features, scholarship_features, feature_names):
-        """Generate an eligibility gap vector to penalize missing critical requirements"""
-        # Extract profile terms
-        profile_terms = set(profile_features.split())
-        
-        # Initialize eligibility gap vector
-        eligibility_gap_vector = np.zeros(len(feature_names))
-        
-        # Count missing requirements for each scholarship
-        for scholarship_idx, scholarship_text in enumerate(scholarship_features):
-            scholarship_terms = set(scholarship_text.split())
-            
-            # Find potential requirement terms in scholarship that are not in profile
-            missing_requirements = scholarship_terms - profile_terms
-            
-            # Calculate penalty for missing requirements
-            for term_idx, term in enumerate(feature_names):
-                if term in missing_requirements:
-                    # Higher penalty for rarer requirements
-                    rarity_factor = self.qualification_rarity_index.get(term, 1.0)
-                    eligibility_gap_vector[term_idx] += rarity_factor * 0.1
+    def generate_eligibility_gap_vector(self, profile_vector, scholarship_matrix, feature_names, qualification_rarity_index):
+        """Generate a per-scholarship eligibility gap score to penalize missing critical requirements"""
+        # Higher penalty for rarer requirements
+        gap_weights = gap_term_weights(feature_names, qualification_rarity_index) * 0.1
         
-        return eligibility_gap_vector
+        # Sum over the requirement terms each scholarship has and the profile lacks, in one sparse product
+        return gap_scores(profile_vector, scholarship_matrix, gap_weights)
     
-    def get_recommendations(self, profile_data, scholarship_posts, top_n=5):
-        """Get scholarship recommendations with tailored enhancement factors"""
+    def get_recommendations(self, profile_data, scholarship_posts, top_n=5, posting_keys=None, offset=0, budget=None):
+        """
+        Get scholarship recommendations with tailored enhancement factors; under a latency
+        budget without time left for them, by cosine similarity alone
+        """
         try:
             # Process profile with scholarship-focused feature extraction
-            profile_features = self.extract_profile_features(profile_data)
-            
-            # Process scholarship posts with section-based weighting
-            processed_scholarships = self.process_scholarship_postings(scholarship_posts)
+            profile_sections = self.extract_profile_sections(profile_data)
             
-            # Build qualification rarity index
-            self.build_qualification_rarity_index(list(processed_scholarships.values()))
+            # Process scholarship posts into sections (cached per posting version when keys are given)
+            processed_scholarships = self.process_scholarship_postings(scholarship_posts, posting_keys)
+            scholarship_section_texts = list(processed_scholarships.values())
+            scholarship_documents = [join_sections(sections) for sections in scholarship_section_texts]
             
-            # Combine all texts for vectorization
-            all_texts = list(processed_scholarships.values()) + [profile_features]
-            
-            # Create TF-IDF matrix
-            tfidf_matrix = self.vectorizer.fit_transform(all_texts)
+            # Fit a private copy of the vectorizer (the matcher is shared across requests)
+            # on the unweighted scholarship and profile documents
+            vectorizer = fit_section_vectorizer(self.vectorizer, scholarship_documents + [join_sections(profile_sections)])
             
             # Get feature names for semantic analysis
-            feature_names = self.vectorizer.get_feature_names_out()
-            
-            # Generate eligibility gap vector
-            eligibility_gap_vector = self.generate_eligibility_gap_vector(
-                profile_features, 
-                list(processed_scholarships.values()),
-                feature_names
-            )
-            
-            # Apply field clustering and deadline weighting
-            profile_vector = tfidf_matrix[-1:].toarray()[0]
-            scholarship_vectors = tfidf_matrix[:-1].toarray()
-            
-            # Initialize match scores array
-            match_scores = np.zeros(len(scholarship_vectors))
+            feature_names = vectorizer.get_feature_names_out()
             
-            # Get original sections for deadline weighting
-            scholarship_sections = {}
-            for title, description in scholarship_posts.items():
-                scholarship_sections[title] = re.findall(r'\[SECTION:([A-Z_]+)\](.*?)(?=\[SECTION:|$)', description, re.DOTALL)
+            # Weighted sum of the section vectors of every scholarship and of the profile
+            scholarship_matrix = weighted_section_matrix(vectorizer, scholarship_section_texts, self.section_weights)
+            profile_vector = weighted_section_matrix(
+                vectorizer, [profile_sections], self.profile_section_weights
+            ).toarray()[0]
             
             # Calculate enhanced similarity with scholarship-specific factors
             scholarship_titles = list(processed_scholarships.keys())
-            for i, scholarship_vector in enumerate(scholarship_vectors):
-                # Current scholarship title
-                scholarship_title = scholarship_titles[i]
-                
-                # Basic cosine similarity
-                dot_product = np.dot(profile_vector, scholarship_vector)
-                profile_norm = np.linalg.norm(profile_vector)
-                scholarship_norm = np.linalg.norm(scholarship_vector)
+            
+            if scoring_tier(budget, 'scholarship') != TIER_FULL:
+                # Cosine tier: no field, deadline or eligibility factors
+                match_scores = cosine_similarities(profile_vector, scholarship_matrix) * 100
+            else:
+                stage_start = time.perf_counter()
                 
-                if profile_norm > 0 and scholarship_norm > 0:
-                    base_similarity = dot_product / (profile_norm * scholarship_norm)
-                else:
-                    base_similarity = 0
+                # Build qualification rarity index
+                qualification_rarity_index = self.build_qualification_rarity_index(
+                    scholarship_documents,
+                    keys_for_titles(posting_keys, processed_scholarships)
+                )
                 
-                # Apply eligibility gap penalty - MODERATE IMPACT
-                eligibility_gap_penalty = np.sum(eligibility_gap_vector) * 0.05
+                # Get original sections for deadline weighting
+                scholarship_sections = {}
+                for title, description in scholarship_posts.items():
+                    scholarship_sections[title] = re.findall(r'\[SECTION:([A-Z_]+)\](.*?)(?=\[SECTION:|$)', description, re.DOTALL)
                 
-                # Apply field matching boost
-                field_match_boost = 1.0
-                boost_count = 0
+                # Per-term field cluster and academic field boosts, only needed for the profile's own terms
+                term_boosts = profile_term_boosts(
+                    profile_vector,
+                    feature_names,
+                    lambda term: (self.get_field_cluster_weight(term) - 1.0)
+                                 + (self.calculate_academic_field_match(profile_data, term) - 1.0)
+                )
                 
-                for term_idx, term in enumerate(feature_names):
-                    if scholarship_vector[term_idx] > 0 and profile_vector[term_idx] > 0:
-                        # Apply field cluster weight
-                        cluster_boost = self.get_field_cluster_weight(term) - 1.0
-                        
-                        # Apply academic field match weight
-                        field_match = self.calculate_academic_field_match(profile_data, term) - 1.0
-                        
-                        # Add boosts to the total
-                        field_match_boost += cluster_boost + field_match
-                        boost_count += 1
+                # Basic cosine similarity, the boosts averaged over the terms each scholarship shares with
+                # the profile (capped at 1.6) and the per-scholarship eligibility gap scores (higher
+                # penalty for rarer requirements), from one pass over the scholarships
+                base_similarity, field_match_boost, eligibility_gap_vector = score_components(
+                    profile_vector,
+                    scholarship_matrix,
+                    term_boosts,
+                    gap_term_weights(feature_names, qualification_rarity_index) * 0.1,
+                    max_boost=1.6
+                )
                 
-                # Normalize field match boost by the number of matching terms
-                if boost_count > 0:
-                    field_match_boost = 1.0 + (field_match_boost - 1.0) / boost_count
-                    field_match_boost = min(1.6, field_match_boost)  # Cap the boost
+                # Apply eligibility gap penalty - MODERATE IMPACT (each scholarship for its own gap)
+                eligibility_gap_penalty = eligibility_gap_vector * 0.05
                 
                 # Apply deadline urgency boost
-                # Extract expiration date from scholarship sections
-                expiration_data = None
-                for section_name, content in scholarship_sections.get(scholarship_title, []):
-                    if section_name == "EXPIRATION_DATE":
-                        expiration_data = content
-                        break
-                
-                deadline_boost = self.calculate_deadline_weight({"expiration_date": expiration_data}) if expiration_data else 1.0
+                deadline_boost = np.ones(len(scholarship_titles))
+                for i, scholarship_title in enumerate(scholarship_titles):
+                    # Extract expiration date from scholarship sections
+                    expiration_data = None
+                    for section_name, content in scholarship_sections.get(scholarship_title, []):
+                        if section_name == "EXPIRATION_DATE":
+                            expiration_data = content
+                            break
+                    
+                    if expiration_data:
+                        deadline_boost[i] = self.calculate_deadline_weight({"expiration_date": expiration_data})
                 
                 # Calculate final match score
                 base_score = base_similarity * 100  # Scale to percentage-like values
                 boosted_score = base_score * field_match_boost * deadline_boost  # Apply boosts
-                final_score = boosted_score - (eligibility_gap_penalty * base_score / 10)  # Apply penalty
-                
-                match_scores[i] = final_score
+                match_scores = boosted_score - (eligibility_gap_penalty * base_score / 10)  # Apply penalty
+                observe_stage(budget, 'scholarship', stage_start)
             
-            # Create scholarship-score pairs
+            # Select the requested page of top recommendations without sorting every scholarship
             scholarship_titles = list(processed_scholarships.keys())
-            scholarship_scores = list(zip(scholarship_titles, match_scores))
-            
-            # Sort by score and get top recommendations
-            recommendations = sorted(scholarship_scores, key=lambda x: x[1], reverse=True)[:top_n]
+            top_rows = top_k_rows(match_scores, top_n, offset)
             
             # Format recommendations with detailed scores
             detailed_recommendations = []
-            for scholarship_title, score in recommendations:
+            for row in top_rows:
+                scholarship_title = scholarship_titles[row]
+                score = match_scores[row]
                 # Ensure scores are positive and capped at 100
                 match_percentage = min(100, max(0, score))
                 recommendation = {
@@ -661,19 +642,28 @@ class ScholarshipMatcher:
         with open(filename, 'r') as f:
             return json.load(f)
 
-    def format_recommendations_for_frontend(recommendations, original_scholarship_postings_json):
-        # Create a lookup dictionary for the original scholarship postings using scholarship_id
-        scholarship_lookup = {}
-        for scholarship in original_scholarship_postings_json.get('scholarship_postings', []):
-            scholarship_id = scholarship.get('scholarship_id')
-            if scholarship_id is not None:
-                scholarship_lookup[scholarship_id] = scholarship
+    # Index the original scholarship postings by id
+    def index_postings_by_id(scholarship_postings_json):
+        """Original scholarship postings keyed by scholarship_id"""
+        return {
+            scholarship.get('scholarship_id'): scholarship
+            for scholarship in scholarship_postings_json.get('scholarship_postings', [])
+            if scholarship.get('scholarship_id') is not None
+        }
+
+    def format_recommendations_for_frontend(recommendations, original_scholarship_postings_json, postings_by_id=None, pagination=None):
+        # Lookup dictionary for the original scholarship postings using scholarship_id (built here unless given)
+        scholarship_lookup = postings_by_id
+        if scholarship_lookup is None:
+            scholarship_lookup = ScholarshipMatcher.index_postings_by_id(original_scholarship_postings_json)
         
         # Format the response
         formatted_response = {
             "success": True,
             "recommendations": []
         }
+        if pagination is not None:
+            formatted_response["pagination"] = pagination
         
         for rec in recommendations:
             # Extract the scholarship_id from the recommendation
@@ -731,17 +721,23 @@ class ScholarshipMatcher:
             }
 
     # Main function to run the scholarship matching process
-    def run_scholarship_matching(profile_data, scholarship_postings_data, top_n=5, return_json=False):
+    def run_scholarship_matching(profile_data, scholarship_postings_data, top_n=5, return_json=False, offset=0, budget=None):
         # Load data
         
         # Transform scholarship postings to the required format, passing scholarship_id
         transformed_scholarships, scholarship_id_map = ScholarshipMatcher.transform_scholarship_postings(scholarship_postings_data, return_id_map=True)
         
-        # Initialize the scholarship matcher
-        matcher = ScholarshipMatcher(debug=True)
+        # Preprocessing of unchanged postings is reused across requests, keyed by (scholarship_id, updated_at)
+        posting_keys = posting_version_keys(scholarship_id_map, scholarship_postings_data.get('scholarship_postings', []), 'scholarship_id')
+        
+        # Use the shared, already initialized scholarship matcher
+        matcher = get_shared_matcher(ScholarshipMatcher)
         
         # Get recommendations
-        recommendations = matcher.get_recommendations(profile_data, transformed_scholarships, top_n)
+        recommendations = matcher.get_recommendations(profile_data, transformed_scholarships, top_n, posting_keys=posting_keys, offset=offset, budget=budget)
+        
+        # Original postings by scholarship_id, shared by the deadline check and the response
+        scholarships_by_id = ScholarshipMatcher.index_postings_by_id(scholarship_postings_data)
         
         # Add scholarship_id to each recommendation using the scholarship_id_map
         for rec in recommendations:
@@ -749,20 +745,26 @@ class ScholarshipMatcher:
             rec['scholarship_id'] = scholarship_id_map.get(scholarship_title)
             
             # Check if deadline is approaching (within 30 days)
-            for scholarship in scholarship_postings_data.get('scholarship_postings', []):
-                if scholarship.get('scholarship_id') == rec['scholarship_id']:
-                    try:
-                        from datetime import datetime
-                        expiry_date = scholarship.get('expiration_date')
-                        if expiry_date:
-                            date_obj = datetime.strptime(expiry_date, '%Y-%m-%d')
-                            days_until_expiry = (date_obj - datetime.now()).days
-                            rec['deadline_approaching'] = days_until_expiry <= 30
-                    except Exception:
-                        rec['deadline_approaching'] = False
+            scholarship = scholarships_by_id.get(rec['scholarship_id'])
+            if scholarship is not None:
+                try:
+                    from datetime import datetime
+                    expiry_date = scholarship.get('expiration_date')
+                    if expiry_date:
+                        date_obj = datetime.strptime(expiry_date, '%Y-%m-%d')
+                        days_until_expiry = (date_obj - datetime.now()).days
+                        rec['deadline_approaching'] = days_until_expiry <= 30
+                except Exception:
+                    rec['deadline_approaching'] = False
         
         # Return the appropriate format
         if return_json:
-            return ScholarshipMatcher.format_recommendations_for_frontend(recommendations, scholarship_postings_data)
+            pagination = {"offset": offset, "top_n": top_n, "total": len(transformed_scholarships)}
+            return ScholarshipMatcher.format_recommendations_for_frontend(
+                recommendations,
+                scholarship_postings_data,
+                postings_by_id=scholarships_by_id,
+                pagination=pagination
+            )
         else:
             return recommendations
\ No newline at end of file
@@ -0,0 +1,281 @@
+# scoring.py - Vectorized scoring kernel shared by the job, training and scholarship matchers
+import numpy as np
+from scipy import sparse
+from . import numba_kernels
+
+# Kernel computing score_components: 'numba' (compiled) or 'numpy', chosen by select_scoring_backend
+SCORING_BACKENDS = ('numba', 'numpy')
+_scoring_backend = 'numpy'
+
+
+def cosine_similarities(profile_vector, posting_matrix, posting_norms=None):
+    """
+    Cosine similarity between one profile vector and every posting row, from one
+    sparse matrix-vector product (posting_norms: precomputed row_norms of the matrix)
+    """
+    profile_vector = np.asarray(profile_vector, dtype=np.float64).ravel()
+    posting_matrix = sparse.csr_matrix(posting_matrix)
+
+    dot_products = posting_products(posting_matrix, profile_vector)
+    if posting_norms is None:
+        posting_norms = row_norms(posting_matrix)
+    profile_norm = np.linalg.norm(profile_vector)
+
+    # Postings (or a profile) without any known term get a similarity of 0
+    similarities = np.zeros(posting_matrix.shape[0])
+    if profile_norm > 0:
+        nonzero = posting_norms > 0
+        similarities[nonzero] = dot_products[nonzero] / (profile_norm * posting_norms[nonzero])
+    return similarities
+
+
+def shared_term_boosts(profile_vector, posting_matrix, term_boosts, max_boost, posting_presence=None):
+    """
+    Average per-term boost over the terms each posting shares with the profile.
+
+    term_boosts holds the extra weight of every vocabulary term (weight - 1.0).
+    Returns 1.0 + mean boost of the shared terms, capped at max_boost, or 1.0
+    for postings that share no term with the profile.
+    """
+    profile_vector = np.asarray(profile_vector, dtype=np.float64).ravel()
+    if posting_presence is None:
+        posting_presence = presence_matrix(posting_matrix)
+    profile_presence = (profile_vector > 0).astype(np.float64)
+
+    # Number of shared terms and sum of their boosts, one sparse product each
+    shared_counts = posting_products(posting_presence, profile_presence)
+    shared_boosts = posting_products(posting_presence, profile_presence * term_boosts)
+
+    boosts = np.ones(posting_presence.shape[0])
+    matched = shared_counts > 0
+    boosts[matched] = np.minimum(max_boost, 1.0 + shared_boosts[matched] / shared_counts[matched])
+    return boosts
+
+
+def profile_term_boosts(profile_vector, feature_names, term_boost):
+    """Per-term boost vector, computed only for the terms present in the profile"""
+    # Terms missing from the profile can never be shared, so their boost stays 0
+    profile_vector = np.asarray(profile_vector).ravel()
+    term_boosts = np.zeros(len(feature_names))
+    for term_idx in np.flatnonzero(profile_vector > 0):
+        term_boosts[term_idx] = term_boost(feature_names[term_idx])
+    return term_boosts
+
+
+def gap_scores(profile_vector, posting_matrix, term_weights, posting_presence=None):
+    """
+    Per-posting gap: sum of term_weights over the terms a posting has and the profile lacks.
+
+    Computed as (posting term mask) @ ((1 - profile term mask) * term_weights),
+    one sparse product for all postings. A (terms x k) term_weights gives k gap sums per posting.
+    """
+    profile_vector = np.asarray(profile_vector).ravel()
+    term_weights = np.asarray(term_weights)
+    if posting_presence is None:
+        posting_presence = presence_matrix(posting_matrix)
+    profile_presence = profile_vector > 0
+    if term_weights.ndim == 2:
+        profile_presence = profile_presence[:, np.newaxis]
+    missing_weights = np.where(profile_presence, 0.0, term_weights)
+    return posting_products(posting_presence, missing_weights)
+
+
+def gap_term_weights(feature_names, rarity_index):
+    """
+    Rarity weight of every vocabulary term for the gap scores.
+
+    Only single-word terms count, like the whitespace-split term sets the gap
+    used to be computed from (n-gram features would count the same skill twice).
+    """
+    return np.array([
+        rarity_index.get(term, 1.0) if ' ' not in term else 0.0
+        for term in feature_names
+    ])
+
+
+def missing_terms(profile_vector, posting_row, feature_names, term_weights):
+    """(term, weight) pairs of one posting's terms missing from the profile, highest weight first"""
+    profile_vector = np.asarray(profile_vector).ravel()
+    posting_row = sparse.csr_matrix(posting_row)
+    term_indices = posting_row.indices[posting_row.data > 0]
+    term_indices = term_indices[profile_vector[term_indices] <= 0]
+    order = np.argsort(-term_weights[term_indices], kind='stable')
+    return [
+        (feature_names[idx], term_weights[idx])
+        for idx in term_indices[order]
+        if ' ' not in feature_names[idx]
+    ]
+
+
+def numpy_score_components(profile_vector, posting_matrix, term_boosts, gap_weights, max_boost, posting_norms=None):
+    """score_components with one sparse product per factor, sharing one term presence matrix"""
+    posting_presence = presence_matrix(posting_matrix)
+    similarities = cosine_similarities(profile_vector, posting_matrix, posting_norms)
+    boosts = shared_term_boosts(profile_vector, posting_matrix, term_boosts, max_boost, posting_presence)
+    return similarities, boosts, gap_scores(profile_vector, posting_matrix, gap_weights, posting_presence)
+
+
+def score_components(profile_vector, posting_matrix, term_boosts, gap_weights, max_boost, posting_norms=None):
+    """
+    The per-posting factors of a match score, in one call on the selected backend:
+    cosine similarity, shared_term_boosts (capped at max_boost) and gap_scores.
+
+    gap_weights is one weight per vocabulary term, or a (terms x k) array to
+    get k gap sums at once. Returns (similarities, boosts, gaps) with gaps shaped
+    like (postings,) or (postings x k) accordingly. posting_norms optionally holds
+    the cached row_norms of posting_matrix. The matrix stays sparse in its own dtype.
+    """
+    posting_matrix = sparse.csr_matrix(posting_matrix)
+    gap_weights = np.asarray(gap_weights, dtype=np.float64)
+    weights_2d = gap_weights.reshape(gap_weights.shape[0], -1)
+    if _scoring_backend == 'numba':
+        similarities, boosts, gaps = numba_kernels.score_components(
+            profile_vector, posting_matrix, term_boosts, weights_2d, max_boost
+        )
+    else:
+        similarities, boosts, gaps = numpy_score_components(
+            profile_vector, posting_matrix, term_boosts, weights_2d, max_boost, posting_norms
+        )
+    return similarities, boosts, gaps if gap_weights.ndim == 2 else gaps[:, 0]
+
+
+def select_scoring_backend(name='auto'):
+    """
+    Select the score_components kernel once at startup: 'numba', 'numpy', or
+    'auto' for numba when it is installed. The numba kernel is compiled right away
+    so the first request doesn't pay for it. Returns the selected backend.
+    """
+    global _scoring_backend
+    if name == 'auto':
+        name = 'numba' if numba_kernels.AVAILABLE else 'numpy'
+    if name not in SCORING_BACKENDS:
+        raise ValueError(f"Unknown scoring backend: {name}")
+    if name == 'numba':
+        if not numba_kernels.AVAILABLE:
+            print("numba is not installed, scoring with the NumPy kernel")
+            name = 'numpy'
+        else:
+            # Posting matrices are float32; float64 ones (e.g. built elsewhere) get their own specialization
+            for dtype in (np.float32, np.float64):
+                posting_matrix = sparse.csr_matrix(np.ones((1, 2), dtype=dtype))
+                numba_kernels.score_components(np.ones(2), posting_matrix, np.zeros(2), np.zeros((2, 1)), 1.5)
+    _scoring_backend = name
+    return name
+
+
+def scoring_backend():
+    """Name of the selected score_components kernel"""
+    return _scoring_backend
+
+
+def top_k_rows(scores, top_n, offset=0):
+    """
+    Rows of the top_n highest scores after skipping the offset best ones, best first.
+
+    Selects the offset + top_n best rows with a partial partition (linear in the
+    number of postings) and only sorts those. Equal scores keep their row order,
+    exactly like a stable full sort would.
+    """
+    scores = np.asarray(scores, dtype=np.float64).ravel()
+    end = min(offset + top_n, scores.size)
+    if top_n <= 0 or offset >= end:
+        return np.array([], dtype=np.intp)
+
+    # Score of the end-th best row; every better row is a candidate, and the
+    # earliest rows tied with it fill the remaining places
+    kth_score = np.partition(scores, scores.size - end)[scores.size - end]
+    better = np.flatnonzero(scores > kth_score)
+    tied = np.flatnonzero(scores == kth_score)[:end - better.size]
+    candidates = np.concatenate([better, tied])
+
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order][offset:end]
+
+
+def presence_matrix(matrix):
+    """
+    0/1 float32 matrix of the positive entries of a sparse matrix, sharing its
+    index arrays (one float32 per stored entry is the only allocation)
+    """
+    matrix = sparse.csr_matrix(matrix)
+    return sparse.csr_matrix(
+        ((matrix.data > 0).astype(np.float32), matrix.indices, matrix.indptr),
+        shape=matrix.shape,
+        copy=False
+    )
+
+
+def posting_products(posting_matrix, values):
+    """
+    posting_matrix @ values (a dense vector or terms x k array) as float64.
+
+    The product runs in the matrix's own dtype: a float32 matrix times float64
+    values would make scipy copy the whole matrix to float64 on every call.
+    """
+    values = np.asarray(values).astype(posting_matrix.dtype, copy=False)
+    return np.asarray(posting_matrix @ values, dtype=np.float64)
+
+
+def row_norms(matrix):
+    """L2 norm of every row of a sparse matrix (in float64), without copying the matrix"""
+    matrix = sparse.csr_matrix(matrix)
+    squares = np.square(matrix.data, dtype=np.float64)
+    row_lengths = np.diff(matrix.indptr)
+    sums = np.zeros(matrix.shape[0])
+    nonempty = row_lengths > 0
+    sums[nonempty] = np.add.reduceat(squares, matrix.indptr[:-1][nonempty])
+    return np.sqrt(sums)
+
+
+def batch_posting_products(posting_matrix, profile_matrix):
+    """
+    Dense (profiles x postings) float64 products of the rows of two sparse matrices.
+
+    Computed as posting_matrix @ profile_matrix.T in the posting matrix's dtype, so
+    only the (small) profile side is converted or transposed, never the posting matrix.
+    """
+    profile_rows = sparse.csr_matrix(profile_matrix).astype(posting_matrix.dtype, copy=False)
+    return np.asarray((posting_matrix @ profile_rows.T).T.toarray(), dtype=np.float64)
+
+
+def batch_cosine_similarities(profile_matrix, posting_matrix, posting_norms=None):
+    """Dense (profiles x postings) cosine similarities, from one sparse product"""
+    profile_matrix = sparse.csr_matrix(profile_matrix)
+    posting_matrix = sparse.csr_matrix(posting_matrix)
+
+    dot_products = batch_posting_products(posting_matrix, profile_matrix)
+    profile_norms = row_norms(profile_matrix)
+    if posting_norms is None:
+        posting_norms = row_norms(posting_matrix)
+
+    # Rows without any known term get a similarity of 0
+    norms = np.outer(profile_norms, posting_norms)
+    similarities = np.zeros_like(dot_products)
+    np.divide(dot_products, norms, out=similarities, where=norms > 0)
+    return similarities
+
+
+def batch_shared_term_boosts(boost_matrix, profile_presence, posting_presence, max_boost):
+    """
+    shared_term_boosts for many profiles at once.
+
+    boost_matrix holds the extra weight (weight - 1.0) of every profile term,
+    profile_presence marks the profile terms and posting_presence the posting terms.
+    """
+    shared_counts = batch_posting_products(posting_presence, profile_presence)
+    shared_boosts = batch_posting_products(posting_presence, boost_matrix)
+
+    boosts = np.ones_like(shared_counts)
+    matched = shared_counts > 0
+    boosts[matched] = np.minimum(max_boost, 1.0 + shared_boosts[matched] / shared_counts[matched])
+    return boosts
+
+
+def batch_gap_scores(profile_presence, posting_presence, term_weights):
+    """
+    gap_scores for many profiles at once: the weight of all posting terms
+    minus the weight of the terms the profile has.
+    """
+    posting_totals = posting_products(posting_presence, term_weights)
+    covered = batch_posting_products(posting_presence, profile_presence.multiply(term_weights.reshape(1, -1)))
+    return posting_totals.reshape(1, -1) - covered
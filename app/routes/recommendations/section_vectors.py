@@ -0,0 +1,109 @@
+# section_vectors.py - Section-weighted TF-IDF vectors built as a linear combination of per-section vectors
+import threading
+from collections import OrderedDict
+import numpy as np
+from scipy import sparse
+from sklearn.base import clone
+from sklearn.preprocessing import normalize
+
+
+def join_sections(sections):
+    """Unweighted document text of a {section: preprocessed text} dict"""
+    return ' '.join(text for text in sections.values() if text)
+
+
+def fit_section_vectorizer(vectorizer, documents):
+    """
+    Private copy of vectorizer fitted (vocabulary and IDF) on unweighted documents.
+    Its transform() returns raw TF-IDF rows so section vectors can be weighted before normalizing.
+    """
+    vectorizer = clone(vectorizer).set_params(norm=None)
+    vectorizer.fit(documents)
+    return vectorizer
+
+
+def feature_count(vectorizer):
+    """Number of feature columns of a fitted (or hashing) vectorizer"""
+    n_features = getattr(vectorizer, 'n_features', None)
+    return n_features if n_features is not None else len(vectorizer.vocabulary_)
+
+
+def weighted_section_sum(transform, n_features, documents_sections, section_weights, default_weight=1.0, dtype=np.float64):
+    """
+    One unnormalized row per document: the sum over its sections of
+    weight * transform(section), with the exact (float) section weights,
+    stored as dtype.
+    """
+    texts = []
+    rows = []
+    weights = []
+    for row, sections in enumerate(documents_sections):
+        for section, text in sections.items():
+            weight = section_weights.get(section, default_weight)
+            if text and weight:
+                rows.append(row)
+                weights.append(weight)
+                texts.append(text)
+
+    if texts:
+        section_matrix = transform(texts)
+    else:
+        section_matrix = sparse.csr_matrix((0, n_features))
+
+    # (documents x sections) weight matrix, so all documents combine in one sparse product
+    combination = sparse.csr_matrix(
+        (weights, (rows, np.arange(len(texts)))),
+        shape=(len(documents_sections), len(texts))
+    )
+    return sparse.csr_matrix(combination @ section_matrix).astype(dtype, copy=False)
+
+
+def weighted_section_matrix(vectorizer, documents_sections, section_weights, default_weight=1.0, dtype=np.float32):
+    """
+    One L2-normalized row per document: the sum over its sections of
+    weight * TF-IDF(section), with the exact (float) section weights.
+    Summed and normalized in float64, stored as dtype (float32 halves the matrix).
+    """
+    return normalize(weighted_section_sum(
+        vectorizer.transform, feature_count(vectorizer), documents_sections, section_weights, default_weight
+    )).astype(dtype, copy=False)
+
+
+class SectionVectorCache:
+    """
+    Raw TF-IDF vectors of preprocessed section texts for one fitted vectorizer,
+    so unchanged profile sections are not re-vectorized on every request.
+    """
+    def __init__(self, vectorizer, max_size=10000):
+        self.vectorizer = vectorizer
+        self.max_size = max_size
+        self._vectors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def section_vector(self, text):
+        """Raw (unnormalized) TF-IDF row of one section text"""
+        with self._lock:
+            vector = self._vectors.get(text)
+            if vector is not None:
+                self._vectors.move_to_end(text)
+                return vector
+
+        vector = self.vectorizer.transform([text])
+        with self._lock:
+            self._vectors[text] = vector
+            if len(self._vectors) > self.max_size:
+                self._vectors.popitem(last=False)
+        return vector
+
+    def combine(self, sections, section_weights, default_weight=1.0):
+        """Dense, L2-normalized weighted combination of the section vectors of one document"""
+        combined = np.zeros(feature_count(self.vectorizer))
+        for section, text in sections.items():
+            weight = section_weights.get(section, default_weight)
+            if text and weight:
+                vector = self.section_vector(text)
+                combined[vector.indices] += weight * vector.data
+        norm = np.linalg.norm(combined)
+        if norm > 0:
+            combined /= norm
+        return combined
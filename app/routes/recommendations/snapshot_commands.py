@@ -0,0 +1,63 @@
+# snapshot_commands.py - Flask CLI commands managing the recommendation model snapshots and posting signatures
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from app import db
+from app.utils import update_expired_job_postings, get_posting_catalog_version, bump_posting_catalog_version
+from app.utils.employer_helper import POSTING_TYPES
+from .job_reco_model.job_matching import build_job_posting_index, use_job_posting_snapshots
+from .near_duplicates import load_job_postings, record_posting_signature, posting_text
+from .posting_snapshot import write_posting_snapshot, current_snapshot_version
+
+recommendation_cli = AppGroup("recommendations", help="Recommendation model maintenance.")
+
+
+def configure_posting_snapshots(app):
+    """Use the snapshots in RECOMMENDATION_SNAPSHOT_DIR, when set, and register the CLI commands"""
+    use_job_posting_snapshots(
+        app.config.get("RECOMMENDATION_SNAPSHOT_DIR"),
+        keep=app.config.get("RECOMMENDATION_SNAPSHOT_KEEP", 3)
+    )
+    app.cli.add_command(recommendation_cli)
+
+
+@recommendation_cli.command("build-snapshot")
+@click.option("--directory", default=None, help="Snapshot directory (RECOMMENDATION_SNAPSHOT_DIR by default).")
+def build_snapshot(directory):
+    """
+    Fit the job posting index of the current catalog version and publish it as a snapshot.
+    Running workers map it on their next request for that version, without a restart.
+    """
+    directory = directory or current_app.config.get("RECOMMENDATION_SNAPSHOT_DIR")
+    if not directory:
+        raise click.UsageError("Set RECOMMENDATION_SNAPSHOT_DIR or pass --directory")
+
+    # Expire outdated postings first so the catalog version reflects them
+    update_expired_job_postings()
+    version = get_posting_catalog_version('job')
+
+    posting_index = build_job_posting_index(load_job_postings(version))
+    path = write_posting_snapshot(
+        posting_index, directory, version, keep=current_app.config.get("RECOMMENDATION_SNAPSHOT_KEEP", 3)
+    )
+    click.echo(f"Job posting snapshot {version} ({posting_index.matrix.shape[0]} postings, "
+               f"{len(posting_index.feature_names)} terms) written to {path}")
+    click.echo(f"Current snapshot: {current_snapshot_version(directory)}")
+
+
+@recommendation_cli.command("build-signatures")
+@click.option("--posting-type", type=click.Choice(sorted(POSTING_TYPES)), default=None, help="Only this posting type.")
+def build_signatures(posting_type):
+    """
+    (Re)compute the near-duplicate MinHash signatures of every posting, e.g. for
+    postings created before signatures were recorded at ingest.
+    """
+    for kind in [posting_type] if posting_type else sorted(POSTING_TYPES):
+        model, id_column, _ = POSTING_TYPES[kind]
+        postings = model.query.all()
+        for posting in postings:
+            record_posting_signature(kind, getattr(posting, id_column), posting.user_id, posting_text(kind, posting))
+        # Cached indexes and collapsed postings are recomputed for the new version
+        bump_posting_catalog_version(kind)
+        db.session.commit()
+        click.echo(f"{kind}: {len(postings)} posting signatures written")
@@ -0,0 +1,60 @@
+# text_normalizer.py - One-pass text normalisation with a shared, memoized stemmer
+import re
+from functools import lru_cache
+from nltk.stem import SnowballStemmer
+
+# Upper bound on cached stems; posting and profile vocabularies stay far below it
+STEM_CACHE_SIZE = 100000
+
+# Runs of letters, i.e. what is left between the characters the matchers drop
+WORD_PATTERN = re.compile(r'[a-z]+')
+
+_stemmer = SnowballStemmer("english")
+
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem_word(word):
+    """Snowball (english) stem of a word, memoized across matchers and requests"""
+    return _stemmer.stem(word)
+
+
+def normalize_text(text, stopwords):
+    """
+    Lowercase, keep letters only, drop stopwords, collapse whitespace and stem,
+    in a single pass over the text.
+
+    Same output as replacing every non-letter by a space, splitting, filtering
+    and stemming word by word.
+    """
+    return ' '.join([
+        stem_word(word)
+        for word in WORD_PATTERN.findall(str(text).lower())
+        if word not in stopwords
+    ])
+
+
+def surface_forms(text, stopwords=()):
+    """Stem -> first word of the text with that stem, to show stemmed terms the way they were written"""
+    forms = {}
+    for word in WORD_PATTERN.findall(str(text).lower()):
+        if word not in stopwords:
+            forms.setdefault(stem_word(word), word)
+    return forms
+
+
+def surface_term(term, forms):
+    """A (possibly n-gram) feature term with every stem replaced by its surface form when known"""
+    return ' '.join(forms.get(stem, stem) for stem in term.split())
+
+
+def stem_cache_stats():
+    """Hit/miss counters and fill level of the shared stem cache"""
+    info = stem_word.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        'hits': info.hits,
+        'misses': info.misses,
+        'hit_ratio': info.hits / lookups if lookups else 0.0,
+        'size': info.currsize,
+        'max_size': info.maxsize
+    }
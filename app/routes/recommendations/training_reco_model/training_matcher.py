@@ -1,7 +1,6 @@
 # training_matcher.py - Enhanced for training recommendation system
 import json
-import nltk
-from nltk.stem import SnowballStemmer
+import time
 from nltk.corpus import stopwords
 import re
 from sklearn.feature_extraction.text import TfidfVectorizer
@@ -12,18 +11,21 @@ from datetime import datetime
 import string
 from nltk.tokenize import word_tokenize
 from nltk.util import ngrams
-
-nltk.data.path.insert(0, './nltk_data')
+from ..scoring import score_components, profile_term_boosts, gap_scores, gap_term_weights, missing_terms, top_k_rows, cosine_similarities
+from ..cluster_matcher import ClusterMatcher
+from ..text_normalizer import normalize_text
+from ..section_vectors import join_sections, fit_section_vectorizer, weighted_section_matrix
+from ..posting_text_cache import PostingTextCache, keys_for_titles, posting_version_keys
+from ..recency import RecencyTable, work_experience_entries, training_entries
+from ..matcher_registry import get_shared_matcher
+from ..latency_budget import TIER_FULL, scoring_tier, observe_stage
+from .. import nltk_resources  # Points NLTK at the vendored nltk_data directory
 
 class TrainingMatcher:
     def __init__(self, debug=True):
         """Initialize the enhanced training matcher with advanced text processing tools"""
-        nltk.download('stopwords', quiet=True)
-        nltk.download('punkt', quiet=True)
-        nltk.download('wordnet', quiet=True)
-        
+        # NLTK data comes from the vendored nltk_data directory (see nltk_resources)
         self.debug = debug
-        self.stemmer = SnowballStemmer("english")
         
         # Define domain-specific stopwords (adapted for training context)
         self.domain_stopwords = [
@@ -33,6 +35,15 @@ class TrainingMatcher:
             'please', 'submit', 'application'
         ]
         
+        # Set version of the domain stopwords for the per-word filter in preprocess_text
+        self.domain_stopword_set = set(self.domain_stopwords)
+        
+        # Stopwords for key-term extraction, built once instead of on every call
+        self.key_term_stopwords = set(stopwords.words('english')).union(self.domain_stopwords)
+        
+        # Preprocessing results per posting version (see posting_text_cache)
+        self.posting_text_cache = PostingTextCache(self.process_training_posting, self.extract_key_terms)
+        
         # Custom TF-IDF vectorizer with enhanced parameters
         self.vectorizer = TfidfVectorizer(
             ngram_range=(1, 3),  # Capture contextual phrases
@@ -65,6 +76,9 @@ class TrainingMatcher:
                           'therapy', 'healthcare management', 'medical coding', 'pharmacy']
         }
         
+        # Cluster terms compiled once into a single automaton
+        self.skill_cluster_matcher = ClusterMatcher(self.skill_clusters, weight=1.2)
+        
         # Initialize recency weighting parameters
         self.time_decay_lambda = 0.05  # Controls the decay rate
         self.max_recency_boost = 1.5   # Maximum boost for very recent experience
@@ -77,8 +91,13 @@ class TrainingMatcher:
             'training_details': 1.5
         }
         
-        # Skill rarity index (will be populated during processing)
-        self.skill_rarity_index = {}
+        # Profile section weights (adjusted for training focus)
+        self.profile_section_weights = {
+            'education': 2.5,
+            'skills': 4.0,
+            'work_experience': 3.0,
+            'training': 4.0
+        }
         
         # New: Skill gap threshold for training recommendations
         self.skill_gap_threshold = 0.3
@@ -89,7 +108,7 @@ class TrainingMatcher:
         tokens = word_tokenize(text.lower())
         
         # Remove punctuation and stopwords
-        stop_words = set(stopwords.words('english')).union(self.domain_stopwords)
+        stop_words = self.key_term_stopwords
         filtered_tokens = [w for w in tokens if w not in stop_words and w not in string.punctuation]
         
         # Extract unigrams, bigrams and trigrams as potential skills
@@ -102,8 +121,12 @@ class TrainingMatcher:
         
         return all_terms
         
-    def build_skill_rarity_index(self, training_descriptions):
+    def build_skill_rarity_index(self, training_descriptions, posting_keys=None):
         """Build an index of skill term rarity across training postings"""
+        # Cached per posting version, with counts updated only for postings that changed
+        if posting_keys is not None:
+            return self.posting_text_cache.rarity_index(posting_keys, training_descriptions)
+        
         # Extract all potential skill terms from all training descriptions
         all_training_terms = []
         for desc in training_descriptions:
@@ -115,90 +138,38 @@ class TrainingMatcher:
         
         # Calculate inverse frequency (rarity) for each term
         total_trainings = len(training_descriptions)
+        skill_rarity_index = {}
         for term, count in term_counts.items():
             # More rare terms get higher weights
-            self.skill_rarity_index[term] = np.log(total_trainings / (count + 1)) + 1
+            skill_rarity_index[term] = np.log(total_trainings / (count + 1)) + 1
+        
+        return skill_rarity_index
     
     def get_semantic_cluster_weight(self, term):
         """Get the semantic cluster weight for a term"""
-        for cluster, terms in self.skill_clusters.items():
-            if any(skill_term in term for skill_term in terms):
-                return 1.2  # Boost terms that are part of a skill cluster
-        return 1.0
+        # Boost terms that are part of a skill cluster
+        return self.skill_cluster_matcher.term_weight(term)
     
-    def calculate_recency_weight(self, term, profile_data):
-        """Calculate recency weight based on work experience"""
-        # Default weight
-        recency_weight = 1.0
-        
-        # Check work experience for this term
+    def get_semantic_cluster(self, term):
+        """Name of the skill cluster a term belongs to, or None"""
+        return self.skill_cluster_matcher.cluster(term)
+    
+    def build_recency_table(self, profile_data):
+        """Recency weights of the profile's terms, from its work experience and training history"""
+        now = datetime.now()
         try:
-            work_exp = profile_data.get('work_experience', [])
-            
-            # Check training history as well (new for training matcher)
-            other_training = profile_data.get('other_training', [])
-            
-            # Initialize variables to track the most recent mention
-            most_recent_date = None
-            
-            # Check work experience
-            for exp in work_exp:
-                # Check if the term appears in the position or description
-                position = exp.get('position', '').lower()
-                company = exp.get('company_name', '').lower()
-                
-                if term in position or term in company:
-                    # Parse the end date
-                    end_date = exp.get('end_date', None)
-                    
-                    # If still current, use today's date
-                    if end_date is None or end_date.lower() == 'present':
-                        end_date = datetime.now().strftime('%Y-%m-%d')
-                    
-                    # Try to parse the date
-                    try:
-                        date_obj = datetime.strptime(end_date, '%Y-%m-%d')
-                        
-                        # Update most recent date if this is more recent
-                        if most_recent_date is None or date_obj > most_recent_date:
-                            most_recent_date = date_obj
-                    except:
-                        # If date parsing fails, continue to the next experience
-                        continue
-            
-            # Check training history (new for training matcher)
-            for training in other_training:
-                course_name = training.get('course_name', '').lower()
-                skills_acquired = training.get('skills_acquired', '').lower()
-                
-                if term in course_name or term in skills_acquired:
-                    # Parse the completion date
-                    completion_date = training.get('completion_date', None)
-                    
-                    if completion_date:
-                        try:
-                            date_obj = datetime.strptime(completion_date, '%Y-%m-%d')
-                            
-                            # Update most recent date if this is more recent
-                            if most_recent_date is None or date_obj > most_recent_date:
-                                most_recent_date = date_obj
-                        except:
-                            # If date parsing fails, continue to the next training
-                            continue
-            
-            # Calculate recency weight if we found a date
-            if most_recent_date:
-                days_since = (datetime.now() - most_recent_date).days
-                recency_weight = self.max_recency_boost * np.exp(-self.time_decay_lambda * days_since/365.0)
-                # Ensure the weight is at least 1.0
-                recency_weight = max(1.0, recency_weight)
-        
+            # Parse every dated history entry once per profile
+            entries = work_experience_entries(profile_data, now) + training_entries(profile_data)
         except Exception as e:
             if self.debug:
                 print(f"Error calculating recency weight: {str(e)}")
-            recency_weight = 1.0
+            entries = []
             
-        return recency_weight
+        return RecencyTable(entries, self.max_recency_boost, self.time_decay_lambda, now=now)
+
+    def calculate_recency_weight(self, term, profile_data):
+        """Calculate recency weight of a single term (prefer build_recency_table when scoring many terms)"""
+        return self.build_recency_table(profile_data).weight(term)
 
     def calculate_section_weight(self, term, section):
         """Calculate weight based on term position in document"""
@@ -209,27 +180,12 @@ class TrainingMatcher:
 
     def preprocess_text(self, text):
         """Enhanced text preprocessing"""
-        # Convert to lowercase string
-        text = str(text).lower()
-        
-        # Remove special characters but keep spaces
-        text = re.sub(r'[^a-zA-Z\s]', ' ', text)
-        
-        # Remove domain-specific stopwords
-        words = text.split()
-        filtered_words = [word for word in words if word not in self.domain_stopwords]
-        text = ' '.join(filtered_words)
-        
-        # Remove extra whitespace
-        text = ' '.join(text.split())
-        
-        # Apply stemming
-        stemmed_words = [self.stemmer.stem(word) for word in text.split()]
-        
-        return ' '.join(stemmed_words)
+        # Lowercase, keep letters only, remove domain-specific stopwords, collapse
+        # whitespace and stem (memoized, shared by all matchers) in a single pass
+        return normalize_text(text, self.domain_stopword_set)
     
-    def extract_profile_features(self, profile_data):
-        """Extract weighted features from profile with enhanced weighting"""
+    def extract_profile_sections(self, profile_data):
+        """Extract preprocessed, separately weighted feature sections from profile"""
         try:
             # Create structured feature sections for position-based weighting
             feature_sections = {}
@@ -271,182 +227,168 @@ class TrainingMatcher:
                 for section, text in feature_sections.items()
             }
             
-            # Apply section weights (adjusted for training focus)
-            weighted_sections = {
-                'education': processed_sections['education'] * int(2.5),
-                'skills': processed_sections['skills'] * int(4.0),
-                'work_experience': processed_sections['work_experience'] * int(3.0),
-                'training': processed_sections['training'] * int(4.0)  # Higher weight for training
-            }
-            
-            # Combine all weighted sections
-            combined_text = " ".join(weighted_sections.values())
-            
-            return combined_text
+            return processed_sections
             
         except Exception as e:
             print(f"Error extracting profile features: {str(e)}")
             raise
     
-    def process_training_postings(self, training_posts):
-        """Process training posts with section-based weighting"""
+    def extract_profile_features(self, profile_data):
+        """Unweighted profile document (the section weights are applied in vector space)"""
+        return join_sections(self.extract_profile_sections(profile_data))
+    
+    def process_training_posting(self, title, description):
+        """Split one training post into preprocessed sections for section-based weighting"""
+        # Split description into sections (if possible)
+        sections = {}
+        
+        # Extract training title section
+        sections['training_title'] = title
+        
+        # Basic section extraction using regex
+        section_pattern = r'\[SECTION:([A-Z_]+)\](.*?)(?=\[SECTION:|$)'
+        matches = re.findall(section_pattern, description, re.DOTALL)
+        
+        for section_name, content in matches:
+            sections[section_name.lower()] = content.strip()
+        
+        # If no sections found, use the entire description
+        if not matches:
+            sections['description'] = description
+        
+        # Process each section
+        processed_sections = {
+            section: self.preprocess_text(text)
+            for section, text in sections.items()
+        }
+        
+        # Section weights are applied to the section vectors (see section_vectors)
+        return processed_sections
+    
+    def process_training_postings(self, training_posts, posting_keys=None):
+        """Preprocessed sections of every training post, for section-based weighting"""
         processed_trainings = {}
         
         for title, description in training_posts.items():
-            # Split description into sections (if possible)
-            sections = {}
-            
-            # Extract training title section
-            sections['training_title'] = title
-            
-            # Basic section extraction using regex
-            section_pattern = r'\[SECTION:([A-Z_]+)\](.*?)(?=\[SECTION:|$)'
-            matches = re.findall(section_pattern, description, re.DOTALL)
-            
-            for section_name, content in matches:
-                sections[section_name.lower()] = content.strip()
-            
-            # If no sections found, use the entire description
-            if not matches:
-                sections['description'] = description
-            
-            # Process each section
-            processed_sections = {
-                section: self.preprocess_text(text)
-                for section, text in sections.items()
-            }
-            
-            # Apply section weights
-            weighted_text = ""
-            for section, text in processed_sections.items():
-                weight = self.section_weights.get(section, 1.0)
-                # Convert float to int before multiplying with text
-                weighted_text += f" {text * int(weight)}"
-            
-            processed_trainings[title] = weighted_text.strip()
+            # Reuse the cached result of unchanged postings
+            key = posting_keys.get(title) if posting_keys else None
+            if key is not None:
+                processed_trainings[title] = self.posting_text_cache.processed_sections(key, title, description)
+            else:
+                processed_trainings[title] = self.process_training_posting(title, description)
         
         return processed_trainings
     
-    def calculate_skill_gap_opportunity(self, profile_features, training_features, feature_names):
+    def calculate_skill_gap_opportunity(self, profile_vector, training_matrix, feature_names, skill_rarity_index):
         """Calculate skill gap opportunity score for training recommendations"""
-        # Extract profile and training terms
-        profile_terms = set(profile_features.split())
-        
-        # Initialize skill gap opportunity scores
-        skill_gap_scores = {}
-        
-        # For each training, identify skills the user doesn't have
-        for training_title, training_text in training_features.items():
-            training_terms = set(training_text.split())
-            
-            # Find potential skill terms in training that are not in profile
-            new_skills = training_terms - profile_terms
-            
-            # Calculate opportunity score for training
-            opportunity_score = 0
-            relevant_skills = []
-            
-            for term in new_skills:
-                # Higher score for rarer skills
-                if term in feature_names:
-                    rarity_factor = self.skill_rarity_index.get(term, 1.0)
-                    cluster_weight = self.get_semantic_cluster_weight(term)
-                    term_score = rarity_factor * cluster_weight
-                    opportunity_score += term_score
-                    
-                    # Track relevant skills for explanation
-                    if term_score > 1.2:  # Only include significant skills
-                        relevant_skills.append(term)
-            
-            # Normalize by the number of new skills
-            if len(new_skills) > 0:
-                opportunity_score = opportunity_score / len(new_skills)
-            
-            skill_gap_scores[training_title] = {
-                'score': opportunity_score,
-                'new_skills': list(new_skills)[:5],  # Limit to top 5 skills
-                'relevant_skills': relevant_skills[:3]  # Limit to top 3 relevant skills
-            }
+        # Higher score for rarer skills and skills from a known cluster
+        term_scores = self.skill_gap_term_scores(feature_names, skill_rarity_index)
+        
+        # Sum of the scores of the skills each training teaches that the user doesn't have,
+        # normalized by the number of those new skills (all trainings in one sparse pass)
+        gaps = gap_scores(profile_vector, training_matrix, self.skill_gap_weights(feature_names, term_scores))
+        return self.normalized_skill_gaps(gaps), term_scores
+    
+    def skill_gap_term_scores(self, feature_names, skill_rarity_index):
+        """Opportunity score of every vocabulary term: its rarity times its skill cluster boost"""
+        _, cluster_weights = self.skill_cluster_matcher.vocabulary_clusters(feature_names)
+        return gap_term_weights(feature_names, skill_rarity_index) * cluster_weights
+    
+    def skill_gap_weights(self, feature_names, term_scores):
+        """(terms x 2) gap weights: the opportunity score and a 1 for every single-word term"""
+        single_terms = np.array([' ' not in term for term in feature_names], dtype=np.float64)
+        return np.column_stack([term_scores, single_terms])
+    
+    def normalized_skill_gaps(self, gaps):
+        """Opportunity sum divided by the number of new skills, from the two gap sums of skill_gap_weights"""
+        opportunity_scores, new_skill_counts = gaps[:, 0], gaps[:, 1]
+        return np.divide(
+            opportunity_scores, new_skill_counts,
+            out=np.zeros_like(opportunity_scores), where=new_skill_counts > 0
+        )
+    
+    def describe_skill_gap(self, profile_vector, training_row, feature_names, term_scores):
+        """List the new skills of one training, most valuable first (for the explanation)"""
+        new_skills = missing_terms(profile_vector, training_row, feature_names, term_scores)
         
-        return skill_gap_scores
+        return {
+            'new_skills': [term for term, _ in new_skills[:5]],  # Limit to top 5 skills
+            # Only include significant skills, limited to the top 3
+            'relevant_skills': [term for term, term_score in new_skills if term_score > 1.2][:3]
+        }
     
-    def get_recommendations(self, profile_data, training_posts, top_n=5):
-        """Get training recommendations with novelty enhancements"""
+    def get_recommendations(self, profile_data, training_posts, top_n=5, posting_keys=None, offset=0, budget=None):
+        """
+        Get training recommendations with novelty enhancements; under a latency budget
+        without time left for the boosts and skill gaps, by cosine similarity alone
+        """
         try:
             # Process profile with enhanced feature extraction
-            profile_features = self.extract_profile_features(profile_data)
-            
-            # Process training posts with section-based weighting
-            processed_trainings = self.process_training_postings(training_posts)
+            profile_sections = self.extract_profile_sections(profile_data)
             
-            # Build skill rarity index
-            self.build_skill_rarity_index(list(processed_trainings.values()))
+            # Process training posts into sections (cached per posting version when keys are given)
+            processed_trainings = self.process_training_postings(training_posts, posting_keys)
+            training_sections = list(processed_trainings.values())
+            training_documents = [join_sections(sections) for sections in training_sections]
             
-            # Combine all texts for vectorization
-            all_texts = list(processed_trainings.values()) + [profile_features]
-            
-            # Create TF-IDF matrix with enhanced vectorizer
-            tfidf_matrix = self.vectorizer.fit_transform(all_texts)
+            # Fit a private copy of the vectorizer (the matcher is shared across requests)
+            # on the unweighted training and profile documents
+            vectorizer = fit_section_vectorizer(self.vectorizer, training_documents + [join_sections(profile_sections)])
             
             # Get feature names for semantic analysis
-            feature_names = self.vectorizer.get_feature_names_out()
-            
-            # Calculate skill gap opportunity (new for training recommendations)
-            skill_gap_opportunities = self.calculate_skill_gap_opportunity(
-                profile_features,
-                {t: processed_trainings[t] for t in processed_trainings.keys()},
-                feature_names
-            )
-            
-            # Apply semantic clustering and recency weighting
-            profile_vector = tfidf_matrix[-1:].toarray()[0]
-            training_vectors = tfidf_matrix[:-1].toarray()
+            feature_names = vectorizer.get_feature_names_out()
             
-            # Initialize match scores array
-            match_scores = np.zeros(len(training_vectors))
+            # Weighted sum of the section vectors of every training and of the profile
+            training_matrix = weighted_section_matrix(vectorizer, training_sections, self.section_weights)
+            profile_vector = weighted_section_matrix(
+                vectorizer, [profile_sections], self.profile_section_weights
+            ).toarray()[0]
             
             # Get list of training titles for indexing
             training_titles = list(processed_trainings.keys())
             
-            # Calculate enhanced similarity with multiple factors
-            for i, training_vector in enumerate(training_vectors):
-                # Basic cosine similarity
-                dot_product = np.dot(profile_vector, training_vector)
-                profile_norm = np.linalg.norm(profile_vector)
-                training_norm = np.linalg.norm(training_vector)
+            full_tier = scoring_tier(budget, 'training') == TIER_FULL
+            if not full_tier:
+                # Cosine tier: no boosts and no skill gaps
+                match_scores = cosine_similarities(profile_vector, training_matrix) * 100
+                skill_gap_opportunities = np.zeros(len(training_titles))
+                skill_term_scores = None
+            else:
+                stage_start = time.perf_counter()
                 
-                if profile_norm > 0 and training_norm > 0:
-                    base_similarity = dot_product / (profile_norm * training_norm)
-                else:
-                    base_similarity = 0
+                # Build skill rarity index
+                skill_rarity_index = self.build_skill_rarity_index(
+                    training_documents,
+                    keys_for_titles(posting_keys, processed_trainings)
+                )
                 
-                # Get current training title
-                training_title = training_titles[i]
+                # Recency weights come from one pass over the profile history, then per-term lookups
+                recency_table = self.build_recency_table(profile_data)
                 
-                # Apply skill gap opportunity boost (new for training)
-                skill_gap_info = skill_gap_opportunities.get(training_title, {'score': 0})
-                skill_gap_boost = skill_gap_info['score'] * self.skill_gap_threshold
+                # Per-term cluster and recency boosts, only needed for the profile's own terms
+                term_boosts = profile_term_boosts(
+                    profile_vector,
+                    feature_names,
+                    lambda term: (self.get_semantic_cluster_weight(term) - 1.0)
+                                 + (recency_table.weight(term) - 1.0)
+                )
                 
-                # Apply semantic clustering boost
-                semantic_boost = 1.0
-                boost_count = 0
+                # Basic cosine similarity, the boosts averaged over the terms each training shares with
+                # the profile (capped at 1.5) and the skill gap sums, from one pass over the trainings
+                skill_term_scores = self.skill_gap_term_scores(feature_names, skill_rarity_index)
+                base_similarity, semantic_boost, skill_gaps = score_components(
+                    profile_vector,
+                    training_matrix,
+                    term_boosts,
+                    self.skill_gap_weights(feature_names, skill_term_scores),
+                    max_boost=1.5
+                )
                 
-                for term_idx, term in enumerate(feature_names):
-                    if training_vector[term_idx] > 0 and profile_vector[term_idx] > 0:
-                        # Apply cluster weight
-                        cluster_boost = self.get_semantic_cluster_weight(term) - 1.0
-                        
-                        # Apply recency weight
-                        recency_boost = self.calculate_recency_weight(term, profile_data) - 1.0
-                        
-                        # Add boosts to the total
-                        semantic_boost += cluster_boost + recency_boost
-                        boost_count += 1
+                # Calculate skill gap opportunity (new for training recommendations)
+                skill_gap_opportunities = self.normalized_skill_gaps(skill_gaps)
                 
-                # Normalize semantic boost by the number of matching terms
-                if boost_count > 0:
-                    semantic_boost = 1.0 + (semantic_boost - 1.0) / boost_count
-                    semantic_boost = min(1.5, semantic_boost)  # Cap the boost
+                # Apply skill gap opportunity boost (new for training)
+                skill_gap_boost = skill_gap_opportunities * self.skill_gap_threshold
                 
                 # Calculate final match score
                 base_score = base_similarity * 100  # Scale to percentage-like values
@@ -454,22 +396,24 @@ class TrainingMatcher:
                 
                 # Add skill gap opportunity boost - this is a key difference for training recommendations
                 # We want to recommend trainings that fill skill gaps
-                final_score = boosted_score + (skill_gap_boost * 10)  # Apply skill gap boost
-                
-                match_scores[i] = final_score
-            
-            # Create training-score pairs
-            training_titles = list(processed_trainings.keys())
-            training_scores = list(zip(training_titles, match_scores))
+                match_scores = boosted_score + (skill_gap_boost * 10)  # Apply skill gap boost
+                observe_stage(budget, 'training', stage_start)
             
-            # Sort by score and get top recommendations
-            recommendations = sorted(training_scores, key=lambda x: x[1], reverse=True)[:top_n]
+            # Select the requested page of top recommendations without sorting every training
+            top_rows = top_k_rows(match_scores, top_n, offset)
             
             # Format recommendations with detailed scores
             detailed_recommendations = []
-            for training_title, score in recommendations:
-                # Get skill gap information
-                skill_gap_info = skill_gap_opportunities.get(training_title, {})
+            for row in top_rows:
+                training_title = training_titles[row]
+                score = match_scores[row]
+                
+                # Get skill gap information (only for the recommended trainings, and not at the cosine tier)
+                skill_gap_info = {'new_skills': [], 'relevant_skills': []}
+                if full_tier:
+                    skill_gap_info = self.describe_skill_gap(
+                        profile_vector, training_matrix[row], feature_names, skill_term_scores
+                    )
                 
                 # Ensure scores are positive and capped at 100
                 match_percentage = min(100, max(0, score))
@@ -477,9 +421,9 @@ class TrainingMatcher:
                     'training_title': training_title,
                     'match_score': match_percentage,
                     'training_description': training_posts[training_title],
-                    'skill_gap_opportunity': skill_gap_info.get('score', 0),
-                    'new_skills': skill_gap_info.get('new_skills', []),
-                    'relevant_skills': skill_gap_info.get('relevant_skills', [])
+                    'skill_gap_opportunity': skill_gap_opportunities[row],
+                    'new_skills': skill_gap_info['new_skills'],
+                    'relevant_skills': skill_gap_info['relevant_skills']
                 }
                 detailed_recommendations.append(recommendation)
                 
@@ -637,19 +581,28 @@ class TrainingMatcher:
         with open(filename, 'r') as f:
             return json.load(f)
 
-    def format_recommendations_for_frontend(recommendations, original_training_postings_json):
-        # Create a lookup dictionary for the original training postings using training_id
-        training_lookup = {}
-        for training in original_training_postings_json.get('training_postings', []):
-            training_id = training.get('training_id')
-            if training_id is not None:
-                training_lookup[training_id] = training
+    # Index the original training postings by id
+    def index_postings_by_id(training_postings_json):
+        """Original training postings keyed by training_id"""
+        return {
+            training.get('training_id'): training
+            for training in training_postings_json.get('training_postings', [])
+            if training.get('training_id') is not None
+        }
+
+    def format_recommendations_for_frontend(recommendations, original_training_postings_json, postings_by_id=None, pagination=None):
+        # Lookup dictionary for the original training postings using training_id (built here unless given)
+        training_lookup = postings_by_id
+        if training_lookup is None:
+            training_lookup = TrainingMatcher.index_postings_by_id(original_training_postings_json)
         
         # Format the response
         formatted_response = {
             "success": True,
             "recommendations": []
         }
+        if pagination is not None:
+            formatted_response["pagination"] = pagination
         
         for rec in recommendations:
             # Extract the training_id from the recommendation
@@ -731,7 +684,7 @@ class TrainingMatcher:
         }
 
     # Main function to run the training matching process
-    def run_training_matching(profile_json, training_postings_json, top_n=5, return_json=False):
+    def run_training_matching(profile_json, training_postings_json, top_n=5, return_json=False, offset=0, budget=None):
         # # Load data
         # profile_data = load_profile(profile_file)
         # training_postings_json = load_training_postings(training_postings_file)
@@ -739,11 +692,14 @@ class TrainingMatcher:
         # Transform training postings to the required format, passing training_id
         transformed_trainings, training_id_map = TrainingMatcher.transform_training_postings(training_postings_json, return_id_map=True)
         
-        # Initialize the enhanced training matcher
-        matcher = TrainingMatcher(debug=True)
+        # Preprocessing of unchanged postings is reused across requests, keyed by (training_id, updated_at)
+        posting_keys = posting_version_keys(training_id_map, training_postings_json.get('training_postings', []), 'training_id')
+        
+        # Use the shared, already initialized training matcher
+        matcher = get_shared_matcher(TrainingMatcher)
         
         # Get recommendations
-        recommendations = matcher.get_recommendations(profile_json, transformed_trainings, top_n)
+        recommendations = matcher.get_recommendations(profile_json, transformed_trainings, top_n, posting_keys=posting_keys, offset=offset, budget=budget)
         
         # Add training_id to each recommendation using the training_id_map
         for rec in recommendations:
@@ -752,6 +708,7 @@ class TrainingMatcher:
         
         # Return the appropriate format
         if return_json:
-            return TrainingMatcher.format_recommendations_for_frontend(recommendations, training_postings_json)
+            pagination = {"offset": offset, "top_n": top_n, "total": len(transformed_trainings)}
+            return TrainingMatcher.format_recommendations_for_frontend(recommendations, training_postings_json, pagination=pagination)
         else:
             return recommendations
\ No newline at end of file
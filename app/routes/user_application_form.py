@@ -3,7 +3,8 @@ from app import db
 from flask_httpauth import HTTPBasicAuth
 from app.models import User, PersonalInformation, JobPreference, LanguageProficiency, EducationalBackground, WorkExperience, OtherSkills, ProfessionalLicense, OtherTraining, AcademePersonalInformation, EmployerPersonalInformation
 from datetime import datetime
-from app.utils import get_user_data, exclude_fields, convert_dates
+from app.utils import get_user_data, exclude_fields, convert_dates, bump_posting_catalog_version
+from app.routes.recommendations.recommendation_store import mark_recommendations_stale, recommendation_refresher
 
 auth = HTTPBasicAuth()
 
@@ -159,8 +160,12 @@ def add_or_update_personal_info():
         personal_info.is_4ps_beneficiary = data.get('is_4ps_beneficiary', False)
         personal_info._4ps_household_id_no = data.get('_4ps_household_id_no')
 
+        # Flag the stored recommendations of this user for recomputation (same transaction)
+        mark_recommendations_stale(uid)
+
         # Commit changes to the database
         db.session.commit()
+        recommendation_refresher.enqueue(uid)
 
         # Return the response
         return jsonify({
@@ -334,8 +339,12 @@ def add_update_job_preference():
             db.session.add(job_preference)
             message = "Job preference added successfully"
 
+        # Flag the stored recommendations of this user for recomputation (same transaction)
+        mark_recommendations_stale(uid)
+
         # Commit changes to the database
         db.session.commit()
+        recommendation_refresher.enqueue(uid)
 
         # Return success response
         return jsonify({
@@ -395,7 +404,10 @@ def add_language_proficiency():
                 )
                 db.session.add(new_language_proficiency)
         
+        # Flag the stored recommendations of this user for recomputation (same transaction)
+        mark_recommendations_stale(uid)
         db.session.commit()
+        recommendation_refresher.enqueue(uid)
         return jsonify({"success": True, "message": "All language proficiencies processed successfully"}), 201
     
     except Exception as e:
@@ -564,8 +576,12 @@ def add_educational_background():
             educational_background.field_of_study = data['field_of_study']
             educational_background.program_duration = program_duration
 
+            # Flag the stored recommendations of this user for recomputation (same transaction)
+            mark_recommendations_stale(uid)
+
             # Commit changes to the database
             db.session.commit()
+            recommendation_refresher.enqueue(uid)
 
             # Append success result
             results.append({
@@ -696,7 +712,10 @@ def add_other_training():
                 )
                 db.session.add(new_training)
         
+        # Flag the stored recommendations of this user for recomputation (same transaction)
+        mark_recommendations_stale(uid)
         db.session.commit()
+        recommendation_refresher.enqueue(uid)
         return jsonify({"success": True, "message": "All trainings processed successfully"}), 201
     
     except Exception as e:
@@ -818,8 +837,12 @@ def add_professional_license():
                 db.session.add(new_license)
                 message = "Professional license added successfully"
 
+        # Flag the stored recommendations of this user for recomputation (same transaction)
+        mark_recommendations_stale(uid)
+
         # Commit changes to the database
         db.session.commit()
+        recommendation_refresher.enqueue(uid)
 
         # Return success response
         return jsonify({"success": True, "message": message}), 201
@@ -939,8 +962,12 @@ def add_work_experience():
                 success = True
                 message = "Work experience added successfully"
 
+        # Flag the stored recommendations of this user for recomputation (same transaction)
+        mark_recommendations_stale(uid)
+
         # Commit changes to the database
         db.session.commit()
+        recommendation_refresher.enqueue(uid)
 
         # Return the response
         return jsonify({
@@ -1039,8 +1066,12 @@ def add_other_skills():
                 "message": message
             })
 
+        # Flag the stored recommendations of this user for recomputation (same transaction)
+        mark_recommendations_stale(uid)
+
         # Commit changes to the database
         db.session.commit()
+        recommendation_refresher.enqueue(uid)
 
         # Return the response
         return jsonify({
@@ -1242,6 +1273,7 @@ def add_or_update_employer_personal_info():
             employer_info = EmployerPersonalInformation(user_id=uid)
             db.session.add(employer_info)
             message = "Employer personal information added successfully"
+        previous_industry = employer_info.company_industry
 
         # Update fields
         employer_info.prefix = data.get('prefix', employer_info.prefix)
@@ -1273,6 +1305,11 @@ def add_or_update_employer_personal_info():
         employer_info.landline_number = data.get('landline_number', employer_info.landline_number)
         employer_info.valid_id_url = data.get('valid_id_url', employer_info.valid_id_url)
 
+        # The job posting index caches the company industry of every posting for the
+        # preference filter, so a new industry has to invalidate it
+        if employer_info.company_industry != previous_industry:
+            bump_posting_catalog_version('job')
+
         # Commit changes to the database
         db.session.commit()
 
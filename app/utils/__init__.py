@@ -1,3 +1,3 @@
-from .employer_helper import update_expired_job_postings, update_expired_training_postings, update_expired_scholarship_postings, get_employer_all_jobpostings, get_employer_all_trainingpostings, get_employer_all_scholarshippostings
+from .employer_helper import update_expired_job_postings, update_expired_training_postings, update_expired_scholarship_postings, get_employer_all_jobpostings, get_employer_all_trainingpostings, get_employer_all_scholarshippostings, bump_posting_catalog_version, get_posting_catalog_version, get_active_postings_by_id, build_job_posting_data
 from .user_app_form_helper import get_user_data, exclude_fields, convert, convert_dates
 from .file_upload import upload_to_cloudinary
\ No newline at end of file
@@ -1,10 +1,45 @@
 from app import db
-from app.models import User, EmployerJobPosting, EmployerTrainingPosting, EmployerScholarshipPosting, EmployerPersonalInformation
+from app.models import User, EmployerJobPosting, EmployerTrainingPosting, EmployerScholarshipPosting, EmployerPersonalInformation, PostingCatalogVersion
 from datetime import datetime
+from sqlalchemy.exc import IntegrityError
 from flask import jsonify
 import json
 
 
+# Helper function to bump the catalog version of a posting type
+def bump_posting_catalog_version(posting_type):
+    """
+    Mark the active postings of a type ('job', 'training' or 'scholarship') as changed.
+    Call it before committing any write that creates, updates, expires or deletes a posting
+    so the bump lands in the same transaction and cached recommendation indexes get rebuilt.
+    The first bump of a type inserts its row in a savepoint; when a concurrent first
+    bump inserted it meanwhile, that row is bumped instead.
+    """
+    if _increment_posting_catalog_version(posting_type):
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(PostingCatalogVersion(posting_type=posting_type, version=1))
+    except IntegrityError:
+        _increment_posting_catalog_version(posting_type)
+
+def _increment_posting_catalog_version(posting_type):
+    """Increment the version row of a posting type; False when there is none yet"""
+    updated = (PostingCatalogVersion.query
+               .filter_by(posting_type=posting_type)
+               .update({PostingCatalogVersion.version: PostingCatalogVersion.version + 1},
+                       synchronize_session=False))
+    return updated > 0
+
+# Helper function to read the catalog version of a posting type
+def get_posting_catalog_version(posting_type):
+    """
+    Return the current catalog version of a posting type (0 if it was never bumped).
+    """
+    catalog = db.session.get(PostingCatalogVersion, posting_type)
+    return catalog.version if catalog else 0
+
+
 # Helper function to update expired job postings
 def update_expired_job_postings():
     """
@@ -24,6 +59,7 @@ def update_expired_job_postings():
         
         # Commit changes if any jobs were updated
         if expired_jobs:
+            bump_posting_catalog_version('job')
             db.session.commit()
             
     except Exception as e:
@@ -49,6 +85,7 @@ def update_expired_training_postings():
         
         # Commit changes if any trainings were updated
         if expired_trainings:
+            bump_posting_catalog_version('training')
             db.session.commit()
             
     except Exception as e:
@@ -74,12 +111,66 @@ def update_expired_scholarship_postings():
         
         # Commit changes if any scholarships were updated
         if expired_scholarships:
+            bump_posting_catalog_version('scholarship')
             db.session.commit()
             
     except Exception as e:
         db.session.rollback()
         print(f"Error updating expired scholarship postings: {str(e)}")
 
+# Helper function to combine a job posting with its employer details
+def build_job_posting_data(job):
+    """
+    Job posting and employer details as served to the frontend,
+    or None when the employer information is not available.
+    """
+    # Get employer information
+    employer_info = EmployerPersonalInformation.query.filter_by(user_id=job.user_id).first()
+    
+    # Skip if employer information is not available
+    if not employer_info:
+        return None
+        
+    # Get user information
+    user = User.query.get(job.user_id)
+    
+    if not user:
+        return None
+    
+    # Create a dictionary with job posting and employer details
+    return {
+        "job_id": job.employer_jobpost_id,
+        "job_title": job.job_title,
+        "job_type": job.job_type,
+        "experience_level": job.experience_level,
+        "job_description": job.job_description,
+        "estimated_salary_from": job.estimated_salary_from,
+        "estimated_salary_to": job.estimated_salary_to,
+        "no_of_vacancies": job.no_of_vacancies,
+        "country": job.country,
+        "city_municipality": job.city_municipality,
+        "local_or_overseas": job.local_or_overseas,
+        "other_skills": job.other_skills,
+        "course_name": job.course_name,
+        "training_institution": job.training_institution,
+        "certificate_received": job.certificate_received,
+        "status": job.status,
+        "created_at": job.created_at.strftime('%Y-%m-%d'),
+        "updated_at": job.updated_at.strftime('%Y-%m-%d'),
+        "expiration_date": job.expiration_date.strftime('%Y-%m-%d') if job.expiration_date else None,
+        "employer": {
+            "user_id": job.user_id,
+            "username": user.username,
+            "email": user.email,
+            "company_name": employer_info.company_name if hasattr(employer_info, 'company_name') else None,
+            "company_industry": employer_info.company_industry if hasattr(employer_info, 'company_industry') else None,
+            "contact_number": employer_info.contact_number if hasattr(employer_info, 'contact_number') else None,
+            "address": employer_info.address if hasattr(employer_info, 'address') else None,
+            "website": employer_info.website if hasattr(employer_info, 'website') else None,
+            "company_description": employer_info.company_description if hasattr(employer_info, 'company_description') else None
+        }
+    }
+
 def get_employer_all_jobpostings():
     try:
         # Update expired job postings first
@@ -97,51 +188,11 @@ def get_employer_all_jobpostings():
         
         # For each job posting, get the employer information and combine them
         for job in job_postings:
-            # Get employer information
-            employer_info = EmployerPersonalInformation.query.filter_by(user_id=job.user_id).first()
-            
-            # Skip if employer information is not available
-            if not employer_info:
-                continue
-                
-            # Get user information
-            user = User.query.get(job.user_id)
-            
-            if not user:
+            # Combine the job posting with its employer details (skipped when unavailable)
+            job_data = build_job_posting_data(job)
+            if job_data is None:
                 continue
             
-            # Create a dictionary with job posting and employer details
-            job_data = {
-                "job_id": job.employer_jobpost_id,
-                "job_title": job.job_title,
-                "job_type": job.job_type,
-                "experience_level": job.experience_level,
-                "job_description": job.job_description,
-                "estimated_salary_from": job.estimated_salary_from,
-                "estimated_salary_to": job.estimated_salary_to,
-                "no_of_vacancies": job.no_of_vacancies,
-                "country": job.country,
-                "city_municipality": job.city_municipality,
-                "other_skills": job.other_skills,
-                "course_name": job.course_name,
-                "training_institution": job.training_institution,
-                "certificate_received": job.certificate_received,
-                "status": job.status,
-                "created_at": job.created_at.strftime('%Y-%m-%d'),
-                "updated_at": job.updated_at.strftime('%Y-%m-%d'),
-                "expiration_date": job.expiration_date.strftime('%Y-%m-%d') if job.expiration_date else None,
-                "employer": {
-                    "user_id": job.user_id,
-                    "username": user.username,
-                    "email": user.email,
-                    "company_name": employer_info.company_name if hasattr(employer_info, 'company_name') else None,
-                    "contact_number": employer_info.contact_number if hasattr(employer_info, 'contact_number') else None,
-                    "address": employer_info.address if hasattr(employer_info, 'address') else None,
-                    "website": employer_info.website if hasattr(employer_info, 'website') else None,
-                    "company_description": employer_info.company_description if hasattr(employer_info, 'company_description') else None
-                }
-            }
-            
             result.append(job_data)
             
         return json.dumps({
@@ -152,6 +203,46 @@ def get_employer_all_jobpostings():
         # Handle unexpected errors
         return jsonify({"error": str(e)}), 500
 
+# Helper function to combine a training posting with its employer details
+def build_training_posting_data(training):
+    """
+    Training posting and employer details as served to the frontend,
+    or None when the employer information is not available.
+    """
+    # Get employer information
+    employer_info = EmployerPersonalInformation.query.filter_by(user_id=training.user_id).first()
+    
+    # Skip if employer information is not available
+    if not employer_info:
+        return None
+        
+    # Get user information
+    user = User.query.get(training.user_id)
+    
+    if not user:
+        return None
+    
+    # Create a dictionary with training posting and employer details based on actual model fields
+    return {
+        "training_id": training.employer_trainingpost_id,
+        "training_title": training.training_title,
+        "training_description": training.training_description,
+        "status": training.status,
+        "created_at": training.created_at.strftime('%Y-%m-%d'),
+        "updated_at": training.updated_at.strftime('%Y-%m-%d'),
+        "expiration_date": training.expiration_date.strftime('%Y-%m-%d') if training.expiration_date else None,
+        "employer": {
+            "user_id": training.user_id,
+            "username": user.username,
+            "email": user.email,
+            "company_name": employer_info.company_name if hasattr(employer_info, 'company_name') else None,
+            "contact_number": employer_info.contact_number if hasattr(employer_info, 'contact_number') else None,
+            "address": employer_info.address if hasattr(employer_info, 'address') else None,
+            "website": employer_info.website if hasattr(employer_info, 'website') else None,
+            "company_description": employer_info.company_description if hasattr(employer_info, 'company_description') else None
+        }
+    }
+
 def get_employer_all_trainingpostings():
     try:
         # Update expired training postings first
@@ -169,40 +260,11 @@ def get_employer_all_trainingpostings():
         
         # For each training posting, get the employer information and combine them
         for training in training_postings:
-            # Get employer information
-            employer_info = EmployerPersonalInformation.query.filter_by(user_id=training.user_id).first()
-            
-            # Skip if employer information is not available
-            if not employer_info:
-                continue
-                
-            # Get user information
-            user = User.query.get(training.user_id)
-            
-            if not user:
+            # Combine the training posting with its employer details (skipped when unavailable)
+            training_data = build_training_posting_data(training)
+            if training_data is None:
                 continue
             
-            # Create a dictionary with training posting and employer details based on actual model fields
-            training_data = {
-                "training_id": training.employer_trainingpost_id,
-                "training_title": training.training_title,
-                "training_description": training.training_description,
-                "status": training.status,
-                "created_at": training.created_at.strftime('%Y-%m-%d'),
-                "updated_at": training.updated_at.strftime('%Y-%m-%d'),
-                "expiration_date": training.expiration_date.strftime('%Y-%m-%d') if training.expiration_date else None,
-                "employer": {
-                    "user_id": training.user_id,
-                    "username": user.username,
-                    "email": user.email,
-                    "company_name": employer_info.company_name if hasattr(employer_info, 'company_name') else None,
-                    "contact_number": employer_info.contact_number if hasattr(employer_info, 'contact_number') else None,
-                    "address": employer_info.address if hasattr(employer_info, 'address') else None,
-                    "website": employer_info.website if hasattr(employer_info, 'website') else None,
-                    "company_description": employer_info.company_description if hasattr(employer_info, 'company_description') else None
-                }
-            }
-            
             result.append(training_data)
         
         return {"training_postings": result}, 200  # Return dictionary
@@ -211,6 +273,47 @@ def get_employer_all_trainingpostings():
         # Handle unexpected errors
         return {"error": str(e)}, 500  # Return dictionary
 
+# Helper function to combine a scholarship posting with its employer details
+def build_scholarship_posting_data(scholarship):
+    """
+    Scholarship posting and employer details as served to the frontend,
+    or None when the employer information is not available.
+    """
+    # Get employer information
+    employer_info = EmployerPersonalInformation.query.filter_by(user_id=scholarship.user_id).first()
+    
+    # Skip if employer information is not available
+    if not employer_info:
+        return None
+    
+    # Get user information
+    user = User.query.get(scholarship.user_id)
+    if not user:
+        return None
+    
+    # Create a dictionary with scholarship posting and employer details based on actual model fields
+    return {
+        "scholarship_id": scholarship.employer_scholarshippost_id,
+        "scholarship_title": scholarship.scholarship_title,
+        "scholarship_description": scholarship.scholarship_description,
+        "slots": scholarship.slots,
+        "occupied_slots": scholarship.occupied_slots,
+        "status": scholarship.status,
+        "created_at": scholarship.created_at.strftime('%Y-%m-%d'),
+        "updated_at": scholarship.updated_at.strftime('%Y-%m-%d'),
+        "expiration_date": scholarship.expiration_date.strftime('%Y-%m-%d') if scholarship.expiration_date else None,
+        "employer": {
+            "user_id": scholarship.user_id,
+            "username": user.username,
+            "email": user.email,
+            "company_name": employer_info.company_name if hasattr(employer_info, 'company_name') else None,
+            "contact_number": employer_info.contact_number if hasattr(employer_info, 'contact_number') else None,
+            "address": employer_info.address if hasattr(employer_info, 'address') else None,
+            "website": employer_info.website if hasattr(employer_info, 'website') else None,
+            "company_description": employer_info.company_description if hasattr(employer_info, 'company_description') else None
+        }
+    }
+
 def get_employer_all_scholarshippostings():
     try:
         # Update expired scholarship postings first
@@ -228,44 +331,43 @@ def get_employer_all_scholarshippostings():
         
         # For each scholarship posting, get the employer information and combine them
         for scholarship in scholarship_postings:
-            # Get employer information
-            employer_info = EmployerPersonalInformation.query.filter_by(user_id=scholarship.user_id).first()
-            
-            # Skip if employer information is not available
-            if not employer_info:
-                continue
-            
-            # Get user information
-            user = User.query.get(scholarship.user_id)
-            if not user:
+            # Combine the scholarship posting with its employer details (skipped when unavailable)
+            scholarship_data = build_scholarship_posting_data(scholarship)
+            if scholarship_data is None:
                 continue
             
-            # Create a dictionary with scholarship posting and employer details based on actual model fields
-            scholarship_data = {
-                "scholarship_id": scholarship.employer_scholarshippost_id,
-                "scholarship_title": scholarship.scholarship_title,
-                "scholarship_description": scholarship.scholarship_description,
-                "slots": scholarship.slots,
-                "occupied_slots": scholarship.occupied_slots,
-                "status": scholarship.status,
-                "created_at": scholarship.created_at.strftime('%Y-%m-%d'),
-                "updated_at": scholarship.updated_at.strftime('%Y-%m-%d'),
-                "expiration_date": scholarship.expiration_date.strftime('%Y-%m-%d') if scholarship.expiration_date else None,
-                "employer": {
-                    "user_id": scholarship.user_id,
-                    "username": user.username,
-                    "email": user.email,
-                    "company_name": employer_info.company_name if hasattr(employer_info, 'company_name') else None,
-                    "contact_number": employer_info.contact_number if hasattr(employer_info, 'contact_number') else None,
-                    "address": employer_info.address if hasattr(employer_info, 'address') else None,
-                    "website": employer_info.website if hasattr(employer_info, 'website') else None,
-                    "company_description": employer_info.company_description if hasattr(employer_info, 'company_description') else None
-                }
-            }
             result.append(scholarship_data)
         
         return {"scholarship_postings": result}, 200  # Return dictionary
     
     except Exception as e:
         # Handle unexpected errors
-        return {"error": str(e)}, 500  # Return dictionary
\ No newline at end of file
+        return {"error": str(e)}, 500  # Return dictionary
+
+# Posting model, id column and formatter of each posting type
+POSTING_TYPES = {
+    'job': (EmployerJobPosting, 'employer_jobpost_id', build_job_posting_data),
+    'training': (EmployerTrainingPosting, 'employer_trainingpost_id', build_training_posting_data),
+    'scholarship': (EmployerScholarshipPosting, 'employer_scholarshippost_id', build_scholarship_posting_data)
+}
+
+# Helper function to load a few active postings by id
+def get_active_postings_by_id(posting_type, posting_ids):
+    """
+    Active postings of a type ('job', 'training' or 'scholarship') with the given ids,
+    formatted like get_employer_all_*postings and keyed by id.
+    """
+    model, id_column, build_posting_data = POSTING_TYPES[posting_type]
+    if not posting_ids:
+        return {}
+    
+    postings = (model.query
+                .filter(getattr(model, id_column).in_(posting_ids), model.status == 'active')
+                .all())
+    
+    result = {}
+    for posting in postings:
+        posting_data = build_posting_data(posting)
+        if posting_data is not None:
+            result[getattr(posting, id_column)] = posting_data
+    return result
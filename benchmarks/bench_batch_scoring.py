@@ -0,0 +1,55 @@
+# bench_batch_scoring.py - Profiles per minute of batch scoring versus one get_recommendations call per profile
+#
+# Usage (from the repository root):
+#     python -m benchmarks.bench_batch_scoring [profiles] [postings]
+#
+# Both paths score against the same prefitted posting index, so the per-profile
+# loop is already faster than the original one-request-per-user flow (which also
+# refitted TF-IDF each time). The top-k scores of both paths are compared.
+import sys
+import time
+import numpy as np
+
+from app.routes.recommendations.job_reco_model.job_matching import build_job_posting_index
+from app.routes.recommendations.job_reco_model.job_matcher import NoveltyEnhancedJobMatcher
+from benchmarks.synthetic import generate_job_postings, generate_profile
+
+TOP_N = 10
+BATCH_SIZE = 256
+
+
+def run(profile_count, posting_count):
+    matcher = NoveltyEnhancedJobMatcher(debug=False)
+    posting_index = build_job_posting_index(generate_job_postings(posting_count), matcher=matcher)
+    profiles = [generate_profile(seed=seed) for seed in range(profile_count)]
+
+    start = time.perf_counter()
+    expected = [matcher.get_recommendations(profile, top_n=TOP_N, posting_index=posting_index) for profile in profiles]
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = []
+    for batch_start in range(0, profile_count, BATCH_SIZE):
+        actual.extend(matcher.get_batch_recommendations(
+            profiles[batch_start:batch_start + BATCH_SIZE], posting_index, top_n=TOP_N
+        ))
+    batch_time = time.perf_counter() - start
+
+    # Both sum float32 posting weights, in a different order
+    equal = all(
+        np.allclose([rec['match_score'] for rec in single], scores, atol=1e-5)
+        for single, (_, scores) in zip(expected, actual)
+    )
+
+    print(f"{profile_count} profiles x {posting_count} postings, top {TOP_N}, batches of {BATCH_SIZE}")
+    print(f"{'variant':>12} {'time (s)':>10} {'profiles/min':>14} {'speedup':>9}")
+    for name, elapsed in [('per profile', loop_time), ('batch', batch_time)]:
+        print(f"{name:>12} {elapsed:>10.2f} {profile_count / elapsed * 60:>14.0f} {loop_time / elapsed:>8.1f}x")
+    print(f"equal scores: {equal}")
+    if not equal:
+        raise SystemExit("Batch scores differ from get_recommendations")
+
+
+if __name__ == '__main__':
+    arguments = [int(argument) for argument in sys.argv[1:]]
+    run(arguments[0] if arguments else 2000, arguments[1] if len(arguments) > 1 else 5000)
@@ -0,0 +1,66 @@
+# bench_hashed_features.py - Fitted TF-IDF vocabulary vs hashed features with a document-frequency array
+#
+# Usage (from the repository root):
+#     python -m benchmarks.bench_hashed_features [sizes...]
+#
+# For each catalog size: time and peak traced memory of building the job posting
+# index in both modes (fresh matchers, so no preprocessing is cached), time to add
+# 1% new postings (full refit vs hashed update), and the overlap of the top 10
+# recommendations of both modes over a few profiles.
+import sys
+import time
+import tracemalloc
+
+from app.routes.recommendations.job_reco_model.job_matching import build_job_posting_index
+from app.routes.recommendations.job_reco_model.job_matcher import NoveltyEnhancedJobMatcher
+from benchmarks.synthetic import generate_job_postings, generate_profile
+
+HASH_FEATURES = 2 ** 18
+
+
+def traced_build(payload, matcher, base_index=None):
+    """(index, seconds, peak traced MB) of one index build"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    posting_index = build_job_posting_index(payload, matcher=matcher, base_index=base_index)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return posting_index, elapsed, peak / 2 ** 20
+
+
+def top_ids(matcher, posting_index, profile):
+    return [rec['job_id'] for rec in matcher.get_recommendations(profile, top_n=10, posting_index=posting_index)]
+
+
+def run(sizes):
+    profiles = [generate_profile(seed) for seed in range(10)]
+
+    print(f"{'postings':>9} {'mode':>8} {'build (s)':>10} {'peak MB':>8} {'+1% (s)':>8} {'+1% peak MB':>12} {'top-10 overlap':>15}")
+    for size in sizes:
+        payload = generate_job_postings(size)
+        grown = generate_job_postings(size + max(1, size // 100))
+
+        tfidf_matcher = NoveltyEnhancedJobMatcher(debug=False)
+        hashed_matcher = NoveltyEnhancedJobMatcher(debug=False)
+        hashed_matcher.use_hashed_features(HASH_FEATURES)
+
+        results = {}
+        for mode, matcher in (('tfidf', tfidf_matcher), ('hashing', hashed_matcher)):
+            posting_index, build_time, build_peak = traced_build(payload, matcher)
+            # Adding postings: a full refit for the vocabulary, an update of the hashed index
+            _, update_time, update_peak = traced_build(grown, matcher, base_index=posting_index)
+            results[mode] = (posting_index, build_time, build_peak, update_time, update_peak)
+
+        overlaps = [
+            len(set(top_ids(tfidf_matcher, results['tfidf'][0], profile))
+                & set(top_ids(hashed_matcher, results['hashing'][0], profile))) / 10
+            for profile in profiles
+        ]
+        for mode, (_, build_time, build_peak, update_time, update_peak) in results.items():
+            overlap = f"{sum(overlaps) / len(overlaps):.0%}" if mode == 'hashing' else ''
+            print(f"{size:>9} {mode:>8} {build_time:>10.2f} {build_peak:>8.0f} {update_time:>8.2f} {update_peak:>12.0f} {overlap:>15}")
+
+
+if __name__ == '__main__':
+    run([int(size) for size in sys.argv[1:]] or [1000, 5000, 20000])
@@ -0,0 +1,91 @@
+# bench_inverted_index.py - Pruned top-k over the inverted index versus scoring every posting
+#
+# Usage (from the repository root):
+#     python -m benchmarks.bench_inverted_index [postings] [profiles]
+#
+# Postings come from generate_domain_job_postings, where each posting has the skill
+# words of one of many domains (as in a real catalog, most postings share no skill
+# term with a given profile). Fitting the index over 100k postings takes a few
+# minutes; only the scoring of each profile is timed. Both paths must return the
+# same postings with the same scores.
+import sys
+import time
+import numpy as np
+
+from app.routes.recommendations.job_reco_model.job_matching import build_job_posting_index
+from app.routes.recommendations.job_reco_model.job_matcher import NoveltyEnhancedJobMatcher
+from app.routes.recommendations.scoring import profile_term_boosts, top_k_rows
+from benchmarks.synthetic import generate_domain_job_postings, generate_domain_profile
+
+TOP_N = 10
+
+
+def profile_scoring_inputs(matcher, posting_index, profile_data):
+    """Profile vector and per-term boosts, as computed by get_recommendations"""
+    profile_sections = matcher.extract_profile_sections(profile_data)
+    profile_vector = posting_index.section_vectors.combine(profile_sections, matcher.profile_section_weights)
+    recency_table = matcher.build_recency_table(profile_data)
+    term_boosts = profile_term_boosts(
+        profile_vector,
+        posting_index.feature_names,
+        lambda term: recency_table.weight(term) - 1.0
+    )
+    term_boosts += np.where(profile_vector > 0, posting_index.cluster_weights - 1.0, 0.0)
+    return profile_vector, term_boosts
+
+
+def run(posting_count, profile_count):
+    matcher = NoveltyEnhancedJobMatcher(debug=False)
+
+    start = time.perf_counter()
+    posting_index = build_job_posting_index(generate_domain_job_postings(posting_count), matcher=matcher)
+    build_time = time.perf_counter() - start
+
+    job_matrix = posting_index.matrix
+    inputs = [
+        profile_scoring_inputs(matcher, posting_index, generate_domain_profile(seed=seed))
+        for seed in range(profile_count)
+    ]
+
+    # Brute force: score every posting, then select the top rows
+    start = time.perf_counter()
+    expected = []
+    for profile_vector, term_boosts in inputs:
+        scores = matcher.score_jobs(profile_vector, job_matrix, term_boosts, posting_index.gap_weights)
+        rows = top_k_rows(scores, TOP_N)
+        expected.append((rows, scores[rows]))
+    brute_time = time.perf_counter() - start
+
+    # Pruned: only the candidates that could still reach the top TOP_N are scored
+    scored_rows = []
+    start = time.perf_counter()
+    actual = []
+    for profile_vector, term_boosts in inputs:
+        def score_rows(rows):
+            scored_rows.append(len(rows))
+            return matcher.score_jobs(profile_vector, job_matrix[rows], term_boosts, posting_index.gap_weights)
+        actual.append(posting_index.inverted_index.top_k(
+            profile_vector, TOP_N, score_rows, score_bound=100 * matcher.max_semantic_boost
+        ))
+    pruned_time = time.perf_counter() - start
+
+    fallbacks = sum(result is None for result in actual)
+    equal = all(
+        result is None or (np.array_equal(result[0], rows) and np.allclose(result[1], scores, atol=1e-5))
+        for result, (rows, scores) in zip(actual, expected)
+    )
+
+    print(f"{job_matrix.shape[0]} postings x {job_matrix.shape[1]} features (index fitted in {build_time:.0f}s), "
+          f"{profile_count} profiles, top {TOP_N}")
+    print(f"{'variant':>12} {'ms/profile':>11} {'rows scored/profile':>20} {'speedup':>9}")
+    print(f"{'brute force':>12} {brute_time / profile_count * 1000:>11.2f} {job_matrix.shape[0]:>20} {1:>8.1f}x")
+    print(f"{'pruned':>12} {pruned_time / profile_count * 1000:>11.2f} "
+          f"{sum(scored_rows) / profile_count:>20.0f} {brute_time / pruned_time:>8.1f}x")
+    print(f"fallbacks to brute force: {fallbacks}, equal results: {equal}")
+    if not equal:
+        raise SystemExit("Pruned top-k differs from brute force")
+
+
+if __name__ == '__main__':
+    arguments = [int(argument) for argument in sys.argv[1:]]
+    run(arguments[0] if arguments else 100000, arguments[1] if len(arguments) > 1 else 200)
@@ -0,0 +1,66 @@
+# bench_latency_tiers.py - Full and cosine scoring tiers of job recommendations under a latency budget
+#
+# Usage (from the repository root):
+#     python -m benchmarks.bench_latency_tiers [sizes...]
+#
+# For each catalog size: time per request of get_recommendations at the full tier
+# (no budget) and at the cosine tier (an exhausted budget), and the overlap of
+# their top 10 jobs over a few profiles. Also checks that the cosine tier returns
+# the best postings by cosine similarity, scored over every posting.
+import sys
+import time
+import numpy as np
+
+from app.routes.recommendations.job_reco_model.job_matching import build_job_posting_index
+from app.routes.recommendations.job_reco_model.job_matcher import NoveltyEnhancedJobMatcher
+from app.routes.recommendations.latency_budget import LatencyBudget, LatencyMetrics, TIER_COSINE
+from app.routes.recommendations.scoring import cosine_similarities
+from benchmarks.synthetic import generate_job_postings, generate_profile
+
+TOP_N = 10
+
+
+def run(sizes):
+    matcher = NoveltyEnhancedJobMatcher(debug=False)
+    profiles = [generate_profile(seed) for seed in range(10)]
+    metrics = LatencyMetrics()
+
+    print(f"{'postings':>9} {'full ms':>8} {'cosine ms':>10} {'speedup':>8} {'top-10 overlap':>15}")
+    mismatches = []
+    for size in sizes:
+        posting_index = build_job_posting_index(generate_job_postings(size), matcher=matcher)
+        full_time = cosine_time = 0.0
+        overlaps = []
+        for profile in profiles:
+            start = time.perf_counter()
+            full = matcher.get_recommendations(profile, top_n=TOP_N, posting_index=posting_index)
+            full_time += time.perf_counter() - start
+
+            # A budget already used up leaves no time for the boosts
+            budget = LatencyBudget(1e-6, metrics)
+            start = time.perf_counter()
+            cosine = matcher.get_recommendations(profile, top_n=TOP_N, posting_index=posting_index, budget=budget)
+            cosine_time += time.perf_counter() - start
+            assert budget.tier('job') == TIER_COSINE
+
+            profile_vector = posting_index.section_vectors.combine(
+                matcher.extract_profile_sections(profile), matcher.profile_section_weights
+            )
+            similarities = cosine_similarities(profile_vector, posting_index.matrix) * 100
+            expected = np.sort(np.minimum(similarities, 100))[::-1][:TOP_N]
+            if not np.allclose([rec['match_score'] for rec in cosine], expected, rtol=1e-6, atol=1e-5):
+                mismatches.append(size)
+
+            overlaps.append(len({rec['job_id'] for rec in full} & {rec['job_id'] for rec in cosine}) / TOP_N)
+
+        full_ms = full_time / len(profiles) * 1000
+        cosine_ms = cosine_time / len(profiles) * 1000
+        print(f"{size:>9} {full_ms:>8.1f} {cosine_ms:>10.1f} {full_ms / cosine_ms:>7.1f}x "
+              f"{sum(overlaps) / len(overlaps):>15.0%}")
+
+    if mismatches:
+        raise SystemExit(f"Cosine tier scores differ from the cosine similarities at {sorted(set(mismatches))} postings")
+
+
+if __name__ == '__main__':
+    run([int(size) for size in sys.argv[1:]] or [1000, 5000, 20000])
@@ -0,0 +1,144 @@
+# bench_matching_pool.py - p99 latency of mixed recommendation and CRUD traffic, with and without the matching pool
+#
+# Usage (from the repository root):
+#     python -m benchmarks.bench_matching_pool [postings] [seconds] [processes]
+#
+# Emulates one threaded server process: SERVER_THREADS request threads serve
+# CLIENTS closed-loop clients for the given number of seconds. RECOMMENDATION_SHARE
+# of the requests are recommendations (job, training or scholarship, in turn) for
+# a catalog of the given size; the others are CRUD requests (a short database wait
+# plus serializing a posting). Recommendations run in the request thread ("threads")
+# or on a MatchingService of the given number of processes ("pool"). Reports the
+# p50/p99 latency of both request types; recommendation responses must match.
+import json
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from app.routes.recommendations.job_reco_model.job_matching import job_posting_index, use_job_posting_snapshots
+from app.routes.recommendations.matching_service import MatchingService, run_matcher
+from benchmarks.synthetic import generate_job_postings, generate_profile
+
+SERVER_THREADS = 4
+CLIENTS = 8
+RECOMMENDATION_SHARE = 0.1
+
+# Database round trip of a CRUD request (seconds)
+CRUD_WAIT = 0.002
+
+CATALOG_VERSION = 1
+
+
+def kind_payloads(size):
+    """Postings of every kind: jobs as a loader (indexed once), trainings and scholarships as payloads"""
+    jobs = generate_job_postings(size)['job_postings']
+    trainings = {'training_postings': [
+        {**job, 'training_id': job['job_id'], 'training_title': f"{job['job_title']} {job['job_id']}",
+         'training_description': job['job_description']}
+        for job in jobs
+    ]}
+    scholarships = {'scholarship_postings': [
+        {**job, 'scholarship_id': job['job_id'], 'scholarship_title': f"{job['job_title']} {job['job_id']}",
+         'scholarship_description': job['job_description']}
+        for job in jobs
+    ]}
+    return {'job': lambda: {'job_postings': jobs}, 'training': trainings, 'scholarship': scholarships}
+
+
+def percentile(values, share):
+    return float(np.percentile(values, share * 100)) if values else 0.0
+
+
+def crud_request(posting):
+    time.sleep(CRUD_WAIT)
+    return json.loads(json.dumps(posting))
+
+
+def run_mode(recommend, payloads, seconds):
+    """{request type: latencies (ms)} of one mode"""
+    server = ThreadPoolExecutor(max_workers=SERVER_THREADS)
+    latencies = {'recommendation': [], 'crud': []}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    kinds = ['job', 'training', 'scholarship']
+    posting = payloads['training']['training_postings'][0]
+
+    def client(number):
+        rng = random.Random(number)
+        turn = number
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            if rng.random() < RECOMMENDATION_SHARE:
+                kind = kinds[turn % len(kinds)]
+                turn += 1
+                server.submit(recommend, kind, generate_profile(turn % 10)).result()
+                request_type = 'recommendation'
+            else:
+                server.submit(crud_request, posting).result()
+                request_type = 'crud'
+            with lock:
+                latencies[request_type].append((time.perf_counter() - start) * 1000)
+
+    clients = [threading.Thread(target=client, args=(number,)) for number in range(CLIENTS)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    server.shutdown()
+    return latencies
+
+
+def run(size, seconds, processes):
+    payloads = kind_payloads(size)
+
+    # The pool's workers map the job posting index from snapshots published by this process
+    snapshot_dir = tempfile.mkdtemp(prefix="bench-snapshots-")
+    use_job_posting_snapshots(snapshot_dir)
+    job_posting_index.get(CATALOG_VERSION, payloads['job'])
+
+    service = MatchingService(processes, queue_depth=SERVER_THREADS, settings={
+        'scoring_backend': 'auto', 'featurization': 'tfidf', 'hash_features': 2 ** 18,
+        'snapshot_dir': snapshot_dir, 'snapshot_keep': 3
+    })
+    service.start()
+
+    def in_thread(kind, profile):
+        return run_matcher(kind, profile, payloads[kind], CATALOG_VERSION, 10)
+
+    def on_pool(kind, profile):
+        return service.match(kind, profile, payloads[kind], CATALOG_VERSION, 10)
+
+    # Same rankings both ways (this also warms up the workers before timing)
+    mismatches = 0
+    for kind in ('job', 'training', 'scholarship'):
+        for _ in range(processes):
+            expected, actual = in_thread(kind, generate_profile(1)), on_pool(kind, generate_profile(1))
+            id_key = f"{kind}_id"
+            mismatches += [rec[f"{kind}_posting"][id_key] for rec in expected['recommendations']] != \
+                          [rec[f"{kind}_posting"][id_key] for rec in actual['recommendations']]
+
+    print(f"{size} postings, {SERVER_THREADS} server threads, {CLIENTS} clients, "
+          f"{RECOMMENDATION_SHARE:.0%} recommendations, {seconds}s per mode, {processes} processes")
+    print(f"{'mode':>8} {'requests':>9} {'reco p50':>9} {'reco p99':>9} {'crud p50':>9} {'crud p99':>9}  (ms)")
+    for name, recommend in (('threads', in_thread), ('pool', on_pool)):
+        latencies = run_mode(recommend, payloads, seconds)
+        recommendations, crud = latencies['recommendation'], latencies['crud']
+        print(f"{name:>8} {len(recommendations) + len(crud):>9} "
+              f"{percentile(recommendations, 0.5):>9.1f} {percentile(recommendations, 0.99):>9.1f} "
+              f"{percentile(crud, 0.5):>9.1f} {percentile(crud, 0.99):>9.1f}")
+    print(f"pool: {service.stats()}")
+    if mismatches:
+        raise SystemExit(f"Pool rankings differ from in-thread rankings ({mismatches} mismatches)")
+
+
+if __name__ == '__main__':
+    arguments = [int(argument) for argument in sys.argv[1:]]
+    run(
+        arguments[0] if arguments else 1000,
+        arguments[1] if len(arguments) > 1 else 30,
+        arguments[2] if len(arguments) > 2 else 2
+    )
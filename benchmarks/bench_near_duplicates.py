@@ -0,0 +1,73 @@
+# bench_near_duplicates.py - MinHash/LSH detection of reposted job postings
+#
+# Usage (from the repository root):
+#     python -m benchmarks.bench_near_duplicates [sizes...]
+#
+# For each catalog size, REPOST_SHARE of the postings are reposted by the same
+# employer with a few words changed. Reports the time to sign and cluster all
+# postings, how many reposts were found (recall), how many clustered pairs were
+# not reposts (false pairs) and how much smaller the corpus the matchers score gets.
+import random
+import sys
+import time
+
+from app.routes.recommendations.near_duplicates import DuplicateIndex, minhash_signature, posting_text
+from benchmarks.synthetic import generate_job_postings
+
+REPOST_SHARE = 0.2
+
+# Words of the description replaced in a repost
+EDITED_WORDS = 3
+
+
+def with_reposts(postings, seed=0):
+    """postings plus edited copies of REPOST_SHARE of them, and the (original, repost) id pairs"""
+    rng = random.Random(seed)
+    reposts, pairs = [], []
+    next_id = max(posting['job_id'] for posting in postings) + 1
+    for posting in rng.sample(postings, int(len(postings) * REPOST_SHARE)):
+        words = posting['job_description'].split()
+        for _ in range(EDITED_WORDS):
+            words[rng.randrange(len(words))] = rng.choice(['urgent', 'hiring', 'immediately', 'new', 'apply'])
+        reposts.append({**posting, 'job_id': next_id, 'job_description': ' '.join(words)})
+        pairs.append((posting['job_id'], next_id))
+        next_id += 1
+    return postings + reposts, pairs
+
+
+def run(sizes):
+    print(f"{'postings':>9} {'sign (s)':>9} {'cluster (s)':>12} {'recall':>7} {'false pairs':>12} {'scored':>7}")
+    for size in sizes:
+        postings, pairs = with_reposts(generate_job_postings(size)['job_postings'])
+        # Synthetic employers: the company of every posting
+        employers = {posting['job_id']: posting['employer']['company_name'] for posting in postings}
+
+        start = time.perf_counter()
+        signatures = {posting['job_id']: minhash_signature(posting_text('job', posting)) for posting in postings}
+        sign_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = DuplicateIndex(threshold=0.8)
+        for posting_id, signature in signatures.items():
+            index.add(posting_id, signature, group=employers[posting_id])
+        clusters = index.clusters()
+        cluster_time = time.perf_counter() - start
+
+        cluster_of = {posting_id: number for number, cluster in enumerate(clusters) for posting_id in cluster}
+        found = sum(
+            original in cluster_of and cluster_of.get(original) == cluster_of.get(repost)
+            for original, repost in pairs
+        )
+        expected = {frozenset(pair) for pair in pairs}
+        false_pairs = sum(
+            frozenset((first, second)) not in expected
+            for cluster in clusters for i, first in enumerate(cluster) for second in cluster[i + 1:]
+        )
+        scored = len(postings) - sum(len(cluster) - 1 for cluster in clusters)
+
+        print(f"{len(postings):>9} {sign_time:>9.2f} {cluster_time:>12.2f} {found / len(pairs):>7.0%} "
+              f"{false_pairs:>12} {scored / len(postings):>7.0%}")
+
+
+if __name__ == '__main__':
+    run([int(size) for size in sys.argv[1:]] or [1000, 5000, 20000])
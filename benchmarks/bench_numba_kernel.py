@@ -0,0 +1,87 @@
+# bench_numba_kernel.py - Python loop vs NumPy vs numba for the per-posting score math
+#
+# Usage (from the repository root):
+#     python -m benchmarks.bench_numba_kernel [sizes...]
+#
+# Times the cosine / shared-term boost / gap penalty combination of
+# NoveltyEnhancedJobMatcher.score_jobs on each backend and checks that they agree.
+# The Python loop is only run up to LOOP_MAX_POSTINGS postings.
+import sys
+import time
+import numpy as np
+
+from app.routes.recommendations.job_reco_model.job_matching import build_job_posting_index
+from app.routes.recommendations.job_reco_model.job_matcher import NoveltyEnhancedJobMatcher
+from app.routes.recommendations.scoring import profile_term_boosts, select_scoring_backend, gap_scores
+from app.routes.recommendations import numba_kernels
+from benchmarks.bench_scoring_kernel import legacy_scores
+from benchmarks.synthetic import generate_job_postings, generate_profile
+
+LOOP_MAX_POSTINGS = 1000
+
+# Timed repetitions of the NumPy and numba kernels (best run is reported)
+REPEATS = 5
+
+
+def best_time(function, repeats=REPEATS):
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(sizes):
+    matcher = NoveltyEnhancedJobMatcher(debug=False)
+    profile_data = generate_profile()
+    profile_sections = matcher.extract_profile_sections(profile_data)
+    backends = ['numpy'] + (['numba'] if numba_kernels.AVAILABLE else [])
+    for backend in backends:
+        select_scoring_backend(backend)
+
+    print(f"{'postings':>10} {'nnz':>10} {'loop (ms)':>10} {'numpy (ms)':>11} {'numba (ms)':>11}  equal")
+    for size in sizes:
+        posting_index = build_job_posting_index(generate_job_postings(size), matcher=matcher)
+        feature_names = posting_index.feature_names
+        job_matrix = posting_index.matrix
+        profile_vector = posting_index.section_vectors.combine(profile_sections, matcher.profile_section_weights)
+        recency_table = matcher.build_recency_table(profile_data)
+        term_boosts = profile_term_boosts(profile_vector, feature_names, lambda term: recency_table.weight(term) - 1.0)
+        term_boosts += np.where(profile_vector > 0, posting_index.cluster_weights - 1.0, 0.0)
+
+        def score(backend):
+            select_scoring_backend(backend)
+            return matcher.score_jobs(profile_vector, job_matrix, term_boosts, posting_index.gap_weights)
+
+        timings = {}
+        results = {}
+        for backend in backends:
+            timings[backend], results[backend] = best_time(lambda: score(backend))
+
+        if size <= LOOP_MAX_POSTINGS:
+            # Gap penalty per job, as the original loop received it
+            penalties = gap_scores(profile_vector, job_matrix, posting_index.gap_weights * 0.1) * 0.02
+            start = time.perf_counter()
+            expected = np.array([
+                legacy_scores(matcher, profile_data, profile_vector, job_matrix[row].toarray(), feature_names, penalties[row])[0]
+                for row in range(job_matrix.shape[0])
+            ])
+            timings['loop'] = time.perf_counter() - start
+        else:
+            expected = results['numpy']
+
+        # Posting weights are float32: scores agree to float32 rounding, not exactly
+        equal = all(np.allclose(result, expected, rtol=1e-6, atol=1e-5) for result in results.values())
+        print(f"{size:>10} {job_matrix.nnz:>10} "
+              + ' '.join(
+                  f"{timings[backend] * 1000:>{width}.1f}" if backend in timings else f"{'-':>{width}}"
+                  for backend, width in (('loop', 10), ('numpy', 11), ('numba', 11))
+              )
+              + f"  {equal}")
+        if not equal:
+            raise SystemExit(f"Backends disagree at {size} postings")
+
+
+if __name__ == '__main__':
+    run([int(size) for size in sys.argv[1:]] or [500, 1000, 5000, 20000])
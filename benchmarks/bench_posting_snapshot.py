@@ -0,0 +1,67 @@
+# bench_posting_snapshot.py - Fit the job posting index vs map it from a snapshot
+#
+# Usage (from the repository root):
+#     python -m benchmarks.bench_posting_snapshot [sizes...]
+#
+# Writes a snapshot of a freshly fitted index to a temporary directory, maps it back
+# and checks that both indexes give the same recommendations.
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+from app.routes.recommendations.job_reco_model.job_matching import build_job_posting_index
+from app.routes.recommendations.job_reco_model.job_matcher import NoveltyEnhancedJobMatcher
+from app.routes.recommendations.posting_snapshot import write_posting_snapshot, load_posting_snapshot, snapshot_name
+from benchmarks.synthetic import generate_job_postings, generate_profile
+
+
+def recommendations(matcher, posting_index, profiles):
+    return [
+        [(rec['job_id'], rec['match_score']) for rec in matcher.get_recommendations(profile, top_n=10, posting_index=posting_index)]
+        for profile in profiles
+    ]
+
+
+def run(sizes):
+    matcher = NoveltyEnhancedJobMatcher(debug=False)
+    profiles = [generate_profile(seed) for seed in range(20)]
+
+    print(f"{'postings':>10} {'fit (s)':>9} {'write (s)':>10} {'map (s)':>9} {'mapped MB':>10}  equal")
+    for size in sizes:
+        payload = generate_job_postings(size)
+        start = time.perf_counter()
+        posting_index = build_job_posting_index(payload, matcher=matcher)
+        fit_time = time.perf_counter() - start
+
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            write_posting_snapshot(posting_index, directory, 1)
+            write_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            mapped = load_posting_snapshot(directory, 1, matcher.vectorizer)
+            map_time = time.perf_counter() - start
+
+            # Pages of the .npy files are shared by every process mapping the snapshot
+            snapshot = os.path.join(directory, snapshot_name(1))
+            mapped_bytes = sum(
+                os.path.getsize(os.path.join(snapshot, name)) for name in os.listdir(snapshot) if name.endswith('.npy')
+            )
+
+            expected = recommendations(matcher, posting_index, profiles)
+            actual = recommendations(matcher, mapped, profiles)
+            equal = all(
+                [job_id for job_id, _ in a] == [job_id for job_id, _ in e]
+                and np.allclose([score for _, score in a], [score for _, score in e])
+                for a, e in zip(actual, expected)
+            )
+
+        print(f"{size:>10} {fit_time:>9.2f} {write_time:>10.3f} {map_time:>9.3f} {mapped_bytes / 2**20:>10.1f}  {equal}")
+        if not equal:
+            raise SystemExit(f"Mapped snapshot gives different recommendations at {size} postings")
+
+
+if __name__ == '__main__':
+    run([int(size) for size in sys.argv[1:]] or [1000, 5000, 20000])
@@ -0,0 +1,66 @@
+# bench_preprocessing.py - Preprocessing throughput before/after the one-pass normaliser and stem cache
+#
+# Usage (from the repository root):
+#     python -m benchmarks.bench_preprocessing [postings] [description_words]
+#
+# The corpus is the transformed (sectioned) text of synthetic job postings with
+# real-sized descriptions (400 words by default). The new path is measured twice:
+# with a cold stem cache and with the cache warmed by the first pass.
+import re
+import sys
+import time
+from nltk.stem import SnowballStemmer
+
+from app.routes.recommendations.job_reco_model.job_matcher import NoveltyEnhancedJobMatcher
+from app.routes.recommendations.job_reco_model.transform_jobs import transform_job_postings
+from app.routes.recommendations.text_normalizer import stem_word, stem_cache_stats
+from benchmarks.synthetic import generate_job_postings
+
+
+def legacy_preprocess_text(stemmer, domain_stopwords, text):
+    """The original preprocess_text of the matchers"""
+    text = str(text).lower()
+    text = re.sub(r'[^a-zA-Z\s]', ' ', text)
+    words = text.split()
+    filtered_words = [word for word in words if word not in domain_stopwords]
+    text = ' '.join(filtered_words)
+    text = ' '.join(text.split())
+    stemmed_words = [stemmer.stem(word) for word in text.split()]
+    return ' '.join(stemmed_words)
+
+
+def timed(function, corpus):
+    start = time.perf_counter()
+    output = [function(text) for text in corpus]
+    return output, time.perf_counter() - start
+
+
+def run(postings, description_words):
+    matcher = NoveltyEnhancedJobMatcher(debug=False)
+    stemmer = SnowballStemmer("english")
+    corpus = list(transform_job_postings(generate_job_postings(postings, description_words=description_words)).values())
+    megabytes = sum(len(text) for text in corpus) / 1e6
+
+    expected, legacy_time = timed(lambda text: legacy_preprocess_text(stemmer, matcher.domain_stopwords, text), corpus)
+
+    stem_word.cache_clear()
+    cold, cold_time = timed(matcher.preprocess_text, corpus)
+    warm, warm_time = timed(matcher.preprocess_text, corpus)
+
+    print(f"{postings} postings, {megabytes:.1f} MB of text")
+    print(f"{'variant':>22} {'time (s)':>10} {'docs/s':>10} {'MB/s':>8} {'speedup':>9}")
+    for name, elapsed in [('legacy', legacy_time), ('one pass, cold cache', cold_time), ('one pass, warm cache', warm_time)]:
+        print(f"{name:>22} {elapsed:>10.3f} {postings / elapsed:>10.0f} {megabytes / elapsed:>8.2f} "
+              f"{legacy_time / elapsed:>8.1f}x")
+
+    stats = stem_cache_stats()
+    print(f"stem cache: {stats['hits']} hits, {stats['misses']} misses, {stats['size']} entries")
+
+    if cold != expected or warm != expected:
+        raise SystemExit("Normalised text differs from the original preprocess_text")
+    print("output identical: True")
+
+
+if __name__ == '__main__':
+    arguments = [int(argument) for argument in sys.argv[1:]]
+    run(arguments[0] if arguments else 2000, arguments[1] if len(arguments) > 1 else 400)
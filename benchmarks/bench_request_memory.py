@@ -0,0 +1,91 @@
+# bench_request_memory.py - Per-request peak memory of job recommendations
+#
+# Usage (from the repository root):
+#     python -m benchmarks.bench_request_memory [--budget MB] [sizes...]
+#
+# For each catalog size: size of the posting matrix as stored (float32) and as a
+# float64 copy, and the peak traced memory of one recommendation request for
+#   dense    - the original path, densifying the posting matrix in float64
+#   float64  - the sparse kernel over a float64 copy of the matrix
+#   full     - the sparse kernel over the float32 index, scoring every posting
+#   pruned   - get_recommendations as served (inverted index top-k)
+# The float64 copy is made before tracing, so only the request itself is measured.
+# With --budget, exits with an error when a served request (full or pruned) peaks
+# above that many MB, so memory regressions show up in CI runs.
+import resource
+import sys
+import tracemalloc
+import numpy as np
+
+from app.routes.recommendations.job_reco_model.job_matching import build_job_posting_index
+from app.routes.recommendations.job_reco_model.job_matcher import NoveltyEnhancedJobMatcher
+from benchmarks.synthetic import generate_job_postings, generate_profile
+
+
+def traced_peak(function):
+    """(result, peak traced MB) of one call"""
+    tracemalloc.start()
+    result = function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, peak / 2 ** 20
+
+
+def matrix_mb(matrix):
+    return (matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes) / 2 ** 20
+
+
+def dense_scores(profile_vector, job_matrix):
+    """Cosine similarities the way the matcher first computed them, over a dense float64 matrix"""
+    job_vectors = job_matrix.toarray().astype(np.float64)
+    dot_products = job_vectors @ profile_vector
+    norms = np.linalg.norm(job_vectors, axis=1) * np.linalg.norm(profile_vector)
+    return np.divide(dot_products, norms, out=np.zeros_like(dot_products), where=norms > 0)
+
+
+def run(sizes, budget=None):
+    matcher = NoveltyEnhancedJobMatcher(debug=False)
+    profile_data = generate_profile()
+    profile_sections = matcher.extract_profile_sections(profile_data)
+
+    print(f"{'postings':>9} {'index MB':>9} {'index f64 MB':>13} "
+          f"{'dense MB':>9} {'float64 MB':>11} {'full MB':>8} {'pruned MB':>10}")
+    over_budget = []
+    for size in sizes:
+        posting_index = build_job_posting_index(generate_job_postings(size), matcher=matcher)
+        job_matrix = posting_index.matrix
+        job_matrix_64 = job_matrix.astype(np.float64)
+        profile_vector = posting_index.section_vectors.combine(profile_sections, matcher.profile_section_weights)
+        term_boosts = matcher.profile_term_boost_vector(
+            posting_index, profile_vector, profile_sections, matcher.build_recency_table(profile_data)
+        )
+
+        _, dense_peak = traced_peak(lambda: dense_scores(profile_vector, job_matrix))
+        _, float64_peak = traced_peak(
+            lambda: matcher.score_jobs(profile_vector, job_matrix_64, term_boosts, posting_index.gap_weights)
+        )
+        _, full_peak = traced_peak(
+            lambda: matcher.score_jobs(profile_vector, job_matrix, term_boosts, posting_index.gap_weights, posting_index.row_norms)
+        )
+        _, pruned_peak = traced_peak(
+            lambda: matcher.get_recommendations(profile_data, top_n=10, posting_index=posting_index)
+        )
+
+        print(f"{size:>9} {matrix_mb(job_matrix):>9.1f} {matrix_mb(job_matrix_64):>13.1f} "
+              f"{dense_peak:>9.1f} {float64_peak:>11.1f} {full_peak:>8.1f} {pruned_peak:>10.1f}")
+        if budget is not None and max(full_peak, pruned_peak) > budget:
+            over_budget.append(size)
+
+    # ru_maxrss is in KB on Linux
+    print(f"max resident set: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+    if over_budget:
+        raise SystemExit(f"Request peak memory above {budget} MB at {over_budget} postings")
+
+
+if __name__ == '__main__':
+    arguments = sys.argv[1:]
+    budget = None
+    if arguments[:1] == ['--budget']:
+        budget = float(arguments[1])
+        arguments = arguments[2:]
+    run([int(size) for size in arguments] or [1000, 5000, 20000], budget)
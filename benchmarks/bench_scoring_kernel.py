@@ -0,0 +1,93 @@
+# bench_scoring_kernel.py - Compare the vectorized scoring kernel with the original per-job/per-term loop
+#
+# Usage (from the repository root):
+#     python -m benchmarks.bench_scoring_kernel [sizes...]
+#
+# Besides timing both implementations, it checks that they produce the same scores.
+import sys
+import time
+import numpy as np
+
+from app.routes.recommendations.job_reco_model.job_matching import build_job_posting_index
+from app.routes.recommendations.job_reco_model.job_matcher import NoveltyEnhancedJobMatcher
+from app.routes.recommendations.scoring import cosine_similarities, shared_term_boosts, profile_term_boosts
+from benchmarks.synthetic import generate_job_postings, generate_profile
+
+
+def legacy_scores(matcher, profile_data, profile_vector, job_vectors, feature_names, skill_gap_penalty):
+    """The original dense per-job/per-term scoring loop of NoveltyEnhancedJobMatcher"""
+    match_scores = np.zeros(len(job_vectors))
+    for i, job_vector in enumerate(job_vectors):
+        dot_product = np.dot(profile_vector, job_vector)
+        profile_norm = np.linalg.norm(profile_vector)
+        job_norm = np.linalg.norm(job_vector)
+        if profile_norm > 0 and job_norm > 0:
+            base_similarity = dot_product / (profile_norm * job_norm)
+        else:
+            base_similarity = 0
+
+        semantic_boost = 1.0
+        boost_count = 0
+        for term_idx, term in enumerate(feature_names):
+            if job_vector[term_idx] > 0 and profile_vector[term_idx] > 0:
+                cluster_boost = matcher.get_semantic_cluster_weight(term) - 1.0
+                recency_boost = matcher.calculate_recency_weight(term, profile_data) - 1.0
+                semantic_boost += cluster_boost + recency_boost
+                boost_count += 1
+        if boost_count > 0:
+            semantic_boost = 1.0 + (semantic_boost - 1.0) / boost_count
+            semantic_boost = min(1.5, semantic_boost)
+
+        base_score = base_similarity * 100
+        match_scores[i] = base_score * semantic_boost - (skill_gap_penalty * base_score / 10)
+    return match_scores
+
+
+def kernel_scores(matcher, profile_data, profile_vector, job_matrix, feature_names, cluster_weights, skill_gap_penalty):
+    """The vectorized kernel as used by NoveltyEnhancedJobMatcher.get_recommendations"""
+    base_similarity = cosine_similarities(profile_vector, job_matrix)
+    recency_table = matcher.build_recency_table(profile_data)
+    term_boosts = profile_term_boosts(
+        profile_vector,
+        feature_names,
+        lambda term: recency_table.weight(term) - 1.0
+    )
+    term_boosts += np.where(profile_vector > 0, cluster_weights - 1.0, 0.0)
+    semantic_boost = shared_term_boosts(profile_vector, job_matrix, term_boosts, max_boost=1.5)
+    base_score = base_similarity * 100
+    return base_score * semantic_boost - (skill_gap_penalty * base_score / 10)
+
+
+def run(sizes):
+    matcher = NoveltyEnhancedJobMatcher(debug=False)
+    profile_data = generate_profile()
+    profile_sections = matcher.extract_profile_sections(profile_data)
+
+    print(f"{'postings':>10} {'features':>10} {'loop (s)':>10} {'kernel (s)':>11} {'speedup':>9}  equal")
+    for size in sizes:
+        posting_index = build_job_posting_index(generate_job_postings(size), matcher=matcher)
+        feature_names = posting_index.feature_names
+        profile_vector = posting_index.section_vectors.combine(profile_sections, matcher.profile_section_weights)
+        skill_gap_penalty = 0.5
+
+        start = time.perf_counter()
+        expected = legacy_scores(matcher, profile_data, profile_vector, posting_index.matrix.toarray(),
+                                 feature_names, skill_gap_penalty)
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = kernel_scores(matcher, profile_data, profile_vector, posting_index.matrix,
+                               feature_names, posting_index.cluster_weights, skill_gap_penalty)
+        kernel_time = time.perf_counter() - start
+
+        # Posting weights are float32: scores agree to float32 rounding, not exactly
+        equal = np.allclose(actual, expected, rtol=1e-6, atol=1e-5)
+        print(f"{size:>10} {len(feature_names):>10} {loop_time:>10.3f} {kernel_time:>11.4f} "
+              f"{loop_time / kernel_time:>8.0f}x  {equal}")
+        if not equal:
+            raise SystemExit(f"Kernel scores differ from the loop at {size} postings "
+                             f"(max abs diff {np.max(np.abs(actual - expected)):.3e})")
+
+
+if __name__ == '__main__':
+    run([int(size) for size in sys.argv[1:]] or [100, 500, 1000])
@@ -0,0 +1,79 @@
+# bench_skill_gap.py - Compare the sparse per-posting gap scores with the original nested-loop skill gap vector
+#
+# Usage (from the repository root):
+#     python -m benchmarks.bench_skill_gap [sizes...]
+#
+# The postings are vectorized directly (no NLTK preprocessing) so that large
+# catalogs stay quick to set up; both implementations see the same texts.
+# Besides timing both, it checks that they agree: the loop's (catalog-wide)
+# total must equal the sum of the per-posting gaps, and the first postings are
+# compared one by one.
+import sys
+import time
+from collections import Counter
+import numpy as np
+from sklearn.base import clone
+
+from app.routes.recommendations.job_reco_model.job_matcher import NoveltyEnhancedJobMatcher
+from app.routes.recommendations.scoring import gap_scores, gap_term_weights
+from benchmarks.synthetic import generate_job_postings
+
+PROFILE_TEXT = "python django sql docker data analysis communication teamwork report project"
+
+# Postings compared one by one against the loop
+CHECKED_POSTINGS = 20
+
+
+def legacy_gap_vector(profile_features, job_features, feature_names, skill_rarity_index):
+    """The original NoveltyEnhancedJobMatcher.generate_skill_gap_vector"""
+    profile_terms = set(profile_features.split())
+    skill_gap_vector = np.zeros(len(feature_names))
+    for job_text in job_features:
+        job_terms = set(job_text.split())
+        missing_skills = job_terms - profile_terms
+        for term_idx, term in enumerate(feature_names):
+            if term in missing_skills:
+                rarity_factor = skill_rarity_index.get(term, 1.0)
+                skill_gap_vector[term_idx] += rarity_factor * 0.1
+    return skill_gap_vector
+
+
+def run(sizes):
+    matcher = NoveltyEnhancedJobMatcher(debug=False)
+
+    print(f"{'postings':>10} {'features':>10} {'loop (s)':>10} {'sparse (s)':>11} {'speedup':>9}  equal")
+    for size in sizes:
+        postings = generate_job_postings(size)['job_postings']
+        job_features = [posting['job_description'].lower().rstrip('.') for posting in postings]
+
+        vectorizer = clone(matcher.vectorizer)
+        job_matrix = vectorizer.fit_transform(job_features)
+        feature_names = vectorizer.get_feature_names_out()
+        profile_vector = vectorizer.transform([PROFILE_TEXT]).toarray()[0]
+
+        # Same shape as build_skill_rarity_index, on whitespace tokens
+        term_counts = Counter(term for text in job_features for term in text.split())
+        skill_rarity_index = {term: np.log(size / (count + 1)) + 1 for term, count in term_counts.items()}
+
+        start = time.perf_counter()
+        expected = legacy_gap_vector(PROFILE_TEXT, job_features, feature_names, skill_rarity_index)
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        gap_weights = gap_term_weights(feature_names, skill_rarity_index) * 0.1
+        actual = gap_scores(profile_vector, job_matrix, gap_weights)
+        sparse_time = time.perf_counter() - start
+
+        equal = np.isclose(np.sum(actual), np.sum(expected), rtol=1e-6)
+        for row in range(min(CHECKED_POSTINGS, size)):
+            single = legacy_gap_vector(PROFILE_TEXT, [job_features[row]], feature_names, skill_rarity_index)
+            equal = equal and np.isclose(actual[row], np.sum(single), rtol=1e-6)
+
+        print(f"{size:>10} {len(feature_names):>10} {loop_time:>10.3f} {sparse_time:>11.4f} "
+              f"{loop_time / sparse_time:>8.0f}x  {equal}")
+        if not equal:
+            raise SystemExit(f"Sparse gap scores differ from the loop at {size} postings")
+
+
+if __name__ == '__main__':
+    run([int(size) for size in sys.argv[1:]] or [1000, 10000, 50000])
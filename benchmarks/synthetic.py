@@ -0,0 +1,122 @@
+# synthetic.py - Synthetic postings and profiles for the recommendation benchmarks
+import random
+
+SKILL_WORDS = [
+    'python', 'java', 'javascript', 'react', 'node', 'django', 'flask', 'sql', 'docker', 'aws',
+    'machine', 'learning', 'data', 'analysis', 'statistics', 'tableau', 'excel', 'marketing',
+    'sales', 'management', 'leadership', 'communication', 'teamwork', 'nursing', 'patient', 'care',
+    'cooking', 'chef', 'baking', 'kitchen', 'accounting', 'finance', 'welding', 'electrical',
+    'plumbing', 'driving', 'logistics', 'warehouse', 'customer', 'service', 'design', 'figma',
+    'photoshop', 'teaching', 'curriculum', 'engineering', 'civil', 'mechanical', 'software', 'development'
+]
+
+FILLER_WORDS = [
+    'team', 'daily', 'support', 'ensure', 'quality', 'report', 'client', 'office', 'field', 'project',
+    'maintain', 'prepare', 'review', 'process', 'coordinate', 'schedule', 'operate', 'monitor',
+    'assist', 'handle', 'record', 'plan', 'deliver', 'improve', 'train', 'inspect', 'update'
+]
+
+TITLES = ['Staff', 'Specialist', 'Assistant', 'Officer', 'Technician', 'Engineer', 'Associate', 'Supervisor']
+
+
+def generate_job_postings(count, seed=42, description_words=120):
+    """Return a job postings payload shaped like get_employer_all_jobpostings()"""
+    rnd = random.Random(seed)
+    job_postings = []
+    for job_id in range(1, count + 1):
+        skills = rnd.sample(SKILL_WORDS, 5)
+        words = rnd.choices(SKILL_WORDS + FILLER_WORDS * 3, k=description_words)
+        job_postings.append({
+            "job_id": job_id,
+            "job_title": f"{skills[0].title()} {rnd.choice(TITLES)}",
+            "job_type": rnd.choice(['Full-time', 'Part-time', 'Contract']),
+            "experience_level": rnd.choice(['Entry', 'Mid-level', 'Senior']),
+            "job_description": ' '.join(words) + '.',
+            "estimated_salary_from": 10000.0 + 1000 * rnd.randint(0, 30),
+            "estimated_salary_to": 45000.0 + 1000 * rnd.randint(0, 30),
+            "no_of_vacancies": rnd.randint(1, 5),
+            "country": rnd.choice(['Philippines', 'Japan', 'Canada']),
+            "city_municipality": rnd.choice(['Iloilo City', 'Oton', 'Pavia', 'Passi City']),
+            "other_skills": ', '.join(skills),
+            "course_name": rnd.choice(['Computer Science', 'Nursing', 'Accountancy', 'Culinary Arts']),
+            "training_institution": None,
+            "certificate_received": None,
+            "status": "active",
+            "created_at": f"2025-0{rnd.randint(1, 9)}-1{rnd.randint(0, 9)}",
+            "updated_at": "2025-10-01",
+            "expiration_date": None,
+            "employer": {"company_name": f"Company {job_id % 97}"}
+        })
+    return {"job_postings": job_postings}
+
+
+def generate_profile(seed=7):
+    """Return a jobseeker profile shaped like the one assembled in recommendation_routes"""
+    rnd = random.Random(seed)
+    skills = rnd.sample(SKILL_WORDS, 8)
+    return {
+        "personal_information": [],
+        "job_preference": [],
+        "language_proficiency": [],
+        "educational_background": [
+            {"degree_or_qualification": "Bachelor", "field_of_study": "Computer Science"}
+        ],
+        "other_training": [
+            {"course_name": f"{skills[0]} {skills[1]}", "skills_acquired": f"{skills[2]} {skills[3]}",
+             "completion_date": "2024-05-01"}
+        ],
+        "professional_license": [],
+        "work_experience": [
+            {"position": f"{skills[4]} developer", "company_name": f"{skills[5]} company", "end_date": "2023-12-31"},
+            {"position": f"{skills[6]} assistant", "company_name": "local office", "end_date": None}
+        ],
+        "other_skills": [{"skills": ', '.join(skills)}]
+    }
+
+
+def domain_vocabulary(domains, words_per_domain=20, seed=0):
+    """Made-up, letter-only skill words for each of `domains` unrelated job domains"""
+    rnd = random.Random(seed)
+    consonants, vowels = 'bcdfghjklmnprstvz', 'aeiou'
+    seen = set()
+    vocabulary = []
+    for _ in range(domains):
+        words = []
+        while len(words) < words_per_domain:
+            word = ''.join(rnd.choice(consonants) + rnd.choice(vowels) for _ in range(3))
+            if word not in seen:
+                seen.add(word)
+                words.append(word)
+        vocabulary.append(words)
+    return vocabulary
+
+
+def generate_domain_job_postings(count, domains=250, seed=42, description_words=40):
+    """
+    Job postings payload where every posting belongs to one of `domains` domains
+    with their own skill words, so most postings share no skill term with a profile
+    """
+    rnd = random.Random(seed)
+    vocabulary = domain_vocabulary(domains)
+    payload = generate_job_postings(count, seed=seed, description_words=0)
+    for job in payload['job_postings']:
+        words = vocabulary[rnd.randrange(domains)]
+        skills = rnd.sample(words, 5)
+        # Titles carry the id so that every posting is its own row
+        job['job_title'] = f"{skills[0].title()} {rnd.choice(TITLES)} {job['job_id']}"
+        job['job_description'] = ' '.join(rnd.choices(words + FILLER_WORDS, k=description_words)) + '.'
+        job['other_skills'] = ', '.join(skills)
+    return payload
+
+
+def generate_domain_profile(seed=7, domains=250):
+    """Profile (see generate_profile) whose skills come from one domain of generate_domain_job_postings"""
+    rnd = random.Random(seed)
+    words = domain_vocabulary(domains)[rnd.randrange(domains)]
+    profile = generate_profile(seed)
+    skills = rnd.sample(words, 8)
+    profile['other_training'][0].update(course_name=f"{skills[0]} {skills[1]}", skills_acquired=f"{skills[2]} {skills[3]}")
+    profile['work_experience'][0]['position'] = f"{skills[4]} developer"
+    profile['work_experience'][1]['position'] = f"{skills[6]} assistant"
+    profile['other_skills'] = [{"skills": ', '.join(skills)}]
+    return profile
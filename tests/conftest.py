@@ -0,0 +1,127 @@
+# conftest.py - Flask app on a throwaway SQLite database, and factories for users and postings
+import base64
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+# Set before app.config is imported: the tests never touch a configured database,
+# and no background refresher or matching processes are started
+TEST_DIR = tempfile.mkdtemp(prefix='ipeps-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(TEST_DIR, 'test.db')
+os.environ['RECOMMENDATION_REFRESHER_ENABLED'] = 'false'
+os.environ['RECOMMENDATION_MATCHING_PROCESSES'] = '0'
+os.environ['RECOMMENDATION_SNAPSHOT_DIR'] = ''
+os.environ.setdefault('SECRET_KEY', 'test-secret')
+
+PASSWORD = 'password'
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import create_app
+    # create_app logs to app.log in the working directory
+    cwd = os.getcwd()
+    os.chdir(TEST_DIR)
+    try:
+        flask_app = create_app()
+    finally:
+        os.chdir(cwd)
+    flask_app.config['TESTING'] = True
+    return flask_app
+
+
+@pytest.fixture
+def database(app):
+    """Empty tables and empty process-wide recommendation caches for one test"""
+    from app import db
+    from app.routes.recommendations import near_duplicates
+    from app.routes.recommendations.job_reco_model.job_matching import job_posting_index
+    from app.routes.recommendations.candidate_index import jobseeker_profile_index
+    from app.routes.recommendations.recommendation_store import recommendation_cache
+
+    # Catalog versions start over with every database, so nothing cached per version may survive
+    job_posting_index.clear()
+    jobseeker_profile_index.clear()
+    recommendation_cache.clear()
+    near_duplicates._collapsed_ids.clear()
+
+    with app.app_context():
+        db.create_all()
+        yield db
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app, database):
+    return app.test_client()
+
+
+def auth_headers(username):
+    """HTTP basic auth headers of a user created by make_user"""
+    token = base64.b64encode(f'{username}:{PASSWORD}'.encode()).decode()
+    return {'Authorization': f'Basic {token}'}
+
+
+@pytest.fixture
+def make_user(database):
+    """Create a user (JOBSEEKER unless given) and return its id; with skills, its OtherSkills entry"""
+    from app.models import User, OtherSkills
+
+    def make(username, user_type='JOBSEEKER', skills=None):
+        user = User(username=username, email=f'{username}@example.com',
+                    password=User.hash_password(PASSWORD), user_type=user_type)
+        database.session.add(user)
+        database.session.commit()
+        if skills is not None:
+            database.session.add(OtherSkills(user_id=user.user_id, skills=skills))
+            database.session.commit()
+        return user.user_id
+    return make
+
+
+@pytest.fixture
+def make_employer(make_user, database):
+    """Create an EMPLOYER user with its personal information and return its id"""
+    from app.models import EmployerPersonalInformation
+
+    def make(username, company_industry='Information Technology'):
+        user_id = make_user(username, 'EMPLOYER')
+        database.session.add(EmployerPersonalInformation(
+            user_id=user_id, prefix='Ms', first_name='Ana', last_name='Reyes', company_name=f'{username} Inc',
+            company_type='Private', company_classification='Small', company_industry=company_industry,
+            company_workforce='10-50', email=f'{username}@example.com', employer_position='HR',
+            employer_id_number='E-1', cellphone_number='09170000000'
+        ))
+        database.session.commit()
+        return user_id
+    return make
+
+
+@pytest.fixture
+def make_job_posting(database):
+    """
+    Create a job posting the way the employer route does (signature recorded, catalog
+    version bumped) and return its id
+    """
+    from app.models import EmployerJobPosting
+    from app.utils import bump_posting_catalog_version
+    from app.routes.recommendations.near_duplicates import record_posting_signature, posting_text
+
+    def make(user_id, job_title, job_description, status='active', **fields):
+        fields.setdefault('job_type', 'Full-time')
+        fields.setdefault('no_of_vacancies', 1)
+        fields.setdefault('country', 'Philippines')
+        fields.setdefault('city_municipality', 'Iloilo City')
+        fields.setdefault('expiration_date', datetime.utcnow() + timedelta(days=30))
+        job = EmployerJobPosting(user_id=user_id, job_title=job_title, job_description=job_description,
+                                 status=status, **fields)
+        database.session.add(job)
+        database.session.flush()
+        record_posting_signature('job', job.employer_jobpost_id, user_id, posting_text('job', job))
+        bump_posting_catalog_version('job')
+        database.session.commit()
+        return job.employer_jobpost_id
+    return make
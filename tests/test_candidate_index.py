@@ -0,0 +1,123 @@
+# test_candidate_index.py - Jobseeker profile index: incremental updates of changed profiles, and ranked candidates
+import re
+
+import numpy as np
+import pytest
+
+from app.routes.recommendations.candidate_index import CandidateIndexCache
+from app.routes.recommendations.job_reco_model.job_matching import build_job_posting_index
+from app.routes.recommendations.job_reco_model.job_matcher import NoveltyEnhancedJobMatcher
+from benchmarks.synthetic import generate_job_postings, generate_profile
+from tests.conftest import auth_headers
+
+WELDER_DESCRIPTION = "Weld structural steel, read blueprints and inspect welding joints on construction sites."
+
+
+@pytest.fixture(scope='module')
+def job_index():
+    return build_job_posting_index(generate_job_postings(60), matcher=NoveltyEnhancedJobMatcher(debug=False))
+
+
+class ProfileSource:
+    """Jobseeker profiles by user id, recording which ones the index loads"""
+    def __init__(self, seeds):
+        self.profiles = {user_id: generate_profile(seed) for user_id, seed in seeds.items()}
+        self.loaded = []
+
+    def user_ids(self):
+        return sorted(self.profiles)
+
+    def load(self, user_ids):
+        self.loaded.append(sorted(user_ids))
+        return {user_id: self.profiles[user_id] for user_id in user_ids if user_id in self.profiles}
+
+
+def rankings(index, job_index):
+    """Candidates of every posting of the job index, with their scores"""
+    ranked = []
+    for row in range(len(job_index.posting_ids)):
+        user_ids, scores, total = index.rank(job_index.matrix[row].toarray().ravel(), top_n=10)
+        ranked.append((user_ids, np.round(scores, 4).tolist(), total))
+    return ranked
+
+
+def test_changed_profile_is_updated_alone(job_index):
+    source = ProfileSource({user_id: user_id for user_id in range(1, 9)})
+    cache = CandidateIndexCache()
+    cache.get(job_index, source.user_ids, source.load)
+    assert source.loaded == [list(range(1, 9))]
+
+    source.profiles[3] = generate_profile(99)
+    cache.mark_stale(3)
+    index = cache.get(job_index, source.user_ids, source.load)
+
+    assert source.loaded[1:] == [[3]]
+    stats = cache.stats()
+    assert (stats['full_loads'], stats['builds'], stats['updates'], stats['updated_profiles']) == (1, 1, 1, 1)
+    rebuilt = CandidateIndexCache().get(job_index, source.user_ids, source.load)
+    assert rankings(index, job_index) == rankings(rebuilt, job_index)
+
+
+def test_unchanged_index_is_reused(job_index):
+    source = ProfileSource({1: 1, 2: 2})
+    cache = CandidateIndexCache()
+    index = cache.get(job_index, source.user_ids, source.load)
+
+    assert cache.get(job_index, source.user_ids, source.load) is index
+    assert len(source.loaded) == 1
+
+
+def test_profiles_that_are_gone_are_dropped(job_index):
+    source = ProfileSource({1: 1, 2: 2, 3: 3})
+    cache = CandidateIndexCache()
+    cache.get(job_index, source.user_ids, source.load)
+
+    # No longer a jobseeker: load_profiles leaves it out
+    del source.profiles[2]
+    cache.mark_stale(2)
+    index = cache.get(job_index, source.user_ids, source.load)
+
+    assert sorted(index.user_ids) == [1, 3]
+    assert 2 not in index.row_by_user
+
+
+def test_unindexed_applicants_are_loaded_along(job_index):
+    source = ProfileSource({1: 1, 2: 2})
+    cache = CandidateIndexCache()
+    cache.get(job_index, lambda: [1], source.load)
+
+    index = cache.get(job_index, lambda: [1], source.load, user_ids=[2])
+
+    assert source.loaded == [[1], [2]]
+    assert sorted(index.user_ids) == [1, 2]
+
+
+def test_new_vocabulary_transforms_the_kept_profiles(job_index):
+    source = ProfileSource({1: 1, 2: 2})
+    cache = CandidateIndexCache()
+    cache.get(job_index, source.user_ids, source.load)
+
+    refitted = build_job_posting_index(generate_job_postings(40, seed=5), matcher=NoveltyEnhancedJobMatcher(debug=False))
+    index = cache.get(refitted, source.user_ids, source.load)
+
+    assert index.vectorizer is refitted.vectorizer
+    assert len(source.loaded) == 1
+    assert (cache.stats()['full_loads'], cache.stats()['builds']) == (1, 2)
+
+
+def test_pool_ranking_lists_the_postings_words(client, make_user, make_employer, make_job_posting):
+    job_id = make_job_posting(make_employer('builder'), 'Welder', WELDER_DESCRIPTION, other_skills='welding, blueprints')
+    make_job_posting(make_employer('shipyard'), 'Welder', WELDER_DESCRIPTION, other_skills='welding, blueprints')
+    welder = make_user('welder', skills='welding blueprints steel')
+    make_user('nurse', skills='nursing patient care')
+
+    response = client.get(f'/api/recommend/candidates/{job_id}/pool', headers=auth_headers('builder'))
+
+    assert response.status_code == 200
+    candidates = response.get_json()['candidates']
+    assert [candidate['user_id'] for candidate in candidates] == [welder]
+    # Matched terms are words of the posting, not the stems of its vocabulary
+    posting_words = set(re.findall(r'[a-z]+', f'welder {WELDER_DESCRIPTION} welding blueprints'.lower()))
+    matched_terms = candidates[0]['matched_terms']
+    assert 'blueprints' in matched_terms
+    assert all(set(term.split()) <= posting_words for term in matched_terms)
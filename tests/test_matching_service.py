@@ -0,0 +1,124 @@
+# test_matching_service.py - Matching pool back-pressure: bounded queue, 503 when full, recovery of a broken pool
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.routes.recommendations.matching_service import MatchingService, MatchingServiceBusy, matching_service
+from tests.conftest import auth_headers
+
+RESPONSE = {"success": True, "recommendations": []}
+
+
+class HeldExecutor:
+    """Stands in for the process pool: every submitted matching finishes once released (or fails with error)"""
+    def __init__(self, error=None):
+        self.error = error
+        self.release = threading.Event()
+        self.submitted = threading.Semaphore(0)
+
+    def submit(self, function, *args):
+        future = Future()
+
+        def finish():
+            self.release.wait(10)
+            if self.error is not None:
+                future.set_exception(self.error)
+            else:
+                future.set_result((RESPONSE, 'full'))
+        self.submitted.release()
+        threading.Thread(target=finish, daemon=True).start()
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def started_service(executor, queue_depth=1):
+    service = MatchingService(processes=1, queue_depth=queue_depth)
+    service._executor = executor
+    return service
+
+
+def match_in_thread(service, results, block=True):
+    def match():
+        try:
+            results.append(service.match('training', {}, {}, 1, 5, block=block))
+        except MatchingServiceBusy as e:
+            results.append(e)
+    thread = threading.Thread(target=match)
+    thread.start()
+    return thread
+
+
+def test_full_queue_rejects_callers_that_cannot_wait():
+    executor = HeldExecutor()
+    service = started_service(executor)
+    results = []
+    holder = match_in_thread(service, results)
+    assert executor.submitted.acquire(timeout=5)
+
+    with pytest.raises(MatchingServiceBusy):
+        service.match('training', {}, {}, 1, 5, block=False)
+
+    executor.release.set()
+    holder.join(5)
+    assert results == [RESPONSE]
+    assert service.stats()['rejected'] == 1 and service.stats()['dispatched'] == 1
+
+
+def test_blocking_callers_wait_for_a_slot():
+    executor = HeldExecutor()
+    service = started_service(executor)
+    results = []
+    holder = match_in_thread(service, results)
+    assert executor.submitted.acquire(timeout=5)
+
+    waiter = match_in_thread(service, results)
+    # The waiter is held back until the first matching frees its slot
+    assert not executor.submitted.acquire(timeout=0.3)
+
+    executor.release.set()
+    holder.join(5)
+    waiter.join(5)
+    assert results == [RESPONSE, RESPONSE]
+    assert service.stats()['rejected'] == 0 and service.stats()['dispatched'] == 2
+
+
+def test_failed_matching_falls_back_in_process():
+    executor = HeldExecutor(error=RuntimeError("worker failed"))
+    executor.release.set()
+    service = started_service(executor)
+
+    assert service.match('training', {}, {}, 1, 5) is None
+    assert service.stats()['failures'] == 1 and service.stats()['fallbacks'] == 1
+    assert service._executor is executor
+
+
+def test_broken_pool_is_replaced_once(monkeypatch):
+    broken = HeldExecutor(error=BrokenProcessPool("a worker died"))
+    broken.release.set()
+    service = started_service(broken, queue_depth=2)
+    replacement = HeldExecutor()
+    monkeypatch.setattr(service, '_create_executor', lambda: replacement)
+
+    assert service.match('training', {}, {}, 1, 5) is None
+    # A request that still saw the broken pool doesn't replace the new one
+    service._restart(broken)
+
+    assert service._executor is replacement
+    assert service.stats()['restarts'] == 1
+
+
+def test_full_queue_answers_503_with_retry_after(client, make_user, monkeypatch):
+    make_user('seeker', skills='welding')
+    monkeypatch.setattr(matching_service, '_executor', HeldExecutor())
+    monkeypatch.setattr(matching_service, '_slots', threading.BoundedSemaphore(1))
+    matching_service._slots.acquire()
+
+    response = client.get('/api/recommend/training-posting', headers=auth_headers('seeker'))
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert response.get_json()['success'] is False
@@ -0,0 +1,79 @@
+# test_near_duplicates.py - MinHash signatures, collapsing of reposts and the admin near-duplicate report
+import json
+
+from app.routes.recommendations.near_duplicates import (
+    minhash_signature, signature_similarity, load_job_postings, near_duplicate_report
+)
+from app.models import EmployerJobPosting
+from tests.conftest import auth_headers
+
+DESCRIPTION = (
+    "We are hiring a customer service representative to answer client calls, resolve billing "
+    "issues, record every ticket in the support system and escalate urgent cases to the team lead. "
+    "Previous call center experience and clear spoken English are required for this role."
+)
+EDITED_DESCRIPTION = DESCRIPTION.replace("Previous call center", "Prior call center")
+OTHER_DESCRIPTION = (
+    "Weld structural steel on construction sites, read blueprints, inspect joints for defects "
+    "and maintain the welding equipment according to the safety plan of the project."
+)
+
+
+def job_ids(payload):
+    """Ids of a job postings payload (JSON text when nothing was collapsed)"""
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+    return sorted(job['job_id'] for job in payload['job_postings'])
+
+
+def test_signatures_estimate_text_similarity():
+    original = minhash_signature(DESCRIPTION)
+    assert signature_similarity(original, minhash_signature(EDITED_DESCRIPTION)) >= 0.8
+    assert signature_similarity(original, minhash_signature(OTHER_DESCRIPTION)) < 0.3
+
+
+def test_reposts_collapse_to_the_newest_posting(make_employer, make_job_posting):
+    employer_id = make_employer('acme')
+    first = make_job_posting(employer_id, 'Customer Service Representative', DESCRIPTION)
+    repost = make_job_posting(employer_id, 'Customer Service Representative', EDITED_DESCRIPTION)
+    other = make_job_posting(employer_id, 'Welder', OTHER_DESCRIPTION)
+
+    assert job_ids(load_job_postings()) == [repost, other]
+    assert first not in job_ids(load_job_postings())
+
+
+def test_other_employers_postings_never_collapse(make_employer, make_job_posting):
+    first = make_job_posting(make_employer('acme'), 'Customer Service Representative', DESCRIPTION)
+    second = make_job_posting(make_employer('globex'), 'Customer Service Representative', DESCRIPTION)
+
+    assert job_ids(load_job_postings()) == [first, second]
+
+
+def test_report_keeps_what_the_matchers_keep(make_employer, make_job_posting, database):
+    employer_id = make_employer('acme')
+    first = make_job_posting(employer_id, 'Customer Service Representative', DESCRIPTION)
+    repost = make_job_posting(employer_id, 'Customer Service Representative', EDITED_DESCRIPTION)
+    # The newest repost is closed: the matchers keep the active repost, not it
+    make_job_posting(employer_id, 'Customer Service Representative', DESCRIPTION, status='closed')
+
+    report = near_duplicate_report('job', EmployerJobPosting, 'employer_jobpost_id')
+
+    assert len(report) == 1
+    assert report[0]['kept_posting_id'] == repost
+    assert [posting['posting_id'] for posting in report[0]['postings']] == [first, repost]
+    assert repost in job_ids(load_job_postings()) and first not in job_ids(load_job_postings())
+
+
+def test_report_endpoint_is_admin_only(client, make_user, make_employer, make_job_posting):
+    make_user('admin', 'ADMIN')
+    employer_id = make_employer('acme')
+    make_job_posting(employer_id, 'Customer Service Representative', DESCRIPTION)
+    repost = make_job_posting(employer_id, 'Customer Service Representative', EDITED_DESCRIPTION)
+
+    response = client.get('/api/near-duplicate-postings?posting_type=job', headers=auth_headers('admin'))
+    assert response.status_code == 200
+    job_report = response.get_json()['near_duplicates']['job']
+    assert job_report['duplicate_postings'] == 1
+    assert job_report['clusters'][0]['kept_posting_id'] == repost
+
+    assert client.get('/api/near-duplicate-postings', headers=auth_headers('acme')).status_code == 403
@@ -0,0 +1,112 @@
+# test_preference_filter.py - Job preference prefilter: constraint tiers relaxed until enough candidates remain
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.config import Config
+from app.routes.recommendations.preference_filter import select_candidate_rows, parse_tiers
+from app.utils import get_posting_catalog_version
+from tests.conftest import auth_headers
+
+TIERS = parse_tiers("country,municipality,salary,industry;country,salary;country;scope")
+
+POSTINGS = [
+    # Local postings: Iloilo City IT, Iloilo City IT (low pay), Passi City health
+    {'country': 'Philippines', 'city_municipality': 'Iloilo City', 'local_or_overseas': 'Local',
+     'estimated_salary_from': 25000, 'estimated_salary_to': 35000, 'employer': {'company_industry': 'Information Technology'}},
+    {'country': 'Philippines', 'city_municipality': 'Iloilo City', 'local_or_overseas': 'Local',
+     'estimated_salary_from': 12000, 'estimated_salary_to': 15000, 'employer': {'company_industry': 'Information Technology'}},
+    {'country': 'Philippines', 'city_municipality': 'Passi City', 'local_or_overseas': 'Local',
+     'estimated_salary_from': 20000, 'estimated_salary_to': 30000, 'employer': {'company_industry': 'Health'}},
+    # Overseas postings: Japan, and one without a country
+    {'country': 'Japan', 'city_municipality': 'Tokyo', 'local_or_overseas': 'Overseas',
+     'employer': {'company_industry': 'Manufacturing'}},
+    {'local_or_overseas': 'Overseas', 'employer': {'company_industry': 'Information Technology'}},
+]
+
+
+def posting_index(postings=POSTINGS, active=None):
+    """The parts of a posting index the prefilter reads"""
+    posting_ids = list(range(1, len(postings) + 1))
+    active = np.ones(len(postings), dtype=bool) if active is None else np.asarray(active)
+    return SimpleNamespace(
+        posting_ids=posting_ids, postings_by_id=dict(zip(posting_ids, postings)),
+        attributes=None, active_rows=lambda: active
+    )
+
+
+def profile(*preferences):
+    return {'job_preference': list(preferences)}
+
+
+ILOILO_IT = {'country': 'Philippines', 'municipality': 'Iloilo City', 'industry': 'information technology',
+             'salary_from': 20000, 'salary_to': 40000}
+
+
+def selected_rows(mask):
+    return list(np.flatnonzero(mask)) if mask is not None else None
+
+
+def test_strictest_tier_with_enough_candidates_is_used():
+    mask, fields = select_candidate_rows(posting_index(), profile(ILOILO_IT), min_candidates=1, tiers=TIERS)
+
+    # The low paid Iloilo posting fails the salary range; the posting without a country passes it
+    assert fields == TIERS[0]
+    assert selected_rows(mask) == [0, 4]
+
+
+def test_tiers_are_relaxed_until_enough_candidates_remain():
+    mask, fields = select_candidate_rows(posting_index(), profile(ILOILO_IT), min_candidates=3, tiers=TIERS)
+    assert fields == ('country', 'salary')
+    assert selected_rows(mask) == [0, 2, 4]
+
+    mask, fields = select_candidate_rows(posting_index(), profile(ILOILO_IT), min_candidates=4, tiers=TIERS)
+    assert fields == ('country',)
+    assert selected_rows(mask) == [0, 1, 2, 4]
+
+
+def test_overseas_preference_keeps_overseas_postings():
+    mask, fields = select_candidate_rows(posting_index(), profile({'country': 'Canada'}), min_candidates=2, tiers=TIERS)
+
+    # No posting is in Canada: the scope tier keeps the postings abroad
+    assert fields == ('scope',)
+    assert selected_rows(mask) == [3, 4]
+
+
+def test_any_preference_may_match():
+    overseas = {'country': 'Japan'}
+    mask, fields = select_candidate_rows(posting_index(), profile(ILOILO_IT, overseas), min_candidates=1, tiers=TIERS)
+
+    assert fields == TIERS[0]
+    assert selected_rows(mask) == [0, 3, 4]
+
+
+def test_inactive_postings_are_never_candidates():
+    index = posting_index(active=[False, True, True, True, True])
+    mask, fields = select_candidate_rows(index, profile(ILOILO_IT), min_candidates=1, tiers=TIERS)
+
+    assert fields == TIERS[0]
+    assert selected_rows(mask) == [4]
+
+
+def test_no_prefilter_when_every_tier_is_too_strict_or_it_is_off(monkeypatch):
+    assert select_candidate_rows(posting_index(), profile(ILOILO_IT), min_candidates=6, tiers=TIERS) == (None, None)
+    assert select_candidate_rows(posting_index(), profile(), min_candidates=1, tiers=TIERS) == (None, None)
+
+    monkeypatch.setattr(Config, 'RECOMMENDATION_PREFILTER_ENABLED', False)
+    assert select_candidate_rows(posting_index(), profile(ILOILO_IT), min_candidates=1, tiers=TIERS) == (None, None)
+
+
+def test_industry_change_bumps_the_job_catalog_version(client, make_employer):
+    make_employer('builder', company_industry='Construction')
+    before = get_posting_catalog_version('job')
+
+    response = client.post('/api/add-employer-personal-information', json={'company_name': 'Builder Corp'},
+                           headers=auth_headers('builder'))
+    assert response.status_code == 200
+    assert get_posting_catalog_version('job') == before
+
+    response = client.post('/api/add-employer-personal-information', json={'company_industry': 'Manufacturing'},
+                           headers=auth_headers('builder'))
+    assert response.status_code == 200
+    assert get_posting_catalog_version('job') == before + 1
@@ -0,0 +1,91 @@
+# test_recommendation_cache.py - Cached recommendation responses: per-user invalidation and catalog version bumps
+from app.routes.recommendations.recommendation_cache import RecommendationCache
+from app.routes.recommendations.recommendation_store import (
+    compute_recommendations, mark_recommendations_stale, recommendation_cache
+)
+from app.utils import bump_posting_catalog_version, get_posting_catalog_version
+from tests.conftest import auth_headers
+
+WELDER_DESCRIPTION = "Weld structural steel, read blueprints and inspect welding joints on construction sites."
+
+
+def setup_postings(make_employer, make_job_posting):
+    """Welder postings of two employers (the posting vocabulary keeps terms of two postings or more)"""
+    return [make_job_posting(make_employer(employer), 'Welder', WELDER_DESCRIPTION, other_skills='welding, blueprints')
+            for employer in ('builder', 'shipyard')]
+
+
+def test_invalidate_user_drops_only_that_users_entries():
+    cache = RecommendationCache(maxsize=10, ttl=60)
+    cache.set(1, ('job', 'a'), {'user': 1})
+    cache.set(1, ('training', 'a'), {'user': 1})
+    cache.set(2, ('job', 'a'), {'user': 2})
+
+    cache.invalidate_user(1)
+
+    assert cache.get(1, ('job', 'a')) is None and cache.get(1, ('training', 'a')) is None
+    assert cache.get(2, ('job', 'a')) == {'user': 2}
+    assert cache.stats()['invalidations'] == 2
+
+
+def test_evicted_keys_are_forgotten_per_user():
+    cache = RecommendationCache(maxsize=2, ttl=60)
+    for page in range(4):
+        cache.set(1, ('job', page), {'page': page})
+
+    # Only the keys still cached are tracked for the user
+    assert cache._keys_by_user[1] == {(1, ('job', 2)), (1, ('job', 3))}
+
+
+def test_first_bump_creates_the_version_row(database):
+    assert get_posting_catalog_version('training') == 0
+
+    bump_posting_catalog_version('training')
+    database.session.commit()
+    bump_posting_catalog_version('training')
+    database.session.commit()
+
+    assert get_posting_catalog_version('training') == 2
+    assert get_posting_catalog_version('scholarship') == 0
+
+
+def test_posting_edit_bumps_the_catalog_version(client, make_employer, make_job_posting):
+    job_id = make_job_posting(make_employer('builder'), 'Welder', WELDER_DESCRIPTION)
+    before = get_posting_catalog_version('job')
+
+    response = client.put(f'/api/job-posting/{job_id}', json={'job_title': 'Pipe Welder'},
+                          headers=auth_headers('builder'))
+
+    assert response.status_code == 200
+    assert get_posting_catalog_version('job') == before + 1
+
+
+def test_cached_response_is_served_until_the_catalog_changes(make_user, make_employer, make_job_posting):
+    setup_postings(make_employer, make_job_posting)
+    user_id = make_user('seeker', skills='welding blueprints steel')
+
+    version, response = compute_recommendations(user_id, 'job', 5)
+    assert compute_recommendations(user_id, 'job', 5)[1] is response
+
+    newer = make_job_posting(make_employer('dockyard'), 'Welder', WELDER_DESCRIPTION, other_skills='welding, steel')
+    newer_version, newer_response = compute_recommendations(user_id, 'job', 5)
+
+    assert newer_version == version + 1
+    assert newer_response is not response
+    assert newer in [rec['job_posting']['job_id'] for rec in newer_response['recommendations']]
+
+
+def test_profile_change_invalidates_only_that_users_responses(database, make_user, make_employer, make_job_posting):
+    setup_postings(make_employer, make_job_posting)
+    changed = make_user('changed', skills='welding blueprints steel')
+    unchanged = make_user('unchanged', skills='welding blueprints steel')
+    changed_response = compute_recommendations(changed, 'job', 5)[1]
+    unchanged_response = compute_recommendations(unchanged, 'job', 5)[1]
+
+    invalidations = recommendation_cache.stats()['invalidations']
+    mark_recommendations_stale(changed)
+    database.session.commit()
+
+    assert recommendation_cache.stats()['invalidations'] == invalidations + 1
+    assert compute_recommendations(changed, 'job', 5)[1] is not changed_response
+    assert compute_recommendations(unchanged, 'job', 5)[1] is unchanged_response
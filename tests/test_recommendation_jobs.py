@@ -0,0 +1,108 @@
+# test_recommendation_jobs.py - Asynchronous recommendation jobs: submit, (long-)poll from any worker process, TTL
+import json
+import threading
+from datetime import datetime, timedelta
+
+from app.models import RecommendationJobRecord
+from app.routes.recommendations import recommendation_routes
+from app.routes.recommendations.recommendation_jobs import recommendation_jobs, JOB_DONE, JOB_RUNNING
+from tests.conftest import auth_headers
+
+WELDER_DESCRIPTION = "Weld structural steel, read blueprints and inspect welding joints on construction sites."
+
+
+def submit(client, username, **body):
+    response = client.post('/api/recommend/jobs', json=body, headers=auth_headers(username))
+    assert response.status_code == 202
+    return response.get_json()
+
+
+def poll(client, username, job_id, wait=None):
+    url = f'/api/recommend/jobs/{job_id}' + (f'?wait={wait}' if wait else '')
+    return client.get(url, headers=auth_headers(username))
+
+
+def store_job(database, owner_id, status, **fields):
+    """A job as another worker process stores it"""
+    database.session.add(RecommendationJobRecord(job_id='a' * 32, owner_id=owner_id, status=status, **fields))
+    database.session.commit()
+    return 'a' * 32
+
+
+def test_submitted_job_is_polled_to_its_results(client, database, make_user, make_employer, make_job_posting):
+    welders = [make_job_posting(make_employer(employer), 'Welder', WELDER_DESCRIPTION, other_skills='welding, blueprints')
+               for employer in ('builder', 'shipyard')]
+    make_user('seeker', skills='welding blueprints steel')
+
+    submitted = submit(client, 'seeker', kinds=['job'], top_n=5)
+    response = poll(client, 'seeker', submitted['job_id'], wait=20)
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['status'] == JOB_DONE and body['success']
+    assert {rec['job_posting']['job_id'] for rec in body['results']['job']['recommendations']} == set(welders)
+    record = database.session.get(RecommendationJobRecord, submitted['job_id'])
+    assert record.expires_at - record.finished_at == timedelta(seconds=recommendation_jobs.ttl)
+
+
+def test_failed_part_is_reported(client, database, make_user, monkeypatch):
+    make_user('seeker')
+
+    def fail(user_id, kind, **kwargs):
+        raise RuntimeError(f"{kind} matcher failed")
+    monkeypatch.setattr(recommendation_routes, 'get_user_recommendations', fail)
+
+    submitted = submit(client, 'seeker', kinds=['training'])
+    body = poll(client, 'seeker', submitted['job_id'], wait=20).get_json()
+
+    assert body['status'] == 'failed' and not body['success']
+    assert body['errors'] == {'training': 'training matcher failed'}
+
+
+def test_job_of_another_worker_process_is_polled_from_the_database(client, database, make_user, app):
+    user_id = make_user('seeker')
+    job_id = store_job(database, user_id, JOB_RUNNING)
+
+    response = poll(client, 'seeker', job_id)
+    assert response.status_code == 202
+    assert response.get_json()['status'] == JOB_RUNNING
+
+    def finish():
+        with app.app_context():
+            finished_at = datetime.utcnow()
+            RecommendationJobRecord.query.filter_by(job_id=job_id).update({
+                'status': JOB_DONE, 'results': json.dumps({'job': {'recommendations': []}}),
+                'finished_at': finished_at, 'expires_at': finished_at + timedelta(minutes=10)
+            })
+            database.session.commit()
+    finisher = threading.Timer(0.3, finish)
+    finisher.start()
+    response = poll(client, 'seeker', job_id, wait=10)
+    finisher.join()
+
+    assert response.status_code == 200
+    assert response.get_json()['results'] == {'job': {'recommendations': []}}
+
+
+def test_only_the_submitter_or_an_admin_sees_a_job(client, database, make_user):
+    job_id = store_job(database, make_user('seeker'), JOB_RUNNING)
+    make_user('other')
+    make_user('admin', 'ADMIN')
+
+    assert poll(client, 'other', job_id).status_code == 404
+    assert poll(client, 'admin', job_id).status_code == 202
+
+
+def test_finished_jobs_expire_after_the_ttl(client, database, make_user):
+    user_id = make_user('seeker')
+    finished_at = datetime.utcnow() - timedelta(seconds=recommendation_jobs.ttl + 1)
+    job_id = store_job(database, user_id, JOB_DONE, results='{}', finished_at=finished_at,
+                       expires_at=finished_at + timedelta(seconds=recommendation_jobs.ttl))
+
+    assert poll(client, 'seeker', job_id).status_code == 404
+
+    # The next submission deletes it
+    submitted = submit(client, 'seeker', kinds=['training'])
+    poll(client, 'seeker', submitted['job_id'], wait=20)
+    database.session.expire_all()
+    assert database.session.get(RecommendationJobRecord, job_id) is None
@@ -0,0 +1,140 @@
+# test_recommendation_store.py - Stored recommendations: served from the store, recomputed when outdated
+import json
+from datetime import datetime, timedelta
+
+from app.models import UserRecommendation
+from app.routes.recommendations import recommendation_store
+from app.routes.recommendations.recommendation_store import (
+    recommendation_refresher, refresh_outdated_recommendations, REFRESH_RETRY_DELAY
+)
+from tests.conftest import auth_headers
+
+NURSE_DESCRIPTION = "Provide nursing care to hospital patients, give medication and monitor patient vital signs."
+WELDER_DESCRIPTION = "Weld structural steel, read blueprints and inspect welding joints on construction sites."
+
+
+def job_scores(response):
+    """{job id: match score} of a /recommend/job-posting response"""
+    body = response.get_json()
+    return {rec['job_posting']['job_id']: rec['match_score'] for rec in body['recommendations']}
+
+
+def stored_entry(database, user_id):
+    database.session.expire_all()
+    return database.session.get(UserRecommendation, (user_id, 'job'))
+
+
+def setup_postings(make_employer, make_job_posting):
+    """Nurse and welder postings of two employers (the posting vocabulary keeps terms of two postings or more)"""
+    nurses, welders = [], []
+    for employer in ('hospital', 'builder'):
+        employer_id = make_employer(employer)
+        nurses.append(make_job_posting(employer_id, 'Staff Nurse', NURSE_DESCRIPTION, other_skills='nursing, patient care'))
+        welders.append(make_job_posting(employer_id, 'Welder', WELDER_DESCRIPTION, other_skills='welding, blueprints'))
+    return nurses, welders
+
+
+def test_first_request_stores_the_ranking(client, database, make_user, make_employer, make_job_posting):
+    nurses, welders = setup_postings(make_employer, make_job_posting)
+    user_id = make_user('seeker', skills='welding blueprints steel')
+
+    response = client.get('/api/recommend/job-posting', headers=auth_headers('seeker'))
+
+    assert response.status_code == 200
+    assert list(job_scores(response))[:2] == welders
+    entry = stored_entry(database, user_id)
+    assert entry is not None and not entry.stale
+    assert [ranked['posting_id'] for ranked in json.loads(entry.ranked_postings)][:2] == welders
+
+
+def test_profile_change_is_recomputed_without_a_refresher(client, database, make_user, make_employer, make_job_posting):
+    nurses, welders = setup_postings(make_employer, make_job_posting)
+    user_id = make_user('seeker', skills='welding blueprints steel')
+    before = job_scores(client.get('/api/recommend/job-posting', headers=auth_headers('seeker')))
+
+    response = client.post('/api/add-jobseeker-student-other-skills',
+                           json=['nursing patient care hospital medication'], headers=auth_headers('seeker'))
+    assert response.status_code < 300
+    assert stored_entry(database, user_id).stale
+
+    assert not recommendation_refresher.running
+    after = job_scores(client.get('/api/recommend/job-posting', headers=auth_headers('seeker')))
+
+    assert after[nurses[0]] > before[nurses[0]]
+    assert not stored_entry(database, user_id).stale
+
+
+def test_catalog_change_is_recomputed_without_a_refresher(client, database, make_user, make_employer, make_job_posting):
+    setup_postings(make_employer, make_job_posting)
+    user_id = make_user('seeker', skills='welding blueprints steel')
+    client.get('/api/recommend/job-posting', headers=auth_headers('seeker'))
+
+    newer = make_job_posting(make_employer('shipyard'), 'Pipe Welder', WELDER_DESCRIPTION + ' Pipe welding.',
+                             other_skills='welding, steel, blueprints')
+    scores = job_scores(client.get('/api/recommend/job-posting', headers=auth_headers('seeker')))
+
+    assert newer in scores
+    assert stored_entry(database, user_id).catalog_version == recommendation_store.get_posting_catalog_version('job')
+
+
+def test_outdated_entry_is_served_while_the_refresher_runs(client, database, make_user, make_employer, make_job_posting, monkeypatch):
+    setup_postings(make_employer, make_job_posting)
+    user_id = make_user('seeker', skills='welding blueprints steel')
+    before = client.get('/api/recommend/job-posting', headers=auth_headers('seeker')).get_json()
+    stored_entry(database, user_id).stale = True
+    database.session.commit()
+
+    queued = []
+    monkeypatch.setattr(recommendation_refresher, '_thread', object())
+    monkeypatch.setattr(recommendation_refresher, 'enqueue', queued.append)
+    served = client.get('/api/recommend/job-posting', headers=auth_headers('seeker')).get_json()
+
+    assert served['recommendations'] == before['recommendations']
+    assert queued == [user_id]
+    assert stored_entry(database, user_id).stale
+
+
+def test_entry_older_than_the_staleness_bound_is_recomputed(client, database, make_user, make_employer, make_job_posting, monkeypatch):
+    setup_postings(make_employer, make_job_posting)
+    user_id = make_user('seeker', skills='welding blueprints steel')
+    client.get('/api/recommend/job-posting', headers=auth_headers('seeker'))
+    entry = stored_entry(database, user_id)
+    entry.computed_at = datetime.utcnow() - timedelta(days=2)
+    database.session.commit()
+
+    monkeypatch.setattr(recommendation_refresher, '_thread', object())
+    client.get('/api/recommend/job-posting', headers=auth_headers('seeker'))
+
+    assert datetime.utcnow() - stored_entry(database, user_id).computed_at < timedelta(minutes=5)
+
+
+def test_sweep_holds_back_entries_that_keep_failing(database, make_user, monkeypatch):
+    user_ids = [make_user(f'seeker{i}') for i in range(3)]
+    for user_id in user_ids:
+        database.session.add(UserRecommendation(user_id=user_id, kind='job', ranked_postings='[]', stale=True))
+    database.session.commit()
+
+    attempts = []
+
+    def recompute(user_id, kind, **kwargs):
+        attempts.append(user_id)
+        if user_id == user_ids[0]:
+            raise RuntimeError("matcher failed")
+        if user_id == user_ids[1]:
+            return None, 0, {"success": False}
+        recommendation_store.store_recommendations(user_id, kind, 0, [], 0)
+        return [], 0, {"success": True}
+    monkeypatch.setattr(recommendation_store, 'recompute_recommendations', recompute)
+
+    assert refresh_outdated_recommendations(limit=2) == 0
+    assert attempts == user_ids[:2]
+    for user_id in user_ids[:2]:
+        entry = stored_entry(database, user_id)
+        assert entry.refresh_failures == 1
+        assert entry.retry_after - datetime.utcnow() <= timedelta(seconds=REFRESH_RETRY_DELAY)
+
+    # The failing entries wait for their retry time; the third one gets its turn
+    attempts.clear()
+    assert refresh_outdated_recommendations(limit=2) == 1
+    assert attempts == [user_ids[2]]
+    assert stored_entry(database, user_ids[2]).refresh_failures == 0
@@ -0,0 +1,192 @@
+# test_scoring.py - Rankings of the scoring kernel, MaxScore pruning and posting snapshots against the baseline path
+#
+# Run from the repository root with:  python -m pytest -q
+#
+# The baseline is the original dense per-posting/per-term scoring loop with a full
+# stable sort of every posting (the sorted(..., reverse=True) the matchers started from).
+import numpy as np
+import pytest
+from scipy import sparse
+
+from app.routes.recommendations import scoring, numba_kernels
+from app.routes.recommendations.job_reco_model.job_matching import build_job_posting_index
+from app.routes.recommendations.job_reco_model.job_matcher import NoveltyEnhancedJobMatcher
+from app.routes.recommendations.training_reco_model import training_matcher
+from app.routes.recommendations.training_reco_model.training_matcher import TrainingMatcher
+from app.routes.recommendations.scholarship_reco_model import scholarship_matcher
+from app.routes.recommendations.scholarship_reco_model.scholarship_matcher import ScholarshipMatcher
+from app.routes.recommendations.posting_snapshot import PostingSnapshotStore
+from benchmarks.synthetic import generate_job_postings, generate_profile
+
+POSTINGS = 150
+PROFILE_SEEDS = (3, 7, 11)
+PAGES = ((10, 0), (5, 5))  # (top_n, offset)
+
+# Posting weights are float32: scores agree to float32 rounding, not exactly
+RTOL = 1e-6
+ATOL = 1e-5
+
+
+def legacy_score_components(profile_vector, posting_matrix, term_boosts, gap_weights, max_boost, posting_norms=None):
+    """score_components as the original dense loop over every posting and every term"""
+    profile_vector = np.asarray(profile_vector, dtype=np.float64).ravel()
+    posting_vectors = sparse.csr_matrix(posting_matrix).toarray().astype(np.float64)
+    gap_weights = np.asarray(gap_weights, dtype=np.float64)
+
+    similarities = np.zeros(len(posting_vectors))
+    boosts = np.ones(len(posting_vectors))
+    gaps = np.zeros((len(posting_vectors),) + gap_weights.shape[1:])
+    profile_norm = np.linalg.norm(profile_vector)
+    for i, posting_vector in enumerate(posting_vectors):
+        posting_norm = np.linalg.norm(posting_vector)
+        if profile_norm > 0 and posting_norm > 0:
+            similarities[i] = np.dot(profile_vector, posting_vector) / (profile_norm * posting_norm)
+
+        boost = 1.0
+        boost_count = 0
+        for term_idx in range(len(profile_vector)):
+            if posting_vector[term_idx] > 0 and profile_vector[term_idx] > 0:
+                boost += term_boosts[term_idx]
+                boost_count += 1
+            elif posting_vector[term_idx] > 0:
+                gaps[i] += gap_weights[term_idx]
+        if boost_count > 0:
+            boosts[i] = min(max_boost, 1.0 + (boost - 1.0) / boost_count)
+    return similarities, boosts, gaps
+
+
+def legacy_top_k_rows(scores, top_n, offset=0):
+    """Page of the full stable sort of every score, best first"""
+    order = sorted(range(len(scores)), key=lambda row: scores[row], reverse=True)
+    return np.array(order[offset:offset + top_n], dtype=np.intp)
+
+
+@pytest.fixture(params=scoring.SCORING_BACKENDS)
+def scoring_backend(request):
+    """Run a test on each score_components backend, back on NumPy afterwards"""
+    if request.param == 'numba' and not numba_kernels.AVAILABLE:
+        pytest.skip("numba is not installed")
+    scoring.select_scoring_backend(request.param)
+    yield request.param
+    scoring.select_scoring_backend('numpy')
+
+
+@pytest.fixture(scope='module')
+def job_postings():
+    return generate_job_postings(POSTINGS)
+
+
+@pytest.fixture(scope='module')
+def job_index(job_postings):
+    return build_job_posting_index(job_postings, matcher=NoveltyEnhancedJobMatcher(debug=False))
+
+
+def payload(job_postings, kind):
+    """The synthetic job postings as a training or scholarship postings payload"""
+    return {f'{kind}_postings': [
+        {**job, f'{kind}_id': job['job_id'], f'{kind}_title': f"{job['job_title']} {job['job_id']}",
+         f'{kind}_description': job['job_description']}
+        for job in job_postings['job_postings']
+    ]}
+
+
+def test_score_components_match_the_dense_loop(scoring_backend):
+    rnd = np.random.default_rng(0)
+    posting_matrix = sparse.random(60, 200, density=0.05, format='csr', dtype=np.float32, random_state=1)
+    profile_vector = np.where(rnd.random(200) < 0.2, rnd.random(200), 0.0)
+    term_boosts = np.where(profile_vector > 0, rnd.random(200) * 0.8, 0.0)
+    gap_weights = rnd.random((200, 2))
+
+    actual = scoring.score_components(profile_vector, posting_matrix, term_boosts, gap_weights, max_boost=1.5)
+    expected = legacy_score_components(profile_vector, posting_matrix, term_boosts, gap_weights, max_boost=1.5)
+    for actual_part, expected_part in zip(actual, expected):
+        np.testing.assert_allclose(actual_part, expected_part, rtol=RTOL, atol=ATOL)
+
+
+def test_top_k_rows_matches_a_full_stable_sort():
+    # Many ties: equal scores must keep their row order like sorted() does
+    scores = np.random.default_rng(2).integers(0, 20, size=500).astype(np.float64)
+    for top_n, offset in ((10, 0), (25, 40), (30, 490), (5, 600)):
+        np.testing.assert_array_equal(
+            scoring.top_k_rows(scores, top_n, offset), legacy_top_k_rows(scores, top_n, offset)
+        )
+
+
+@pytest.mark.parametrize('seed', PROFILE_SEEDS)
+def test_job_rankings_match_the_exhaustive_loop(job_index, scoring_backend, seed, monkeypatch):
+    matcher = NoveltyEnhancedJobMatcher(debug=False)
+    profile_data = generate_profile(seed)
+
+    # Baseline: every posting scored by the dense loop, then fully sorted
+    recommended = {}
+    for top_n, offset in PAGES:
+        recommended[top_n, offset] = matcher.get_recommendations(
+            profile_data, top_n=top_n, posting_index=job_index, offset=offset
+        )
+    profile_vector = job_index.section_vectors.combine(
+        matcher.extract_profile_sections(profile_data), matcher.profile_section_weights
+    )
+    term_boosts = matcher.profile_term_boost_vector(
+        job_index, profile_vector, matcher.extract_profile_sections(profile_data),
+        matcher.build_recency_table(profile_data)
+    )
+    monkeypatch.setattr('app.routes.recommendations.job_reco_model.job_matcher.score_components', legacy_score_components)
+    scores = matcher.score_jobs(profile_vector, job_index.matrix, term_boosts, job_index.gap_weights)
+
+    for (top_n, offset), recommendations in recommended.items():
+        rows = legacy_top_k_rows(scores, top_n, offset)
+        assert [rec['job_id'] for rec in recommendations] == [job_index.posting_ids[row] for row in rows]
+        np.testing.assert_allclose(
+            [rec['match_score'] for rec in recommendations],
+            np.clip(scores[rows], 0, 100),
+            rtol=RTOL, atol=ATOL
+        )
+
+
+@pytest.mark.parametrize('kind, run_matching, module', [
+    ('training', TrainingMatcher.run_training_matching, training_matcher),
+    ('scholarship', ScholarshipMatcher.run_scholarship_matching, scholarship_matcher),
+])
+def test_training_and_scholarship_rankings_match_the_dense_loop(job_postings, scoring_backend, kind, run_matching, module, monkeypatch):
+    postings = payload(job_postings, kind)
+    for seed in PROFILE_SEEDS:
+        profile_data = generate_profile(seed)
+        for top_n, offset in PAGES:
+            actual = run_matching(profile_data, postings, top_n, offset=offset)
+            with monkeypatch.context() as patch:
+                patch.setattr(module, 'score_components', legacy_score_components)
+                patch.setattr(module, 'top_k_rows', legacy_top_k_rows)
+                expected = run_matching(profile_data, postings, top_n, offset=offset)
+
+            assert [rec[f'{kind}_id'] for rec in actual] == [rec[f'{kind}_id'] for rec in expected]
+            np.testing.assert_allclose(
+                [rec['match_score'] for rec in actual],
+                [rec['match_score'] for rec in expected],
+                rtol=RTOL, atol=ATOL
+            )
+            if kind == 'training':
+                np.testing.assert_allclose(
+                    [rec['skill_gap_opportunity'] for rec in actual],
+                    [rec['skill_gap_opportunity'] for rec in expected],
+                    rtol=RTOL, atol=ATOL
+                )
+
+
+def test_snapshot_round_trip_ranks_like_the_built_index(job_index, tmp_path):
+    matcher = NoveltyEnhancedJobMatcher(debug=False)
+    store = PostingSnapshotStore(str(tmp_path), matcher.vectorizer)
+    assert store.save(job_index, 1)
+    loaded = store.load(1)
+    assert loaded is not None
+
+    assert list(loaded.feature_names) == list(job_index.feature_names)
+    assert list(loaded.posting_ids) == list(job_index.posting_ids)
+    assert (loaded.matrix != job_index.matrix).nnz == 0
+
+    for seed in PROFILE_SEEDS:
+        profile_data = generate_profile(seed)
+        for top_n, offset in PAGES:
+            built = matcher.get_recommendations(profile_data, top_n=top_n, posting_index=job_index, offset=offset)
+            mapped = matcher.get_recommendations(profile_data, top_n=top_n, posting_index=loaded, offset=offset)
+            assert [rec['job_id'] for rec in mapped] == [rec['job_id'] for rec in built]
+            assert [rec['match_score'] for rec in mapped] == [rec['match_score'] for rec in built]